@@ -0,0 +1,417 @@
+"""Adaptateur EventSourcedEngine: journal de commandes et checkpoints.
+
+Chaque commande acceptée (construction, ou variations de ressources groupées
+d'un ``adjust_resources`` ou d'un ``transfer_resources``) est ajoutée à un
+journal append-only (JSON Lines) avant d'être appliquée au monde en mémoire.
+Toutes les ``checkpoint_every`` commandes, l'état est figé dans un checkpoint
+(format legacy de FileStorageEngine) et le journal passe à un nouveau segment.
+
+Répertoire du journal::
+
+    checkpoint-000000000000.json   monde initial (genèse, conservé)
+    checkpoint-000000010000.json   monde après la commande 10000
+    log-000000000001.jsonl         commandes 1..10000
+    log-000000010001.jsonl         commandes 10001..
+
+Au démarrage, le dernier checkpoint complet est chargé puis seule la fin du
+journal est rejouée: le temps de reprise dépend du nombre de commandes depuis
+le dernier checkpoint, pas de l'historique total. Le rejeu passe par les
+méthodes de MemoryEngine (``apply_event``), il est donc déterministe; ``tools.replay_events``
+reconstruit n'importe quel état depuis la genèse.
+
+Une construction est journalisée avec le coût prélevé à son acceptation: le
+rejeu applique ce coût sans consulter le catalogue, et reste identique si les
+données de jeu ont changé depuis.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from ..gamedata import NO_COST, Catalog
+from ..models import BuildCmd, EngineStats, ResourceDelta, Transfer, Village
+from .file_engine import load_world
+from .footprint import file_size
+from .json_stream import WorldJsonWriter
+from .memory_engine import (
+    MemoryEngine,
+    WorldView,
+    built_villages,
+    in_id_order,
+    transfer_deltas,
+    transferred_villages,
+)
+from .persistent_map import PersistentMap
+
+DEFAULT_CHECKPOINT_EVERY = 10_000
+CHECKPOINT_PREFIX = "checkpoint-"
+LOG_PREFIX = "log-"
+# Checkpoints conservés en plus de la genèse
+_KEEP_CHECKPOINTS = 2
+
+
+class BuildEvent(NamedTuple):
+    """Construction journalisée, avec le coût prélevé à son acceptation."""
+
+    cmd: BuildCmd
+    cost: ResourceDelta
+
+
+# Commande journalisée: construction, ou variations de ressources par village
+Event = BuildEvent | dict[int, ResourceDelta]
+
+
+class Checkpoint(NamedTuple):
+    """Checkpoint complet sur disque."""
+
+    seq: int
+    path: Path
+
+
+def _seq_of(path: Path, prefix: str) -> int:
+    return int(path.name[len(prefix) :].split(".", 1)[0])
+
+
+def list_checkpoints(event_dir: Path) -> list[Checkpoint]:
+    """Liste les checkpoints complets, du plus ancien au plus récent."""
+    paths = event_dir.glob(f"{CHECKPOINT_PREFIX}*.json")
+    return sorted(Checkpoint(_seq_of(p, CHECKPOINT_PREFIX), p) for p in paths)
+
+
+def _segments(event_dir: Path) -> list[tuple[int, Path]]:
+    """Segments du journal (numéro de leur première commande, chemin), dans l'ordre."""
+    return sorted((_seq_of(p, LOG_PREFIX), p) for p in event_dir.glob(f"{LOG_PREFIX}*.jsonl"))
+
+
+def village_record(village: Village) -> dict[str, Any]:
+    """Enregistrement d'un village au format legacy (ressources et queue inline)."""
+    return {
+        "id": village.id,
+        "name": village.name,
+        "x": village.x,
+        "y": village.y,
+        "resources": village.resources.model_dump(),
+        "queue": list(village.queue),
+    }
+
+
+def write_world_file(path: Path, records: Iterable[dict[str, Any]]) -> int:
+    """Écrit un monde (fichier temporaire puis renommage).
+
+    Args:
+        path: Fichier cible, lisible par FileStorageEngine
+        records: Enregistrements de villages (voir ``village_record``)
+
+    Returns:
+        Nombre de villages écrits
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as fp:
+        writer = WorldJsonWriter(fp)
+        count = writer.write_section("villages", ((str(r["id"]), r) for r in records))
+        writer.close()
+    tmp_path.replace(path)
+    return count
+
+
+def encode_event(seq: int, event: Event) -> str:
+    """Ligne de journal d'une commande."""
+    if isinstance(event, BuildEvent):
+        record = {"seq": seq, "type": "build", "cmd": event.cmd.model_dump(), "cost": event.cost}
+        return json.dumps(record) + "\n"
+    return json.dumps({"seq": seq, "type": "resources", "deltas": event}) + "\n"
+
+
+def decode_event(record: dict[str, Any]) -> Event:
+    """Commande d'une ligne de journal décodée."""
+    if record["type"] == "resources":
+        return {int(vid): tuple(delta) for vid, delta in record["deltas"].items()}
+    # Journaux antérieurs au catalogue: constructions sans coût
+    wood, clay, iron, crop = record.get("cost", NO_COST)
+    return BuildEvent(BuildCmd(**record["cmd"]), (wood, clay, iron, crop))
+
+
+def apply_event(engine: MemoryEngine, event: Event) -> None:
+    """Applique une commande journalisée avec les méthodes de MemoryEngine (sans journal)."""
+    if isinstance(event, BuildEvent):
+        MemoryEngine._apply_builds(engine, [(event.cmd, event.cost)])
+    else:
+        MemoryEngine.adjust_resources(engine, event)
+
+
+def iter_events(event_dir: Path, after_seq: int = 0) -> Iterator[tuple[int, Event]]:
+    """Parcourt les commandes journalisées de numéro supérieur à ``after_seq``.
+
+    Une dernière ligne incomplète (écriture interrompue par un arrêt brutal)
+    est ignorée.
+
+    Args:
+        event_dir: Répertoire du journal
+        after_seq: Numéro de la dernière commande déjà appliquée
+
+    Yields:
+        (numéro, commande) dans l'ordre du journal
+    """
+    segments = _segments(event_dir)
+    for i, (_, path) in enumerate(segments):
+        if i + 1 < len(segments) and segments[i + 1][0] <= after_seq + 1:
+            continue  # segment entièrement couvert par le checkpoint
+        with path.open(encoding="utf-8") as fp:
+            for line in fp:
+                if not line.endswith("\n"):
+                    return
+                record = json.loads(line)
+                if record["seq"] > after_seq:
+                    yield record["seq"], decode_event(record)
+
+
+def _truncate_torn_tail(path: Path) -> None:
+    """Retire une dernière ligne incomplète pour pouvoir reprendre l'ajout."""
+    data = path.read_bytes()
+    if data and not data.endswith(b"\n"):
+        with path.open("r+b") as fp:
+            fp.truncate(data.rfind(b"\n") + 1)
+
+
+class EventSourcedEngine(MemoryEngine):
+    """Moteur mémoire persistant par journal de commandes et checkpoints.
+
+    Les lectures sont celles de MemoryEngine. Les mutations sont sérialisées par
+    le journal (un ordre global unique est ce qui rend le rejeu déterministe);
+    un checkpoint fige la version courante du monde (immuable, O(1)) sous le
+    verrou et la sérialise dans un thread. ``apply_build``, hérité et public,
+    est journalisé comme ``queue_build``; ``world = ...`` est refusé.
+    ``queue_builds`` journalise un lot en une écriture (un seul ``fsync``).
+    """
+
+    def __init__(
+        self,
+        event_dir: str | Path,
+        checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+        fsync: bool = False,
+        catalog: Catalog | None = None,
+    ) -> None:
+        """Charge le dernier checkpoint et rejoue la fin du journal.
+
+        Args:
+            event_dir: Répertoire du journal (créé si besoin, avec la genèse)
+            checkpoint_every: Nombre de commandes entre deux checkpoints
+            fsync: Forcer l'écriture sur disque à chaque commande (sinon le
+                journal est seulement vidé vers l'OS)
+            catalog: Catalogue des bâtiments des nouvelles commandes (le rejeu
+                utilise les coûts journalisés)
+        """
+        super().__init__(catalog)
+        self.event_dir = Path(event_dir)
+        self.event_dir.mkdir(parents=True, exist_ok=True)
+        self.checkpoint_every = checkpoint_every
+        self._fsync = fsync
+        self._log_lock = threading.Lock()
+        self._checkpoint_thread: threading.Thread | None = None
+        # Durée d'écriture du dernier checkpoint
+        self.last_persist_seconds: float | None = None
+
+        checkpoints = list_checkpoints(self.event_dir)
+        # Octets des checkpoints et des segments, tenus à jour à chaque écriture
+        self._checkpoint_bytes = file_size(*(c.path for c in checkpoints))
+        if checkpoints:
+            self._checkpoint_seq, path = checkpoints[-1]
+            self._replace_world(load_world(path))
+        else:
+            # Genèse: le monde initial, point de départ de tout rejeu
+            self._checkpoint_seq = 0
+            self._write_checkpoint(0, self.view())
+
+        self._seq = self._checkpoint_seq
+        self.replayed = 0
+        for seq, event in iter_events(self.event_dir, after_seq=self._seq):
+            apply_event(self, event)
+            self._seq = seq
+            self.replayed += 1
+
+        segments = _segments(self.event_dir)
+        if segments and segments[-1][0] <= self._seq + 1:
+            segment_path = segments[-1][1]
+            _truncate_torn_tail(segment_path)
+        else:
+            segment_path = self._segment_path(self._seq + 1)
+        self._log = segment_path.open("a", encoding="utf-8")
+        self._log_bytes = file_size(*(path for _, path in _segments(self.event_dir)))
+
+    @property
+    def seq(self) -> int:
+        """Numéro de la dernière commande journalisée."""
+        return self._seq
+
+    def stats(self) -> EngineStats:
+        """Statistiques du monde en mémoire, taille du journal et durée du dernier checkpoint."""
+        stats = super().stats()
+        return stats.model_copy(
+            update={
+                "storage_bytes": self._log_bytes + self._checkpoint_bytes,
+                "last_persist_seconds": self.last_persist_seconds,
+            }
+        )
+
+    def _segment_path(self, start: int) -> Path:
+        return self.event_dir / f"{LOG_PREFIX}{start:012d}.jsonl"
+
+    @property
+    def world(self) -> PersistentMap[int, Village]:
+        """Villages de la version courante (immuables)."""
+        return self._view.villages
+
+    @world.setter
+    def world(self, villages: Mapping[int, Village]) -> None:
+        # Un remplacement du monde n'est pas une commande: il ne serait ni
+        # journalisé ni rejoué. Le monde vient du journal et de ses checkpoints.
+        raise AttributeError("EventSourcedEngine.world: monde en lecture seule (non journalisé)")
+
+    def _apply_builds(self, builds: Sequence[tuple[BuildCmd, ResourceDelta | None]]) -> list[bool]:
+        """Journalise puis applique des constructions, en une écriture et une version.
+
+        ``queue_build``, ``queue_builds`` et ``apply_build`` passent tous par
+        ici; le rejeu (``apply_event``) appelle directement
+        ``MemoryEngine._apply_builds``, sans journaliser.
+
+        Args:
+            builds: Paires (commande, coût); un coût None refuse la commande
+
+        Returns:
+            Acceptation de chaque construction (acceptée = journalisée)
+        """
+        with self._log_lock:
+            # Les mutations sont sérialisées par le journal: les constructions
+            # acceptées ici le seront à l'identique par MemoryEngine._apply_builds
+            _, accepted = built_villages(self.world, builds)
+            events = [
+                BuildEvent(cmd, cost)
+                for (cmd, cost), ok in zip(builds, accepted, strict=True)
+                if ok and cost is not None
+            ]
+            if events:
+                self._append(*events)
+                super()._apply_builds([(event.cmd, event.cost) for event in events])
+                self._maybe_checkpoint()
+        return accepted
+
+    def adjust_resources(self, deltas: Mapping[int, ResourceDelta]) -> int:
+        """Journalise puis applique des variations de ressources, en une seule ligne.
+
+        Args:
+            deltas: Variations par ID de village (les stocks sont bornés à 0)
+
+        Returns:
+            Nombre de villages modifiés (les IDs inconnus ne sont pas journalisés)
+        """
+        with self._log_lock:
+            world = self.world
+            known = {vid: delta for vid, delta in deltas.items() if vid in world}
+            if not known:
+                return 0
+            self._append(known)
+            changed = super().adjust_resources(known)
+            self._maybe_checkpoint()
+        return changed
+
+    def transfer_resources(self, transfers: Sequence[Transfer]) -> list[ResourceDelta]:
+        """Journalise des transferts comme les variations nettes qu'ils produisent.
+
+        Les quantités sont bornées sur l'état courant, sous le verrou du
+        journal: les variations journalisées ne sont jamais bornées à 0, et
+        leur rejeu redonne exactement les mêmes stocks.
+
+        Args:
+            transfers: Transferts (source, cible, quantités)
+
+        Returns:
+            Quantités transférées, alignées sur ``transfers``
+        """
+        with self._log_lock:
+            _, moved = transferred_villages(self.world, transfers)
+            deltas = transfer_deltas(transfers, moved)
+            if deltas:
+                self._append(deltas)
+                super().adjust_resources(deltas)
+                self._maybe_checkpoint()
+        return moved
+
+    def _append(self, *events: Event) -> None:
+        """Écrit des commandes au journal en une écriture et leur attribue leurs numéros.
+
+        Appelé sous ``_log_lock``; le journal est vidé (et synchronisé) une fois.
+        """
+        lines = "".join(encode_event(self._seq + i, event) for i, event in enumerate(events, 1))
+        self._log.write(lines)
+        self._log.flush()
+        if self._fsync:
+            os.fsync(self._log.fileno())
+        self._seq += len(events)
+        self._log_bytes += len(lines.encode("utf-8"))
+
+    def _maybe_checkpoint(self) -> None:
+        if self._seq - self._checkpoint_seq >= self.checkpoint_every:
+            self._start_checkpoint()
+
+    def checkpoint(self) -> int:
+        """Écrit immédiatement un checkpoint de l'état courant.
+
+        Returns:
+            Numéro de commande couvert par le checkpoint
+        """
+        self.wait_checkpoint()
+        with self._log_lock:
+            seq = self._seq
+            if seq != self._checkpoint_seq:
+                self._start_checkpoint()
+        self.wait_checkpoint()
+        return seq
+
+    def wait_checkpoint(self) -> None:
+        """Attend la fin du checkpoint en cours d'écriture, s'il y en a un."""
+        thread = self._checkpoint_thread
+        if thread is not None:
+            thread.join()
+
+    def close(self) -> None:
+        """Attend le checkpoint en cours et ferme le journal."""
+        self.wait_checkpoint()
+        with self._log_lock:
+            self._log.close()
+
+    def _start_checkpoint(self) -> None:
+        """Fige l'état et lance l'écriture du checkpoint (sous ``_log_lock``)."""
+        if self._checkpoint_thread is not None and self._checkpoint_thread.is_alive():
+            return  # réessayé à la prochaine commande
+        seq = self._seq
+        view = self.view()
+        # Nouveau segment: le checkpoint couvre exactement les segments précédents
+        self._log.close()
+        self._log = self._segment_path(seq + 1).open("a", encoding="utf-8")
+        self._checkpoint_seq = seq
+        self._checkpoint_thread = threading.Thread(
+            target=self._write_checkpoint,
+            args=(seq, view),
+            name="ager-event-checkpoint",
+            daemon=True,
+        )
+        self._checkpoint_thread.start()
+
+    def _write_checkpoint(self, seq: int, view: WorldView) -> None:
+        path = self.event_dir / f"{CHECKPOINT_PREFIX}{seq:012d}.json"
+        started = time.perf_counter()
+        write_world_file(path, (village_record(v) for v in in_id_order(view.villages)))
+        self.last_persist_seconds = time.perf_counter() - started
+        written = file_size(path)
+        # Conserver la genèse et les derniers checkpoints; les segments restent (rejeu)
+        checkpoints = list_checkpoints(self.event_dir)
+        for old in checkpoints[1:-_KEEP_CHECKPOINTS]:
+            written -= file_size(old.path)
+            old.path.unlink(missing_ok=True)
+        self._checkpoint_bytes += written
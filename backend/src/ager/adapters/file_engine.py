@@ -4,10 +4,118 @@ Implémentation persistante utilisant un fichier JSON pour stocker l'état du mo
 """
 
 import json
+import threading
+import time
+from collections.abc import Mapping, Sequence
 from pathlib import Path
 from typing import Any
 
-from ..models import BuildCmd, Resources, Village
+from ..gamedata import Catalog, build_cost
+from ..models import (
+    BuildCmd,
+    EngineStats,
+    RankEntry,
+    ResourceDelta,
+    Resources,
+    Transfer,
+    Village,
+)
+from .footprint import file_size, world_footprint
+from .json_stream import iter_world_records
+from .leaderboard import board_entries, board_rank, build_boards, get_board
+from .locking import StripedLock
+from .memory_engine import (
+    WorldView,
+    adjusted_villages,
+    build_grid,
+    built_villages,
+    count_queue_items,
+    in_id_order,
+    publish,
+    resolve_ids,
+    transfer_ids,
+    transferred_villages,
+)
+from .persistent_map import PersistentMap
+
+# Ressources par défaut, immuables et donc partagées par tous les villages sans ressources
+_DEFAULT_RESOURCES = Resources()
+
+
+def load_world(path: Path) -> dict[int, Village]:
+    """Charge le monde depuis le fichier JSON, enregistrement par enregistrement.
+
+    Supporte deux formats:
+    1. Format legacy: resources dans chaque village
+    2. Format seed: resources séparées dans data["resources"]
+
+    Le fichier est parcouru en flux: chaque village est construit dès sa
+    lecture et les sections ``resources``/``buildQueues`` le remplacent
+    ensuite par une copie complétée (les villages sont gelés). Seuls les
+    enregistrements arrivés avant leur village sont mis en attente, si bien
+    que le pic mémoire suit la taille du monde final.
+
+    Args:
+        path: Fichier JSON du monde
+
+    Returns:
+        Dictionnaire village_id -> Village
+    """
+    world: dict[int, Village] = {}
+    # Enregistrements lus avant leur village (ordre de sections inhabituel)
+    pending_resources: dict[int, dict[str, Any]] = {}
+    pending_queues: dict[int, tuple[str, ...]] = {}
+    # Villages en attente de leurs resources séparées
+    missing: set[int] = set()
+
+    with path.open(encoding="utf-8") as fp:
+        for section, vid_str, value in iter_world_records(fp):
+            vid = int(vid_str)
+
+            if section == "villages":
+                # Priorité: resources dans village, sinon resources séparées, sinon défaut
+                if "resources" in value:
+                    resources = Resources(**value["resources"])
+                elif vid in pending_resources:
+                    resources = Resources(**pending_resources.pop(vid))
+                else:
+                    resources = _DEFAULT_RESOURCES
+                    missing.add(vid)
+
+                # Priorité: buildQueues séparées, sinon queue dans village
+                if vid in pending_queues:
+                    queue = pending_queues.pop(vid)
+                else:
+                    queue = tuple(value.get("queue", ()))
+
+                world[vid] = Village(
+                    id=value["id"],
+                    name=value["name"],
+                    x=value.get("x", 0),
+                    y=value.get("y", 0),
+                    resources=resources,
+                    queue=queue,
+                )
+
+            elif section == "resources":
+                village = world.get(vid)
+                if village is None:
+                    pending_resources[vid] = value
+                elif vid in missing:
+                    # Village gelé: remplacé par une copie complétée
+                    missing.discard(vid)
+                    world[vid] = village.model_copy(update={"resources": Resources(**value)})
+
+            elif section == "buildQueues":
+                # Convertir format buildQueues vers queue simplifiée
+                queue = tuple(f"{item['building']} -> L{item.get('level', 1)}" for item in value)
+                village = world.get(vid)
+                if village is None:
+                    pending_queues[vid] = queue
+                else:
+                    world[vid] = village.model_copy(update={"queue": queue})
+
+    return world
 
 
 class FileStorageEngine:
@@ -15,17 +123,39 @@ class FileStorageEngine:
 
     Implémente l'interface SimulationEngine avec stockage sur disque.
     Le fichier est lu au démarrage et écrit à chaque modification.
+
+    Concurrence: comme MemoryEngine, le monde est une suite de versions
+    immuables (``WorldView``); une mutation prépare ses villages sous leurs
+    verrous striés et publie une nouvelle version, puis la sauvegarde a lieu
+    hors de tout verrou de mutation, à partir d'une version figée. Les
+    sauvegardes sont regroupées: un appelant dont la version a déjà été écrite
+    par la sauvegarde d'un autre thread rend la main sans réécrire le fichier.
+    Chaque appel ne retourne qu'une fois sa mutation persistée.
     """
 
-    def __init__(self, storage_path: str = "./data/world.json") -> None:
+    def __init__(
+        self, storage_path: str = "./data/world.json", catalog: Catalog | None = None
+    ) -> None:
         """Initialise le moteur avec le chemin de stockage.
 
         Args:
             storage_path: Chemin du fichier JSON de stockage
+            catalog: Catalogue des bâtiments (coûts prélevés); None: constructions
+                acceptées sans coût
         """
         self.storage_path = Path(storage_path)
+        self.catalog = catalog
         self._ensure_storage_exists()
-        self.world = self._load_world()
+        self._view = WorldView(0, PersistentMap(self._load_world()))
+        self._grid = build_grid(self._view.villages)
+        self._boards = build_boards(self._view.villages)
+        self._queue_items = count_queue_items(self._view.villages)
+        self._stripes = StripedLock()
+        self._publish_lock = threading.Lock()
+        # Version de la dernière sauvegarde et durée de cette sauvegarde
+        self._saved_version = 0
+        self.last_persist_seconds: float | None = None
+        self._save_lock = threading.Lock()
 
     def _ensure_storage_exists(self) -> None:
         """Crée le répertoire de stockage et le fichier s'ils n'existent pas."""
@@ -45,86 +175,99 @@ class FileStorageEngine:
             self.storage_path.write_text(json.dumps(default_world, indent=2))
 
     def _load_world(self) -> dict[int, Village]:
-        """Charge le monde depuis le fichier JSON.
+        """Charge le monde depuis le fichier de stockage (voir ``load_world``)."""
+        return load_world(self.storage_path)
 
-        Supporte deux formats:
-        1. Format legacy: resources dans chaque village
-        2. Format seed: resources séparées dans data["resources"]
+    @property
+    def world(self) -> PersistentMap[int, Village]:
+        """Villages de la version courante (immuables)."""
+        return self._view.villages
 
-        Returns:
-            Dictionnaire village_id -> Village
-        """
-        data = json.loads(self.storage_path.read_text())
-        world: dict[int, Village] = {}
+    def view(self) -> WorldView:
+        """Retourne la version courante du monde, cohérente et immuable (O(1))."""
+        return self._view
 
-        # Charger resources séparées si présentes (format seed)
-        resources_map = data.get("resources", {})
-
-        for vid_str, v_data in data.get("villages", {}).items():
-            vid = int(vid_str)
+    def _save_world(self, villages: PersistentMap[int, Village]) -> None:
+        """Sauvegarde une version du monde dans le fichier JSON.
 
-            # Priorité: resources dans village, sinon resources séparées, sinon défaut
-            if "resources" in v_data:
-                resources = Resources(**v_data["resources"])
-            elif vid_str in resources_map:
-                resources = Resources(**resources_map[vid_str])
-            else:
-                resources = Resources()
-
-            # Charger queue: priorité buildQueues séparées, sinon queue dans village
-            build_queues = data.get("buildQueues", {})
-            if vid_str in build_queues:
-                # Convertir format buildQueues vers queue simplifiée
-                queue = [
-                    f"{item['building']} -> L{item.get('level', 1)}"
-                    for item in build_queues[vid_str]
-                ]
-            else:
-                queue = v_data.get("queue", [])
-
-            world[vid] = Village(
-                id=v_data["id"],
-                name=v_data["name"],
-                resources=resources,
-                queue=queue,
-            )
-        return world
+        La version étant immuable, elle est sérialisée sans verrou; le fichier
+        est écrit à côté puis renommé. Les villages y sont rangés par ID.
 
-    def _save_world(self) -> None:
-        """Sauvegarde le monde dans le fichier JSON."""
+        Args:
+            villages: Villages de la version à sauvegarder
+        """
         data: dict[str, Any] = {"villages": {}}
-        for vid, village in self.world.items():
-            data["villages"][str(vid)] = {
+        for village in in_id_order(villages):
+            data["villages"][str(village.id)] = {
                 "id": village.id,
                 "name": village.name,
+                "x": village.x,
+                "y": village.y,
                 "resources": {
                     "wood": village.resources.wood,
                     "clay": village.resources.clay,
                     "iron": village.resources.iron,
                     "crop": village.resources.crop,
                 },
-                "queue": village.queue,
+                "queue": list(village.queue),
             }
-        self.storage_path.write_text(json.dumps(data, indent=2))
+        tmp_path = self.storage_path.with_name(self.storage_path.name + ".tmp")
+        tmp_path.write_text(json.dumps(data, indent=2))
+        tmp_path.replace(self.storage_path)
+
+    def _persist(self, version: int) -> None:
+        """Garantit que la mutation ``version`` est sur disque.
 
-    def snapshot(self) -> list[Village]:
+        Args:
+            version: Version publiée par la mutation
+        """
+        with self._save_lock:
+            if self._saved_version >= version:
+                return  # écrite par la sauvegarde d'un autre thread
+            # La version courante inclut toutes les mutations jusqu'à ``version``
+            view = self._view
+            started = time.perf_counter()
+            self._save_world(view.villages)
+            self.last_persist_seconds = time.perf_counter() - started
+            self._saved_version = view.version
+
+    def snapshot(self, fields: frozenset[str] | None = None) -> list[Village]:
         """Retourne la liste de tous les villages.
 
+        Args:
+            fields: Champs demandés; ignoré, les villages étant déjà en mémoire
+                (la projection se fait à la sérialisation)
+
         Returns:
-            Liste de tous les villages du monde
+            Liste de tous les villages du monde, par ID croissant
         """
-        return list(self.world.values())
+        return in_id_order(self._view.villages)
 
-    def get_village(self, vid: int) -> Village | None:
+    def get_village(self, vid: int, fields: frozenset[str] | None = None) -> Village | None:
         """Récupère un village par son ID.
 
         Args:
             vid: ID du village
+            fields: Champs demandés; ignoré (voir ``snapshot``)
 
         Returns:
             Le village si trouvé, None sinon
         """
-        return self.world.get(vid)
+        return self._view.villages.get(vid)
+
+    def get_villages(
+        self, vids: Sequence[int], fields: frozenset[str] | None = None
+    ) -> list[Village]:
+        """Récupère plusieurs villages par leurs IDs.
+
+        Args:
+            vids: IDs des villages
+            fields: Champs demandés; ignoré (voir ``snapshot``)
+
+        Returns:
+            Villages connus, dans l'ordre de ``vids``
+        """
+        return resolve_ids(self._view.villages, list(vids))
 
     def queue_build(self, cmd: BuildCmd) -> bool:
         """Ajoute une commande de construction à la queue d'un village.
@@ -133,18 +276,150 @@ class FileStorageEngine:
             cmd: Commande de construction
 
         Returns:
-            True si la commande a été acceptée, False sinon
+            True si la commande a été acceptée, False sinon (village inconnu,
+            construction absente du catalogue ou stocks insuffisants)
+        """
+        return self.queue_builds([cmd])[0]
+
+    def queue_builds(self, cmds: Sequence[BuildCmd]) -> list[bool]:
+        """Ajoute des constructions dans l'ordre, en une version et une sauvegarde.
+
+        Args:
+            cmds: Commandes de construction
+
+        Returns:
+            Acceptation de chaque commande, alignée sur ``cmds``
         """
-        village = self.world.get(cmd.villageId)
-        if not village:
-            return False
-        if not cmd.building or cmd.levelTarget <= 0:
-            return False
+        builds = [(cmd, build_cost(self.catalog, cmd)) for cmd in cmds]
 
-        # Ajouter à la queue
-        village.queue.append(f"{cmd.building} -> L{cmd.levelTarget}")
+        # Ajouter aux queues et prélever les coûts (nouvelle version du monde)
+        with self._stripes.hold(cmd.villageId for cmd in cmds):
+            replaced, accepted = built_villages(self._view.villages, builds)
+            if not replaced:
+                return accepted
+            with self._publish_lock:
+                self._view = publish(self._view, self._boards, replaced)
+                self._queue_items += sum(accepted)
+                version = self._view.version
 
-        # Persister immédiatement
-        self._save_world()
+        # Persister immédiatement (hors du verrou de mutation)
+        self._persist(version)
+        return accepted
 
-        return True
+    def adjust_resources(self, deltas: Mapping[int, ResourceDelta]) -> int:
+        """Applique des variations de ressources, en une version et une sauvegarde.
+
+        Args:
+            deltas: Variations par ID de village (les stocks sont bornés à 0)
+
+        Returns:
+            Nombre de villages modifiés (les IDs inconnus sont ignorés)
+        """
+        with self._stripes.hold(deltas):
+            replaced = adjusted_villages(self._view.villages, deltas)
+            if not replaced:
+                return 0
+            with self._publish_lock:
+                self._view = publish(self._view, self._boards, replaced)
+                version = self._view.version
+        self._persist(version)
+        return len(replaced)
+
+    def transfer_resources(self, transfers: Sequence[Transfer]) -> list[ResourceDelta]:
+        """Transfère des ressources entre villages, en une version et une sauvegarde.
+
+        Args:
+            transfers: Transferts (source, cible, quantités), bornés au stock
+                de la source
+
+        Returns:
+            Quantités transférées, alignées sur ``transfers``
+        """
+        with self._stripes.hold(transfer_ids(transfers)):
+            replaced, moved = transferred_villages(self._view.villages, transfers)
+            if not replaced:
+                return moved
+            with self._publish_lock:
+                self._view = publish(self._view, self._boards, replaced)
+                version = self._view.version
+        self._persist(version)
+        return moved
+
+    def villages_within(self, x: int, y: int, r: float) -> list[Village]:
+        """Villages à distance au plus ``r`` de (x, y), du plus proche au plus lointain.
+
+        Args:
+            x: Abscisse du centre
+            y: Ordonnée du centre
+            r: Rayon
+
+        Returns:
+            Villages trouvés, triés par distance puis par ID
+        """
+        return resolve_ids(self._view.villages, self._grid.within(x, y, r))
+
+    def nearest_villages(self, x: int, y: int, n: int) -> list[Village]:
+        """Les ``n`` villages les plus proches de (x, y).
+
+        Args:
+            x: Abscisse du point
+            y: Ordonnée du point
+            n: Nombre de villages
+
+        Returns:
+            Villages trouvés, triés par distance puis par ID
+        """
+        return resolve_ids(self._view.villages, self._grid.nearest(x, y, n))
+
+    def leaderboard(self, metric: str, limit: int, offset: int) -> list[RankEntry]:
+        """Tranche du classement d'une métrique.
+
+        Args:
+            metric: Métrique de ``LEADERBOARD_METRICS``
+            limit: Nombre maximal d'entrées
+            offset: Nombre d'entrées sautées depuis la première place
+
+        Returns:
+            Entrées triées par score décroissant puis par ID
+
+        Raises:
+            ValueError: Si la métrique est inconnue
+        """
+        # Classements modifiés en place: lus avec leur version, sous le verrou
+        # de publication
+        with self._publish_lock:
+            return board_entries(
+                self._view.villages, get_board(self._boards, metric).top(limit, offset)
+            )
+
+    def village_rank(self, vid: int, metric: str) -> RankEntry | None:
+        """Rang d'un village dans le classement d'une métrique.
+
+        Args:
+            vid: ID du village
+            metric: Métrique de ``LEADERBOARD_METRICS``
+
+        Returns:
+            L'entrée du village si trouvé, None sinon
+
+        Raises:
+            ValueError: Si la métrique est inconnue
+        """
+        with self._publish_lock:
+            return board_rank(self._view.villages, self._boards, vid, metric)
+
+    def stats(self) -> EngineStats:
+        """Compteurs du monde en mémoire, taille du fichier et durée de la dernière sauvegarde.
+
+        Returns:
+            Statistiques du moteur (O(1): compteurs et un ``stat`` du fichier)
+        """
+        villages = len(self._view.villages)
+        return EngineStats(
+            engine=type(self).__name__,
+            villages=villages,
+            queue_items=self._queue_items,
+            memory_bytes=world_footprint(villages, self._queue_items),
+            storage_bytes=file_size(self.storage_path),
+            last_persist_seconds=self.last_persist_seconds,
+        )
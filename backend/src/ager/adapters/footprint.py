@@ -0,0 +1,60 @@
+"""Estimations O(1) pour ``stats()``: empreinte mémoire d'un monde et taille des fichiers.
+
+Mesurer l'empreinte réelle d'un monde demanderait de parcourir tous ses objets.
+Elle est estimée à partir de la taille d'un village type et d'un élément de
+queue type, mesurées une fois par processus, multipliées par les compteurs que
+les moteurs tiennent à jour.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from functools import cache
+from pathlib import Path
+
+from ..models import Resources, Village
+
+# Entrée d'un village dans la table persistante (feuille + part des nœuds internes)
+_MAP_ENTRY_BYTES = 64
+
+
+def _deep_size(obj: object) -> int:
+    """Taille de ``obj`` et des objets qu'il contient (modèles, listes, dict)."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k) + _deep_size(v) for k, v in obj.items())
+    elif isinstance(obj, list | tuple):
+        size += sum(_deep_size(item) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += _deep_size(vars(obj))
+    return size
+
+
+@cache
+def village_bytes() -> int:
+    """Taille estimée d'un village sans queue (modèle, ressources, nom)."""
+    village = Village(id=10**6, name="Village 000000", x=100, y=100, resources=Resources())
+    return _deep_size(village) + _MAP_ENTRY_BYTES
+
+
+@cache
+def queue_item_bytes() -> int:
+    """Taille estimée d'un élément de queue et de sa place dans le tuple."""
+    return sys.getsizeof("main_building -> L10") + 8
+
+
+def world_footprint(villages: int, queue_items: int) -> int:
+    """Empreinte mémoire approximative d'un monde en mémoire, en octets."""
+    return villages * village_bytes() + queue_items * queue_item_bytes()
+
+
+def file_size(*paths: str | Path) -> int:
+    """Taille cumulée de fichiers (un ``stat`` chacun), 0 pour un fichier absent."""
+    total = 0
+    for path in paths:
+        try:
+            total += os.stat(path).st_size
+        except FileNotFoundError:
+            pass
+    return total
@@ -0,0 +1,317 @@
+"""Adaptateur HybridEngine: état en mémoire, persistance SQLite différée.
+
+Le monde est chargé depuis SQLite au démarrage puis servi depuis la mémoire
+(lectures de MemoryEngine). Chaque mutation acceptée est appliquée en mémoire
+puis mise en file; un thread la persiste dans SQLite par lots, via le writer
+unique de la base (``db/writer.py``).
+
+Le retard de SQLite sur la mémoire est borné:
+- en temps: une mutation est commitée au plus ``max_lag`` secondes après avoir
+  été appliquée (hors indisponibilité de la base);
+- en volume: au-delà de ``max_pending`` mutations en attente, une nouvelle
+  mutation attend que le thread ait rattrapé son retard.
+
+``flush()`` persiste immédiatement tout ce qui est en attente; il est appelé à
+l'arrêt de l'application. Un arrêt brutal perd au plus les mutations des
+``max_lag`` dernières secondes. Un lot dont l'écriture échoue pendant l'arrêt
+n'est pas réessayé: il est journalisé et compté dans ``dropped``.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Mapping, Sequence
+from datetime import UTC, datetime
+from functools import partial
+from pathlib import Path
+from typing import NamedTuple
+
+from sqlmodel import Session
+
+from ..db.models import BuildQueue as BuildQueueORM
+from ..db.session import get_writer
+from ..gamedata import Catalog
+from ..metrics import WRITE_BEHIND_LAG, WRITE_BEHIND_PENDING
+from ..models import BuildCmd, EngineStats, ResourceDelta, Resources, Transfer, Village
+from .footprint import file_size
+from .memory_engine import MemoryEngine
+from .sql_engine import SQLiteEngine, sqlite_stats, store_resources, wal_path
+
+DEFAULT_MAX_LAG = 0.2
+DEFAULT_MAX_PENDING = 10_000
+# Délai avant une nouvelle tentative quand l'écriture d'un lot a échoué
+_RETRY_DELAY = 1.0
+
+logger = logging.getLogger("ager.hybrid")
+
+
+class _Mutation(NamedTuple):
+    """Ajout à une queue de construction, en attente d'écriture.
+
+    ``resources``: stocks du village après prélèvement du coût (catalogue),
+    None si la construction n'a rien coûté.
+    """
+
+    village_id: int
+    building: str
+    level: int
+    queued_at: str
+    applied_at: float
+    resources: Resources | None = None
+
+
+class _ResourceWrite(NamedTuple):
+    """Stocks de villages après un ``adjust_resources`` ou des transferts, en attente d'écriture.
+
+    Les valeurs sont absolues: la mémoire fait autorité, SQLite la rattrape.
+    """
+
+    rows: list[tuple[int, Resources]]
+    applied_at: float
+
+
+class HybridEngine(MemoryEngine):
+    """Moteur mémoire adossé à SQLite avec écriture différée (write-behind)."""
+
+    def __init__(
+        self,
+        db_path: Path,
+        max_lag: float = DEFAULT_MAX_LAG,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        catalog: Catalog | None = None,
+    ) -> None:
+        """Charge le monde depuis SQLite.
+
+        Args:
+            db_path: Base SQLite (créée et migrée si besoin)
+            max_lag: Retard maximal, en secondes, d'une mutation sur SQLite
+            max_pending: Mutations en attente au-delà desquelles les écrivains
+                attendent le thread de persistance
+            catalog: Catalogue des bâtiments (coûts prélevés en mémoire puis
+                persistés avec la construction)
+        """
+        super().__init__(catalog)
+        self._db_path = Path(db_path)
+        self._store = SQLiteEngine(self._db_path)
+        self.world = {v.id: v for v in self._store.snapshot()}
+        self._writer = get_writer(self._db_path)
+        self.max_lag = max_lag
+        self.max_pending = max_pending
+
+        self._pending: list[_Mutation | _ResourceWrite] = []
+        self._cond = threading.Condition()
+        # Numéros de la dernière mutation mise en file et de la dernière traitée
+        self._enqueued = 0
+        self._persisted = 0
+        # Mutations abandonnées: lot en échec pendant l'arrêt (jamais dans SQLite)
+        self.dropped = 0
+        self._flush_requested = False
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+        # Durée de l'écriture du dernier lot (commit compris)
+        self.last_persist_seconds: float | None = None
+
+    @property
+    def pending(self) -> int:
+        """Nombre de mutations appliquées en mémoire mais pas encore dans SQLite."""
+        return self._enqueued - self._persisted - self.dropped
+
+    # Les mutations de MemoryEngine sont précédées d'une attente de capacité;
+    # ``_published`` les met en file sous les stries des villages modifiés.
+
+    def _apply_builds(self, builds: Sequence[tuple[BuildCmd, ResourceDelta | None]]) -> list[bool]:
+        self._reserve()
+        return super()._apply_builds(builds)
+
+    def adjust_resources(self, deltas: Mapping[int, ResourceDelta]) -> int:
+        self._reserve()
+        return super().adjust_resources(deltas)
+
+    def transfer_resources(self, transfers: Sequence[Transfer]) -> list[ResourceDelta]:
+        self._reserve()
+        return super().transfer_resources(transfers)
+
+    def _published(
+        self, replaced: list[tuple[Village, Village]], builds: Sequence[BuildCmd] = ()
+    ) -> None:
+        """Planifie la persistance d'une mutation publiée.
+
+        Appelé sous les stries des villages modifiés: deux mutations d'un même
+        village sont mises en file dans leur ordre d'application, et ``_cond``
+        n'est pris que le temps de l'ajout (les écrivains de villages
+        différents ne sont pas sérialisés).
+
+        Args:
+            replaced: Paires (village lu, version publiée)
+            builds: Constructions acceptées, une mutation en attente chacune;
+                vide pour des variations de ressources (le lot compte alors
+                pour une seule mutation en attente)
+        """
+        applied_at = time.perf_counter()
+        mutations: list[_Mutation | _ResourceWrite]
+        if not builds:
+            rows = [(new.id, new.resources) for _, new in replaced]
+            mutations = [_ResourceWrite(rows, applied_at)]
+        else:
+            # Stocks après le lot: la dernière écriture d'un village l'emporte
+            published = {new.id: new for _, new in replaced}
+            queued_at = datetime.now(UTC).isoformat()
+            mutations = [
+                _Mutation(
+                    cmd.villageId,
+                    cmd.building,
+                    cmd.levelTarget,
+                    queued_at,
+                    applied_at,
+                    published[cmd.villageId].resources if self.catalog is not None else None,
+                )
+                for cmd in builds
+            ]
+        with self._cond:
+            for mutation in mutations:
+                self._enqueue(mutation)
+
+    def _reserve(self) -> None:
+        """Attend de la place dans la file avant une mutation (hors de toute strie).
+
+        La borne ``max_pending`` est donc approximative: des écrivains
+        concurrents peuvent la dépasser d'une mutation chacun.
+        """
+        with self._cond:
+            self._wait_capacity()
+
+    def _wait_capacity(self) -> None:
+        """Retard en volume borné: attend que le thread rattrape (sous ``_cond``)."""
+        while self.pending >= self.max_pending and not self._stopping:
+            self._flush_requested = True
+            self._cond.notify_all()
+            self._cond.wait()
+
+    def _enqueue(self, mutation: _Mutation | _ResourceWrite) -> None:
+        """Met une mutation appliquée en file et réveille le thread (sous ``_cond``)."""
+        self._pending.append(mutation)
+        self._enqueued += 1
+        WRITE_BEHIND_PENDING.set(self.pending)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ager-write-behind", daemon=True)
+            self._thread.start()
+        elif len(self._pending) == 1:
+            self._cond.notify_all()
+
+    def flush(self) -> None:
+        """Persiste immédiatement les mutations en attente et attend leur commit."""
+        with self._cond:
+            target = self._enqueued
+            while self._persisted + self.dropped < target and self._thread is not None:
+                self._flush_requested = True
+                self._cond.notify_all()
+                self._cond.wait()
+
+    def close(self) -> None:
+        """Persiste les mutations en attente puis arrête les threads d'écriture."""
+        with self._cond:
+            self._stopping = True
+            thread = self._thread
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join()
+        self._store.close()
+
+    def stats(self) -> EngineStats:
+        """Statistiques du monde en mémoire, complétées de celles de la base SQLite."""
+        stats = super().stats()
+        return stats.model_copy(
+            update={
+                "storage_bytes": file_size(self._db_path, wal_path(self._db_path)),
+                "last_persist_seconds": self.last_persist_seconds,
+                "pending_writes": self.pending,
+                "sqlite": sqlite_stats(self._db_path),
+            }
+        )
+
+    # --- Thread de persistance -------------------------------------------
+
+    def _next_batch(self) -> list[_Mutation | _ResourceWrite] | None:
+        """Attend qu'un lot soit dû (retard max atteint, flush ou arrêt) et le retire.
+
+        Returns None quand le thread doit s'arrêter, sans rien en attente.
+        """
+        with self._cond:
+            while True:
+                if self._pending:
+                    due = self._pending[0].applied_at + self.max_lag
+                    remaining = due - time.perf_counter()
+                    if remaining <= 0 or self._flush_requested or self._stopping:
+                        batch, self._pending = self._pending, []
+                        self._flush_requested = False
+                        return batch
+                    self._cond.wait(remaining)
+                elif self._stopping:
+                    self._thread = None
+                    self._cond.notify_all()
+                    return None
+                else:
+                    self._cond.wait()
+
+    def _run(self) -> None:
+        while (batch := self._next_batch()) is not None:
+            written = self._write_batch(batch)
+            with self._cond:
+                if written:
+                    self._persisted += len(batch)
+                else:
+                    self.dropped += len(batch)
+                WRITE_BEHIND_PENDING.set(self.pending)
+                self._cond.notify_all()
+
+    def _write_batch(self, batch: list[_Mutation | _ResourceWrite]) -> bool:
+        """Écrit un lot, en réessayant tant que la base est indisponible.
+
+        Returns:
+            False si le lot est abandonné: il échoue pendant l'arrêt, qui ne
+            doit pas bloquer indéfiniment sur une base en panne
+        """
+        while True:
+            started = time.perf_counter()
+            try:
+                self._writer.execute(partial(self._write, batch=batch))
+            except Exception:
+                logger.exception("Write-behind batch of %d mutations failed", len(batch))
+                if self._stopping:
+                    logger.error(
+                        "Dropping %d mutations on shutdown, they are not in %s",
+                        len(batch),
+                        self._db_path,
+                    )
+                    return False
+                # Base indisponible: le lot reste en mémoire, nouvelle tentative
+                time.sleep(_RETRY_DELAY)
+                continue
+            committed = time.perf_counter()
+            self.last_persist_seconds = committed - started
+            for mutation in batch:
+                WRITE_BEHIND_LAG.observe(committed - mutation.applied_at)
+            return True
+
+    @staticmethod
+    def _write(session: Session, batch: list[_Mutation | _ResourceWrite]) -> None:
+        session.add_all(
+            BuildQueueORM(
+                village_id=m.village_id,
+                building=m.building,
+                level=m.level,
+                queued_at=m.queued_at,
+            )
+            for m in batch
+            if isinstance(m, _Mutation)
+        )
+        # Dans l'ordre d'application: la dernière écriture d'un village l'emporte
+        rows: list[tuple[int, Resources]] = []
+        for m in batch:
+            if isinstance(m, _ResourceWrite):
+                rows.extend(m.rows)
+            elif m.resources is not None:
+                rows.append((m.village_id, m.resources))
+        store_resources(session, rows)
@@ -0,0 +1,198 @@
+"""Lecture et écriture incrémentales du format JSON de FileStorageEngine.
+
+Le fichier de monde est un objet JSON dont les sections (``villages``,
+``resources``, ``buildQueues``) sont elles-mêmes des objets indexés par ID de
+village. Ce module permet de parcourir ces sections enregistrement par
+enregistrement et de les réécrire sans jamais matérialiser le document entier.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from collections.abc import Iterable, Iterator
+from json.scanner import make_scanner
+from typing import Any, TextIO
+
+WORLD_SECTIONS = ("villages", "resources", "buildQueues")
+
+_CHUNK_SIZE = 1 << 16
+_DELIMITERS = " \t\n\r,]}"
+_NUMBER_TYPES = (int, float)
+_NON_WHITESPACE = re.compile(r"[^ \t\n\r]")
+# Clé d'objet simple (sans échappement) suivie de ':', le cas de tous les IDs de village
+_SIMPLE_KEY = re.compile(r'[ \t\n\r]*"([^"\\]*)"[ \t\n\r]*:[ \t\n\r]*')
+_NEXT_SIMPLE_KEY = re.compile(r'[ \t\n\r]*,[ \t\n\r]*"([^"\\]*)"[ \t\n\r]*:[ \t\n\r]*')
+
+
+class _Scanner:
+    """Curseur sur un flux texte JSON, rechargé par blocs."""
+
+    def __init__(self, fp: TextIO, chunk_size: int = _CHUNK_SIZE) -> None:
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._scan_once = make_scanner(json.JSONDecoder())  # type: ignore[arg-type]
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, min_size: int = 0) -> bool:
+        """Ajoute un bloc au tampon. Retourne False en fin de flux."""
+        if self._eof:
+            return False
+        # Compacter le tampon pour que la mémoire reste bornée par le bloc courant
+        if self._pos:
+            self._buf = self._buf[self._pos :]
+            self._pos = 0
+        chunk = self._fp.read(max(self._chunk_size, min_size))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf += chunk
+        return True
+
+    def peek(self) -> str:
+        """Retourne le prochain caractère significatif sans le consommer."""
+        while True:
+            match = _NON_WHITESPACE.search(self._buf, self._pos)
+            if match:
+                self._pos = match.start()
+                return self._buf[self._pos]
+            self._pos = len(self._buf)
+            if not self._fill():
+                raise ValueError("Fin de fichier JSON inattendue")
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"JSON invalide: '{char}' attendu à la position {self._pos}")
+        self._pos += 1
+
+    def key(self) -> str:
+        """Décode une clé d'objet et le ':' qui la suit."""
+        match = _SIMPLE_KEY.match(self._buf, self._pos)
+        if match and match.end() < len(self._buf):
+            self._pos = match.end()
+            return match.group(1)
+        key = self.value()
+        if not isinstance(key, str):
+            raise ValueError("JSON invalide: clé d'objet attendue")
+        self.expect(":")
+        return key
+
+    def value(self) -> Any:
+        """Décode la prochaine valeur JSON complète (chaîne, objet, liste...)."""
+        if self._pos >= len(self._buf) or self._buf[self._pos] in " \t\n\r":
+            self.peek()
+        while True:
+            try:
+                value, end = self._scan_once(self._buf, self._pos)
+            except (json.JSONDecodeError, StopIteration) as exc:
+                # Valeur coupée par la fin du tampon: recharger et réessayer
+                if self._fill(len(self._buf)):
+                    continue
+                if isinstance(exc, StopIteration):
+                    raise json.JSONDecodeError("Expecting value", self._buf, self._pos) from None
+                raise
+            # Une valeur en fin de tampon peut être tronquée (nombre: "1.5e" -> 1)
+            if (
+                end == len(self._buf)
+                or (type(value) in _NUMBER_TYPES and self._buf[end] not in _DELIMITERS)
+            ) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def members(self) -> Iterator[str]:
+        """Parcourt les clés d'un objet; l'appelant consomme chaque valeur."""
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        yield self.key()
+        while True:
+            # Chemin rapide: séparateur et clé suivante en une seule expression
+            match = _NEXT_SIMPLE_KEY.match(self._buf, self._pos)
+            if match and match.end() < len(self._buf):
+                self._pos = match.end()
+                yield match.group(1)
+                continue
+            sep = self.peek()
+            self._pos += 1
+            if sep == "}":
+                return
+            if sep != ",":
+                raise ValueError(f"JSON invalide: ',' ou '}}' attendu à la position {self._pos}")
+            yield self.key()
+
+    def items(self) -> Iterator[tuple[str, Any]]:
+        """Parcourt les paires (clé, valeur) d'un objet."""
+        members = self.members()
+        value = self.value
+        for key in members:
+            yield key, value()
+
+
+def iter_world_records(fp: TextIO, chunk_size: int = _CHUNK_SIZE) -> Iterator[tuple[str, str, Any]]:
+    """Parcourt un fichier de monde enregistrement par enregistrement.
+
+    Les sections connues (``villages``, ``resources``, ``buildQueues``) sont
+    découpées membre par membre; les autres clés de premier niveau sont ignorées.
+
+    Args:
+        fp: Flux texte ouvert sur le fichier JSON
+        chunk_size: Taille des blocs lus dans le flux
+
+    Yields:
+        Triplets (section, clé de village, valeur décodée)
+    """
+    scanner = _Scanner(fp, chunk_size)
+    for section in scanner.members():
+        if section in WORLD_SECTIONS and scanner.peek() == "{":
+            for key, value in scanner.items():
+                yield section, key, value
+        else:
+            scanner.value()
+
+
+class WorldJsonWriter:
+    """Écrit un fichier de monde section par section, sans tampon global.
+
+    Usage:
+        writer = WorldJsonWriter(fp)
+        writer.write_section("villages", records)
+        writer.close()
+    """
+
+    def __init__(self, fp: TextIO) -> None:
+        self._fp = fp
+        self._sections = 0
+        self._encode = json.JSONEncoder(ensure_ascii=False).encode
+        self._fp.write("{")
+
+    def write_section(self, name: str, records: Iterable[tuple[str, Any]]) -> int:
+        """Écrit une section complète à partir d'un itérable de (clé, valeur).
+
+        Args:
+            name: Nom de la section
+            records: Enregistrements à écrire, consommés paresseusement
+
+        Returns:
+            Nombre d'enregistrements écrits
+        """
+        write = self._fp.write
+        encode = self._encode
+        write(",\n  " if self._sections else "\n  ")
+        write(f"{encode(name)}: {{")
+        count = 0
+        sep = "\n    "
+        for key, value in records:
+            write(f"{sep}{encode(key)}: {encode(value)}")
+            sep = ",\n    "
+            count += 1
+        write("\n  }" if count else "}")
+        self._sections += 1
+        return count
+
+    def close(self) -> None:
+        """Termine le document JSON (ne ferme pas le flux)."""
+        self._fp.write("\n}\n" if self._sections else "}\n")
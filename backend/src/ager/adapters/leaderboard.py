@@ -0,0 +1,207 @@
+"""Classements des villages par ressources, maintenus à chaque mutation.
+
+Un ``Leaderboard`` garde les clés ``(-score, id)`` dans une liste triée: le
+top-N est une tranche de la liste et le rang d'un village une recherche
+dichotomique (O(log n)), au lieu d'un tri du monde entier à chaque requête.
+Une mise à jour retire l'ancienne clé et insère la nouvelle (recherche en
+O(log n), puis décalage mémoire de la liste, négligeable devant un tri).
+
+Un moteur en mémoire tient un classement par métrique (``build_boards``) et
+le met à jour à chaque village remplacé (``refresh_boards``). Une écriture
+groupée qui touche une large part du monde (``refresh_boards_many``) retrie
+plutôt le classement en une fois: un tri coûte moins que des milliers de
+décalages de la liste. Les classements étant modifiés en place, un moteur les
+lit sous le verrou qui publie ses mutations, pour les rapporter à une seule
+version du monde.
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, insort
+from collections.abc import Iterable, Mapping
+
+from ..models import LEADERBOARD_METRICS, RankEntry, Resources, Village
+
+# Au-delà d'un score modifié pour _RESORT_RATIO entrées, update_many retrie la liste
+_RESORT_RATIO = 32
+
+
+def resource_score(resources: Resources, metric: str) -> int:
+    """Score d'un village pour une métrique de classement.
+
+    Args:
+        resources: Ressources du village
+        metric: ``total`` (somme des quatre ressources) ou nom d'une ressource
+
+    Returns:
+        Score (plus grand = mieux classé)
+
+    Raises:
+        ValueError: Si la métrique est inconnue
+    """
+    if metric == "total":
+        return resources.wood + resources.clay + resources.iron + resources.crop
+    if metric not in LEADERBOARD_METRICS:
+        raise ValueError(f"Métrique de classement inconnue: {metric}")
+    score: int = getattr(resources, metric)
+    return score
+
+
+class Leaderboard:
+    """Classement trié par score décroissant, puis par ID croissant."""
+
+    def __init__(self) -> None:
+        self._keys: list[tuple[int, int]] = []
+        self._scores: dict[int, int] = {}
+        # Lectures et mises à jour ne se croisent jamais au milieu d'un décalage
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, scores: Iterable[tuple[int, int]]) -> Leaderboard:
+        """Construit un classement en un seul tri.
+
+        Args:
+            scores: Paires (id du village, score)
+
+        Returns:
+            Classement contenant toutes les paires
+        """
+        board = cls()
+        board._scores = dict(scores)
+        board._keys = sorted((-score, vid) for vid, score in board._scores.items())
+        return board
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def update(self, vid: int, score: int) -> None:
+        """Ajoute un village ou met à jour son score (sans effet si inchangé)."""
+        with self._lock:
+            previous = self._scores.get(vid)
+            if previous == score:
+                return
+            if previous is not None:
+                del self._keys[bisect_left(self._keys, (-previous, vid))]
+            insort(self._keys, (-score, vid))
+            self._scores[vid] = score
+
+    def update_many(self, scores: Iterable[tuple[int, int]]) -> None:
+        """Met à jour plusieurs scores (paires id, score) sous un seul verrou.
+
+        Un lot qui modifie plus d'une entrée sur ``_RESORT_RATIO`` est appliqué
+        par un tri complet plutôt qu'entrée par entrée.
+        """
+        with self._lock:
+            changed = [(vid, score) for vid, score in scores if self._scores.get(vid) != score]
+            if len(changed) * _RESORT_RATIO < len(self._keys):
+                for vid, score in changed:
+                    previous = self._scores.get(vid)
+                    if previous is not None:
+                        del self._keys[bisect_left(self._keys, (-previous, vid))]
+                    insort(self._keys, (-score, vid))
+                    self._scores[vid] = score
+            elif changed:
+                self._scores.update(changed)
+                self._keys = sorted((-score, vid) for vid, score in self._scores.items())
+
+    def remove(self, vid: int) -> None:
+        """Retire un village (sans effet s'il est absent)."""
+        with self._lock:
+            previous = self._scores.pop(vid, None)
+            if previous is not None:
+                del self._keys[bisect_left(self._keys, (-previous, vid))]
+
+    def top(self, limit: int, offset: int = 0) -> list[tuple[int, int, int]]:
+        """Tranche du classement.
+
+        Args:
+            limit: Nombre maximal d'entrées
+            offset: Nombre d'entrées sautées depuis la première place
+
+        Returns:
+            Triplets (rang à partir de 1, id du village, score)
+        """
+        with self._lock:
+            keys = self._keys[offset : offset + limit]
+        return [(offset + i + 1, vid, -neg) for i, (neg, vid) in enumerate(keys)]
+
+    def rank(self, vid: int) -> tuple[int, int] | None:
+        """Rang (à partir de 1) et score d'un village, ou None s'il est absent."""
+        with self._lock:
+            score = self._scores.get(vid)
+            if score is None:
+                return None
+            return bisect_left(self._keys, (-score, vid)) + 1, score
+
+
+Boards = dict[str, Leaderboard]
+
+
+def get_board(boards: Boards, metric: str) -> Leaderboard:
+    """Classement d'une métrique.
+
+    Raises:
+        ValueError: Si la métrique est inconnue
+    """
+    board = boards.get(metric)
+    if board is None:
+        raise ValueError(f"Métrique de classement inconnue: {metric}")
+    return board
+
+
+def build_boards(villages: Mapping[int, Village]) -> Boards:
+    """Un classement par métrique de ``LEADERBOARD_METRICS``."""
+    return {
+        metric: Leaderboard.build(
+            (v.id, resource_score(v.resources, metric)) for v in villages.values()
+        )
+        for metric in LEADERBOARD_METRICS
+    }
+
+
+def refresh_boards(boards: Boards, previous: Village | None, village: Village) -> None:
+    """Reporte les ressources d'un village remplacé dans tous les classements.
+
+    Une copie qui partage les ressources de la version précédente (cas d'une
+    mise en queue, voir ``with_queued``) ne coûte qu'une comparaison.
+    """
+    if previous is not None and village.resources is previous.resources:
+        return
+    for metric, board in boards.items():
+        board.update(village.id, resource_score(village.resources, metric))
+
+
+def refresh_boards_many(boards: Boards, replaced: Iterable[tuple[Village, Village]]) -> None:
+    """Reporte dans tous les classements les ressources de villages remplacés en lot.
+
+    Args:
+        boards: Classements à mettre à jour
+        replaced: Paires (version précédente, nouvelle version) des villages
+    """
+    changed = [new for old, new in replaced if new.resources is not old.resources]
+    for metric, board in boards.items():
+        board.update_many((v.id, resource_score(v.resources, metric)) for v in changed)
+
+
+def board_entries(
+    villages: Mapping[int, Village], ranked: Iterable[tuple[int, int, int]]
+) -> list[RankEntry]:
+    """Entrées de classement complétées du nom des villages."""
+    return [
+        RankEntry(rank=rank, villageId=vid, name=v.name, score=score)
+        for rank, vid, score in ranked
+        if (v := villages.get(vid)) is not None
+    ]
+
+
+def board_rank(
+    villages: Mapping[int, Village], boards: Boards, vid: int, metric: str
+) -> RankEntry | None:
+    """Entrée de classement d'un village, ou None s'il est inconnu."""
+    found = get_board(boards, metric).rank(vid)
+    village = villages.get(vid)
+    if found is None or village is None:
+        return None
+    rank, score = found
+    return RankEntry(rank=rank, villageId=vid, name=village.name, score=score)
@@ -0,0 +1,67 @@
+"""Verrous striés pour les mutations par village.
+
+Un verrou global sérialiserait toutes les commandes; un verrou par village
+coûterait un objet par village. Les villages sont répartis sur un nombre fixe
+de verrous (``village_id % stripes``): deux commandes sur des villages
+différents ne se bloquent que si elles tombent sur la même strie.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack, contextmanager
+
+DEFAULT_STRIPES = 64
+
+
+class StripedLock:
+    """Ensemble fixe de verrous indexés par identifiant de village."""
+
+    def __init__(self, stripes: int = DEFAULT_STRIPES) -> None:
+        if stripes <= 0:
+            raise ValueError("stripes doit être strictement positif")
+        self._locks = tuple(threading.Lock() for _ in range(stripes))
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def for_key(self, key: int) -> threading.Lock:
+        """Retourne le verrou de la strie d'un village.
+
+        Args:
+            key: Identifiant du village
+
+        Returns:
+            Verrou protégeant ce village (et ceux de la même strie)
+        """
+        return self._locks[key % len(self._locks)]
+
+    def for_keys(self, keys: Iterable[int]) -> list[threading.Lock]:
+        """Retourne les verrous de plusieurs villages, sans doublon, dans l'ordre des stries.
+
+        Les prendre dans cet ordre évite tout interblocage entre deux
+        opérations multi-villages.
+
+        Args:
+            keys: Identifiants des villages
+
+        Returns:
+            Verrous à acquérir dans l'ordre retourné
+        """
+        n = len(self._locks)
+        return [self._locks[i] for i in sorted({key % n for key in keys})]
+
+    @contextmanager
+    def hold(self, keys: Iterable[int] | None = None) -> Iterator[None]:
+        """Détient les verrous de plusieurs villages (``for_keys``), ou de toutes les stries.
+
+        Args:
+            keys: Identifiants des villages (None: toutes les stries, par exemple
+                pour remplacer le monde entier)
+        """
+        locks = list(self._locks) if keys is None else self.for_keys(keys)
+        with ExitStack() as stack:
+            for lock in locks:
+                stack.enter_context(lock)
+            yield
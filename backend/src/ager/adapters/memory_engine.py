@@ -1,23 +1,424 @@
-from ..models import BuildCmd, Resources, Village
+import threading
+from collections.abc import Iterable, Mapping, Sequence
+from typing import NamedTuple
+
+from ..gamedata import NO_COST, Catalog, build_cost
+from ..models import (
+    BuildCmd,
+    EngineStats,
+    RankEntry,
+    ResourceDelta,
+    Resources,
+    Transfer,
+    Village,
+)
+from .footprint import world_footprint
+from .leaderboard import (
+    Boards,
+    board_entries,
+    board_rank,
+    build_boards,
+    get_board,
+    refresh_boards,
+    refresh_boards_many,
+)
+from .locking import StripedLock
+from .persistent_map import PersistentMap
+from .spatial import GridIndex
+
+
+class WorldView(NamedTuple):
+    """Version immuable du monde: numéro de version et villages."""
+
+    version: int
+    villages: PersistentMap[int, Village]
+
+
+def build_grid(villages: Mapping[int, Village]) -> GridIndex:
+    """Index spatial des villages (les coordonnées ne changent pas après création)."""
+    return GridIndex.build((v.id, v.x, v.y) for v in villages.values())
+
+
+def resolve_ids(villages: Mapping[int, Village], vids: list[int]) -> list[Village]:
+    """Villages correspondant aux IDs retournés par l'index, dans le même ordre."""
+    return [v for vid in vids if (v := villages.get(vid)) is not None]
+
+
+def in_id_order(villages: Mapping[int, Village]) -> list[Village]:
+    """Villages triés par ID: ``snapshot`` et les sauvegardes ne dépendent pas
+    de l'ordre d'itération de la table (celui d'un ``PersistentMap`` suit le
+    hachage des clés, pas leur ordre)."""
+    return [villages[vid] for vid in sorted(villages)]
+
+
+def count_queue_items(villages: Mapping[int, Village]) -> int:
+    """Nombre total d'éléments de queue (compté au chargement, puis tenu à jour)."""
+    return sum(len(v.queue) for v in villages.values())
+
+
+def with_queued(village: Village, item: str) -> Village:
+    """Retourne une copie du village avec ``item`` ajouté à sa queue.
+
+    Les villages sont gelés: une mutation remplace le village par une copie
+    (les ressources, inchangées, sont partagées).
+    """
+    return village.model_copy(update={"queue": (*village.queue, item)})
+
+
+def affordable(resources: Resources, cost: ResourceDelta) -> bool:
+    """Indique si les stocks couvrent un coût."""
+    wood, clay, iron, crop = cost
+    return (
+        resources.wood >= wood
+        and resources.clay >= clay
+        and resources.iron >= iron
+        and resources.crop >= crop
+    )
+
+
+def with_build(village: Village, cmd: BuildCmd, cost: ResourceDelta) -> Village | None:
+    """Retourne une copie du village avec la construction en queue et son coût prélevé.
+
+    Returns:
+        None si les stocks du village ne couvrent pas le coût
+    """
+    item = f"{cmd.building} -> L{cmd.levelTarget}"
+    if cost == NO_COST:
+        return with_queued(village, item)
+    r = village.resources
+    if not affordable(r, cost):
+        return None
+    wood, clay, iron, crop = cost
+    resources = Resources(
+        wood=r.wood - wood, clay=r.clay - clay, iron=r.iron - iron, crop=r.crop - crop
+    )
+    return village.model_copy(update={"queue": (*village.queue, item), "resources": resources})
+
+
+def built_villages(
+    villages: Mapping[int, Village], builds: Sequence[tuple[BuildCmd, ResourceDelta | None]]
+) -> tuple[list[tuple[Village, Village]], list[bool]]:
+    """Applique des constructions dans l'ordre, chacune sur le résultat des précédentes.
+
+    Appelé par un écrivain qui détient les stries des villages concernés.
+
+    Args:
+        villages: Villages de la version courante
+        builds: Paires (commande, coût); un coût None refuse la commande
+
+    Returns:
+        (paires (village lu, version finale) des villages modifiés,
+        acceptation de chaque construction, alignée sur ``builds``)
+    """
+    current: dict[int, Village] = {}
+    accepted: list[bool] = []
+    for cmd, cost in builds:
+        village = current.get(cmd.villageId) or villages.get(cmd.villageId)
+        updated = None if village is None or cost is None else with_build(village, cmd, cost)
+        if updated is not None:
+            current[cmd.villageId] = updated
+        accepted.append(updated is not None)
+    return [(villages[vid], v) for vid, v in current.items()], accepted
+
+
+def with_resource_delta(village: Village, delta: ResourceDelta) -> Village:
+    """Retourne une copie du village dont les stocks varient de ``delta`` (bornés à 0)."""
+    r = village.resources
+    wood, clay, iron, crop = delta
+    resources = Resources(
+        wood=max(0, r.wood + wood),
+        clay=max(0, r.clay + clay),
+        iron=max(0, r.iron + iron),
+        crop=max(0, r.crop + crop),
+    )
+    return village.model_copy(update={"resources": resources})
+
+
+def transfer_ids(transfers: Iterable[Transfer]) -> set[int]:
+    """IDs des villages sources et cibles de transferts."""
+    return {vid for source, target, _ in transfers for vid in (source, target)}
+
+
+def settle_transfers(
+    stocks: dict[int, list[int]], transfers: Sequence[Transfer]
+) -> list[ResourceDelta]:
+    """Applique des transferts, dans l'ordre, à des stocks modifiés en place.
+
+    Chaque quantité est bornée au stock de la source après les transferts
+    précédents; un transfert dont la source ou la cible est absente de
+    ``stocks`` ne déplace rien.
+
+    Args:
+        stocks: Stocks (bois, argile, fer, céréales) par ID de village
+        transfers: Transferts (source, cible, quantités)
+
+    Returns:
+        Quantités effectivement transférées, alignées sur ``transfers``
+
+    Raises:
+        ValueError: Si une quantité est négative
+    """
+    moved: list[ResourceDelta] = []
+    for source, target, amounts in transfers:
+        if any(a < 0 for a in amounts):
+            raise ValueError(f"Transfert {source} -> {target}: quantités négatives {amounts}")
+        if source not in stocks or target not in stocks:
+            moved.append((0, 0, 0, 0))
+            continue
+        taken = [min(a, s) for a, s in zip(amounts, stocks[source], strict=True)]
+        for i, amount in enumerate(taken):
+            stocks[source][i] -= amount
+            stocks[target][i] += amount
+        moved.append((taken[0], taken[1], taken[2], taken[3]))
+    return moved
+
+
+def transfer_deltas(
+    transfers: Sequence[Transfer], moved: Sequence[ResourceDelta]
+) -> dict[int, ResourceDelta]:
+    """Variation nette par village de transferts effectués (villages inchangés exclus)."""
+    totals: dict[int, list[int]] = {}
+    for (source, target, _), amounts in zip(transfers, moved, strict=True):
+        if source == target or not any(amounts):
+            continue
+        lost = totals.setdefault(source, [0, 0, 0, 0])
+        gained = totals.setdefault(target, [0, 0, 0, 0])
+        for i, amount in enumerate(amounts):
+            lost[i] -= amount
+            gained[i] += amount
+    return {vid: (d[0], d[1], d[2], d[3]) for vid, d in sorted(totals.items()) if any(d)}
+
+
+def transferred_villages(
+    villages: Mapping[int, Village], transfers: Sequence[Transfer]
+) -> tuple[list[tuple[Village, Village]], list[ResourceDelta]]:
+    """Copies des villages après des transferts (voir ``settle_transfers``).
+
+    Returns:
+        (paires (village courant, copie) des villages modifiés, quantités transférées)
+    """
+    current = {vid: v for vid in transfer_ids(transfers) if (v := villages.get(vid)) is not None}
+    stocks = {
+        vid: [v.resources.wood, v.resources.clay, v.resources.iron, v.resources.crop]
+        for vid, v in current.items()
+    }
+    moved = settle_transfers(stocks, transfers)
+    replaced = [
+        (
+            current[vid],
+            with_resource_delta(current[vid], delta),
+        )
+        for vid, delta in transfer_deltas(transfers, moved).items()
+    ]
+    return replaced, moved
+
+
+def adjusted_villages(
+    villages: Mapping[int, Village], deltas: Mapping[int, ResourceDelta]
+) -> list[tuple[Village, Village]]:
+    """Copies ajustées des villages connus de ``deltas``.
+
+    Returns:
+        Paires (village courant, copie dont les stocks varient du delta)
+    """
+    return [
+        (village, with_resource_delta(village, delta))
+        for vid, delta in deltas.items()
+        if (village := villages.get(vid)) is not None
+    ]
+
+
+def publish(view: WorldView, boards: Boards, replaced: list[tuple[Village, Village]]) -> WorldView:
+    """Version suivante du monde où des villages sont remplacés; met à jour les classements.
+
+    Appelé sous le verrou de publication par un écrivain qui détient les
+    stries des villages remplacés: ils n'ont pas changé depuis leur lecture.
+
+    Args:
+        view: Version courante
+        boards: Classements à mettre à jour
+        replaced: Paires (village lu, nouvelle version du village)
+
+    Returns:
+        Version à publier
+    """
+    if len(replaced) == 1:
+        previous, village = replaced[0]
+        villages = view.villages.set(village.id, village)
+        refresh_boards(boards, previous, village)
+    else:
+        villages = view.villages.update({new.id: new for _, new in replaced})
+        refresh_boards_many(boards, replaced)
+    return WorldView(view.version + 1, villages)
 
 
 class MemoryEngine:
-    def __init__(self) -> None:
-        self.world: dict[int, Village] = {
-            1: Village(id=1, name="Capitale", resources=Resources(), queue=[])
-        }
+    """Moteur en mémoire dont le monde est une table persistante versionnée.
+
+    Une lecture prend la version courante (une seule référence, O(1)) et la
+    parcourt sans verrou: les écritures publient une nouvelle version au lieu
+    de modifier celle qui est lue. Une écriture lit et recopie ses villages
+    sous les verrous striés de ces villages (``StripedLock``): deux commandes
+    sur des stries différentes ne s'attendent pas. Seul le remplacement de la
+    version courante passe par un verrou commun, brièvement: il ne recopie que
+    le chemin des villages modifiés.
+
+    Les requêtes de carte passent par un index en grille et les classements par
+    des listes triées, reconstruits quand le monde est remplacé
+    (``world = ...``); les classements suivent ensuite chaque mutation.
+
+    Avec un catalogue de données de jeu, une construction doit exister à ce
+    niveau et son coût est prélevé sur les stocks du village (refusée s'ils
+    ne suffisent pas).
+    """
+
+    def __init__(self, catalog: Catalog | None = None) -> None:
+        self._view = WorldView(
+            0,
+            PersistentMap({1: Village(id=1, name="Capitale", resources=Resources())}),
+        )
+        self._grid = build_grid(self._view.villages)
+        self._boards = build_boards(self._view.villages)
+        self._queue_items = count_queue_items(self._view.villages)
+        self._stripes = StripedLock()
+        self._publish_lock = threading.Lock()
+        self.catalog = catalog
+
+    @property
+    def world(self) -> PersistentMap[int, Village]:
+        """Villages de la version courante (immuables)."""
+        return self._view.villages
+
+    @world.setter
+    def world(self, villages: Mapping[int, Village]) -> None:
+        self._replace_world(villages)
+
+    def _replace_world(self, villages: Mapping[int, Village]) -> None:
+        """Remplace tout le monde et reconstruit ses index (chargement, rejeu)."""
+        if not isinstance(villages, PersistentMap):
+            villages = PersistentMap(villages)
+        grid = build_grid(villages)
+        boards = build_boards(villages)
+        queue_items = count_queue_items(villages)
+        with self._stripes.hold(), self._publish_lock:
+            self._view = WorldView(self._view.version + 1, villages)
+            self._grid = grid
+            self._boards = boards
+            self._queue_items = queue_items
+
+    def view(self) -> WorldView:
+        """Retourne la version courante du monde, cohérente et immuable (O(1))."""
+        return self._view
+
+    # Les villages sont déjà en mémoire: une projection (``fields``) ne
+    # chargerait rien de moins, elle est laissée à la sérialisation.
 
-    def snapshot(self) -> list[Village]:
-        return list(self.world.values())
+    def snapshot(self, fields: frozenset[str] | None = None) -> list[Village]:
+        return in_id_order(self._view.villages)
 
-    def get_village(self, vid: int) -> Village | None:
-        return self.world.get(vid)
+    def get_village(self, vid: int, fields: frozenset[str] | None = None) -> Village | None:
+        return self._view.villages.get(vid)
+
+    def get_villages(
+        self, vids: Sequence[int], fields: frozenset[str] | None = None
+    ) -> list[Village]:
+        return resolve_ids(self._view.villages, list(vids))
 
     def queue_build(self, cmd: BuildCmd) -> bool:
-        v = self.world.get(cmd.villageId)
-        if not v:
-            return False
-        if not cmd.building or cmd.levelTarget <= 0:
+        cost = build_cost(self.catalog, cmd)
+        if cost is None:
             return False
-        v.queue.append(f"{cmd.building} -> L{cmd.levelTarget}")
-        return True
+        return self.apply_build(cmd, cost)
+
+    def queue_builds(self, cmds: Sequence[BuildCmd]) -> list[bool]:
+        return self._apply_builds([(cmd, build_cost(self.catalog, cmd)) for cmd in cmds])
+
+    def apply_build(self, cmd: BuildCmd, cost: ResourceDelta) -> bool:
+        """Ajoute une construction dont le coût est déjà déterminé (ex. rejeu d'un journal).
+
+        Returns:
+            False si le village est inconnu ou ne peut pas payer ``cost``
+        """
+        return self._apply_builds([(cmd, cost)])[0]
+
+    def _apply_builds(self, builds: Sequence[tuple[BuildCmd, ResourceDelta | None]]) -> list[bool]:
+        """Applique des constructions dans l'ordre et publie une seule version.
+
+        Args:
+            builds: Paires (commande, coût); un coût None refuse la commande
+
+        Returns:
+            Acceptation de chaque construction, alignée sur ``builds``
+        """
+        with self._stripes.hold(cmd.villageId for cmd, _ in builds):
+            replaced, accepted = built_villages(self._view.villages, builds)
+            if replaced:
+                with self._publish_lock:
+                    self._view = publish(self._view, self._boards, replaced)
+                    self._queue_items += sum(accepted)
+                self._published(
+                    replaced, [cmd for (cmd, _), ok in zip(builds, accepted, strict=True) if ok]
+                )
+        return accepted
+
+    def adjust_resources(self, deltas: Mapping[int, ResourceDelta]) -> int:
+        with self._stripes.hold(deltas):
+            replaced = adjusted_villages(self._view.villages, deltas)
+            if replaced:
+                with self._publish_lock:
+                    self._view = publish(self._view, self._boards, replaced)
+                self._published(replaced)
+        return len(replaced)
+
+    def transfer_resources(self, transfers: Sequence[Transfer]) -> list[ResourceDelta]:
+        with self._stripes.hold(transfer_ids(transfers)):
+            replaced, moved = transferred_villages(self._view.villages, transfers)
+            if replaced:
+                with self._publish_lock:
+                    self._view = publish(self._view, self._boards, replaced)
+                self._published(replaced)
+        return moved
+
+    def _published(
+        self, replaced: list[tuple[Village, Village]], builds: Sequence[BuildCmd] = ()
+    ) -> None:
+        """Point d'extension appelé après la publication d'une mutation (sans effet ici).
+
+        Appelé sous les stries des villages remplacés, hors verrou de
+        publication: une sous-classe y reçoit les versions publiées dans
+        l'ordre où chaque village a été modifié.
+
+        Args:
+            replaced: Paires (village lu, version publiée)
+            builds: Constructions acceptées, dans l'ordre; vide pour des
+                variations de ressources
+        """
+
+    def villages_within(self, x: int, y: int, r: float) -> list[Village]:
+        return resolve_ids(self._view.villages, self._grid.within(x, y, r))
+
+    def nearest_villages(self, x: int, y: int, n: int) -> list[Village]:
+        return resolve_ids(self._view.villages, self._grid.nearest(x, y, n))
+
+    # Les classements sont modifiés en place par ``publish``: ils sont lus sous
+    # le verrou de publication, avec la version du monde qu'ils reflètent.
+
+    def leaderboard(self, metric: str, limit: int, offset: int) -> list[RankEntry]:
+        with self._publish_lock:
+            return board_entries(
+                self._view.villages, get_board(self._boards, metric).top(limit, offset)
+            )
+
+    def village_rank(self, vid: int, metric: str) -> RankEntry | None:
+        with self._publish_lock:
+            return board_rank(self._view.villages, self._boards, vid, metric)
+
+    def stats(self) -> EngineStats:
+        """Taille du monde et empreinte mémoire estimée (compteurs, O(1))."""
+        villages = len(self._view.villages)
+        return EngineStats(
+            engine=type(self).__name__,
+            villages=villages,
+            queue_items=self._queue_items,
+            memory_bytes=world_footprint(villages, self._queue_items),
+        )
@@ -0,0 +1,280 @@
+"""Table associative persistante (HAMT) à partage structurel.
+
+``PersistentMap`` est un trie de hachage (hash array mapped trie): chaque
+nœud consomme 5 bits du hachage de la clé et ne stocke que ses branches
+présentes (bitmap de 32 bits + tuple compact). Une mise à jour ne modifie
+jamais un nœud existant: ``set`` recopie uniquement le chemin de la racine à
+la clé modifiée (quelques nœuds, O(log32 n)) et partage tout le reste avec la
+version précédente.
+
+Une version déjà publiée n'est donc jamais modifiée: la lire depuis un autre
+thread ne demande aucun verrou et aucune copie, même pendant des écritures.
+"""
+
+from __future__ import annotations
+
+from collections.abc import ItemsView, Iterable, Iterator, Mapping, ValuesView
+from typing import Any
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_MASK = (1 << 64) - 1
+
+# Feuille: (hachage, clé, valeur)
+_Leaf = tuple[int, Any, Any]
+
+# ``update`` reconstruit la table quand le lot dépasse 1/_REBUILD_RATIO des clés:
+# une passe de construction coûte alors moins que les chemins recopiés
+_REBUILD_RATIO = 4
+
+
+class _Node:
+    """Nœud interne: bitmap des branches présentes et tableau compact."""
+
+    __slots__ = ("bitmap", "array")
+
+    def __init__(self, bitmap: int, array: tuple[Any, ...]) -> None:
+        self.bitmap = bitmap
+        self.array = array
+
+
+class _Collision:
+    """Feuilles de clés distinctes de même hachage."""
+
+    __slots__ = ("hash", "leaves")
+
+    def __init__(self, hash_: int, leaves: tuple[_Leaf, ...]) -> None:
+        self.hash = hash_
+        self.leaves = leaves
+
+
+_EMPTY = _Node(0, ())
+
+
+def _hash(key: Any) -> int:
+    return hash(key) & _HASH_MASK
+
+
+def _entry_hash(entry: Any) -> int:
+    return entry.hash if type(entry) is _Collision else entry[0]
+
+
+def _pair(shift: int, a: Any, b: Any) -> Any:
+    """Nœud contenant deux entrées (feuilles ou collisions) de hachages différents."""
+    ha, hb = _entry_hash(a), _entry_hash(b)
+    ia, ib = (ha >> shift) & _MASK, (hb >> shift) & _MASK
+    if ia == ib:
+        return _Node(1 << ia, (_pair(shift + _BITS, a, b),))
+    return _Node((1 << ia) | (1 << ib), (a, b) if ia < ib else (b, a))
+
+
+def _set(node: Any, shift: int, leaf: _Leaf) -> tuple[Any, bool]:
+    """Insère ou remplace une feuille; retourne (nouveau nœud, clé ajoutée)."""
+    h, key, value = leaf
+    if type(node) is _Collision:
+        if h != node.hash:
+            return _pair(shift, node, leaf), True
+        for i, (_, k, v) in enumerate(node.leaves):
+            if k is key or k == key:
+                if v is value:
+                    return node, False
+                leaves = node.leaves[:i] + (leaf,) + node.leaves[i + 1 :]
+                return _Collision(h, leaves), False
+        return _Collision(h, (*node.leaves, leaf)), True
+
+    bit = 1 << ((h >> shift) & _MASK)
+    idx = (node.bitmap & (bit - 1)).bit_count()
+    array = node.array
+    if not node.bitmap & bit:
+        return _Node(node.bitmap | bit, array[:idx] + (leaf,) + array[idx:]), True
+
+    entry = array[idx]
+    added = False
+    if type(entry) is tuple:
+        eh, ek, ev = entry
+        if eh == h and (ek is key or ek == key):
+            if ev is value:
+                return node, False
+            child: Any = leaf
+        elif eh == h:
+            child, added = _Collision(h, (entry, leaf)), True
+        else:
+            child, added = _pair(shift + _BITS, entry, leaf), True
+    else:
+        child, added = _set(entry, shift + _BITS, leaf)
+        if child is entry:
+            return node, added
+    return _Node(node.bitmap, array[:idx] + (child,) + array[idx + 1 :]), added
+
+
+def _build(leaves: list[_Leaf], shift: int) -> Any:
+    """Construit un sous-arbre à partir de feuilles de clés distinctes."""
+    if len(leaves) == 1:
+        return leaves[0]
+    first = leaves[0][0]
+    if all(leaf[0] == first for leaf in leaves):
+        return _Collision(first, tuple(leaves))
+    groups: dict[int, list[_Leaf]] = {}
+    for leaf in leaves:
+        groups.setdefault((leaf[0] >> shift) & _MASK, []).append(leaf)
+    bitmap = 0
+    for index in groups:
+        bitmap |= 1 << index
+    array = tuple(_build(groups[index], shift + _BITS) for index in sorted(groups))
+    return _Node(bitmap, array)
+
+
+def _collect(node: _Node, out: list[_Leaf]) -> None:
+    for entry in node.array:
+        if type(entry) is tuple:
+            out.append(entry)
+        elif type(entry) is _Collision:
+            out.extend(entry.leaves)
+        else:
+            _collect(entry, out)
+
+
+def _walk(root: _Node) -> Iterator[_Leaf]:
+    """Parcourt les feuilles, collectées d'un coup (2x plus rapide qu'un générateur récursif)."""
+    leaves: list[_Leaf] = []
+    _collect(root, leaves)
+    return iter(leaves)
+
+
+class PersistentMap[K, V](Mapping[K, V]):
+    """Mapping immuable; ``set`` retourne une nouvelle version partageant l'ancienne.
+
+    L'itération suit l'ordre du trie (bits de poids faible du hachage), ni
+    l'ordre d'insertion ni celui des clés: un appelant qui expose un ordre
+    (``snapshot``, fichier sauvegardé) trie lui-même.
+
+    Usage:
+        villages = PersistentMap({1: v1})
+        updated = villages.set(2, v2)   # villages est inchangé
+    """
+
+    __slots__ = ("_root", "_len")
+
+    def __init__(self, items: Mapping[K, V] | Iterable[tuple[K, V]] = ()) -> None:
+        """Construit une table en une passe (O(n), sans copie de chemins).
+
+        Args:
+            items: Mapping ou paires (clé, valeur); la dernière valeur d'une clé
+                répétée l'emporte
+        """
+        pairs = dict(items)
+        leaves = [(_hash(k), k, v) for k, v in pairs.items()]
+        root = _build(leaves, 0) if leaves else _EMPTY
+        if type(root) is not _Node:
+            # La racine est toujours un nœud interne
+            root = _Node(1 << (_entry_hash(root) & _MASK), (root,))
+        self._root: _Node = root
+        self._len = len(leaves)
+
+    @classmethod
+    def _from_root(cls, root: _Node, length: int) -> PersistentMap[K, V]:
+        new = cls.__new__(cls)
+        new._root = root
+        new._len = length
+        return new
+
+    def set(self, key: K, value: V) -> PersistentMap[K, V]:
+        """Retourne une nouvelle version où ``key`` est associée à ``value``.
+
+        Args:
+            key: Clé (hachable)
+            value: Valeur
+
+        Returns:
+            Nouvelle table; ``self`` n'est pas modifiée
+        """
+        root, added = _set(self._root, 0, (_hash(key), key, value))
+        if root is self._root:
+            return self
+        return self._from_root(root, self._len + added)
+
+    def update(self, items: Mapping[K, V]) -> PersistentMap[K, V]:
+        """Retourne une nouvelle version avec plusieurs associations modifiées.
+
+        Un petit lot est appliqué par ``set`` successifs; un lot qui couvre une
+        large part de la table la reconstruit en une passe (O(n)), sans créer
+        les nœuds intermédiaires de chaque chemin recopié.
+
+        Args:
+            items: Associations à ajouter ou remplacer
+
+        Returns:
+            Nouvelle table; ``self`` n'est pas modifiée
+        """
+        if len(items) * _REBUILD_RATIO < self._len:
+            result = self
+            for key, value in items.items():
+                result = result.set(key, value)
+            return result
+        merged = dict(self.items())
+        merged.update(items)
+        return PersistentMap(merged)
+
+    def __getitem__(self, key: K) -> V:
+        h = _hash(key)
+        node: Any = self._root
+        shift = 0
+        while True:
+            if type(node) is _Collision:
+                for _, k, v in node.leaves:
+                    if k is key or k == key:
+                        return v  # type: ignore[no-any-return]
+                raise KeyError(key)
+            bit = 1 << ((h >> shift) & _MASK)
+            if not node.bitmap & bit:
+                raise KeyError(key)
+            entry = node.array[(node.bitmap & (bit - 1)).bit_count()]
+            if type(entry) is tuple:
+                if entry[0] == h and (entry[1] is key or entry[1] == key):
+                    return entry[2]  # type: ignore[no-any-return]
+                raise KeyError(key)
+            node = entry
+            shift += _BITS
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            self[key]  # type: ignore[index]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[K]:
+        for _, key, _ in _walk(self._root):
+            yield key
+
+    def __len__(self) -> int:
+        return self._len
+
+    def values(self) -> ValuesView[V]:
+        return _ValuesView(self)
+
+    def items(self) -> ItemsView[K, V]:
+        return _ItemsView(self)
+
+    def __repr__(self) -> str:
+        return f"PersistentMap({dict(self.items())!r})"
+
+
+class _ValuesView[V](ValuesView[V]):
+    """Vue des valeurs parcourant l'arbre directement (sans recherche par clé)."""
+
+    _mapping: PersistentMap[Any, V]
+
+    def __iter__(self) -> Iterator[V]:
+        for _, _, value in _walk(self._mapping._root):
+            yield value
+
+
+class _ItemsView[K, V](ItemsView[K, V]):
+    """Vue des paires parcourant l'arbre directement (sans recherche par clé)."""
+
+    _mapping: PersistentMap[K, V]
+
+    def __iter__(self) -> Iterator[tuple[K, V]]:
+        for _, key, value in _walk(self._mapping._root):
+            yield key, value
@@ -0,0 +1,903 @@
+"""Adaptateur SharedMemoryEngine: un monde partagé par les workers d'un serveur.
+
+Avec ``uvicorn --workers N``, chaque worker crée son propre moteur: en mode
+mémoire les mondes divergent, en mode fichier les workers écrasent le JSON
+les uns des autres. Ici, ressources et queues vivent dans un segment
+``multiprocessing.shared_memory`` à disposition fixe, que tous les workers
+lisent directement (``struct.unpack_from`` sur le segment, sans aller-retour
+vers un autre processus).
+
+Un seul processus écrit: celui qui détient le verrou ``flock`` du segment.
+Les autres lui transmettent leurs écritures par un socket Unix
+(``multiprocessing.connection``, authentifié par une clé stockée dans
+l'en-tête). Si l'écrivain disparaît, le verrou est libéré par le système et
+le premier worker qui écrit ensuite prend le relais sur le même segment.
+
+Disposition du segment::
+
+    en-tête (80 octets)   magic, version du format, villages, emplacements de
+                          queue, état, éléments de queue, version du monde,
+                          date du fichier à la dernière persistance, nombre de
+                          modifications de ressources, clé d'authentification
+    journal (4 Kio)       anneau des ``CHANGE_LOG_SLOTS`` derniers emplacements
+                          de villages dont les ressources ont changé
+    village x N           seq, id, x, y, bois, argile, fer, céréales,
+                          longueur de queue, nom (64 octets), puis
+                          ``queue_slots`` éléments de queue de 40 octets
+
+Chaque village est protégé par un seqlock: l'écrivain rend ``seq`` impair
+pendant sa mise à jour, un lecteur relit le village si ``seq`` a changé. Un
+village lu est donc toujours cohérent; ``snapshot`` lit les villages un par
+un (pas d'instantané global). Un seqlock resté impair au-delà de
+``SEQLOCK_TIMEOUT`` (écrivain mort pendant une mise à jour) fait reprendre le
+segment par le lecteur, qui le répare; si l'écrivain est toujours là, la
+lecture échoue avec ``TimeoutError`` au lieu de boucler.
+
+Chaque processus tient ses propres classements, mis à jour à la demande quand
+la version du monde (incrémentée à chaque mutation) a changé: seuls les
+villages notés dans le journal depuis la dernière mise à jour sont relus. Si
+l'anneau a fait le tour entre-temps, les classements sont reconstruits.
+
+Limites de la disposition fixe: le nombre de villages est celui du monde
+chargé à la création du segment (``storage_path``, au format de
+FileStorageEngine), une queue compte au plus ``queue_slots`` éléments, un nom
+de village 64 octets (UTF-8) et un élément de queue 40 octets. Le monde est
+écrit dans ``storage_path`` par l'écrivain toutes les ``flush_interval``
+secondes s'il a changé, par ``flush()`` et à sa fermeture, qui retire alors
+le segment; les autres processus s'attachent au suivant. Un segment resté en
+place (workers arrêtés sans ``close``) est repris au démarrage suivant, sauf
+si ``storage_path`` a été modifié depuis sa dernière persistance: le fichier
+fait alors foi et le segment est recréé.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import logging
+import os
+import secrets
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Iterator, Mapping, Sequence
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Client, Connection, Listener
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Any
+
+from ..gamedata import NO_COST, Catalog, build_cost
+from ..models import (
+    BuildCmd,
+    EngineStats,
+    RankEntry,
+    ResourceDelta,
+    Resources,
+    Transfer,
+    Village,
+)
+from .event_engine import village_record, write_world_file
+from .file_engine import load_world
+from .footprint import file_size
+from .leaderboard import (
+    Boards,
+    board_entries,
+    board_rank,
+    build_boards,
+    get_board,
+    refresh_boards_many,
+)
+from .memory_engine import in_id_order, settle_transfers, transfer_deltas, transfer_ids
+from .spatial import GridIndex
+
+LAYOUT_VERSION = 4
+DEFAULT_QUEUE_SLOTS = 64
+DEFAULT_TIMEOUT = 10.0
+NAME_BYTES = 64
+ITEM_BYTES = 40
+# Emplacements du journal des modifications de ressources
+CHANGE_LOG_SLOTS = 1024
+# Durée maximale d'un seqlock fermé avant de considérer l'écrivain comme mort
+SEQLOCK_TIMEOUT = 1.0
+
+logger = logging.getLogger("ager.shared")
+
+_MAGIC = b"AGSH"
+# magic, version du format, villages, emplacements de queue, état, éléments de
+# queue (tous villages), version du monde, st_mtime_ns de storage_path à la
+# dernière persistance (0: pas de fichier), modifications journalisées, clé
+_HEADER = struct.Struct("<4sIIIIIQQQ32s")
+_STATE_OFFSET = 16
+_QUEUE_ITEMS_OFFSET = 20
+_VERSION_OFFSET = 24
+_PERSISTED_OFFSET = 32
+_CHANGES_OFFSET = 40
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_CHANGE_LOG_OFFSET = _HEADER.size
+_RECORDS_OFFSET = _CHANGE_LOG_OFFSET + CHANGE_LOG_SLOTS * _U32.size
+
+# seq, id, x, y, bois, argile, fer, céréales, longueur de queue, nom
+_VILLAGE = struct.Struct(f"<Qqii4qI{NAME_BYTES}s")
+_RESOURCES_OFFSET = 24
+_RESOURCES = struct.Struct("<4q")
+_QLEN_OFFSET = 56
+_QLEN = struct.Struct("<I")
+_RECORD_HEAD = 128
+_ITEM = struct.Struct(f"<{ITEM_BYTES}s")
+
+# États du segment: en cours de remplissage, prêt, retiré par son écrivain
+_INITIALIZING, _READY, _RETIRED = 0, 1, 2
+
+_POLL_INTERVAL = 0.01
+
+
+def segment_name(storage_path: str | Path) -> str:
+    """Nom du segment d'un monde, dérivé de son fichier (un segment par monde)."""
+    digest = hashlib.sha256(str(Path(storage_path).resolve()).encode()).hexdigest()
+    return f"ager-{digest[:16]}"
+
+
+def _open_segment(name: str, create: bool = False, size: int = 0) -> SharedMemory:
+    """Ouvre un segment sans le confier au resource tracker.
+
+    Avant Python 3.13, un simple attachement est suivi par le tracker, qui
+    supprimerait le segment à la sortie de chaque worker.
+    """
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name, create, size, track=False)
+    shm = SharedMemory(name, create, size)
+    resource_tracker.unregister(f"/{shm.name}", "shared_memory")
+    return shm
+
+
+def _unlink_segment(shm: SharedMemory) -> None:
+    if sys.version_info < (3, 13):
+        # unlink() se désinscrit du tracker: il doit y être inscrit
+        resource_tracker.register(f"/{shm.name}", "shared_memory")
+    shm.unlink()
+
+
+def _attach_segment(name: str) -> SharedMemory | None:
+    """Segment existant, None s'il n'existe pas (ou pas encore dimensionné)."""
+    try:
+        return _open_segment(name)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _buffer(shm: SharedMemory) -> memoryview:
+    buf = shm.buf
+    if buf is None:
+        raise ValueError(f"Segment {shm.name} fermé")
+    return buf
+
+
+def _encode(text: str, size: int) -> bytes | None:
+    data = text.encode("utf-8")
+    return data if len(data) <= size else None
+
+
+def _decode(raw: bytes) -> str:
+    return raw.rstrip(b"\0").decode("utf-8")
+
+
+class _Ranking:
+    """Classements d'un processus et position du segment qu'ils reflètent."""
+
+    __slots__ = ("buf", "version", "changes", "villages", "boards")
+
+    def __init__(
+        self,
+        buf: memoryview,
+        version: int,
+        changes: int,
+        villages: dict[int, Village],
+        boards: Boards,
+    ) -> None:
+        self.buf = buf
+        self.version = version
+        self.changes = changes
+        self.villages = villages
+        self.boards = boards
+
+
+class SharedMemoryEngine:
+    """Moteur dont le monde est dans un segment de mémoire partagée inter-processus."""
+
+    def __init__(
+        self,
+        storage_path: str | Path = "./data/world.json",
+        name: str | None = None,
+        queue_slots: int = DEFAULT_QUEUE_SLOTS,
+        catalog: Catalog | None = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        flush_interval: float | None = None,
+    ) -> None:
+        """S'attache au segment du monde, ou le crée en devenant son écrivain.
+
+        Args:
+            storage_path: Fichier du monde, chargé à la création du segment et
+                écrit par ``flush()``
+            name: Nom du segment (None: dérivé de ``storage_path``)
+            queue_slots: Éléments de queue par village (identique dans tous
+                les processus d'un même segment)
+            catalog: Catalogue des bâtiments (coûts prélevés par l'écrivain)
+            timeout: Attente maximale, en secondes, d'un écrivain disponible
+            flush_interval: Secondes entre deux persistances du monde par
+                l'écrivain, s'il a changé (None: seulement ``flush()`` et
+                ``close()``)
+
+        Raises:
+            ValueError: Si le monde ne tient pas dans la disposition fixe, ou si
+                le segment existant a une autre disposition
+            TimeoutError: Si aucun écrivain ne publie le segment à temps
+        """
+        self.storage_path = Path(storage_path)
+        self.name = name or segment_name(self.storage_path)
+        self.queue_slots = queue_slots
+        self.catalog = catalog
+        self.timeout = timeout
+        self.flush_interval = flush_interval
+        self._record_size = _RECORD_HEAD + queue_slots * ITEM_BYTES
+
+        runtime_dir = Path(tempfile.gettempdir())
+        self._socket_path = runtime_dir / f"{self.name}.sock"
+        self._lock_fd = os.open(runtime_dir / f"{self.name}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        self.is_writer = False
+        self._shm: SharedMemory | None = None
+        self._buf: memoryview = memoryview(b"")
+        self._slots: dict[int, int] = {}
+        self._grid = GridIndex()
+        # Classements de ce processus, mis à jour sous leur verrou
+        self._ranking: _Ranking | None = None
+        self._ranking_lock = threading.Lock()
+        # Mutations de l'écrivain (locales ou transmises)
+        self._write_lock = threading.Lock()
+        # Rattachement à un nouveau segment
+        self._attach_lock = threading.Lock()
+        self._listener: Listener | None = None
+        self._conn: Connection | None = None
+        self._conn_lock = threading.Lock()
+        self._closed = False
+        # Persistance: une écriture du fichier à la fois, version déjà écrite
+        self._persist_lock = threading.Lock()
+        self._persisted_version: int | None = None
+        self._stop = threading.Event()
+        self._flusher: threading.Thread | None = None
+        self.last_persist_seconds: float | None = None
+        try:
+            self._attach()
+        except BaseException:
+            os.close(self._lock_fd)
+            raise
+
+    # --- Segment ----------------------------------------------------------
+
+    def _attach(self) -> None:
+        """Devient l'écrivain si le verrou est libre, sinon s'attache au segment publié."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if self._try_lock():
+                self._become_writer()
+                return
+            shm = _attach_segment(self.name)
+            if shm is not None:
+                if self._header_state(shm) == _READY:
+                    self._use(shm)
+                    return
+                shm.close()
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Segment {self.name}: aucun écrivain disponible")
+            time.sleep(_POLL_INTERVAL)
+
+    def _try_lock(self) -> bool:
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    def _header_state(self, shm: SharedMemory) -> int | None:
+        """État d'un segment de même disposition, None pour un segment étranger."""
+        if shm.size < _HEADER.size:
+            return None
+        magic, layout, count, slots, state, *_ = _HEADER.unpack_from(_buffer(shm), 0)
+        if magic != _MAGIC or layout != LAYOUT_VERSION:
+            return None
+        if slots != self.queue_slots:
+            raise ValueError(
+                f"Segment {self.name}: {slots} emplacements de queue, {self.queue_slots} attendus"
+            )
+        if shm.size < _RECORDS_OFFSET + count * self._record_size:
+            return None
+        return int(state)
+
+    def _become_writer(self) -> None:
+        """Reprend le segment publié (écrivain précédent disparu) ou en crée un."""
+        self.is_writer = True
+        shm = _attach_segment(self.name)
+        if shm is not None and (self._header_state(shm) != _READY or self._is_stale(shm)):
+            # Segment étranger, dont le remplissage a été interrompu, ou plus
+            # ancien que le fichier du monde
+            _unlink_segment(shm)
+            shm.close()
+            shm = None
+        if shm is None:
+            shm = self._create_segment()
+        self._use(shm)
+        self._repair()
+        self._socket_path.unlink(missing_ok=True)
+        self._listener = Listener(str(self._socket_path), family="AF_UNIX", authkey=self._authkey())
+        threading.Thread(target=self._serve, name="ager-shm-writer", daemon=True).start()
+        if self.flush_interval is not None:
+            self._flusher = threading.Thread(
+                target=self._flush_periodically,
+                args=(self.flush_interval,),
+                name="ager-shm-flush",
+                daemon=True,
+            )
+            self._flusher.start()
+
+    def _file_mtime(self) -> int:
+        """``st_mtime_ns`` de ``storage_path``, 0 s'il n'existe pas."""
+        try:
+            return self.storage_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def _is_stale(self, shm: SharedMemory) -> bool:
+        """Vrai si ``storage_path`` a été modifié depuis la dernière persistance du segment."""
+        mtime = self._file_mtime()
+        persisted: int = _U64.unpack_from(_buffer(shm), _PERSISTED_OFFSET)[0]
+        if mtime and mtime != persisted:
+            logger.warning(
+                "Segment %s is older than %s, reloading the world from the file",
+                self.name,
+                self.storage_path,
+            )
+            return True
+        return False
+
+    def _create_segment(self) -> SharedMemory:
+        """Crée le segment et y copie le monde de ``storage_path`` (ou le monde initial)."""
+        mtime = self._file_mtime()
+        if mtime:
+            world = load_world(self.storage_path)
+            # Le fichier est déjà à jour de la version 0
+            self._persisted_version = 0
+        else:
+            world = {1: Village(id=1, name="Capitale", resources=Resources())}
+        size = _RECORDS_OFFSET + len(world) * self._record_size
+        try:
+            shm = _open_segment(self.name, create=True, size=size)
+        except FileExistsError:
+            # Segment laissé par un écrivain interrompu avant son état "prêt"
+            stale = _open_segment(self.name)
+            _unlink_segment(stale)
+            stale.close()
+            shm = _open_segment(self.name, create=True, size=size)
+        buf = _buffer(shm)
+        _HEADER.pack_into(
+            buf,
+            0,
+            _MAGIC,
+            LAYOUT_VERSION,
+            len(world),
+            self.queue_slots,
+            _INITIALIZING,
+            sum(len(v.queue) for v in world.values()),
+            0,
+            mtime,
+            0,
+            secrets.token_bytes(32),
+        )
+        # Emplacements par ID croissant: ``snapshot`` lit le segment dans cet ordre
+        for slot, village in enumerate(in_id_order(world)):
+            self._write_village(buf, self._offset(slot), village)
+        _U32.pack_into(buf, _STATE_OFFSET, _READY)
+        return shm
+
+    def _write_village(self, buf: memoryview, base: int, village: Village) -> None:
+        name = _encode(village.name, NAME_BYTES)
+        items = [_encode(item, ITEM_BYTES) for item in village.queue]
+        if name is None or len(items) > self.queue_slots or None in items:
+            raise ValueError(
+                f"Village {village.id}: nom ou queue hors de la disposition du segment "
+                f"({NAME_BYTES} octets, {self.queue_slots} éléments de {ITEM_BYTES} octets)"
+            )
+        r = village.resources
+        _VILLAGE.pack_into(
+            buf, base, 0, village.id, village.x, village.y,
+            r.wood, r.clay, r.iron, r.crop, len(items), name,
+        )  # fmt: skip
+        for i, item in enumerate(items):
+            _ITEM.pack_into(buf, base + _RECORD_HEAD + i * ITEM_BYTES, item)
+
+    def _use(self, shm: SharedMemory) -> None:
+        """Adopte un segment prêt: index des IDs et des positions (fixes après création)."""
+        buf = _buffer(shm)
+        count = _HEADER.unpack_from(buf, 0)[2]
+        slots: dict[int, int] = {}
+        positions = []
+        for slot in range(count):
+            _, vid, x, y, *_ = _VILLAGE.unpack_from(buf, self._offset(slot))
+            slots[vid] = slot
+            positions.append((vid, x, y))
+        self._shm, self._buf, self._slots = shm, buf, slots
+        self._grid = GridIndex.build(positions)
+
+    def _repair(self) -> None:
+        """Referme les seqlocks laissés ouverts par un écrivain interrompu."""
+        for slot in range(len(self._slots)):
+            base = self._offset(slot)
+            seq = _U64.unpack_from(self._buf, base)[0]
+            if seq & 1:
+                _U64.pack_into(self._buf, base, seq + 1)
+
+    def _authkey(self) -> bytes:
+        key: bytes = _HEADER.unpack_from(self._buf, 0)[9]
+        return key
+
+    def _current(self) -> memoryview:
+        """Tampon du segment courant, après rattachement si son écrivain l'a retiré."""
+        if _U32.unpack_from(self._buf, _STATE_OFFSET)[0] != _READY and not self._closed:
+            with self._attach_lock:
+                if _U32.unpack_from(self._buf, _STATE_OFFSET)[0] != _READY:
+                    self._drop_connection()
+                    self._attach()
+        return self._buf
+
+    def _offset(self, slot: int) -> int:
+        return _RECORDS_OFFSET + slot * self._record_size
+
+    @property
+    def world_version(self) -> int:
+        """Nombre de mutations appliquées au segment depuis sa création."""
+        version: int = _U64.unpack_from(self._current(), _VERSION_OFFSET)[0]
+        return version
+
+    # --- Lectures ---------------------------------------------------------
+
+    def _read(
+        self, buf: memoryview, slot: int, resources: bool = True, queue: bool = True
+    ) -> Village:
+        """Lit un village sous son seqlock (relu s'il est modifié pendant la lecture)."""
+        base = self._offset(slot)
+        deadline: float | None = None
+        while True:
+            seq = _U64.unpack_from(buf, base)[0]
+            if seq & 1:
+                now = time.monotonic()
+                if deadline is None:
+                    deadline = now + SEQLOCK_TIMEOUT
+                elif now > deadline:
+                    self._recover(slot)
+                    buf, deadline = self._buf, None
+                time.sleep(0)
+                continue
+            _, vid, x, y, wood, clay, iron, crop, qlen, name = _VILLAGE.unpack_from(buf, base)
+            items = (
+                [
+                    _ITEM.unpack_from(buf, base + _RECORD_HEAD + i * ITEM_BYTES)[0]
+                    for i in range(min(qlen, self.queue_slots))
+                ]
+                if queue
+                else None
+            )
+            if _U64.unpack_from(buf, base)[0] == seq:
+                break
+        values: dict[str, Any] = {"id": vid, "name": _decode(name), "x": x, "y": y}
+        if resources:
+            values["resources"] = Resources(wood=wood, clay=clay, iron=iron, crop=crop)
+        if items is not None:
+            values["queue"] = [_decode(item) for item in items]
+        return Village(**values)
+
+    def _recover(self, slot: int) -> None:
+        """Traite un seqlock resté fermé au-delà de ``SEQLOCK_TIMEOUT``.
+
+        Si l'écrivain a disparu, ce processus reprend le segment (``_repair``
+        referme ses seqlocks); écrivain lui-même, il répare sous son verrou
+        d'écriture.
+
+        Raises:
+            TimeoutError: Si l'écrivain, toujours vivant, ne referme pas le seqlock
+        """
+        with self._attach_lock:
+            if not self.is_writer and self._try_lock():
+                self._become_writer()
+                return
+        if self.is_writer:
+            with self._write_lock:
+                self._repair()
+            return
+        raise TimeoutError(
+            f"Segment {self.name}: village à l'emplacement {slot} verrouillé par "
+            f"un écrivain qui ne répond plus"
+        )
+
+    def snapshot(self, fields: frozenset[str] | None = None) -> list[Village]:
+        """Villages lus un par un dans le segment (chacun cohérent).
+
+        Args:
+            fields: Champs demandés (None = tous); sans ``resources`` ni
+                ``queue``, ces zones ne sont pas décodées
+        """
+        buf = self._current()
+        resources = fields is None or "resources" in fields
+        queue = fields is None or "queue" in fields
+        return [self._read(buf, slot, resources, queue) for slot in range(len(self._slots))]
+
+    def get_village(self, vid: int, fields: frozenset[str] | None = None) -> Village | None:
+        buf = self._current()
+        slot = self._slots.get(vid)
+        if slot is None:
+            return None
+        return self._read(
+            buf, slot, fields is None or "resources" in fields, fields is None or "queue" in fields
+        )
+
+    def get_villages(
+        self, vids: Sequence[int], fields: frozenset[str] | None = None
+    ) -> list[Village]:
+        buf = self._current()
+        resources = fields is None or "resources" in fields
+        queue = fields is None or "queue" in fields
+        return [
+            self._read(buf, slot, resources, queue)
+            for vid in vids
+            if (slot := self._slots.get(vid)) is not None
+        ]
+
+    def _villages(self, vids: list[int]) -> list[Village]:
+        buf = self._current()
+        return [self._read(buf, self._slots[vid]) for vid in vids]
+
+    def villages_within(self, x: int, y: int, r: float) -> list[Village]:
+        return self._villages(self._grid.within(x, y, r))
+
+    def nearest_villages(self, x: int, y: int, n: int) -> list[Village]:
+        return self._villages(self._grid.nearest(x, y, n))
+
+    def _ranked(self) -> _Ranking:
+        """Classements de la version courante (sous ``_ranking_lock``).
+
+        Après une mutation, seuls les villages notés dans le journal depuis la
+        dernière mise à jour sont relus; les classements sont reconstruits pour
+        un nouveau segment ou si le journal a été recouvert entre-temps.
+        """
+        buf = self._current()
+        version = _U64.unpack_from(buf, _VERSION_OFFSET)[0]
+        ranking = self._ranking
+        if ranking is not None and ranking.buf is buf and ranking.version == version:
+            return ranking
+        # Les modifications sont journalisées avant que la version ne change:
+        # lue après elle, ``changes`` couvre toutes les mutations de ``version``
+        changes = _U64.unpack_from(buf, _CHANGES_OFFSET)[0]
+        slots = None
+        if ranking is not None and ranking.buf is buf:
+            slots = self._changed_slots(buf, ranking.changes, changes)
+        if ranking is None or slots is None:
+            villages = {v.id: v for v in self.snapshot(frozenset({"id", "name", "resources"}))}
+            ranking = _Ranking(buf, version, changes, villages, build_boards(villages))
+        else:
+            replaced = []
+            for slot in slots:
+                village = self._read(buf, slot, queue=False)
+                replaced.append((ranking.villages[village.id], village))
+                ranking.villages[village.id] = village
+            refresh_boards_many(ranking.boards, replaced)
+            ranking.version, ranking.changes = version, changes
+        self._ranking = ranking
+        return ranking
+
+    @staticmethod
+    def _changed_slots(buf: memoryview, seen: int, changes: int) -> list[int] | None:
+        """Emplacements journalisés entre ``seen`` et ``changes``, None si recouverts."""
+        if changes - seen >= CHANGE_LOG_SLOTS:
+            return None
+        slots = {
+            _U32.unpack_from(buf, _CHANGE_LOG_OFFSET + (i % CHANGE_LOG_SLOTS) * _U32.size)[0]
+            for i in range(seen, changes)
+        }
+        # L'écrivain a pu recouvrir des entrées pendant leur lecture
+        if _U64.unpack_from(buf, _CHANGES_OFFSET)[0] - seen >= CHANGE_LOG_SLOTS:
+            return None
+        return sorted(slots)
+
+    def leaderboard(self, metric: str, limit: int, offset: int) -> list[RankEntry]:
+        with self._ranking_lock:
+            ranking = self._ranked()
+            return board_entries(
+                ranking.villages, get_board(ranking.boards, metric).top(limit, offset)
+            )
+
+    def village_rank(self, vid: int, metric: str) -> RankEntry | None:
+        with self._ranking_lock:
+            ranking = self._ranked()
+            return board_rank(ranking.villages, ranking.boards, vid, metric)
+
+    # --- Écritures --------------------------------------------------------
+
+    def queue_build(self, cmd: BuildCmd) -> bool:
+        """Ajoute une construction, directement ou via l'écrivain.
+
+        Returns:
+            False si la commande est invalide, le village inconnu, sa queue
+            pleine (``queue_slots``) ou ses stocks insuffisants
+        """
+        if build_cost(self.catalog, cmd) is None:
+            return False
+        result: bool = self._write("build", cmd.model_dump())
+        return result
+
+    def queue_builds(self, cmds: Sequence[BuildCmd]) -> list[bool]:
+        """Ajoute des constructions dans l'ordre, en un message et une version du segment.
+
+        Returns:
+            Acceptation de chaque commande (voir ``queue_build``), alignée sur ``cmds``
+        """
+        if not cmds:
+            return []
+        result: list[bool] = self._write("builds", [cmd.model_dump() for cmd in cmds])
+        return result
+
+    def adjust_resources(self, deltas: Mapping[int, ResourceDelta]) -> int:
+        if not deltas:
+            return 0
+        result: int = self._write("adjust", dict(deltas))
+        return result
+
+    def transfer_resources(self, transfers: Sequence[Transfer]) -> list[ResourceDelta]:
+        if not transfers:
+            return []
+        result: list[ResourceDelta] = self._write("transfer", list(transfers))
+        return result
+
+    def _write(self, op: str, payload: Any) -> Any:
+        """Applique une mutation dans l'écrivain; un autre processus la lui transmet.
+
+        Si l'écrivain ne répond plus, ce processus tente de prendre le relais.
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            self._current()
+            if self.is_writer:
+                return self._apply(op, payload)
+            try:
+                return self._forward(op, payload)
+            except (OSError, EOFError):
+                self._drop_connection()
+                with self._attach_lock:
+                    if not self.is_writer and self._try_lock():
+                        self._become_writer()
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(_POLL_INTERVAL)
+
+    def _forward(self, op: str, payload: Any) -> Any:
+        with self._conn_lock:
+            if self._conn is None:
+                self._conn = Client(
+                    str(self._socket_path), family="AF_UNIX", authkey=self._authkey()
+                )
+            self._conn.send((op, payload))
+            reply = self._conn.recv()
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def _drop_connection(self) -> None:
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _serve(self) -> None:
+        """Accepte les connexions des autres processus (thread de l'écrivain)."""
+        listener = self._listener
+        while listener is not None:
+            try:
+                conn = listener.accept()
+            except OSError:
+                return  # listener fermé
+            except Exception:  # handshake refusé (mauvaise clé)
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: Connection) -> None:
+        with conn:
+            while True:
+                try:
+                    op, payload = conn.recv()
+                except (OSError, EOFError):
+                    return
+                try:
+                    reply = self._apply(op, payload)
+                except Exception as exc:  # renvoyée à l'appelant
+                    reply = exc
+                conn.send(reply)
+
+    def _apply(self, op: str, payload: Any) -> Any:
+        if op == "build":
+            return self._apply_builds([BuildCmd(**payload)])[0]
+        if op == "builds":
+            return self._apply_builds([BuildCmd(**cmd) for cmd in payload])
+        if op == "adjust":
+            return self._apply_adjust(payload)
+        if op == "transfer":
+            return self._apply_transfer(payload)
+        raise ValueError(f"Mutation inconnue: {op}")
+
+    def _begin(self, base: int) -> int:
+        """Ouvre le seqlock d'un village; retourne la valeur qui le refermera."""
+        seq: int = _U64.unpack_from(self._buf, base)[0]
+        _U64.pack_into(self._buf, base, seq + 1)
+        return seq + 2
+
+    def _log_change(self, slot: int) -> None:
+        """Note dans le journal un village dont les ressources ont changé."""
+        changes = _U64.unpack_from(self._buf, _CHANGES_OFFSET)[0]
+        entry = _CHANGE_LOG_OFFSET + (changes % CHANGE_LOG_SLOTS) * _U32.size
+        _U32.pack_into(self._buf, entry, slot)
+        _U64.pack_into(self._buf, _CHANGES_OFFSET, changes + 1)
+
+    def _publish(self) -> None:
+        version = _U64.unpack_from(self._buf, _VERSION_OFFSET)[0]
+        _U64.pack_into(self._buf, _VERSION_OFFSET, version + 1)
+
+    def _apply_builds(self, cmds: Sequence[BuildCmd]) -> list[bool]:
+        """Constructions appliquées dans l'ordre sous le verrou d'écriture, publiées une fois."""
+        with self._write_lock:
+            accepted = [self._build(cmd) for cmd in cmds]
+            if any(accepted):
+                self._publish()
+        return accepted
+
+    def _build(self, cmd: BuildCmd) -> bool:
+        """Ajoute une construction au segment (sous ``_write_lock``, sans publier)."""
+        cost = build_cost(self.catalog, cmd)
+        item = _encode(f"{cmd.building} -> L{cmd.levelTarget}", ITEM_BYTES)
+        slot = self._slots.get(cmd.villageId)
+        if cost is None or item is None or slot is None:
+            return False
+        buf, base = self._buf, self._offset(slot)
+        qlen = _QLEN.unpack_from(buf, base + _QLEN_OFFSET)[0]
+        stocks = _RESOURCES.unpack_from(buf, base + _RESOURCES_OFFSET)
+        if qlen >= self.queue_slots or any(s < c for s, c in zip(stocks, cost, strict=True)):
+            return False
+        seq = self._begin(base)
+        _ITEM.pack_into(buf, base + _RECORD_HEAD + qlen * ITEM_BYTES, item)
+        _QLEN.pack_into(buf, base + _QLEN_OFFSET, qlen + 1)
+        total = _U32.unpack_from(buf, _QUEUE_ITEMS_OFFSET)[0]
+        _U32.pack_into(buf, _QUEUE_ITEMS_OFFSET, total + 1)
+        if cost != NO_COST:
+            left = [s - c for s, c in zip(stocks, cost, strict=True)]
+            _RESOURCES.pack_into(buf, base + _RESOURCES_OFFSET, *left)
+        _U64.pack_into(buf, base, seq)
+        if cost != NO_COST:
+            self._log_change(slot)
+        return True
+
+    def _apply_adjust(self, deltas: Mapping[int, ResourceDelta]) -> int:
+        buf = self._buf
+        changed = 0
+        with self._write_lock:
+            for vid, delta in deltas.items():
+                slot = self._slots.get(vid)
+                if slot is None:
+                    continue
+                base = self._offset(slot)
+                stocks = _RESOURCES.unpack_from(buf, base + _RESOURCES_OFFSET)
+                seq = self._begin(base)
+                _RESOURCES.pack_into(
+                    buf,
+                    base + _RESOURCES_OFFSET,
+                    *(max(0, s + d) for s, d in zip(stocks, delta, strict=True)),
+                )
+                _U64.pack_into(buf, base, seq)
+                self._log_change(slot)
+                changed += 1
+            if changed:
+                self._publish()
+        return changed
+
+    def _apply_transfer(self, transfers: Sequence[Transfer]) -> list[ResourceDelta]:
+        """Transferts bornés aux stocks du segment, sous le verrou d'écriture."""
+        buf = self._buf
+        with self._write_lock:
+            stocks = {
+                vid: list(_RESOURCES.unpack_from(buf, self._offset(slot) + _RESOURCES_OFFSET))
+                for vid in transfer_ids(transfers)
+                if (slot := self._slots.get(vid)) is not None
+            }
+            moved = settle_transfers(stocks, transfers)
+            changed = transfer_deltas(transfers, moved)
+            for vid in changed:
+                slot = self._slots[vid]
+                base = self._offset(slot)
+                seq = self._begin(base)
+                _RESOURCES.pack_into(buf, base + _RESOURCES_OFFSET, *stocks[vid])
+                _U64.pack_into(buf, base, seq)
+                self._log_change(slot)
+            if changed:
+                self._publish()
+        return moved
+
+    def stats(self) -> EngineStats:
+        """Compteurs de l'en-tête du segment (O(1)), partagés par tous les processus.
+
+        ``memory_bytes`` est la taille du segment; ``last_persist_seconds``
+        n'est connu que de l'écrivain.
+        """
+        buf = self._current()
+        return EngineStats(
+            engine=type(self).__name__,
+            villages=len(self._slots),
+            queue_items=_U32.unpack_from(buf, _QUEUE_ITEMS_OFFSET)[0],
+            memory_bytes=len(buf),
+            storage_bytes=file_size(self.storage_path),
+            last_persist_seconds=self.last_persist_seconds,
+        )
+
+    # --- Persistance et cycle de vie ----------------------------------------
+
+    def flush(self) -> None:
+        """Écrit le monde dans ``storage_path`` s'il a changé (écrivain seulement).
+
+        La date du fichier écrit est notée dans l'en-tête: un segment repris
+        plus tard n'est réutilisé que si le fichier n'a pas changé depuis.
+        """
+        if not self.is_writer or self._shm is None:
+            return
+        with self._persist_lock:
+            version = self.world_version
+            if version == self._persisted_version:
+                return
+            started = time.perf_counter()
+            self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+            write_world_file(self.storage_path, _records(self.snapshot()))
+            _U64.pack_into(self._buf, _PERSISTED_OFFSET, self._file_mtime())
+            self._persisted_version = version
+            self.last_persist_seconds = time.perf_counter() - started
+
+    def _flush_periodically(self, interval: float) -> None:
+        """Persiste le monde toutes les ``interval`` secondes (thread de l'écrivain)."""
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Periodic flush of segment %s failed", self.name)
+
+    def close(self) -> None:
+        """Détache le moteur; l'écrivain persiste le monde puis retire le segment.
+
+        Les autres processus voient le segment retiré et s'attachent à celui
+        du prochain écrivain (eux-mêmes, au besoin).
+        """
+        if self._closed:
+            return
+        self._drop_connection()
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        if self.is_writer and self._shm is not None:
+            with self._write_lock:
+                self.flush()
+                _U32.pack_into(self._buf, _STATE_OFFSET, _RETIRED)
+                _unlink_segment(self._shm)
+            if self._listener is not None:
+                listener, self._listener = self._listener, None
+                listener.close()
+            self._socket_path.unlink(missing_ok=True)
+        self._closed = True
+        fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+        os.close(self._lock_fd)
+
+
+def _records(villages: list[Village]) -> Iterator[dict[str, Any]]:
+    return (village_record(v) for v in villages)
@@ -0,0 +1,144 @@
+"""Index spatial en grille uniforme pour les requêtes de carte.
+
+Chaque village est rangé dans la case ``(x // cell_size, y // cell_size)``.
+Une requête de rayon ``r`` ne visite que les cases recouvrant le carré
+englobant du cercle, et une recherche des N plus proches élargit anneau par
+anneau autour du point: le coût suit le nombre de villages retournés (et la
+densité locale), pas la taille du monde.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from collections.abc import Iterable
+
+DEFAULT_CELL_SIZE = 16
+
+Cell = tuple[int, int]
+
+
+class GridIndex:
+    """Grille uniforme: case -> identifiants des villages qu'elle contient."""
+
+    def __init__(self, cell_size: int = DEFAULT_CELL_SIZE) -> None:
+        if cell_size <= 0:
+            raise ValueError("cell_size doit être strictement positif")
+        self.cell_size = cell_size
+        self._cells: dict[Cell, list[int]] = {}
+        self._positions: dict[int, tuple[int, int]] = {}
+
+    @classmethod
+    def build(
+        cls, points: Iterable[tuple[int, int, int]], cell_size: int = DEFAULT_CELL_SIZE
+    ) -> GridIndex:
+        """Construit un index à partir de triplets (id, x, y).
+
+        Args:
+            points: Positions des villages
+            cell_size: Côté d'une case, en unités de carte
+
+        Returns:
+            Index contenant tous les points
+        """
+        index = cls(cell_size)
+        for vid, x, y in points:
+            index.add(vid, x, y)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _cell(self, x: int, y: int) -> Cell:
+        return x // self.cell_size, y // self.cell_size
+
+    def add(self, vid: int, x: int, y: int) -> None:
+        """Ajoute (ou déplace) un village."""
+        if vid in self._positions:
+            self.remove(vid)
+        self._positions[vid] = (x, y)
+        self._cells.setdefault(self._cell(x, y), []).append(vid)
+
+    def remove(self, vid: int) -> None:
+        """Retire un village (sans effet s'il est absent)."""
+        position = self._positions.pop(vid, None)
+        if position is None:
+            return
+        cell = self._cell(*position)
+        members = self._cells[cell]
+        members.remove(vid)
+        if not members:
+            del self._cells[cell]
+
+    def within(self, x: int, y: int, r: float) -> list[int]:
+        """Villages à une distance inférieure ou égale à ``r`` de (x, y).
+
+        Returns:
+            Identifiants triés par distance croissante puis par identifiant
+        """
+        r2 = r * r
+        found: list[tuple[int, int]] = []
+        cx0, cy0 = self._cell(math.floor(x - r), math.floor(y - r))
+        cx1, cy1 = self._cell(math.ceil(x + r), math.ceil(y + r))
+        positions = self._positions
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self._cells):
+            # Rayon plus large que la zone peuplée: parcourir les cases occupées
+            cells: Iterable[Cell] = [
+                c for c in self._cells if cx0 <= c[0] <= cx1 and cy0 <= c[1] <= cy1
+            ]
+        else:
+            cells = [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)]
+        for cell in cells:
+            for vid in self._cells.get(cell, ()):
+                d2 = _d2(positions[vid], x, y)
+                if d2 <= r2:
+                    found.append((d2, vid))
+        found.sort()
+        return [vid for _, vid in found]
+
+    def nearest(self, x: int, y: int, n: int) -> list[int]:
+        """Les ``n`` villages les plus proches de (x, y).
+
+        Les cases sont visitées par anneaux concentriques; la recherche s'arrête
+        dès que ``n`` candidats sont plus proches que tout village des anneaux
+        non encore visités.
+
+        Returns:
+            Identifiants triés par distance croissante puis par identifiant
+        """
+        if n <= 0 or not self._positions:
+            return []
+        n = min(n, len(self._positions))
+        cx, cy = self._cell(x, y)
+        candidates: list[tuple[int, int]] = []
+        positions = self._positions
+        ring = 0
+        while True:
+            if (2 * ring + 1) ** 2 > 4 * len(self._cells):
+                # Zone clairsemée: les anneaux restants seraient surtout vides
+                distances = ((_d2(positions[vid], x, y), vid) for vid in positions)
+                return [vid for _, vid in heapq.nsmallest(n, distances)]
+            for cell in _ring(cx, cy, ring):
+                for vid in self._cells.get(cell, ()):
+                    candidates.append((_d2(positions[vid], x, y), vid))
+            if len(candidates) >= n:
+                candidates.sort()
+                # Tout village hors des anneaux visités est au moins à cette distance
+                reach = ring * self.cell_size
+                if candidates[n - 1][0] <= reach * reach:
+                    break
+            ring += 1
+        return [vid for _, vid in candidates[:n]]
+
+
+def _d2(position: tuple[int, int], x: int, y: int) -> int:
+    return (position[0] - x) ** 2 + (position[1] - y) ** 2
+
+
+def _ring(cx: int, cy: int, ring: int) -> list[Cell]:
+    """Cases à distance de Tchebychev exactement ``ring`` de (cx, cy)."""
+    if ring == 0:
+        return [(cx, cy)]
+    cells = [(cx + dx, cy + d) for d in (-ring, ring) for dx in range(-ring, ring + 1)]
+    cells += [(cx + d, cy + dy) for d in (-ring, ring) for dy in range(-ring + 1, ring)]
+    return cells
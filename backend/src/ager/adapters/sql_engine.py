@@ -1,121 +1,621 @@
 from __future__ import annotations
 
+import math
+import threading
+from collections.abc import Iterable, Mapping, Sequence
 from datetime import UTC, datetime
 from pathlib import Path
+from typing import Any
 
-from sqlmodel import select
+from sqlalchemy import ColumnElement, bindparam, event, update
+from sqlalchemy import select as core_select
+from sqlalchemy.orm import Mapped
+from sqlmodel import Session, col, func, select
 
-from ..db.migrations.runner import apply_migrations
+from ..db.migrations.runner import MIGRATIONS_DIR, apply_migrations, clone_from_template
 from ..db.models import BuildQueue as BuildQueueORM
 from ..db.models import Resources as ResourcesORM
 from ..db.models import Village as VillageORM
-from ..db.session import get_session
-from ..models import BuildCmd, Resources, Village
+from ..db.session import (
+    enable_wal,
+    get_read_engine,
+    get_read_session,
+    get_writer,
+    release_database,
+)
+from ..gamedata import NO_COST, Catalog, build_cost
+from ..models import (
+    BuildCmd,
+    EngineStats,
+    RankEntry,
+    ResourceDelta,
+    Resources,
+    SQLiteStats,
+    Transfer,
+    Village,
+)
+from ..settings import get_db_template_enabled
+from .footprint import file_size
+from .memory_engine import settle_transfers, transfer_deltas, transfer_ids
+
+# Score de classement: colonne de ressources ou expression sur ces colonnes
+_Score = ColumnElement[int] | Mapped[int]
+
+# Premier rayon essayé par nearest_villages (doublé jusqu'à trouver n villages)
+_NEAREST_START_RADIUS = 16
+
+_RESOURCE_COLUMNS = ("wood", "clay", "iron", "crop")
+
+# Constructions ajoutées par le lot en cours (``session.info`` du writer)
+_QUEUED_KEY = "ager_queued"
+
+# Variations de ressources bornées à 0: une requête préparée, exécutée pour
+# tout le lot (executemany)
+_ADD_RESOURCES = (
+    update(ResourcesORM)
+    .where(col(ResourcesORM.village_id) == bindparam("vid"))
+    .values(
+        {
+            name: func.max(0, getattr(ResourcesORM, name) + bindparam(f"d_{name}"))
+            for name in _RESOURCE_COLUMNS
+        }
+    )
+)
+
+# Coût d'une construction: prélevé seulement si tous les stocks le couvrent
+# (aucune ligne modifiée sinon, ou si le village est inconnu)
+_SPEND_RESOURCES = (
+    update(ResourcesORM)
+    .where(col(ResourcesORM.village_id) == bindparam("vid"))
+    .where(*(getattr(ResourcesORM, name) >= bindparam(f"c_{name}") for name in _RESOURCE_COLUMNS))
+    .values(
+        {name: getattr(ResourcesORM, name) - bindparam(f"c_{name}") for name in _RESOURCE_COLUMNS}
+    )
+)
+
+# Stocks de plusieurs villages, lus en lignes (sans objets ORM)
+_READ_STOCKS = core_select(
+    col(ResourcesORM.village_id), *(getattr(ResourcesORM, name) for name in _RESOURCE_COLUMNS)
+).where(col(ResourcesORM.village_id).in_(bindparam("ids", expanding=True)))
+
+# Stocks absolus (état faisant autorité tenu ailleurs, ex. HybridEngine)
+_SET_RESOURCES = (
+    update(ResourcesORM)
+    .where(col(ResourcesORM.village_id) == bindparam("vid"))
+    .values({name: bindparam(f"v_{name}") for name in _RESOURCE_COLUMNS})
+)
+
+
+def add_resources(session: Session, deltas: Mapping[int, ResourceDelta]) -> int:
+    """Applique des variations de ressources en une seule requête groupée.
+
+    Args:
+        session: Session du writer (la transaction englobe tout le lot)
+        deltas: Variations par ID de village
+
+    Returns:
+        Nombre de villages modifiés (les IDs sans ressources sont ignorés)
+    """
+    if not deltas:
+        return 0
+    params = [
+        {"vid": vid, **{f"d_{name}": d for name, d in zip(_RESOURCE_COLUMNS, delta, strict=True)}}
+        for vid, delta in deltas.items()
+    ]
+    rowcount: int = session.connection().execute(_ADD_RESOURCES, params).rowcount
+    return rowcount
+
+
+def spend_resources(session: Session, vid: int, cost: ResourceDelta) -> bool:
+    """Prélève un coût sur les stocks d'un village s'ils le couvrent tous.
+
+    Returns:
+        False si le village est inconnu ou ses stocks insuffisants (rien n'est prélevé)
+    """
+    params = {
+        "vid": vid,
+        **{f"c_{name}": c for name, c in zip(_RESOURCE_COLUMNS, cost, strict=True)},
+    }
+    rowcount: int = session.connection().execute(_SPEND_RESOURCES, params).rowcount
+    return rowcount == 1
+
+
+def store_resources(session: Session, rows: Iterable[tuple[int, Resources]]) -> None:
+    """Écrit les stocks de villages (valeurs absolues) en une seule requête groupée."""
+    params = [
+        {"vid": vid, **{f"v_{name}": getattr(r, name) for name in _RESOURCE_COLUMNS}}
+        for vid, r in rows
+    ]
+    if params:
+        session.connection().execute(_SET_RESOURCES, params)
+
+
+def transfer_stocks(session: Session, transfers: Sequence[Transfer]) -> list[ResourceDelta]:
+    """Applique des transferts de ressources dans la transaction du writer.
+
+    Les stocks des villages concernés sont lus, les transferts bornés à ces
+    stocks (``settle_transfers``) puis les stocks modifiés écrits en une
+    requête groupée: rien ne peut s'intercaler entre la lecture et l'écriture.
+
+    Returns:
+        Quantités transférées, alignées sur ``transfers`` (rien pour un village
+        sans ressources)
+    """
+    rows = session.connection().execute(_READ_STOCKS, {"ids": list(transfer_ids(transfers))})
+    stocks = {vid: [wood, clay, iron, crop] for vid, wood, clay, iron, crop in rows}
+    moved = settle_transfers(stocks, transfers)
+    store_resources(
+        session,
+        (
+            (vid, Resources(**dict(zip(_RESOURCE_COLUMNS, stocks[vid], strict=True))))
+            for vid in transfer_deltas(transfers, moved)
+        ),
+    )
+    return moved
+
+
+# En-tête du fichier WAL, puis un en-tête de 24 octets par frame (une page)
+_WAL_HEADER_BYTES = 32
+_WAL_FRAME_HEADER_BYTES = 24
+
+
+def sqlite_stats(db_path: Path) -> SQLiteStats:
+    """Pages de la base et taille du WAL, sans parcourir les tables.
+
+    ``page_size``, ``page_count`` et ``freelist_count`` sont lus dans
+    l'en-tête de la base; la taille du WAL est celle du fichier ``-wal``.
+    """
+    with get_read_engine(db_path).connect() as conn:
+        page_size, page_count, freelist_count = (
+            int(conn.exec_driver_sql(f"PRAGMA {name}").scalar_one())
+            for name in ("page_size", "page_count", "freelist_count")
+        )
+    wal_bytes = file_size(wal_path(db_path))
+    frames = max(0, wal_bytes - _WAL_HEADER_BYTES) // (page_size + _WAL_FRAME_HEADER_BYTES)
+    return SQLiteStats(
+        page_size=page_size,
+        page_count=page_count,
+        freelist_count=freelist_count,
+        wal_bytes=wal_bytes,
+        wal_frames=frames,
+    )
+
+
+def wal_path(db_path: Path) -> Path:
+    """Fichier WAL d'une base."""
+    return db_path.with_name(db_path.name + "-wal")
 
 
 class SQLiteEngine:
-    """Adaptateur SQLite pour le port SimulationEngine (avec ORM)."""
+    """Adaptateur SQLite pour le port SimulationEngine (avec ORM).
 
-    def __init__(self, db_path: Path):
+    Lectures et écritures sont séparées: ``snapshot`` et ``get_village`` lisent
+    via un pool de connexions en lecture seule, ``queue_build`` passe par le
+    writer unique de la base (thread dédié, commits par lots). En mode WAL, les
+    lecteurs ne bloquent jamais sur le writer.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        *,
+        use_template: bool | None = None,
+        catalog: Catalog | None = None,
+    ):
         self._db_path = Path(db_path)
+        self.catalog = catalog
+        if use_template is None:
+            use_template = get_db_template_enabled()
+
+        if use_template and not self._db_path.exists():
+            # Nouvelle base: copie d'un template déjà migré (tables + seed)
+            clone_from_template(self._db_path, MIGRATIONS_DIR)
+        else:
+            # Apply migrations (creates tables + seed if needed)
+            apply_migrations(self._db_path, MIGRATIONS_DIR)
+        enable_wal(self._db_path)
+        self._writer = get_writer(self._db_path)
+        # Villages et éléments de queue: comptés une fois (au premier stats()),
+        # puis tenus à jour par les écritures de ce moteur
+        self._counts: list[int] | None = None
+        self._counts_lock = threading.Lock()
 
-        # Apply migrations (creates tables + seed if needed)
-        migrations_dir = Path(__file__).parent.parent / "db" / "migrations"
-        apply_migrations(self._db_path, migrations_dir)
+    def close(self) -> None:
+        """Applique les écritures en attente, arrête le writer et ferme les connexions."""
+        self._writer.close()
+        release_database(self._db_path)
 
     # --- Port methods -----------------------------------------------------
 
-    def snapshot(self) -> list[Village]:
-        """Retourne la liste de tous les villages."""
-        with get_session(self._db_path) as session:
-            villages_orm = session.exec(select(VillageORM)).all()
-            villages = []
-
-            for v_orm in villages_orm:
-                if v_orm.id is None:
-                    continue
-
-                # Récupérer les ressources
-                res_orm = session.exec(
-                    select(ResourcesORM).where(ResourcesORM.village_id == v_orm.id)
-                ).first()
-
-                if res_orm:
-                    resources = Resources(
-                        wood=res_orm.wood,
-                        clay=res_orm.clay,
-                        iron=res_orm.iron,
-                        crop=res_orm.crop,
-                    )
-                else:
-                    resources = Resources()
-
-                # Récupérer la queue de construction
-                queue_orm = session.exec(
-                    select(BuildQueueORM)
-                    .where(BuildQueueORM.village_id == v_orm.id)
-                    .order_by(BuildQueueORM.queued_at)
-                ).all()
-                queue = [f"{q.building} -> L{q.level}" for q in queue_orm]
-
-                villages.append(
-                    Village(id=v_orm.id, name=v_orm.name, resources=resources, queue=queue)
-                )
+    def snapshot(self, fields: frozenset[str] | None = None) -> list[Village]:
+        """Retourne la liste de tous les villages.
+
+        Args:
+            fields: Champs demandés (None = tous); sans ``resources`` ni
+                ``queue``, seule la table village est lue
+
+        Returns:
+            Villages par ID croissant, lus en au plus trois requêtes (une par table)
+        """
+        with get_read_session(self._db_path) as session:
+            return self._load_villages(session, None, fields)
 
-            return villages
+    def get_village(self, vid: int, fields: frozenset[str] | None = None) -> Village | None:
+        """Récupère un village par son ID.
 
-    def get_village(self, vid: int) -> Village | None:
-        """Récupère un village par son ID."""
-        with get_session(self._db_path) as session:
+        Args:
+            vid: ID du village
+            fields: Champs demandés (None = tous); les requêtes de ressources et
+                de queue ne sont émises que si le champ est demandé
+        """
+        with get_read_session(self._db_path) as session:
             v_orm = session.get(VillageORM, vid)
             if not v_orm or v_orm.id is None:
                 return None
+            resources = (
+                self._load_resources(session, vid)
+                if fields is None or "resources" in fields
+                else None
+            )
+            queue = self._load_queue(session, vid) if fields is None or "queue" in fields else None
+            return self._to_village(v_orm, resources, queue)
 
-            # Récupérer les ressources
-            res_orm = session.exec(
-                select(ResourcesORM).where(ResourcesORM.village_id == vid)
-            ).first()
+    def get_villages(
+        self, vids: Sequence[int], fields: frozenset[str] | None = None
+    ) -> list[Village]:
+        """Récupère plusieurs villages en au plus trois requêtes.
 
-            if res_orm:
-                resources = Resources(
-                    wood=res_orm.wood,
-                    clay=res_orm.clay,
-                    iron=res_orm.iron,
-                    crop=res_orm.crop,
-                )
-            else:
-                resources = Resources()
-
-            # Récupérer la queue de construction
-            queue_orm = session.exec(
-                select(BuildQueueORM)
-                .where(BuildQueueORM.village_id == vid)
-                .order_by(BuildQueueORM.queued_at)
-            ).all()
-            queue = [f"{q.building} -> L{q.level}" for q in queue_orm]
+        Args:
+            vids: IDs des villages
+            fields: Champs demandés (voir ``get_village``)
+
+        Returns:
+            Villages connus, dans l'ordre de ``vids``
+        """
+        with get_read_session(self._db_path) as session:
+            return self._load_villages(session, list(vids), fields)
+
+    @staticmethod
+    def _load_resources(session: Session, vid: int) -> Resources:
+        res_orm = session.exec(select(ResourcesORM).where(ResourcesORM.village_id == vid)).first()
+        if res_orm is None:
+            return Resources()
+        return Resources(wood=res_orm.wood, clay=res_orm.clay, iron=res_orm.iron, crop=res_orm.crop)
 
-            return Village(id=v_orm.id, name=v_orm.name, resources=resources, queue=queue)
+    @staticmethod
+    def _load_queue(session: Session, vid: int) -> list[str]:
+        queue_orm = session.exec(
+            select(BuildQueueORM)
+            .where(BuildQueueORM.village_id == vid)
+            .order_by(BuildQueueORM.queued_at, col(BuildQueueORM.id))
+        ).all()
+        return [f"{q.building} -> L{q.level}" for q in queue_orm]
+
+    @staticmethod
+    def _to_village(
+        v_orm: VillageORM, resources: Resources | None, queue: list[str] | None
+    ) -> Village:
+        """Construit un Village; un champ non chargé (None) garde sa valeur par défaut."""
+        values: dict[str, Any] = {"id": v_orm.id, "name": v_orm.name, "x": v_orm.x, "y": v_orm.y}
+        if resources is not None:
+            values["resources"] = resources
+        if queue is not None:
+            values["queue"] = queue
+        return Village(**values)
 
     def queue_build(self, cmd: BuildCmd) -> bool:
-        """Ajoute une commande de construction à la queue."""
-        with get_session(self._db_path) as session:
-            # Vérifier que le village existe
-            v_orm = session.get(VillageORM, cmd.villageId)
-            if not v_orm:
-                return False
+        """Ajoute une commande de construction à la queue.
+
+        La commande est appliquée par le writer de la base; l'appel rend la main
+        une fois le lot qui la contient commité. Avec un catalogue, le coût est
+        prélevé par une seule requête conditionnelle, dans la même transaction.
+        """
+        # Vérifier la validité de la commande (sans accès à la base)
+        cost = build_cost(self.catalog, cmd)
+        if cost is None:
+            return False
+        accepted: bool = self._writer.execute(lambda session: self._add_build(session, cmd, cost))
+        return accepted
+
+    def queue_builds(self, cmds: Sequence[BuildCmd]) -> list[bool]:
+        """Ajoute des constructions dans l'ordre, en une seule commande du writer.
 
-            # Vérifier la validité de la commande
-            if not cmd.building or cmd.levelTarget <= 0:
+        Le lot entier tient dans une transaction (un commit); si elle échoue,
+        aucune construction n'est appliquée et l'erreur est levée.
+
+        Args:
+            cmds: Commandes de construction
+
+        Returns:
+            Acceptation de chaque commande, alignée sur ``cmds``
+        """
+        builds = [(cmd, build_cost(self.catalog, cmd)) for cmd in cmds]
+        if all(cost is None for _, cost in builds):
+            return [False] * len(builds)
+
+        def write(session: Session) -> list[bool]:
+            return [
+                cost is not None and self._add_build(session, cmd, cost) for cmd, cost in builds
+            ]
+
+        accepted: list[bool] = self._writer.execute(write)
+        return accepted
+
+    def _add_build(self, session: Session, cmd: BuildCmd, cost: ResourceDelta) -> bool:
+        """Prélève le coût et ajoute la construction à la queue (thread du writer)."""
+        if cost == NO_COST:
+            # Vérifier que le village existe
+            if not session.get(VillageORM, cmd.villageId):
                 return False
+        elif not spend_resources(session, cmd.villageId, cost):
+            return False
 
-            # Ajouter à la queue
-            build_queue_entry = BuildQueueORM(
+        # Ajouter à la queue
+        session.add(
+            BuildQueueORM(
                 village_id=cmd.villageId,
                 building=cmd.building,
                 level=cmd.levelTarget,
                 queued_at=datetime.now(UTC).isoformat(),
             )
-            session.add(build_queue_entry)
-            session.commit()
+        )
+        self._count_on_commit(session)
+        return True
+
+    def adjust_resources(self, deltas: Mapping[int, ResourceDelta]) -> int:
+        """Applique des variations de ressources en une transaction du writer.
+
+        Args:
+            deltas: Variations par ID de village (les stocks sont bornés à 0)
+
+        Returns:
+            Nombre de villages modifiés (les IDs inconnus sont ignorés)
+        """
+        if not deltas:
+            return 0
+        changed: int = self._writer.execute(lambda session: add_resources(session, deltas))
+        return changed
+
+    def transfer_resources(self, transfers: Sequence[Transfer]) -> list[ResourceDelta]:
+        """Transfère des ressources entre villages dans une transaction du writer.
+
+        Args:
+            transfers: Transferts (source, cible, quantités), bornés au stock
+                de la source
+
+        Returns:
+            Quantités transférées, alignées sur ``transfers``
+        """
+        if not transfers:
+            return []
+        moved: list[ResourceDelta] = self._writer.execute(
+            lambda session: transfer_stocks(session, transfers)
+        )
+        return moved
+
+    def _count_on_commit(self, session: Session) -> None:
+        """Compte une construction une fois son lot commité (thread du writer).
+
+        Un lot annulé puis rejoué commande par commande ne compte donc que les
+        constructions réellement commitées.
+        """
+        queued = session.info.get(_QUEUED_KEY, 0)
+        if not queued:
+            event.listen(session, "after_commit", self._add_queued, once=True)
+        session.info[_QUEUED_KEY] = queued + 1
+
+    def _add_queued(self, session: Session) -> None:
+        with self._counts_lock:
+            if self._counts is not None:
+                self._counts[1] += session.info.get(_QUEUED_KEY, 0)
+
+    def _counters(self) -> tuple[int, int]:
+        """(villages, éléments de queue); le comptage initial passe par le writer.
+
+        Il lit l'état commité par une session de lecture, entre deux lots: les
+        lots précédents y figurent déjà et ceux qui suivent seront comptés à
+        leur commit, sans double compte ni oubli.
+        """
+
+        def count(session: Session) -> list[int]:
+            with self._counts_lock:
+                if self._counts is None:
+                    with get_read_session(self._db_path) as reader:
+                        self._counts = [
+                            reader.exec(select(func.count()).select_from(table)).one()
+                            for table in (VillageORM, BuildQueueORM)
+                        ]
+                return self._counts
+
+        counts = self._counts
+        if counts is None:
+            counts = self._writer.execute(count)
+        return counts[0], counts[1]
+
+    def stats(self) -> EngineStats:
+        """Compteurs du moteur, taille des fichiers et pages SQLite (sans parcours)."""
+        villages, queue_items = self._counters()
+        return EngineStats(
+            engine=type(self).__name__,
+            villages=villages,
+            queue_items=queue_items,
+            storage_bytes=file_size(self._db_path, wal_path(self._db_path)),
+            last_persist_seconds=self._writer.last_commit_seconds,
+            sqlite=sqlite_stats(self._db_path),
+        )
+
+    # --- Map queries ------------------------------------------------------
+
+    def villages_within(self, x: int, y: int, r: float) -> list[Village]:
+        """Villages à distance au plus ``r`` de (x, y), du plus proche au plus lointain.
+
+        Le carré englobant est résolu par l'index ``idx_village_xy``, le cercle
+        est filtré ensuite sur les seules lignes du carré.
+        """
+        with get_read_session(self._db_path) as session:
+            return self._load_villages(session, self._ids_within(session, x, y, r))
+
+    def nearest_villages(self, x: int, y: int, n: int) -> list[Village]:
+        """Les ``n`` villages les plus proches de (x, y).
+
+        Le rayon de recherche double jusqu'à contenir ``n`` villages: chaque
+        requête reste bornée par l'index, et le dernier rayon garantit qu'aucun
+        village hors du cercle n'est plus proche que le n-ième trouvé.
+        """
+        if n <= 0:
+            return []
+        with get_read_session(self._db_path) as session:
+            bounds = session.exec(
+                select(
+                    func.min(VillageORM.x),
+                    func.max(VillageORM.x),
+                    func.min(VillageORM.y),
+                    func.max(VillageORM.y),
+                )
+            ).one()
+            if bounds[0] is None:
+                return []
+            min_x, max_x, min_y, max_y = bounds
+            # Rayon couvrant tout le monde depuis (x, y)
+            world_radius = math.hypot(
+                max(abs(x - min_x), abs(x - max_x)), max(abs(y - min_y), abs(y - max_y))
+            )
+            radius = float(_NEAREST_START_RADIUS)
+            while True:
+                ids = self._ids_within(session, x, y, radius)
+                if len(ids) >= n or radius >= world_radius:
+                    return self._load_villages(session, ids[:n])
+                radius *= 2
+
+    @staticmethod
+    def _ids_within(session: Session, x: int, y: int, r: float) -> list[int]:
+        dx = col(VillageORM.x) - x
+        dy = col(VillageORM.y) - y
+        distance = dx * dx + dy * dy
+        rows = session.exec(
+            select(VillageORM.id)
+            .where(col(VillageORM.x).between(math.floor(x - r), math.ceil(x + r)))
+            .where(col(VillageORM.y).between(math.floor(y - r), math.ceil(y + r)))
+            .where(distance <= r * r)
+            .order_by(distance, col(VillageORM.id))
+        ).all()
+        return [vid for vid in rows if vid is not None]
+
+    @staticmethod
+    def _load_villages(
+        session: Session, ids: list[int] | None, fields: frozenset[str] | None = None
+    ) -> list[Village]:
+        """Charge des villages en au plus trois requêtes, dans l'ordre de ``ids``.
+
+        ``ids``: None charge tout le monde, par ID croissant (tables lues sans
+        filtre). ``fields``: sans ``resources`` ni ``queue``, ces tables ne
+        sont pas lues.
+        """
+        if ids is not None and not ids:
+            return []
+        village_query = select(VillageORM).order_by(col(VillageORM.id))
+        if ids is not None:
+            village_query = village_query.where(col(VillageORM.id).in_(ids))
+        villages = {v.id: v for v in session.exec(village_query) if v.id is not None}
+        resources: dict[int, Resources] | None = None
+        if fields is None or "resources" in fields:
+            resource_query = select(ResourcesORM)
+            if ids is not None:
+                resource_query = resource_query.where(col(ResourcesORM.village_id).in_(ids))
+            resources = {
+                r.village_id: Resources(wood=r.wood, clay=r.clay, iron=r.iron, crop=r.crop)
+                for r in session.exec(resource_query)
+            }
+        queues: dict[int, list[str]] | None = None
+        if fields is None or "queue" in fields:
+            queue_query = select(BuildQueueORM).order_by(
+                col(BuildQueueORM.village_id),
+                col(BuildQueueORM.queued_at),
+                col(BuildQueueORM.id),
+            )
+            if ids is not None:
+                queue_query = queue_query.where(col(BuildQueueORM.village_id).in_(ids))
+            queues = {}
+            for q in session.exec(queue_query):
+                queues.setdefault(q.village_id, []).append(f"{q.building} -> L{q.level}")
+
+        return [
+            SQLiteEngine._to_village(
+                v_orm,
+                resources.get(vid, Resources()) if resources is not None else None,
+                queues.get(vid, []) if queues is not None else None,
+            )
+            for vid in (villages if ids is None else ids)
+            if (v_orm := villages.get(vid)) is not None
+        ]
+
+    # --- Leaderboards -----------------------------------------------------
+
+    def leaderboard(self, metric: str, limit: int, offset: int) -> list[RankEntry]:
+        """Tranche du classement d'une métrique, lue dans l'ordre de son index.
+
+        Chaque métrique a un index ``(score DESC, village_id)``: la tranche est
+        lue directement dans l'index, sans tri. SQLite saute les ``offset``
+        premières entrées une à une: coût O(offset + limit), d'où la borne
+        ``MAX_LEADERBOARD_OFFSET`` de la route.
+
+        Raises:
+            ValueError: Si la métrique est inconnue
+        """
+        score = _score_expr(metric)
+        with get_read_session(self._db_path) as session:
+            rows = session.exec(
+                select(col(ResourcesORM.village_id), VillageORM.name, score)
+                .join(VillageORM, col(VillageORM.id) == col(ResourcesORM.village_id))
+                .order_by(score.desc(), col(ResourcesORM.village_id))
+                .limit(limit)
+                .offset(offset)
+            ).all()
+        return [
+            RankEntry(rank=offset + i + 1, villageId=vid, name=name, score=value)
+            for i, (vid, name, value) in enumerate(rows)
+        ]
+
+    def village_rank(self, vid: int, metric: str) -> RankEntry | None:
+        """Rang d'un village: nombre de villages classés devant lui, plus un.
+
+        Le décompte parcourt la plage de l'index située avant le village (les
+        B-trees de SQLite ne stockent pas de rangs), sans lire la table: coût
+        O(rang).
+
+        Raises:
+            ValueError: Si la métrique est inconnue
+        """
+        score = _score_expr(metric)
+        with get_read_session(self._db_path) as session:
+            row = session.exec(
+                select(VillageORM.name, score)
+                .join(ResourcesORM, col(ResourcesORM.village_id) == col(VillageORM.id))
+                .where(col(VillageORM.id) == vid)
+            ).first()
+            if row is None:
+                return None
+            name, value = row
+            ahead = session.exec(
+                select(func.count())
+                .select_from(ResourcesORM)
+                .where((score > value) | ((score == value) & (col(ResourcesORM.village_id) < vid)))
+            ).one()
+        return RankEntry(rank=ahead + 1, villageId=vid, name=name, score=value)
+
 
-            return True
+def _score_expr(metric: str) -> _Score:
+    """Expression SQL du score d'une métrique (identique à celle des index 0005)."""
+    scores: dict[str, _Score] = {
+        "total": col(ResourcesORM.wood)
+        + col(ResourcesORM.clay)
+        + col(ResourcesORM.iron)
+        + col(ResourcesORM.crop),
+        "wood": col(ResourcesORM.wood),
+        "clay": col(ResourcesORM.clay),
+        "iron": col(ResourcesORM.iron),
+        "crop": col(ResourcesORM.crop),
+    }
+    if metric not in scores:
+        raise ValueError(f"Métrique de classement inconnue: {metric}")
+    return scores[metric]
@@ -0,0 +1,321 @@
+"""Adaptateur TieredEngine: villages chauds en mémoire, villages froids sur disque.
+
+Le monde complet vit dans un moteur de stockage (SQLiteEngine par défaut, ou
+tout moteur du registre); seuls les ``capacity`` villages les plus récemment
+utilisés sont gardés en mémoire, dans un cache LRU. Un village absent du cache
+est chargé depuis le stockage au premier accès (``get_village``), en évinçant
+le village le moins récemment utilisé.
+
+Les mutations sont écrites dans le stockage (write-through) puis reportées
+sur la copie en mémoire: un village évincé est donc toujours à jour sur
+disque, et l'éviction ne coûte aucune écriture.
+
+La mémoire est bornée en nombre de villages (``AGER_TIER_CAPACITY``) plutôt
+qu'en octets: la taille d'un village varie peu, et un compte reste exact sans
+mesurer les objets.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+
+from ..gamedata import Catalog, build_cost
+from ..metrics import TIER_CACHE_EVENTS, TIER_RESIDENT
+from ..models import (
+    BuildCmd,
+    CacheStats,
+    EngineStats,
+    RankEntry,
+    ResourceDelta,
+    Transfer,
+    Village,
+)
+from ..ports import SimulationEngine
+from .footprint import world_footprint
+from .locking import StripedLock
+from .memory_engine import transfer_deltas, transfer_ids, with_build, with_resource_delta
+
+DEFAULT_CAPACITY = 100_000
+
+
+class TieredEngine:
+    """Cache LRU borné de villages devant un moteur de stockage."""
+
+    def __init__(
+        self,
+        store: SimulationEngine,
+        capacity: int = DEFAULT_CAPACITY,
+        catalog: Catalog | None = None,
+    ) -> None:
+        """Crée le moteur; le cache est vide au démarrage (rempli à la demande).
+
+        Args:
+            store: Moteur de stockage faisant autorité (SQLiteEngine en général)
+            capacity: Nombre maximal de villages gardés en mémoire
+            catalog: Catalogue du stockage, pour reporter les coûts prélevés
+                sur les copies en mémoire
+
+        Raises:
+            ValueError: Si ``capacity`` n'est pas strictement positive
+        """
+        if capacity <= 0:
+            raise ValueError("capacity doit être strictement positive")
+        self.store = store
+        self.capacity = capacity
+        self.catalog = catalog
+        self._cache: OrderedDict[int, Village] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Un chargement et une mutation du même village ne se croisent jamais
+        self._locks = StripedLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def resident(self) -> int:
+        """Nombre de villages actuellement en mémoire."""
+        return len(self._cache)
+
+    def _lookup(self, vid: int) -> Village | None:
+        with self._cache_lock:
+            village = self._cache.get(vid)
+            if village is not None:
+                self._cache.move_to_end(vid)
+        return village
+
+    def _admit(self, village: Village) -> None:
+        """Place un village en tête du LRU et évince au-delà de la capacité."""
+        evicted = 0
+        with self._cache_lock:
+            self._cache[village.id] = village
+            self._cache.move_to_end(village.id)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+                evicted += 1
+            self.evictions += evicted
+            TIER_RESIDENT.set(len(self._cache))
+        if evicted:
+            TIER_CACHE_EVENTS.inc(("eviction",), evicted)
+
+    def close(self) -> None:
+        """Vide le cache et ferme le stockage s'il a une méthode ``close``."""
+        with self._cache_lock:
+            self._cache.clear()
+            TIER_RESIDENT.set(0)
+        close = getattr(self.store, "close", None)
+        if callable(close):
+            close()
+
+    # --- Port methods -----------------------------------------------------
+
+    def snapshot(self, fields: frozenset[str] | None = None) -> list[Village]:
+        """Retourne tous les villages, lus depuis le stockage (à jour en permanence).
+
+        La projection ``fields`` est transmise au stockage.
+        """
+        return self.store.snapshot(fields)
+
+    def get_village(self, vid: int, fields: frozenset[str] | None = None) -> Village | None:
+        """Retourne un village, chargé depuis le stockage s'il n'est pas en mémoire.
+
+        Args:
+            vid: ID du village
+            fields: Champs demandés; ignoré, le cache ne gardant que des
+                villages complets
+
+        Returns:
+            Le village si trouvé, None sinon (un ID inconnu n'entre pas en cache)
+        """
+        village = self._lookup(vid)
+        if village is not None:
+            self.hits += 1
+            TIER_CACHE_EVENTS.inc(("hit",))
+            return village
+
+        with self._locks.for_key(vid):
+            # Un autre thread a pu charger le village pendant l'attente du verrou
+            village = self._lookup(vid)
+            if village is not None:
+                self.hits += 1
+                TIER_CACHE_EVENTS.inc(("hit",))
+                return village
+            self.misses += 1
+            TIER_CACHE_EVENTS.inc(("miss",))
+            village = self.store.get_village(vid)
+            if village is not None:
+                self._admit(village)
+        return village
+
+    def get_villages(
+        self, vids: Sequence[int], fields: frozenset[str] | None = None
+    ) -> list[Village]:
+        """Retourne plusieurs villages; ceux absents du cache sont chargés en un appel.
+
+        Args:
+            vids: IDs des villages
+            fields: Champs demandés; ignoré (voir ``get_village``)
+
+        Returns:
+            Villages connus, dans l'ordre de ``vids``
+        """
+        distinct = list(dict.fromkeys(vids))
+        found: dict[int, Village] = {}
+        missing: list[int] = []
+        for vid in distinct:
+            village = self._lookup(vid)
+            if village is not None:
+                found[vid] = village
+            else:
+                missing.append(vid)
+        if missing:
+            with self._locks.hold(missing):
+                # Un autre thread a pu charger certains villages pendant l'attente
+                for vid in missing:
+                    village = self._lookup(vid)
+                    if village is not None:
+                        found[vid] = village
+                missing = [vid for vid in missing if vid not in found]
+                for village in self.store.get_villages(missing):
+                    found[village.id] = village
+                    self._admit(village)
+        # Un ID inconnu compte comme un défaut de cache, comme dans get_village
+        hits = len(distinct) - len(missing)
+        self.hits += hits
+        self.misses += len(missing)
+        if hits:
+            TIER_CACHE_EVENTS.inc(("hit",), hits)
+        if missing:
+            TIER_CACHE_EVENTS.inc(("miss",), len(missing))
+        return [found[vid] for vid in vids if vid in found]
+
+    def queue_build(self, cmd: BuildCmd) -> bool:
+        """Écrit la commande dans le stockage puis met à jour la copie en mémoire.
+
+        Args:
+            cmd: Commande de construction
+
+        Returns:
+            True si la commande a été acceptée par le stockage, False sinon
+        """
+        cost = build_cost(self.catalog, cmd)
+        if cost is None:
+            return False
+        with self._locks.for_key(cmd.villageId):
+            if not self.store.queue_build(cmd):
+                return False
+            self._cache_build(cmd, cost)
+        return True
+
+    def queue_builds(self, cmds: Sequence[BuildCmd]) -> list[bool]:
+        """Écrit les commandes dans le stockage, en une écriture, puis met à jour les copies.
+
+        Args:
+            cmds: Commandes de construction
+
+        Returns:
+            Acceptation de chaque commande par le stockage, alignée sur ``cmds``
+        """
+        with self._locks.hold(cmd.villageId for cmd in cmds):
+            accepted = self.store.queue_builds(cmds)
+            for cmd, ok in zip(cmds, accepted, strict=True):
+                cost = build_cost(self.catalog, cmd)
+                if ok and cost is not None:
+                    self._cache_build(cmd, cost)
+        return accepted
+
+    def _cache_build(self, cmd: BuildCmd, cost: ResourceDelta) -> None:
+        """Reporte une construction acceptée par le stockage sur la copie en mémoire."""
+        village = self._lookup(cmd.villageId)
+        if village is None:
+            return
+        # Copie: un Village déjà retourné aux lecteurs n'est jamais modifié
+        updated = with_build(village, cmd, cost)
+        if updated is not None:
+            self._admit(updated)
+        else:
+            # Copie désynchronisée du stockage: rechargée au prochain accès
+            with self._cache_lock:
+                self._cache.pop(cmd.villageId, None)
+
+    def adjust_resources(self, deltas: Mapping[int, ResourceDelta]) -> int:
+        """Écrit les variations dans le stockage puis les reporte sur les copies en mémoire.
+
+        Les verrous des villages concernés (au plus une strie chacun) sont pris
+        dans l'ordre des stries, pour qu'aucun chargement ne croise l'écriture.
+
+        Args:
+            deltas: Variations par ID de village (les stocks sont bornés à 0)
+
+        Returns:
+            Nombre de villages modifiés dans le stockage
+        """
+        with self._locks.hold(deltas):
+            changed = self.store.adjust_resources(deltas)
+            with self._cache_lock:
+                for vid, delta in deltas.items():
+                    village = self._cache.get(vid)
+                    if village is not None:
+                        # Même bornage que le stockage: la copie reste identique
+                        self._cache[vid] = with_resource_delta(village, delta)
+        return changed
+
+    def transfer_resources(self, transfers: Sequence[Transfer]) -> list[ResourceDelta]:
+        """Écrit les transferts dans le stockage puis les reporte sur les copies en mémoire.
+
+        Les quantités retournées par le stockage sont celles réellement
+        déplacées: leur variation nette ne borne aucun stock, les copies
+        restent identiques au stockage.
+
+        Args:
+            transfers: Transferts (source, cible, quantités)
+
+        Returns:
+            Quantités transférées, alignées sur ``transfers``
+        """
+        with self._locks.hold(transfer_ids(transfers)):
+            moved = self.store.transfer_resources(transfers)
+            with self._cache_lock:
+                for vid, delta in transfer_deltas(transfers, moved).items():
+                    village = self._cache.get(vid)
+                    if village is not None:
+                        self._cache[vid] = with_resource_delta(village, delta)
+        return moved
+
+    def villages_within(self, x: int, y: int, r: float) -> list[Village]:
+        """Requête de carte déléguée au stockage (son index spatial couvre tout le monde)."""
+        return self.store.villages_within(x, y, r)
+
+    def nearest_villages(self, x: int, y: int, n: int) -> list[Village]:
+        """Requête de carte déléguée au stockage."""
+        return self.store.nearest_villages(x, y, n)
+
+    def leaderboard(self, metric: str, limit: int, offset: int) -> list[RankEntry]:
+        """Classement délégué au stockage (il couvre aussi les villages froids)."""
+        return self.store.leaderboard(metric, limit, offset)
+
+    def village_rank(self, vid: int, metric: str) -> RankEntry | None:
+        """Rang délégué au stockage."""
+        return self.store.village_rank(vid, metric)
+
+    def stats(self) -> EngineStats:
+        """Statistiques du stockage, complétées de celles du cache.
+
+        L'empreinte mémoire est celle des villages résidents, queues non
+        comprises (elles ne sont pas comptées dans le cache).
+        """
+        stats = self.store.stats()
+        return stats.model_copy(
+            update={
+                "engine": f"{type(self).__name__}({stats.engine})",
+                "memory_bytes": world_footprint(self.resident, 0),
+                "cache": CacheStats(
+                    resident=self.resident,
+                    capacity=self.capacity,
+                    hits=self.hits,
+                    misses=self.misses,
+                    evictions=self.evictions,
+                ),
+            }
+        )
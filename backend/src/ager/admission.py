@@ -0,0 +1,194 @@
+"""Contrôle d'admission des commandes de construction.
+
+Avant d'entrer dans le pipeline, une commande doit passer trois filtres:
+
+- une limite globale de requêtes ``/cmd/build`` traitées simultanément
+  (503 au-delà: le serveur est saturé, pas l'appelant);
+- un seau à jetons par client (adresse IP de la connexion);
+- un seau à jetons par village, pour qu'aucun village ne voie sa queue
+  grossir sans limite, quel que soit le nombre de clients (429 pour les deux).
+
+Un seau ne stocke que deux nombres (jetons restants, date de mise à jour).
+Un seau resté inactif le temps de se remplir est identique à un seau neuf:
+il est oublié, les seaux étant rangés du moins au plus récemment utilisé.
+La mémoire suit donc le nombre de clés actives, pas le nombre de clés vues.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+from .metrics import ADMISSION_REJECTIONS, BUILDS_IN_FLIGHT
+from .settings import get_client_rate, get_max_inflight_builds, get_village_rate
+
+
+class AdmissionError(Exception):
+    """Commande refusée avant d'entrer dans le pipeline.
+
+    Attributes:
+        reason: ``client``, ``village`` ou ``concurrency``
+        status_code: 429 (débit d'un client ou d'un village) ou 503 (saturation)
+        retry_after: Secondes à attendre avant de réessayer (au moins 1)
+    """
+
+    def __init__(self, reason: str, status_code: int, retry_after: int) -> None:
+        super().__init__(f"Build command refused ({reason})")
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class TokenBucketLimiter:
+    """Seaux à jetons indexés par clé, oubliés une fois pleins."""
+
+    def __init__(
+        self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """Crée un limiteur.
+
+        Args:
+            rate: Jetons rendus par seconde (0 ou moins: pas de limite)
+            burst: Capacité d'un seau (requêtes acceptées d'affilée)
+            clock: Horloge monotone, en secondes
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._clock = clock
+        # Clé -> [jetons, date]; ordre d'utilisation (le plus ancien en tête)
+        self._buckets: OrderedDict[Hashable, list[float]] = OrderedDict()
+        # Durée au bout de laquelle un seau vide est de nouveau plein
+        self._refill = self.burst / rate if rate > 0 else 0.0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: Hashable) -> float:
+        """Prend un jeton dans le seau de ``key``.
+
+        Returns:
+            0.0 si un jeton a été pris, sinon le délai (en secondes) avant
+            qu'un jeton soit disponible
+        """
+        if self.rate <= 0:
+            return 0.0
+        now = self._clock()
+        buckets = self._buckets
+        self._evict_idle(now)
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [self.burst - 1.0, now]
+            return 0.0
+        buckets.move_to_end(key)
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            return 0.0
+        bucket[0] = tokens
+        return (1.0 - tokens) / self.rate
+
+    def refund(self, key: Hashable) -> None:
+        """Rend le jeton pris par un ``acquire`` dont la requête a été refusée ailleurs."""
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket[0] = min(self.burst, bucket[0] + 1.0)
+
+    def _evict_idle(self, now: float) -> None:
+        """Oublie les seaux redevenus pleins (inactifs depuis au moins ``_refill``)."""
+        buckets = self._buckets
+        while buckets:
+            oldest = next(iter(buckets.values()))
+            if now - oldest[1] < self._refill:
+                break
+            buckets.popitem(last=False)
+
+
+class AdmissionController:
+    """Limites par client, par village et de concurrence devant ``/cmd/build``.
+
+    Utilisé depuis la boucle d'événements uniquement (aucun verrou): chaque
+    vérification est une poignée d'opérations sur des dictionnaires.
+    """
+
+    def __init__(
+        self,
+        client_limiter: TokenBucketLimiter,
+        village_limiter: TokenBucketLimiter,
+        max_in_flight: int = 0,
+    ) -> None:
+        """Crée un contrôleur.
+
+        Args:
+            client_limiter: Seaux par client
+            village_limiter: Seaux par village
+            max_in_flight: Requêtes admises simultanément (0: pas de limite)
+        """
+        self.clients = client_limiter
+        self.villages = village_limiter
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+
+    def admit(self, client: str, village: Hashable) -> None:
+        """Réserve une place pour le traitement d'une commande.
+
+        Chaque admission réussie doit être suivie d'un ``release()`` (appel
+        direct plutôt que gestionnaire de contexte: un générateur coûterait
+        plus que les vérifications elles-mêmes).
+
+        Args:
+            client: Identifiant du client (adresse de la connexion)
+            village: Village visé par la commande (avec son monde si plusieurs
+                mondes sont hébergés)
+
+        Raises:
+            AdmissionError: Si l'une des limites est atteinte
+        """
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            ADMISSION_REJECTIONS.inc(("concurrency",))
+            raise AdmissionError("concurrency", 503, 1)
+        wait = self.clients.acquire(client)
+        if wait:
+            ADMISSION_REJECTIONS.inc(("client",))
+            raise AdmissionError("client", 429, _seconds(wait))
+        wait = self.villages.acquire(village)
+        if wait:
+            # Le client n'est pas débité d'une commande refusée pour son village
+            self.clients.refund(client)
+            ADMISSION_REJECTIONS.inc(("village",))
+            raise AdmissionError("village", 429, _seconds(wait))
+        self.in_flight += 1
+        BUILDS_IN_FLIGHT.set(self.in_flight)
+
+    def release(self) -> None:
+        """Libère la place réservée par ``admit``."""
+        self.in_flight -= 1
+        BUILDS_IN_FLIGHT.set(self.in_flight)
+
+
+def _seconds(wait: float) -> int:
+    """Délai pour l'en-tête Retry-After (secondes entières, au moins 1)."""
+    return max(1, math.ceil(wait))
+
+
+_admission: AdmissionController | None = None
+
+
+def get_admission() -> AdmissionController:
+    """Retourne le contrôleur d'admission (créé au premier appel depuis les settings)."""
+    global _admission
+    if _admission is None:
+        _admission = AdmissionController(
+            TokenBucketLimiter(*get_client_rate()),
+            TokenBucketLimiter(*get_village_rate()),
+            get_max_inflight_builds(),
+        )
+    return _admission
+
+
+def reset_admission() -> None:
+    """Oublie le contrôleur courant (relu depuis les settings au prochain appel)."""
+    global _admission
+    _admission = None
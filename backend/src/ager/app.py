@@ -1,12 +1,62 @@
+import asyncio
+import hmac
 import sys
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Annotated, Any
 
-from fastapi import FastAPI, HTTPException
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
+from pydantic import TypeAdapter
 
 from . import __version__
-from .container import get_engine
-from .models import BuildCmd, Village
+from .admission import AdmissionError, get_admission
+from .commands import PipelineFullError, get_pipeline, shutdown_pipeline
+from .container import close_engine, flush_engine, get_engine
+from .db.tracing import SQLTimingMiddleware
+from .metrics import REGISTRY, MetricsMiddleware
+from .models import VILLAGE_FIELDS, BuildCmd, EngineStats, LeaderboardMetric, RankEntry, Village
+from .ports import SimulationEngine
+from .settings import (
+    get_debug_token,
+    get_metrics_enabled,
+    get_profile_dir,
+    get_profiling_enabled,
+    get_profiling_token,
+    get_sql_tracing_enabled,
+    get_world_idle_seconds,
+)
+from .worlds import UnknownWorldError, close_worlds, evict_idle_worlds, get_worlds, world_dir
 
-app = FastAPI(title="Imperium Backend", version=__version__)
+
+async def _sweep_idle_worlds(interval: float) -> None:
+    """Décharge périodiquement les mondes hébergés restés inactifs."""
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(evict_idle_worlds)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    sweeper = asyncio.create_task(_sweep_idle_worlds(max(1.0, get_world_idle_seconds() / 2)))
+    yield
+    sweeper.cancel()
+    # Appliquer les commandes encore en file avant l'arrêt
+    await shutdown_pipeline()
+    # Puis persister les écritures différées (moteur "hybrid"), fermer le moteur
+    # (segment du moteur "shared") et décharger les mondes
+    await asyncio.to_thread(flush_engine)
+    await asyncio.to_thread(close_engine)
+    await asyncio.to_thread(close_worlds)
+
+
+app = FastAPI(title="Imperium Backend", version=__version__, lifespan=lifespan)
+
+if get_metrics_enabled():
+    app.add_middleware(MetricsMiddleware)
+if get_sql_tracing_enabled():
+    app.add_middleware(SQLTimingMiddleware)
 
 
 @app.get("/health")
@@ -19,23 +69,247 @@ def health() -> dict[str, str]:
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> str:
+    """Métriques au format texte Prometheus."""
+    return REGISTRY.render()
+
+
 # --- routes façade (via port/engine) ---
-@app.get("/snapshot")
-def snapshot() -> dict[str, list[Village]]:
-    return {"villages": get_engine().snapshot()}
+# Montées à la racine (moteur par défaut) et sous /worlds/{world_id} (mondes hébergés)
+router = APIRouter()
+
+_VILLAGE_LIST = TypeAdapter(list[Village])
+
+
+async def world_id(request: Request) -> str | None:
+    """Monde visé par la requête (None hors de ``/worlds/{world_id}``).
+
+    Raises:
+        HTTPException: 404 si le monde n'est pas provisionné
+    """
+    world = request.path_params.get("world_id")
+    if world is not None:
+        try:
+            world_dir(world)
+        except UnknownWorldError:
+            raise HTTPException(status_code=404, detail="World not found") from None
+    return world
+
+
+WorldId = Annotated[str | None, Depends(world_id)]
 
 
-@app.get("/village/{vid}")
-def get_village(vid: int) -> Village:
-    v = get_engine().get_village(vid)
+@contextmanager
+def world_engine(world: str | None) -> Iterator[SimulationEngine]:
+    """Moteur du monde (bail le temps de la requête) ou moteur par défaut."""
+    if world is None:
+        yield get_engine()
+    else:
+        with get_worlds().lease(world) as engine:
+            yield engine
+
+
+def village_fields(fields: str | None = None) -> frozenset[str] | None:
+    """Projection demandée par ``fields=name,resources`` (l'id est toujours inclus).
+
+    Raises:
+        HTTPException: 422 si un champ n'existe pas sur Village
+    """
+    if fields is None:
+        return None
+    requested = frozenset(f.strip() for f in fields.split(",") if f.strip()) | {"id"}
+    unknown = requested - VILLAGE_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=422, detail=f"Unknown village fields: {', '.join(sorted(unknown))}"
+        )
+    return requested
+
+
+Fields = Annotated[frozenset[str] | None, Depends(village_fields)]
+
+
+@router.get("/snapshot", response_model=dict[str, list[Village]])
+def snapshot(world: WorldId, fields: Fields) -> Any:
+    with world_engine(world) as engine:
+        villages = engine.snapshot(fields)
+    if fields is None:
+        return {"villages": villages}
+    # Sérialisation directe des seuls champs demandés (sans revalidation)
+    body = _VILLAGE_LIST.dump_json(villages, include={"__all__": set(fields)})
+    return Response(b'{"villages":' + body + b"}", media_type="application/json")
+
+
+@router.get("/village/{vid}", response_model=Village)
+def get_village(world: WorldId, vid: int, fields: Fields) -> Any:
+    with world_engine(world) as engine:
+        v = engine.get_village(vid, fields)
     if not v:
         raise HTTPException(status_code=404, detail="Village not found")
-    return v
+    if fields is None:
+        return v
+    return Response(v.model_dump_json(include=set(fields)), media_type="application/json")
+
+
+# Rayon et nombre de résultats bornés: le coût d'une requête de carte suit sa réponse
+MAX_MAP_RADIUS = 100
+MAX_NEAREST = 100
+
+
+@router.get("/map")
+def map_view(
+    world: WorldId, x: int, y: int, r: Annotated[float, Query(gt=0, le=MAX_MAP_RADIUS)]
+) -> dict[str, list[Village]]:
+    """Villages à distance au plus ``r`` de (x, y), du plus proche au plus lointain."""
+    with world_engine(world) as engine:
+        return {"villages": engine.villages_within(x, y, r)}
+
+
+@router.get("/map/nearest")
+def map_nearest(
+    world: WorldId, x: int, y: int, n: Annotated[int, Query(ge=1, le=MAX_NEAREST)] = 10
+) -> dict[str, list[Village]]:
+    """Les ``n`` villages les plus proches de (x, y), du plus proche au plus lointain."""
+    with world_engine(world) as engine:
+        return {"villages": engine.nearest_villages(x, y, n)}
+
+
+# Tranche de classement bornée, comme les requêtes de carte
+MAX_LEADERBOARD_LIMIT = 100
+# Profondeur de pagination bornée: le moteur SQL lit ``offset`` entrées d'index
+# avant la tranche (coût linéaire en ``offset``)
+MAX_LEADERBOARD_OFFSET = 10_000
+
+
+@router.get("/leaderboard")
+def leaderboard(
+    world: WorldId,
+    metric: LeaderboardMetric = "total",
+    limit: Annotated[int, Query(ge=1, le=MAX_LEADERBOARD_LIMIT)] = 10,
+    offset: Annotated[int, Query(ge=0, le=MAX_LEADERBOARD_OFFSET)] = 0,
+) -> dict[str, Any]:
+    """Classement des villages par ressources (``total`` ou une ressource).
+
+    Les moteurs en mémoire lisent la tranche en O(log n + limit); le moteur
+    SQL parcourt l'index jusqu'à ``offset + limit``, d'où la borne sur
+    ``offset`` (au-delà, passer par ``/leaderboard/village/{vid}``).
+    """
+    with world_engine(world) as engine:
+        return {"metric": metric, "entries": engine.leaderboard(metric, limit, offset)}
+
+
+@router.get("/leaderboard/village/{vid}")
+def leaderboard_rank(world: WorldId, vid: int, metric: LeaderboardMetric = "total") -> RankEntry:
+    """Rang et score d'un village dans un classement.
+
+    Avec le moteur SQL, le rang est un décompte de la plage d'index située
+    devant le village: son coût croît avec le rang (O(rang)).
+    """
+    with world_engine(world) as engine:
+        entry = engine.village_rank(vid, metric)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Village not found")
+    return entry
+
+
+def debug_access(x_ager_debug_token: Annotated[str | None, Header()] = None) -> None:
+    """Exige ``X-Ager-Debug-Token``; sans ``AGER_DEBUG_TOKEN``, la route n'existe pas.
+
+    Raises:
+        HTTPException: 404 si aucun jeton n'est configuré, 403 si le jeton est
+            absent ou différent
+    """
+    token = get_debug_token()
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not (
+        x_ager_debug_token is not None
+        and hmac.compare_digest(x_ager_debug_token.encode(), token.encode())
+    ):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+
 
+@router.get("/debug/engine", dependencies=[Depends(debug_access)])
+def debug_engine(world: WorldId) -> EngineStats:
+    """Statistiques du moteur (du monde visé): taille du monde, empreinte mémoire,
+    stockage, dernière persistance, cache et pages SQLite selon le moteur.
 
-@app.post("/cmd/build")
-def cmd_build(cmd: BuildCmd) -> dict[str, bool]:
-    ok = get_engine().queue_build(cmd)
-    if not ok:
+    Tirées de compteurs tenus à jour par le moteur: la route peut être relevée
+    toutes les quelques secondes.
+    """
+    with world_engine(world) as engine:
+        return engine.stats()
+
+
+@router.post("/cmd/build")
+async def cmd_build(
+    world: WorldId, cmd: BuildCmd, request: Request, response: Response, wait: bool = True
+) -> dict[str, Any]:
+    """Dépose une commande dans le pipeline (du monde visé).
+
+    Avec ``wait=true`` (défaut), répond une fois la commande appliquée; avec
+    ``wait=false``, répond 202 avec l'identifiant à suivre sur ``/cmd/{id}``.
+    Le contrôle d'admission répond 429 (débit du client ou du village
+    dépassé) ou 503 (trop de requêtes simultanées), avec ``Retry-After``.
+    """
+    admission = get_admission()
+    client = request.client.host if request.client else "unknown"
+    try:
+        admission.admit(client, (world, cmd.villageId) if world else cmd.villageId)
+    except AdmissionError as exc:
+        raise HTTPException(
+            status_code=exc.status_code,
+            detail=f"Too many build commands ({exc.reason})",
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
+    try:
+        return await _submit_build(world, cmd, response, wait)
+    finally:
+        admission.release()
+
+
+async def _submit_build(
+    world: str | None, cmd: BuildCmd, response: Response, wait: bool
+) -> dict[str, Any]:
+    try:
+        record = get_pipeline(world).submit(cmd)
+    except PipelineFullError as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="Command queue is full",
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
+
+    if not wait:
+        response.status_code = 202
+        prefix = f"/worlds/{world}" if world else ""
+        response.headers["Location"] = f"{prefix}/cmd/{record.id}"
+        return {"commandId": record.id, "status": record.status}
+
+    status = await asyncio.shield(record.done)
+    if status == "rejected":
         raise HTTPException(status_code=422, detail="Invalid build command")
-    return {"accepted": True}
+    if status == "failed":
+        raise HTTPException(status_code=500, detail="Build command failed")
+    return {"accepted": True, "commandId": record.id}
+
+
+@router.get("/cmd/{command_id}")
+async def get_command(world: WorldId, command_id: str) -> dict[str, Any]:
+    """Statut d'une commande récente (pending, accepted, rejected, failed)."""
+    record = get_pipeline(world).get(command_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Command not found")
+    return {"commandId": record.id, "status": record.status, "error": record.error}
+
+
+app.include_router(router)
+app.include_router(router, prefix="/worlds/{world_id}")
+
+
+# Profilage à la demande: désactivé par défaut, rien n'est importé ni installé
+if get_profiling_enabled():
+    from .profiling import install_profiling
+
+    install_profiling(app, get_profiling_token(), Path(get_profile_dir()))
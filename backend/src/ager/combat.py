@@ -0,0 +1,316 @@
+"""Résolution des combats par lots, un lot par tick.
+
+Les combats sont planifiés pour un tick (``CombatQueue``). À chaque tick, tous
+les combats dus sont résolus ensemble: les armées forment deux matrices
+(combats x types d'unités) et pertes et pillage sont calculés colonne par
+colonne, avec NumPy s'il est installé (extra ``combat``), sinon en Python
+pur, avec des résultats identiques. Le pillage est appliqué aux villages par
+un seul appel ``transfer_resources`` du moteur: chaque butin est borné au
+stock du défenseur au moment de l'écriture, et l'attaquant reçoit exactement
+ce qui a été prélevé.
+
+Règles (calcul entier ou flottant déterministe, identique dans les deux
+implémentations):
+
+- puissance d'attaque ``A = somme(attaque x effectif)``, puissance de défense
+  ``D = somme(défense x effectif) + BASE_DEFENSE``;
+- si ``A > D`` l'attaquant gagne: il perd la fraction ``(D/A)**1.5`` de chaque
+  unité, le défenseur perd tout; sinon l'inverse (``(A/D)**1.5`` pour le
+  défenseur, tout pour l'attaquant). Les pertes sont arrondies à l'unité;
+- un attaquant victorieux emporte au plus la capacité de ses survivants. Les
+  attaquants d'un même village dans le tick se partagent son stock au prorata
+  de leur capacité, chaque ressource au prorata du stock:
+  ``butin = stock x capacité // max(stock total, capacité totale du tick)``.
+
+Les villages ne stockent pas encore de troupes: chaque ``Battle`` porte les
+effectifs des deux camps.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+from collections.abc import Mapping, Sequence
+from functools import cache
+from typing import Any, NamedTuple
+
+from .models import ResourceDelta, Resources, Transfer
+from .ports import SimulationEngine
+
+
+class UnitType(NamedTuple):
+    """Caractéristiques d'un type d'unité."""
+
+    name: str
+    attack: int
+    defense: int
+    carry: int
+
+
+# Ordre des colonnes des matrices d'effectifs
+UNITS: tuple[UnitType, ...] = (
+    UnitType("legionnaire", 40, 35, 50),
+    UnitType("praetorian", 30, 65, 20),
+    UnitType("imperian", 70, 40, 50),
+    UnitType("equites_imperatoris", 120, 65, 100),
+)
+
+# Défense d'un village sans troupes (une attaque vide n'est jamais victorieuse)
+BASE_DEFENSE = 10
+
+# Effectifs par type d'unité, dans l'ordre de UNITS
+Army = tuple[int, ...]
+
+
+class Battle(NamedTuple):
+    """Combat entre une armée attaquante et la garnison d'un village."""
+
+    attacker: int
+    defender: int
+    attack: Army
+    defense: Army
+
+
+class BattleResults(NamedTuple):
+    """Résultats d'un lot, en colonnes alignées sur les combats du lot.
+
+    ``deltas`` cumule le butin par village (gagné par l'attaquant, perdu par
+    le défenseur): c'est l'écriture groupée à appliquer au moteur.
+    """
+
+    attacker_won: list[bool]
+    attack_survivors: list[list[int]]
+    defense_survivors: list[list[int]]
+    loot: list[list[int]]
+    deltas: dict[int, ResourceDelta]
+
+
+_NO_RESULTS = BattleResults([], [], [], [], {})
+
+
+@cache
+def _numpy() -> Any | None:
+    """Module NumPy, ou None s'il n'est pas installé (import au premier lot)."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def resolve_battles(
+    battles: Sequence[Battle],
+    stocks: Mapping[int, Resources],
+    vectorized: bool | None = None,
+) -> BattleResults:
+    """Résout un lot de combats.
+
+    Args:
+        battles: Combats du lot
+        stocks: Ressources des villages défenseurs (un défenseur absent n'a rien
+            à piller)
+        vectorized: Forcer (True) ou exclure (False) NumPy; None: NumPy s'il est
+            installé
+
+    Returns:
+        Résultats alignés sur ``battles``
+
+    Raises:
+        ValueError: Si une armée n'a pas un effectif par type d'unité
+        ModuleNotFoundError: Si ``vectorized=True`` sans NumPy installé
+    """
+    width = len(UNITS)
+    for battle in battles:
+        if len(battle.attack) != width or len(battle.defense) != width:
+            raise ValueError(f"Une armée compte {width} effectifs (un par type d'unité)")
+    np = _numpy() if vectorized is not False else None
+    if vectorized and np is None:
+        raise ModuleNotFoundError("NumPy est requis pour la résolution vectorisée")
+    if not battles:
+        return _NO_RESULTS
+    if np is not None:
+        return _resolve_numpy(np, battles, stocks)
+    return _resolve_python(battles, stocks)
+
+
+def _stock_row(stocks: Mapping[int, Resources], vid: int) -> tuple[int, int, int, int]:
+    r = stocks.get(vid)
+    return (r.wood, r.clay, r.iron, r.crop) if r is not None else (0, 0, 0, 0)
+
+
+def _resolve_numpy(
+    np: Any, battles: Sequence[Battle], stocks: Mapping[int, Resources]
+) -> BattleResults:
+    attack_stat = np.array([u.attack for u in UNITS], dtype=np.int64)
+    defense_stat = np.array([u.defense for u in UNITS], dtype=np.int64)
+    carry_stat = np.array([u.carry for u in UNITS], dtype=np.int64)
+
+    n, width = len(battles), len(UNITS)
+    chain = itertools.chain.from_iterable
+    attack = np.fromiter(chain(b.attack for b in battles), np.int64, n * width)
+    attack = attack.reshape(n, width)
+    defense = np.fromiter(chain(b.defense for b in battles), np.int64, n * width)
+    defense = defense.reshape(n, width)
+    power_a = (attack @ attack_stat).astype(np.float64)
+    power_d = (defense @ defense_stat + BASE_DEFENSE).astype(np.float64)
+
+    won = power_a > power_d
+    ratio = np.where(won, power_d / np.where(won, power_a, 1.0), power_a / power_d)
+    # x**1.5 écrit x*sqrt(x): racine et produit sont exactement arrondis (IEEE 754),
+    # le résultat est donc le même en NumPy et en Python
+    ratio = ratio * np.sqrt(ratio)
+    attack_left = attack - np.rint(attack * np.where(won, ratio, 1.0)[:, None]).astype(np.int64)
+    defense_left = defense - np.rint(defense * np.where(won, 1.0, ratio)[:, None]).astype(np.int64)
+
+    # Pillage: capacité des survivants, stock partagé entre attaquants d'un même village
+    capacity = np.where(won, attack_left @ carry_stat, 0)
+    defender_ids = np.fromiter((b.defender for b in battles), np.int64, n)
+    defenders, slot = np.unique(defender_ids, return_inverse=True)
+    stock = np.array([_stock_row(stocks, int(vid)) for vid in defenders], dtype=np.int64)
+    demand = np.zeros(len(defenders), dtype=np.int64)
+    np.add.at(demand, slot, capacity)
+    share = np.maximum(stock.sum(axis=1), demand)
+    loot = stock[slot] * capacity[:, None] // np.maximum(share[slot], 1)[:, None]
+
+    # Écriture groupée: butin cumulé par village, combats sans butin exclus
+    looted = loot.any(axis=1)
+    attacker_ids = np.fromiter((b.attacker for b in battles), np.int64, n)
+    ids = np.concatenate((attacker_ids[looted], defender_ids[looted]))
+    villages, where = np.unique(ids, return_inverse=True)
+    totals = np.zeros((len(villages), 4), dtype=np.int64)
+    np.add.at(totals, where, np.concatenate((loot[looted], -loot[looted])))
+    deltas = dict(zip(villages.tolist(), map(tuple, totals.tolist()), strict=True))
+
+    return BattleResults(
+        won.tolist(), attack_left.tolist(), defense_left.tolist(), loot.tolist(), deltas
+    )
+
+
+def _resolve_python(battles: Sequence[Battle], stocks: Mapping[int, Resources]) -> BattleResults:
+    won_col: list[bool] = []
+    attack_col: list[list[int]] = []
+    defense_col: list[list[int]] = []
+    capacities: list[int] = []
+    demand: dict[int, int] = {}
+    for b in battles:
+        power_a = float(sum(u.attack * n for u, n in zip(UNITS, b.attack, strict=True)))
+        power_d = float(
+            sum(u.defense * n for u, n in zip(UNITS, b.defense, strict=True)) + BASE_DEFENSE
+        )
+        won = power_a > power_d
+        ratio = power_d / power_a if won else power_a / power_d
+        ratio *= math.sqrt(ratio)
+        attack_loss, defense_loss = (ratio, 1.0) if won else (1.0, ratio)
+        attack_left = [n - round(n * attack_loss) for n in b.attack]
+        defense_left = [n - round(n * defense_loss) for n in b.defense]
+        capacity = sum(u.carry * n for u, n in zip(UNITS, attack_left, strict=True)) if won else 0
+        won_col.append(won)
+        attack_col.append(attack_left)
+        defense_col.append(defense_left)
+        capacities.append(capacity)
+        demand[b.defender] = demand.get(b.defender, 0) + capacity
+
+    loot_col: list[list[int]] = []
+    totals: dict[int, list[int]] = {}
+    for b, capacity in zip(battles, capacities, strict=True):
+        stock = _stock_row(stocks, b.defender)
+        share = max(sum(stock), demand[b.defender], 1)
+        loot = [s * capacity // share for s in stock]
+        loot_col.append(loot)
+        if any(loot):
+            gained = totals.setdefault(b.attacker, [0, 0, 0, 0])
+            lost = totals.setdefault(b.defender, [0, 0, 0, 0])
+            for i, amount in enumerate(loot):
+                gained[i] += amount
+                lost[i] -= amount
+    deltas = {vid: (d[0], d[1], d[2], d[3]) for vid, d in sorted(totals.items())}
+    return BattleResults(won_col, attack_col, defense_col, loot_col, deltas)
+
+
+class CombatQueue:
+    """Combats planifiés, rendus par tick d'échéance (ordre de planification à égalité)."""
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[int, int, Battle]] = []
+        self._order = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, battle: Battle, tick: int) -> None:
+        """Planifie un combat pour le tick ``tick``."""
+        heapq.heappush(self._heap, (tick, next(self._order), battle))
+
+    def pop_due(self, tick: int) -> list[Battle]:
+        """Retire et retourne les combats dus au plus tard au tick ``tick``."""
+        due = []
+        while self._heap and self._heap[0][0] <= tick:
+            due.append(heapq.heappop(self._heap)[2])
+        return due
+
+
+def resolve_tick(
+    engine: SimulationEngine,
+    queue: CombatQueue,
+    tick: int,
+    vectorized: bool | None = None,
+) -> tuple[list[Battle], BattleResults]:
+    """Résout les combats dus au tick et applique le pillage au moteur.
+
+    Une lecture groupée (stocks des seuls défenseurs, ``get_villages``) et
+    une écriture groupée (``transfer_resources``) par tick, quel que soit le
+    nombre de combats. Le butin calculé sur les stocks lus est un maximum: si
+    un défenseur a perdu des ressources entre la lecture et l'écriture, le
+    moteur ne transfère que ce qui reste, et les résultats retournés (``loot``
+    et ``deltas``) sont ceux réellement appliqués.
+
+    Args:
+        engine: Moteur du monde
+        queue: Combats planifiés
+        tick: Tick courant
+        vectorized: Voir ``resolve_battles``
+
+    Returns:
+        (combats résolus, résultats alignés)
+    """
+    battles = queue.pop_due(tick)
+    if not battles:
+        return battles, _NO_RESULTS
+    defenders = sorted({b.defender for b in battles})
+    stocks = {v.id: v.resources for v in engine.get_villages(defenders, _STOCK_FIELDS)}
+    results = resolve_battles(battles, stocks, vectorized)
+    looting = [i for i, loot in enumerate(results.loot) if any(loot)]
+    if not looting:
+        return battles, results
+    transfers: list[Transfer] = [
+        (battles[i].defender, battles[i].attacker, _delta(results.loot[i])) for i in looting
+    ]
+    moved = engine.transfer_resources(transfers)
+    loot = [list(row) for row in results.loot]
+    for i, amounts in zip(looting, moved, strict=True):
+        loot[i] = list(amounts)
+    return battles, results._replace(loot=loot, deltas=_loot_deltas(transfers, moved))
+
+
+_STOCK_FIELDS = frozenset({"id", "resources"})
+
+
+def _delta(row: Sequence[int]) -> ResourceDelta:
+    return (row[0], row[1], row[2], row[3])
+
+
+def _loot_deltas(
+    transfers: Sequence[Transfer], moved: Sequence[ResourceDelta]
+) -> dict[int, ResourceDelta]:
+    """Butin appliqué cumulé par village (gagné par l'attaquant, perdu par le défenseur)."""
+    totals: dict[int, list[int]] = {}
+    for (defender, attacker, _), amounts in zip(transfers, moved, strict=True):
+        if not any(amounts):
+            continue
+        gained = totals.setdefault(attacker, [0, 0, 0, 0])
+        lost = totals.setdefault(defender, [0, 0, 0, 0])
+        for i, amount in enumerate(amounts):
+            gained[i] += amount
+            lost[i] -= amount
+    return {vid: _delta(d) for vid, d in sorted(totals.items())}
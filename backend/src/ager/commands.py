@@ -0,0 +1,261 @@
+"""Pipeline de commandes: file bornée et écrivain unique.
+
+Les ``BuildCmd`` validées par l'API sont déposées dans une ``asyncio.Queue``
+bornée. Une tâche écrivain unique la vide par lots et applique chaque lot au
+moteur dans un thread (les moteurs sont synchrones), dans l'ordre d'arrivée et
+en un seul appel (``queue_builds``: un commit ou une sauvegarde par lot).
+
+Quand la file est pleine, ``submit`` lève ``PipelineFullError``: l'API répond
+503 avec ``Retry-After`` au lieu de laisser la latence croître sans limite.
+Chaque commande reçoit un identifiant; son résultat reste consultable tant
+qu'il n'a pas été évincé des ``max_results`` derniers résultats.
+
+La tâche écrivain ne tourne que tant qu'il y a des commandes: elle est
+démarrée par ``submit`` et se termine quand la file est vide.
+
+Chaque monde hébergé (``/worlds/{world_id}/...``) a son propre pipeline, qui
+prend un bail sur le moteur du monde le temps d'appliquer chaque lot. Quand le
+registre décharge un monde, son pipeline est oublié s'il n'a plus de commande
+en file (ses résultats avec lui).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Literal
+
+from .container import get_engine
+from .metrics import COMMAND_BATCH_SIZE, COMMAND_QUEUE_DEPTH, COMMAND_WAIT_DURATION, COMMANDS
+from .models import BuildCmd
+from .ports import SimulationEngine
+from .settings import get_cmd_batch_size, get_cmd_queue_size
+
+CommandStatus = Literal["pending", "accepted", "rejected", "failed"]
+
+DEFAULT_MAX_RESULTS = 10_000
+
+
+class PipelineFullError(Exception):
+    """La file de commandes est pleine (l'appelant doit réessayer plus tard)."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Command queue is full")
+        self.retry_after = retry_after
+
+
+@dataclass
+class CommandRecord:
+    """Suivi d'une commande soumise."""
+
+    id: str
+    cmd: BuildCmd
+    submitted_at: float
+    done: asyncio.Future[CommandStatus] = field(repr=False)
+    status: CommandStatus = "pending"
+    error: str | None = None
+
+
+class CommandPipeline:
+    """File bornée de commandes appliquées par lots par un écrivain unique."""
+
+    def __init__(
+        self,
+        engine_provider: Callable[[], SimulationEngine] = get_engine,
+        maxsize: int = 1024,
+        max_batch: int = 64,
+        max_results: int = DEFAULT_MAX_RESULTS,
+        engine_lease: Callable[[], AbstractContextManager[SimulationEngine]] | None = None,
+    ) -> None:
+        """Crée un pipeline attaché à la boucle d'événements courante.
+
+        Args:
+            engine_provider: Fournit le moteur au moment d'appliquer chaque lot
+            maxsize: Nombre maximal de commandes en attente
+            max_batch: Nombre maximal de commandes par lot
+            max_results: Nombre de résultats conservés pour ``GET /cmd/{id}``
+            engine_lease: Remplace ``engine_provider``: fournit le moteur pour
+                la durée d'un lot (bail d'un monde hébergé)
+        """
+        self.loop = asyncio.get_running_loop()
+        self._engine_provider = engine_provider
+        self._engine_lease = engine_lease
+        self._queue: asyncio.Queue[CommandRecord] = asyncio.Queue(maxsize)
+        self.max_batch = max_batch
+        self._max_results = max_results
+        self._records: OrderedDict[str, CommandRecord] = OrderedDict()
+        self._writer: asyncio.Task[None] | None = None
+        # Durée moyenne (lissée) d'application d'une commande, pour Retry-After
+        self._seconds_per_command = 0.0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def idle(self) -> bool:
+        """Vrai si aucune commande n'est en file ni en cours d'application."""
+        return self._queue.empty() and (self._writer is None or self._writer.done())
+
+    def retry_after(self) -> int:
+        """Estime en secondes le temps nécessaire pour vider la file (au moins 1)."""
+        return max(1, round(self._queue.maxsize * self._seconds_per_command + 0.5))
+
+    def submit(self, cmd: BuildCmd) -> CommandRecord:
+        """Dépose une commande dans la file.
+
+        Args:
+            cmd: Commande validée
+
+        Returns:
+            Suivi de la commande (``done`` est résolu après application)
+
+        Raises:
+            PipelineFullError: Si la file est pleine
+        """
+        record = CommandRecord(
+            id=uuid.uuid4().hex,
+            cmd=cmd,
+            submitted_at=time.perf_counter(),
+            done=self.loop.create_future(),
+        )
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            COMMANDS.inc(("overloaded",))
+            raise PipelineFullError(self.retry_after()) from None
+
+        self._remember(record)
+        COMMAND_QUEUE_DEPTH.set(self.depth)
+        if self._writer is None or self._writer.done():
+            # Contexte vierge: l'écrivain n'appartient pas à la requête qui l'a démarré
+            self._writer = self.loop.create_task(
+                self._drain(), name="ager-command-writer", context=contextvars.Context()
+            )
+        return record
+
+    def get(self, command_id: str) -> CommandRecord | None:
+        """Retourne le suivi d'une commande récente."""
+        return self._records.get(command_id)
+
+    async def join(self) -> None:
+        """Attend que toutes les commandes déposées aient été appliquées."""
+        await self._queue.join()
+
+    def _remember(self, record: CommandRecord) -> None:
+        self._records[record.id] = record
+        while len(self._records) > self._max_results:
+            oldest_id, oldest = next(iter(self._records.items()))
+            if oldest.status == "pending":
+                break  # ne jamais oublier une commande en cours
+            del self._records[oldest_id]
+
+    # --- Écrivain -------------------------------------------------------
+
+    async def _drain(self) -> None:
+        while not self._queue.empty():
+            batch = [self._queue.get_nowait()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            COMMAND_QUEUE_DEPTH.set(self.depth)
+            COMMAND_BATCH_SIZE.observe(len(batch))
+
+            started = time.perf_counter()
+            for record in batch:
+                COMMAND_WAIT_DURATION.observe(started - record.submitted_at)
+            try:
+                outcomes = await asyncio.to_thread(self._apply, batch)
+            except Exception as exc:  # moteur indisponible ou écriture en échec: tout le lot échoue
+                outcomes = [("failed", repr(exc))] * len(batch)
+            elapsed = time.perf_counter() - started
+            self._seconds_per_command = 0.8 * self._seconds_per_command + 0.2 * (
+                elapsed / len(batch)
+            )
+
+            for record, (status, error) in zip(batch, outcomes, strict=True):
+                record.status = status
+                record.error = error
+                COMMANDS.inc((status,))
+                if not record.done.done():
+                    record.done.set_result(status)
+                self._queue.task_done()
+
+    def _apply(self, batch: list[CommandRecord]) -> list[tuple[CommandStatus, str | None]]:
+        """Applique un lot dans l'ordre, en un appel au moteur (hors de la boucle d'événements).
+
+        ``queue_builds`` écrit le lot en une fois (une transaction, une
+        sauvegarde): s'il lève, toutes les commandes du lot échouent.
+        """
+        lease = self._engine_lease() if self._engine_lease else nullcontext(self._engine_provider())
+        with lease as engine:
+            accepted = engine.queue_builds([record.cmd for record in batch])
+        return [("accepted", None) if ok else ("rejected", None) for ok in accepted]
+
+
+_pipeline: CommandPipeline | None = None
+_world_pipelines: dict[str, CommandPipeline] = {}
+
+
+def get_pipeline(world_id: str | None = None) -> CommandPipeline:
+    """Retourne le pipeline de la boucle d'événements courante (créé au besoin).
+
+    Un nouveau pipeline est créé si la boucle a changé (une boucle par test).
+
+    Args:
+        world_id: Monde hébergé, ou None pour le moteur par défaut
+    """
+    global _pipeline
+    loop = asyncio.get_running_loop()
+    if world_id is None:
+        if _pipeline is None or _pipeline.loop is not loop:
+            _pipeline = CommandPipeline(
+                maxsize=get_cmd_queue_size(), max_batch=get_cmd_batch_size()
+            )
+        return _pipeline
+
+    pipeline = _world_pipelines.get(world_id)
+    if pipeline is None or pipeline.loop is not loop:
+        from .worlds import get_worlds
+
+        pipeline = _world_pipelines[world_id] = CommandPipeline(
+            maxsize=get_cmd_queue_size(),
+            max_batch=get_cmd_batch_size(),
+            engine_lease=partial(get_worlds().lease, world_id),
+        )
+    return pipeline
+
+
+def forget_pipeline(world_id: str) -> None:
+    """Oublie le pipeline d'un monde déchargé, s'il est inactif.
+
+    Appelé par le registre des mondes, depuis n'importe quel thread: le
+    pipeline est retiré dans sa boucle d'événements, là où ``submit`` le remplit.
+    """
+    pipeline = _world_pipelines.get(world_id)
+    if pipeline is None:
+        return
+    try:
+        pipeline.loop.call_soon_threadsafe(_drop_idle_pipeline, world_id, pipeline)
+    except RuntimeError:  # boucle fermée: le pipeline ne servira plus
+        if _world_pipelines.get(world_id) is pipeline:
+            del _world_pipelines[world_id]
+
+
+def _drop_idle_pipeline(world_id: str, pipeline: CommandPipeline) -> None:
+    if _world_pipelines.get(world_id) is pipeline and pipeline.idle:
+        del _world_pipelines[world_id]
+
+
+async def shutdown_pipeline() -> None:
+    """Attend l'application des commandes en file (arrêt de l'application)."""
+    loop = asyncio.get_running_loop()
+    for pipeline in (_pipeline, *_world_pipelines.values()):
+        if pipeline is not None and pipeline.loop is loop:
+            await pipeline.join()
@@ -2,38 +2,209 @@
 
 Gère l'instanciation et la fourniture du moteur de simulation
 selon la configuration (variable d'environnement AGER_ENGINE).
+
+Les moteurs sont résolus via un registre de fabriques: un adaptateur n'est
+importé que lorsqu'il est sélectionné, si bien que ``AGER_ENGINE=memory`` ne
+charge jamais SQLModel/SQLAlchemy. Des moteurs tiers peuvent s'enregistrer avec
+``register_engine()`` ou via le groupe d'entry points ``ager.engines``.
 """
 
+from collections.abc import Callable
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from .adapters.file_engine import FileStorageEngine
-from .adapters.memory_engine import MemoryEngine
-from .adapters.sql_engine import SQLiteEngine
+from .metrics import instrument_engine
 from .ports import SimulationEngine
-from .settings import get_db_path, get_engine_type, get_storage_path
+from .settings import (
+    get_checkpoint_every,
+    get_db_path,
+    get_engine_type,
+    get_event_dir,
+    get_event_fsync,
+    get_game_data_cache_dir,
+    get_game_data_dir,
+    get_metrics_enabled,
+    get_shm_flush_seconds,
+    get_shm_queue_slots,
+    get_storage_path,
+    get_tier_capacity,
+    get_tier_store,
+    get_write_behind_max_pending,
+    get_write_behind_ms,
+    world_data_dir,
+)
+
+if TYPE_CHECKING:
+    from .gamedata import Catalog
+
+# Groupe d'entry points des moteurs tiers: nom -> fabrique sans argument
+ENTRY_POINT_GROUP = "ager.engines"
+
+EngineFactory = Callable[[], SimulationEngine]
 
-# Instance singleton du moteur (créée à l'import)
+# Méthodes du port, enveloppées par l'instrumentation
+PORT_METHODS = tuple(name for name in vars(SimulationEngine) if not name.startswith("_"))
+
+# Instance singleton du moteur (créée au premier appel de get_engine())
 _engine: SimulationEngine | None = None
 
+_factories: dict[str, EngineFactory] = {}
+
+
+def register_engine(name: str, factory: EngineFactory) -> None:
+    """Enregistre une fabrique de moteur sous un nom sélectionnable via AGER_ENGINE.
+
+    Args:
+        name: Nom du moteur (insensible à la casse)
+        factory: Fabrique sans argument retournant le moteur; elle doit importer
+            ses dépendances elle-même pour garder l'import du conteneur léger
+    """
+    _factories[name.lower()] = factory
+
+
+def get_catalog() -> "Catalog | None":
+    """Retourne le catalogue des bâtiments configuré, partagé par tous les moteurs.
+
+    Returns:
+        Catalogue compilé (mis en cache par contenu), None si désactivé
+        (``AGER_GAME_DATA_DIR=off``)
+
+    Raises:
+        GameDataError: Si les définitions sont absentes ou invalides
+    """
+    data_dir = get_game_data_dir()
+    if data_dir is None:
+        return None
+    from .gamedata import load_catalog
+
+    return load_catalog(data_dir, get_game_data_cache_dir())
+
+
+def _memory_engine() -> SimulationEngine:
+    from .adapters.memory_engine import MemoryEngine
+
+    return MemoryEngine(get_catalog())
+
+
+def _file_engine() -> SimulationEngine:
+    from .adapters.file_engine import FileStorageEngine
+
+    return FileStorageEngine(get_storage_path(), catalog=get_catalog())
+
+
+def _sql_engine() -> SimulationEngine:
+    from .adapters.sql_engine import SQLiteEngine
+
+    return SQLiteEngine(Path(get_db_path()), catalog=get_catalog())
+
+
+def _hybrid_engine() -> SimulationEngine:
+    from .adapters.hybrid_engine import HybridEngine
+
+    return HybridEngine(
+        Path(get_db_path()),
+        max_lag=get_write_behind_ms() / 1000,
+        max_pending=get_write_behind_max_pending(),
+        catalog=get_catalog(),
+    )
+
+
+def _tiered_engine() -> SimulationEngine:
+    from .adapters.tiered_engine import TieredEngine
+
+    store = get_tier_store()
+    if store == "tiered":
+        raise ValueError("AGER_TIER_STORE ne peut pas désigner le moteur tiered lui-même")
+    return TieredEngine(
+        _resolve_factory(store)(), capacity=get_tier_capacity(), catalog=get_catalog()
+    )
+
+
+def _event_engine() -> SimulationEngine:
+    from .adapters.event_engine import EventSourcedEngine
+
+    return EventSourcedEngine(
+        get_event_dir(),
+        checkpoint_every=get_checkpoint_every(),
+        fsync=get_event_fsync(),
+        catalog=get_catalog(),
+    )
+
+
+def _shared_engine() -> SimulationEngine:
+    from .adapters.shared_engine import SharedMemoryEngine
+
+    return SharedMemoryEngine(
+        get_storage_path(),
+        queue_slots=get_shm_queue_slots(),
+        catalog=get_catalog(),
+        flush_interval=get_shm_flush_seconds(),
+    )
+
+
+register_engine("memory", _memory_engine)
+register_engine("file", _file_engine)
+register_engine("sql", _sql_engine)
+register_engine("hybrid", _hybrid_engine)
+register_engine("tiered", _tiered_engine)
+register_engine("events", _event_engine)
+register_engine("shared", _shared_engine)
+
+
+def _resolve_factory(name: str) -> EngineFactory:
+    """Retourne la fabrique d'un moteur, en consultant les entry points si besoin.
+
+    Les entry points ne sont parcourus que pour un nom inconnu du registre:
+    les moteurs intégrés ne paient jamais le scan des métadonnées de packages.
+    """
+    factory = _factories.get(name)
+    if factory is None:
+        from importlib.metadata import entry_points
+
+        for ep in entry_points(group=ENTRY_POINT_GROUP):
+            if ep.name.lower() == name:
+                factory = ep.load()
+                register_engine(name, factory)
+                break
+    if factory is None:
+        raise ValueError(f"Type de moteur inconnu: {name}")
+    return factory
+
+
+def available_engines() -> list[str]:
+    """Liste les moteurs sélectionnables (intégrés, enregistrés et entry points)."""
+    from importlib.metadata import entry_points
+
+    names = set(_factories)
+    names.update(ep.name.lower() for ep in entry_points(group=ENTRY_POINT_GROUP))
+    return sorted(names)
+
 
 def _create_engine() -> SimulationEngine:
     """Crée une instance du moteur selon la configuration.
 
     Returns:
-        Instance du moteur configuré (Memory, File ou SQL)
+        Instance du moteur configuré (Memory, File, SQL ou moteur enregistré)
+    """
+    engine = _resolve_factory(get_engine_type())()
+    if get_metrics_enabled():
+        engine = instrument_engine(engine, PORT_METHODS)
+    return engine
+
+
+def create_world_engine(world_id: str) -> SimulationEngine:
+    """Crée le moteur d'un monde hébergé (routes ``/worlds/{world_id}/...``).
+
+    Même moteur que ``AGER_ENGINE``, mais ses chemins de stockage sont résolus
+    dans le répertoire du monde (voir ``settings.world_data_dir``).
+
+    Raises:
+        UnknownWorldError: Si le monde n'est pas provisionné
     """
-    engine_type = get_engine_type()
+    from .worlds import world_dir
 
-    if engine_type == "memory":
-        return MemoryEngine()
-    elif engine_type == "file":
-        storage_path = get_storage_path()
-        return FileStorageEngine(storage_path)
-    elif engine_type == "sql":
-        db_path = Path(get_db_path())
-        return SQLiteEngine(db_path)
-    else:
-        raise ValueError(f"Type de moteur inconnu: {engine_type}")
+    with world_data_dir(world_dir(world_id)):
+        return _create_engine()
 
 
 def get_engine() -> SimulationEngine:
@@ -48,6 +219,31 @@ def get_engine() -> SimulationEngine:
     return _engine
 
 
+def flush_engine() -> None:
+    """Persiste les écritures différées du moteur courant, s'il en a.
+
+    Appelé à l'arrêt de l'application; sans effet si aucun moteur n'a été créé
+    ou si le moteur écrit de façon synchrone (pas de méthode ``flush``).
+    """
+    flush = getattr(_engine, "flush", None)
+    if callable(flush):
+        flush()
+
+
+def close_engine() -> None:
+    """Ferme le moteur courant, s'il a une méthode ``close``, et l'oublie.
+
+    Appelé à l'arrêt de l'application après ``flush_engine``: libère les
+    threads, connexions et segments du moteur. Le prochain appel de
+    get_engine() crée un nouveau moteur.
+    """
+    global _engine
+    engine, _engine = _engine, None
+    close = getattr(engine, "close", None)
+    if callable(close):
+        close()
+
+
 def reset_engine() -> None:
     """Réinitialise le moteur (utile pour les tests).
 
@@ -0,0 +1,4 @@
+-- Covering index for per-village build queue reads (get_village, snapshot):
+-- filters on village_id, orders by (queued_at, id), and carries the selected columns
+CREATE INDEX IF NOT EXISTS idx_build_queue_village_queued
+    ON build_queue(village_id, queued_at, id, building, level);
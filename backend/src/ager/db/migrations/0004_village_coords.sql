@@ -0,0 +1,5 @@
+-- Map coordinates of villages, indexed for radius and nearest-neighbour queries
+-- (bounding box on x, then y filtered from the index entries)
+ALTER TABLE village ADD COLUMN x INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE village ADD COLUMN y INTEGER NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS idx_village_xy ON village(x, y);
@@ -0,0 +1,10 @@
+-- Leaderboards: one index per ranking metric, in ranking order (score DESC,
+-- then village id), so top-N reads the first index entries and a village's
+-- rank counts the entries before it without sorting the table.
+-- The total index is on the same expression SQLiteEngine queries with.
+CREATE INDEX IF NOT EXISTS idx_resources_rank_total
+    ON resources((wood + clay + iron + crop) DESC, village_id);
+CREATE INDEX IF NOT EXISTS idx_resources_rank_wood ON resources(wood DESC, village_id);
+CREATE INDEX IF NOT EXISTS idx_resources_rank_clay ON resources(clay DESC, village_id);
+CREATE INDEX IF NOT EXISTS idx_resources_rank_iron ON resources(iron DESC, village_id);
+CREATE INDEX IF NOT EXISTS idx_resources_rank_crop ON resources(crop DESC, village_id);
@@ -2,9 +2,115 @@
 
 from __future__ import annotations
 
+import hashlib
+import os
 import sqlite3
+import threading
+from dataclasses import dataclass
 from pathlib import Path
 
+# Migrations shipped with the package
+MIGRATIONS_DIR = Path(__file__).parent
+
+
+@dataclass(frozen=True)
+class MigrationSet:
+    """Migrations of a directory, read once, with their fingerprint.
+
+    The fingerprint hashes every version together with the hash of its content,
+    so a database recording the same fingerprint is known to be up to date.
+    """
+
+    fingerprint: str
+    migrations: tuple[tuple[str, str], ...]  # (version, sql)
+
+
+# Per-directory cache, keyed by a stat-only signature of the .sql files
+_migration_sets: dict[Path, tuple[tuple[tuple[str, int, int], ...], MigrationSet]] = {}
+
+# Pre-migrated in-memory templates, keyed by fingerprint
+_templates: dict[str, sqlite3.Connection] = {}
+_templates_lock = threading.Lock()
+
+
+def _dir_signature(migrations_dir: Path) -> tuple[tuple[str, int, int], ...]:
+    """Return (name, size, mtime) of each .sql file, without reading them."""
+    with os.scandir(migrations_dir) as entries:
+        return tuple(
+            sorted(
+                (entry.name, stat.st_size, stat.st_mtime_ns)
+                for entry in entries
+                if entry.name.endswith(".sql") and entry.is_file()
+                for stat in (entry.stat(),)
+            )
+        )
+
+
+def load_migrations(migrations_dir: Path) -> MigrationSet:
+    """Read and fingerprint the migrations of a directory (cached per process).
+
+    Files are only read again when one is added, removed or modified.
+
+    Args:
+        migrations_dir: Directory containing .sql migration files
+
+    Returns:
+        The migrations in alphabetical order with their fingerprint
+    """
+    key = migrations_dir.resolve()
+    signature = _dir_signature(key)
+    cached = _migration_sets.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    migrations = []
+    for name, _, _ in signature:
+        version = Path(name).stem
+        sql_content = (key / name).read_text(encoding="utf-8")
+        content_hash = hashlib.sha256(sql_content.encode("utf-8")).hexdigest()
+        digest.update(f"{version}:{content_hash}\n".encode())
+        migrations.append((version, sql_content))
+
+    migration_set = MigrationSet(fingerprint=digest.hexdigest(), migrations=tuple(migrations))
+    _migration_sets[key] = (signature, migration_set)
+    return migration_set
+
+
+def _stored_fingerprint(conn: sqlite3.Connection) -> str | None:
+    try:
+        row = conn.execute("SELECT fingerprint FROM schema_fingerprint").fetchone()
+    except sqlite3.OperationalError:
+        # Database created before fingerprints (or brand new)
+        return None
+    return row[0] if row else None
+
+
+def _migrate(conn: sqlite3.Connection, migration_set: MigrationSet) -> None:
+    """Apply pending migrations on an open connection and record the fingerprint."""
+    conn.execute("CREATE TABLE IF NOT EXISTS schema_migrations (version TEXT PRIMARY KEY)")
+
+    # Get list of already-applied migrations
+    applied = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+    # Apply pending migrations
+    for version, sql_content in migration_set.migrations:
+        if version in applied:
+            continue
+        with conn:
+            conn.executescript(sql_content)
+            conn.execute("INSERT INTO schema_migrations(version) VALUES (?)", (version,))
+
+    with conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS schema_fingerprint "
+            "(id INTEGER PRIMARY KEY CHECK (id = 1), fingerprint TEXT NOT NULL)"
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO schema_fingerprint(id, fingerprint) VALUES (1, ?)",
+            (migration_set.fingerprint,),
+        )
+
 
 def apply_migrations(db_path: Path, migrations_dir: Path) -> None:
     """Apply all pending SQL migrations to the database.
@@ -17,27 +123,44 @@ def apply_migrations(db_path: Path, migrations_dir: Path) -> None:
     - Creates a schema_migrations table to track applied migrations
     - Applies migrations in alphabetical order (0001_*.sql, 0002_*.sql, etc.)
     - Skips already-applied migrations (idempotent)
+    - Records a fingerprint of the migration set: a database with a matching
+      fingerprint is up to date and costs a single query, with no file read
     """
     # Ensure database directory exists
     db_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Connect and create migrations tracking table
+    migration_set = load_migrations(migrations_dir)
     conn = sqlite3.connect(db_path)
-    conn.execute("CREATE TABLE IF NOT EXISTS schema_migrations (version TEXT PRIMARY KEY)")
+    try:
+        if _stored_fingerprint(conn) != migration_set.fingerprint:
+            _migrate(conn, migration_set)
+    finally:
+        conn.close()
 
-    # Get list of already-applied migrations
-    applied = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
 
-    # Apply pending migrations
-    for sql_file in sorted(migrations_dir.glob("*.sql")):
-        version = sql_file.stem
-        if version in applied:
-            continue
+def clone_from_template(db_path: Path, migrations_dir: Path) -> None:
+    """Create a database by copying a pre-migrated template.
 
-        # Read and execute migration
-        sql_content = sql_file.read_text(encoding="utf-8")
-        with conn:
-            conn.executescript(sql_content)
-            conn.execute("INSERT INTO schema_migrations(version) VALUES (?)", (version,))
+    The template is migrated once per process and per fingerprint in an
+    in-memory database, then copied page by page with the sqlite3 backup API
+    instead of executing the DDL and seeds again.
+
+    Args:
+        db_path: Path of the database to create (overwritten if it exists)
+        migrations_dir: Directory containing .sql migration files
+    """
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    migration_set = load_migrations(migrations_dir)
+
+    with _templates_lock:
+        template = _templates.get(migration_set.fingerprint)
+        if template is None:
+            template = sqlite3.connect(":memory:", check_same_thread=False)
+            _migrate(template, migration_set)
+            _templates[migration_set.fingerprint] = template
 
-    conn.close()
+        dest = sqlite3.connect(db_path)
+        try:
+            template.backup(dest)
+        finally:
+            dest.close()
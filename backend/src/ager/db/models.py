@@ -10,6 +10,8 @@ class Village(SQLModel, table=True):
 
     id: int | None = Field(default=None, primary_key=True)
     name: str
+    x: int = 0
+    y: int = 0
 
 
 class Resources(SQLModel, table=True):
@@ -2,14 +2,25 @@
 
 from __future__ import annotations
 
+import sqlite3
 from pathlib import Path
+from typing import Any
 
+from sqlalchemy import event
 from sqlalchemy.engine import Engine
 from sqlmodel import Session, create_engine
 
-from ..settings import get_db_path
+from ..metrics import count_sql_statement
+from ..settings import get_db_path, get_slow_query_ms, get_sql_tracing_enabled
+from .tracing import install_tracing
+from .writer import SQLiteWriter
+
+# Read-only connections kept per database (sized for the API threadpool)
+READ_POOL_SIZE = 8
 
 _engines: dict[str, Engine] = {}
+_read_engines: dict[str, Engine] = {}
+_writers: dict[str, SQLiteWriter] = {}
 
 
 def init_db() -> None:
@@ -20,8 +31,29 @@ def init_db() -> None:
     pass
 
 
+def _instrument(engine: Engine) -> None:
+    # Count statements per thread (attributed to the engine methods)
+    event.listen(engine, "before_cursor_execute", count_sql_statement)
+    # Time statements for Server-Timing and the slow-query log
+    if get_sql_tracing_enabled():
+        install_tracing(engine, get_slow_query_ms())
+
+
+def _set_writer_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+    # WAL + NORMAL: a commit only appends to the WAL, synced at checkpoints
+    dbapi_connection.execute("PRAGMA synchronous = NORMAL")
+
+
+def _set_query_only(dbapi_connection: Any, connection_record: Any) -> None:
+    dbapi_connection.execute("PRAGMA query_only = ON")
+
+
+def _key(db_path: str | Path | None) -> str:
+    return str(Path(get_db_path() if db_path is None else db_path))
+
+
 def get_engine(db_path: str | Path | None = None) -> Engine:
-    """Get or create an engine for the given database path.
+    """Get or create the write engine for the given database path.
 
     Args:
         db_path: Path to the database file. If None, uses default from settings.
@@ -29,19 +61,97 @@ def get_engine(db_path: str | Path | None = None) -> Engine:
     Returns:
         SQLAlchemy Engine instance
     """
-    if db_path is None:
-        db_path = get_db_path()
-
-    db_path_str = str(Path(db_path))
+    db_path_str = _key(db_path)
 
     if db_path_str not in _engines:
-        _engines[db_path_str] = create_engine(f"sqlite:///{db_path_str}", echo=False)
+        engine = create_engine(f"sqlite:///{db_path_str}", echo=False)
+        event.listen(engine, "connect", _set_writer_pragmas)
+        _instrument(engine)
+        _engines[db_path_str] = engine
 
     return _engines[db_path_str]
 
 
+def get_read_engine(db_path: str | Path | None = None) -> Engine:
+    """Get or create the read-only engine (connection pool) for a database.
+
+    Connections are opened with ``PRAGMA query_only``; in WAL mode they read
+    the last committed state without ever waiting on the writer.
+
+    Args:
+        db_path: Path to the database file. If None, uses default from settings.
+
+    Returns:
+        SQLAlchemy Engine instance
+    """
+    db_path_str = _key(db_path)
+
+    if db_path_str not in _read_engines:
+        engine = create_engine(
+            f"sqlite:///{db_path_str}",
+            echo=False,
+            pool_size=READ_POOL_SIZE,
+            max_overflow=READ_POOL_SIZE,
+        )
+        event.listen(engine, "connect", _set_query_only)
+        _instrument(engine)
+        _read_engines[db_path_str] = engine
+
+    return _read_engines[db_path_str]
+
+
+def get_writer(db_path: str | Path | None = None) -> SQLiteWriter:
+    """Get or create the single writer of a database.
+
+    Args:
+        db_path: Path to the database file. If None, uses default from settings.
+
+    Returns:
+        The writer shared by every SQLiteEngine on this database
+    """
+    db_path_str = _key(db_path)
+
+    writer = _writers.get(db_path_str)
+    if writer is None:
+        # setdefault: two threads racing here end up with the same writer
+        writer = _writers.setdefault(db_path_str, SQLiteWriter(get_engine(db_path_str)))
+    return writer
+
+
+def release_database(db_path: str | Path) -> None:
+    """Stop the writer and dispose the connection pools of a database.
+
+    Everything is recreated on demand by the getters above; this only frees
+    the thread and file handles of a database that is no longer in use.
+
+    Args:
+        db_path: Path to the database file
+    """
+    key = _key(db_path)
+    writer = _writers.pop(key, None)
+    if writer is not None:
+        writer.close()
+    for engines in (_engines, _read_engines):
+        engine = engines.pop(key, None)
+        if engine is not None:
+            engine.dispose()
+
+
+def enable_wal(db_path: str | Path) -> None:
+    """Switch a database to WAL journaling (persistent, no-op once enabled).
+
+    Args:
+        db_path: Path to the database file
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+    finally:
+        conn.close()
+
+
 def get_session(db_path: str | Path | None = None) -> Session:
-    """Get a new database session.
+    """Get a new database session on the write engine.
 
     Args:
         db_path: Path to the database file. If None, uses default from settings.
@@ -51,3 +161,15 @@ def get_session(db_path: str | Path | None = None) -> Session:
     """
     engine = get_engine(db_path)
     return Session(engine)
+
+
+def get_read_session(db_path: str | Path | None = None) -> Session:
+    """Get a new session on the read-only connection pool.
+
+    Args:
+        db_path: Path to the database file. If None, uses default from settings.
+
+    Returns:
+        A new SQLModel Session instance
+    """
+    return Session(get_read_engine(db_path))
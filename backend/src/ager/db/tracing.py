@@ -0,0 +1,159 @@
+"""SQL statement tracing: per-request totals and slow-query log.
+
+Two SQLAlchemy cursor events time every statement. The totals are added to the
+``RequestSQLStats`` of the current request, found through a context variable
+(it follows the request into the threadpool where sync endpoints run), and
+``SQLTimingMiddleware`` reports them in a ``Server-Timing`` header when the
+request ran any statement: a count that grows with the number of villages is
+the signature of an N+1 pattern.
+
+Statements slower than the threshold (``AGER_SLOW_QUERY_MS``) are logged on the
+``ager.sql.slow`` logger with their parameters and ``EXPLAIN QUERY PLAN``.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Connection, Engine
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+slow_query_logger = logging.getLogger("ager.sql.slow")
+
+SERVER_TIMING_HEADER = "Server-Timing"
+_SERVER_TIMING = SERVER_TIMING_HEADER.lower().encode()
+
+
+@dataclass
+class RequestSQLStats:
+    """SQL totals of one request."""
+
+    statements: int = 0
+    seconds: float = 0.0
+
+    def server_timing(self) -> str:
+        """Return the ``Server-Timing`` metric for these totals."""
+        return f'sql;dur={self.seconds * 1000:.3f};desc="{self.statements} statements"'
+
+
+_request_stats: ContextVar[RequestSQLStats | None] = ContextVar("ager_sql_stats", default=None)
+
+
+def current_request_stats() -> RequestSQLStats | None:
+    """Return the SQL totals of the request being served, if any."""
+    return _request_stats.get()
+
+
+def _before_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    if context is not None:
+        context._ager_started = time.perf_counter()
+
+
+def _explain(cursor: Any, statement: str, parameters: Any, executemany: bool) -> str:
+    """Return the query plan of a statement, one detail per step."""
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    try:
+        rows = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return "; ".join(str(row[-1]) for row in rows)
+    except sqlite3.Error as exc:
+        return f"<unavailable: {exc}>"
+
+
+def make_after_cursor_execute(slow_query_seconds: float | None) -> Any:
+    """Build the ``after_cursor_execute`` listener.
+
+    Args:
+        slow_query_seconds: Slow-query threshold, None to disable the log
+
+    Returns:
+        Listener adding the statement duration to the current request
+    """
+
+    def after_cursor_execute(
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        started = getattr(context, "_ager_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.seconds += elapsed
+        if slow_query_seconds is not None and elapsed >= slow_query_seconds:
+            slow_query_logger.warning(
+                "slow query (%.1f ms): %s | params=%r | plan=%s",
+                elapsed * 1000,
+                statement,
+                parameters,
+                _explain(cursor, statement, parameters, executemany),
+                extra={"sql_duration_ms": elapsed * 1000, "sql_statement": statement},
+            )
+
+    return after_cursor_execute
+
+
+def install_tracing(engine: Engine, slow_query_ms: float | None) -> None:
+    """Attach the timing listeners to an engine.
+
+    Args:
+        engine: SQLAlchemy engine (one per database path)
+        slow_query_ms: Slow-query threshold in milliseconds, None to disable the log
+    """
+    from sqlalchemy import event
+
+    threshold = None if slow_query_ms is None else slow_query_ms / 1000
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", make_after_cursor_execute(threshold))
+
+
+class SQLTimingMiddleware:
+    """ASGI middleware exposing the request SQL totals in ``Server-Timing``.
+
+    The header is added when the response starts, i.e. after the endpoint has
+    run for regular (non-streaming) responses, and only if the request ran at
+    least one statement: responses of non-SQL engines and of routes that do
+    not touch the database carry no ``sql`` metric.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSQLStats()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and stats.statements:
+                headers = list(message.get("headers", []))
+                headers.append((_SERVER_TIMING, stats.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _request_stats.set(stats)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
@@ -0,0 +1,195 @@
+"""Single writer thread per SQLite database.
+
+SQLite serializes writers on one database-wide lock: concurrent sessions that
+each commit their own transaction spend their time waiting on that lock (and
+retrying on ``database is locked``). ``SQLiteWriter`` funnels every write
+through one dedicated thread that drains a command queue and commits the
+commands found in the queue together, in batches of up to ``max_batch``. Under
+load, one commit (one WAL sync) is paid per batch instead of per command.
+
+Callers still get a synchronous result: ``submit`` returns a future resolved
+once the batch holding the command is committed.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any
+
+from sqlmodel import Session
+
+from ..metrics import add_sql_statements, sql_statement_count
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+DEFAULT_MAX_BATCH = 64
+# The thread exits after this many idle seconds and restarts on the next write
+DEFAULT_IDLE_TIMEOUT = 30.0
+
+WriteFunc = Callable[[Session], Any]
+
+
+class _Command:
+    """A queued write: the function, the caller's context and its future."""
+
+    __slots__ = ("func", "context", "future", "statements")
+
+    def __init__(self, func: WriteFunc) -> None:
+        self.func = func
+        # Run in the caller's context: SQL tracing attributes the statements
+        # to the HTTP request that issued the write
+        self.context = contextvars.copy_context()
+        self.future: Future[Any] = Future()
+        self.statements = 0
+
+
+class SQLiteWriter:
+    """Dedicated writer thread draining a command queue in batched transactions.
+
+    The thread is started lazily on the first write. If a command raises, the
+    batch is rolled back and its commands are replayed one transaction each, so
+    a failing command never takes the others down with it.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    ) -> None:
+        self._engine = engine
+        self.max_batch = max_batch
+        self.idle_timeout = idle_timeout
+        self._queue: queue.SimpleQueue[_Command | None] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self.batches = 0
+        self.commands = 0
+        # Duration of the last successful commit, in seconds
+        self.last_commit_seconds: float | None = None
+
+    def _enqueue(self, func: WriteFunc) -> _Command:
+        command = _Command(func)
+        with self._lock:
+            self._queue.put(command)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="ager-sqlite-writer", daemon=True
+                )
+                self._thread.start()
+        return command
+
+    def submit(self, func: WriteFunc) -> Future[Any]:
+        """Queue a write and return a future resolved after its commit.
+
+        Args:
+            func: Function applying the write on the writer's session (it must
+                not commit; its return value resolves the future)
+
+        Returns:
+            Future of the function's return value
+        """
+        return self._enqueue(func).future
+
+    def execute(self, func: WriteFunc) -> Any:
+        """Queue a write and wait until it is committed.
+
+        The statements it ran are added to the caller thread's SQL count, so
+        engine metrics keep attributing them to the calling method.
+
+        Args:
+            func: Function applying the write (see ``submit``)
+
+        Returns:
+            The function's return value
+        """
+        command = self._enqueue(func)
+        result = command.future.result()
+        add_sql_statements(command.statements)
+        return result
+
+    def close(self) -> None:
+        """Apply the queued writes, then stop the thread (restarted on demand)."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopping = True
+            self._queue.put(None)  # wake the thread up
+        thread.join()
+
+    # --- Writer thread ----------------------------------------------------
+
+    def _next_batch(self) -> list[_Command] | None:
+        """Block for one command, then take those already queued behind it.
+
+        Returns None when the thread must exit: idle for ``idle_timeout`` or
+        asked to stop, with nothing left in the queue.
+        """
+        while True:
+            try:
+                first = self._queue.get(block=not self._stopping, timeout=self.idle_timeout)
+            except queue.Empty:
+                first = None
+            if first is not None:
+                break
+            with self._lock:
+                if self._queue.empty():
+                    self._thread = None
+                    self._stopping = False
+                    return None
+
+        batch = [first]
+        while len(batch) < self.max_batch:
+            try:
+                command = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if command is not None:
+                batch.append(command)
+        return batch
+
+    def _run(self) -> None:
+        while (batch := self._next_batch()) is not None:
+            self._apply(batch)
+
+    def _apply(self, batch: list[_Command]) -> None:
+        results: list[Any] = []
+        try:
+            with Session(self._engine) as session:
+                for command in batch:
+                    results.append(command.context.run(self._call, command, session))
+                started = time.perf_counter()
+                session.commit()
+                committed = time.perf_counter() - started
+        except Exception as exc:
+            if len(batch) > 1:
+                for command in batch:
+                    self._apply([command])
+            else:
+                batch[0].future.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.commands += len(batch)
+        self.last_commit_seconds = committed
+        for command, result in zip(batch, results, strict=True):
+            command.future.set_result(result)
+
+    @staticmethod
+    def _call(command: _Command, session: Session) -> Any:
+        before = sql_statement_count()
+        try:
+            result = command.func(session)
+            # Flush now so the statements run in the command's context
+            session.flush()
+            return result
+        finally:
+            command.statements = sql_statement_count() - before
@@ -0,0 +1,307 @@
+"""Catalogue des données de jeu: bâtiments, coûts et durées de construction.
+
+Les définitions normalisées sont lues dans ``<data>/buildings/*.json`` (un
+fichier par bâtiment, nommé d'après son ``id``), validées, puis compilées en
+tables denses indexées par bâtiment et par niveau: ``Catalog.cost`` et
+``Catalog.build_time`` sont deux accès indexés, sans calcul.
+
+Formules (niveau ``n`` à partir de 1):
+
+- coût de chaque ressource: ``cost x cost_growth**(n-1)``, arrondi au multiple
+  de 5 le plus proche;
+- durée: ``build_time_s x time_growth**(n-1)``, arrondie à la seconde.
+
+La forme compilée est mise en cache sur disque sous l'empreinte SHA-256 du
+contenu des définitions (et de la version du compilateur): un démarrage dont
+les définitions n'ont pas changé lit les tables sans revalider ni recalculer.
+Dans un processus, un catalogue n'est relu que si un fichier de définition a
+été ajouté, retiré ou modifié.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from .models import BuildCmd, ResourceDelta
+
+logger = logging.getLogger(__name__)
+
+# Change quand les formules ou le format compilé changent (invalide les caches)
+COMPILER_VERSION = 1
+
+BUILDINGS_DIR = "buildings"
+_COST_STEP = 5
+
+# Coût d'une construction sans catalogue: rien n'est prélevé
+NO_COST: ResourceDelta = (0, 0, 0, 0)
+
+# Signature (nom, taille, mtime) des définitions -> catalogue, par répertoire
+_catalogs: dict[Path, tuple[tuple[tuple[str, int, int], ...], Catalog]] = {}
+
+
+class GameDataError(ValueError):
+    """Définitions de jeu absentes ou invalides."""
+
+
+class BuildingCost(BaseModel):
+    """Coût du niveau 1 d'un bâtiment."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    wood: int = Field(ge=0)
+    clay: int = Field(ge=0)
+    iron: int = Field(ge=0)
+    crop: int = Field(ge=0)
+
+
+class BuildingDef(BaseModel):
+    """Définition normalisée d'un bâtiment (``data/buildings/<id>.json``)."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    id: str = Field(pattern=r"^[a-z][a-z0-9_]*$")
+    name: str = Field(min_length=1)
+    max_level: int = Field(ge=1, le=100)
+    cost: BuildingCost
+    cost_growth: float = Field(ge=1.0)
+    build_time_s: int = Field(gt=0)
+    time_growth: float = Field(ge=1.0)
+
+
+def _round_half_up(value: float, step: int = 1) -> int:
+    return int(math.floor(value / step + 0.5)) * step
+
+
+def compile_building(
+    building: BuildingDef,
+) -> tuple[tuple[ResourceDelta, ...], tuple[int, ...]]:
+    """Tables d'un bâtiment: coûts et durées des niveaux 1..max_level.
+
+    Returns:
+        (coût par niveau, durée en secondes par niveau), indexés par ``niveau - 1``
+    """
+    c = building.cost
+    costs: list[ResourceDelta] = []
+    times: list[int] = []
+    for level in range(1, building.max_level + 1):
+        factor = building.cost_growth ** (level - 1)
+        wood, clay, iron, crop = (
+            _round_half_up(base * factor, _COST_STEP) for base in (c.wood, c.clay, c.iron, c.crop)
+        )
+        costs.append((wood, clay, iron, crop))
+        times.append(_round_half_up(building.build_time_s * building.time_growth ** (level - 1)))
+    return tuple(costs), tuple(times)
+
+
+class Catalog:
+    """Tables compilées des bâtiments: coût et durée par (bâtiment, niveau) en O(1)."""
+
+    def __init__(
+        self,
+        fingerprint: str,
+        buildings: list[tuple[str, str, tuple[ResourceDelta, ...], tuple[int, ...]]],
+    ) -> None:
+        """Construit le catalogue depuis des tables déjà compilées.
+
+        Args:
+            fingerprint: Empreinte des définitions sources
+            buildings: (id, nom, coûts par niveau, durées par niveau)
+        """
+        self.fingerprint = fingerprint
+        self._index = {bid: i for i, (bid, _, _, _) in enumerate(buildings)}
+        self._names = tuple(name for _, name, _, _ in buildings)
+        self._costs = tuple(costs for _, _, costs, _ in buildings)
+        self._times = tuple(times for _, _, _, times in buildings)
+
+    @property
+    def buildings(self) -> tuple[str, ...]:
+        """Identifiants des bâtiments, dans l'ordre des tables."""
+        return tuple(self._index)
+
+    def name(self, building: str) -> str | None:
+        """Nom affiché d'un bâtiment, None s'il est inconnu."""
+        i = self._index.get(building)
+        return None if i is None else self._names[i]
+
+    def max_level(self, building: str) -> int | None:
+        """Niveau maximal d'un bâtiment, None s'il est inconnu."""
+        i = self._index.get(building)
+        return None if i is None else len(self._costs[i])
+
+    def cost(self, building: str, level: int) -> ResourceDelta | None:
+        """Coût (bois, argile, fer, céréales) d'un niveau.
+
+        Returns:
+            None si le bâtiment est inconnu ou le niveau hors de 1..max_level
+        """
+        i = self._index.get(building)
+        if i is None:
+            return None
+        costs = self._costs[i]
+        return costs[level - 1] if 0 < level <= len(costs) else None
+
+    def build_time(self, building: str, level: int) -> int | None:
+        """Durée de construction d'un niveau en secondes (None comme ``cost``)."""
+        i = self._index.get(building)
+        if i is None:
+            return None
+        times = self._times[i]
+        return times[level - 1] if 0 < level <= len(times) else None
+
+    def to_json(self) -> dict[str, Any]:
+        """Forme compilée, sérialisable (cache sur disque)."""
+        return {
+            "compiler": COMPILER_VERSION,
+            "fingerprint": self.fingerprint,
+            "buildings": [
+                [bid, self._names[i], self._costs[i], self._times[i]]
+                for bid, i in self._index.items()
+            ],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> Catalog:
+        """Catalogue relu depuis sa forme compilée."""
+        return cls(
+            data["fingerprint"],
+            [
+                (bid, name, tuple(tuple(c) for c in costs), tuple(times))
+                for bid, name, costs, times in data["buildings"]
+            ],
+        )
+
+
+def build_cost(catalog: Catalog | None, cmd: BuildCmd) -> ResourceDelta | None:
+    """Coût d'une commande de construction, None si elle est invalide.
+
+    Sans catalogue, toute construction nommée de niveau positif est acceptée
+    sans coût; avec, le bâtiment et le niveau doivent figurer dans ses tables
+    (un accès indexé).
+    """
+    if not cmd.building or cmd.levelTarget <= 0:
+        return None
+    if catalog is None:
+        return NO_COST
+    return catalog.cost(cmd.building, cmd.levelTarget)
+
+
+def _dir_signature(buildings_dir: Path) -> tuple[tuple[str, int, int], ...]:
+    """(nom, taille, mtime) de chaque définition, sans les lire."""
+    with os.scandir(buildings_dir) as entries:
+        return tuple(
+            sorted(
+                (entry.name, stat.st_size, stat.st_mtime_ns)
+                for entry in entries
+                if entry.name.endswith(".json") and entry.is_file()
+                for stat in (entry.stat(),)
+            )
+        )
+
+
+def _fingerprint(sources: list[tuple[str, bytes]]) -> str:
+    digest = hashlib.sha256(f"compiler:{COMPILER_VERSION}\n".encode())
+    for name, content in sources:
+        digest.update(f"{name}:{hashlib.sha256(content).hexdigest()}\n".encode())
+    return digest.hexdigest()
+
+
+def compile_catalog(sources: list[tuple[str, bytes]], fingerprint: str) -> Catalog:
+    """Valide les définitions et compile leurs tables.
+
+    Args:
+        sources: (nom de fichier, contenu) des définitions, triés par nom
+        fingerprint: Empreinte des sources
+
+    Returns:
+        Catalogue compilé
+
+    Raises:
+        GameDataError: Si une définition est illisible, invalide, ou si son
+            ``id`` ne correspond pas au nom de son fichier
+    """
+    buildings = []
+    for name, content in sources:
+        try:
+            building = BuildingDef.model_validate_json(content)
+        except ValidationError as exc:
+            raise GameDataError(f"{BUILDINGS_DIR}/{name}: définition invalide\n{exc}") from exc
+        if building.id != Path(name).stem:
+            raise GameDataError(
+                f"{BUILDINGS_DIR}/{name}: l'id {building.id!r} doit correspondre au nom du fichier"
+            )
+        costs, times = compile_building(building)
+        buildings.append((building.id, building.name, costs, times))
+    if not buildings:
+        raise GameDataError(f"Aucune définition de bâtiment dans {BUILDINGS_DIR}/")
+    return Catalog(fingerprint, buildings)
+
+
+def _read_cache(path: Path, fingerprint: str) -> Catalog | None:
+    """Catalogue en cache, None s'il est absent, illisible ou d'une autre empreinte."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("compiler") != COMPILER_VERSION or data.get("fingerprint") != fingerprint:
+            return None
+        return Catalog.from_json(data)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        logger.warning("Cache du catalogue ignoré (%s): %s", path, exc)
+        return None
+
+
+def _write_cache(path: Path, catalog: Catalog) -> None:
+    """Écrit le cache (fichier temporaire puis renommage); un échec n'est pas fatal."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(json.dumps(catalog.to_json(), separators=(",", ":")), encoding="utf-8")
+        tmp_path.replace(path)
+    except OSError as exc:
+        logger.warning("Cache du catalogue non écrit (%s): %s", path, exc)
+
+
+def load_catalog(data_dir: str | Path, cache_dir: str | Path | None = None) -> Catalog:
+    """Charge le catalogue des bâtiments d'un répertoire de données de jeu.
+
+    Args:
+        data_dir: Répertoire des données (contient ``buildings/``)
+        cache_dir: Répertoire du cache compilé (None: pas de cache sur disque)
+
+    Returns:
+        Catalogue compilé (partagé par les appels suivants tant que les
+        définitions ne changent pas)
+
+    Raises:
+        GameDataError: Si le répertoire des bâtiments est absent ou si une
+            définition est invalide
+    """
+    buildings_dir = Path(data_dir).resolve() / BUILDINGS_DIR
+    try:
+        signature = _dir_signature(buildings_dir)
+    except FileNotFoundError:
+        raise GameDataError(f"Répertoire de bâtiments introuvable: {buildings_dir}") from None
+    cached = _catalogs.get(buildings_dir)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    sources = [(name, (buildings_dir / name).read_bytes()) for name, _, _ in signature]
+    fingerprint = _fingerprint(sources)
+    cache_path = (
+        Path(cache_dir) / f"buildings-{fingerprint[:16]}.json" if cache_dir is not None else None
+    )
+    catalog = _read_cache(cache_path, fingerprint) if cache_path is not None else None
+    if catalog is None:
+        catalog = compile_catalog(sources, fingerprint)
+        if cache_path is not None:
+            _write_cache(cache_path, catalog)
+    _catalogs[buildings_dir] = (signature, catalog)
+    return catalog
@@ -0,0 +1,412 @@
+"""Instrumentation légère d'AGER exposée au format texte Prometheus.
+
+Les compteurs et histogrammes sont shardés par thread: chaque thread écrit dans
+ses propres cellules sans verrou, et l'agrégation n'a lieu qu'à la lecture
+(``/metrics``). Le coût d'une observation reste de l'ordre de la microseconde,
+ce qui permet de laisser l'instrumentation active en production.
+"""
+
+from __future__ import annotations
+
+import abc
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from functools import wraps
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:  # Starlette n'est pas importé par le moteur seul (cf. budget d'import)
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Bornes par défaut (secondes), du cache mémoire à la requête lente
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True))
+    return f"{{{pairs}}}" if pairs else ""
+
+
+class _Metric(abc.ABC):
+    """Base des métriques shardées par thread.
+
+    Chaque thread possède un dict labels -> cellules (liste de nombres). Les
+    dicts de tous les threads sont référencés dans ``_shards`` pour l'agrégation;
+    ils survivent à la fin de leur thread afin de ne perdre aucune observation.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Labels = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._local = threading.local()
+        self._shards: list[dict[Labels, list[float]]] = []
+        self._shards_lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _cells_size(self) -> int:
+        """Nombre de cellules par jeu de labels."""
+
+    def _cells(self, labels: Labels) -> list[float]:
+        try:
+            shard: dict[Labels, list[float]] = self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        cells = shard.get(labels)
+        if cells is None:
+            cells = shard[labels] = [0.0] * self._cells_size()
+        return cells
+
+    def collect(self) -> dict[Labels, list[float]]:
+        """Agrège les cellules de tous les threads."""
+        with self._shards_lock:
+            shards = list(self._shards)
+        total: dict[Labels, list[float]] = {}
+        for shard in shards:
+            # dict.copy() est atomique sous le GIL, contrairement à une itération
+            for labels, cells in shard.copy().items():
+                acc = total.get(labels)
+                if acc is None:
+                    total[labels] = list(cells)
+                else:
+                    for i, value in enumerate(cells):
+                        acc[i] += value
+        return total
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, cells in sorted(self.collect().items()):
+            lines.extend(self._render_cells(labels, cells))
+        return lines
+
+    @abc.abstractmethod
+    def _render_cells(self, labels: Labels, cells: list[float]) -> list[str]:
+        """Lignes d'exposition d'un jeu de labels."""
+
+
+class Counter(_Metric):
+    """Compteur monotone."""
+
+    kind = "counter"
+
+    def _cells_size(self) -> int:
+        return 1
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        self._cells(labels)[0] += amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return self.collect().get(labels, [0.0])[0]
+
+    def _render_cells(self, labels: Labels, cells: list[float]) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_num(cells[0])}"]
+
+
+class Gauge(_Metric):
+    """Valeur instantanée (dernière valeur écrite, tous threads confondus).
+
+    Contrairement aux compteurs, une jauge n'est pas shardée: la somme des
+    shards n'aurait pas de sens, et ``set`` est une simple affectation de dict.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Labels = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[Labels, float] = {}
+
+    def _cells_size(self) -> int:
+        return 1
+
+    def set(self, value: float, labels: Labels = ()) -> None:
+        self._values[labels] = value
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+    def collect(self) -> dict[Labels, list[float]]:
+        return {labels: [value] for labels, value in self._values.copy().items()}
+
+    def _render_cells(self, labels: Labels, cells: list[float]) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_num(cells[0])}"]
+
+
+class Histogram(_Metric):
+    """Histogramme à bornes fixes (cellules: un compteur par borne + +Inf, somme, total)."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _cells_size(self) -> int:
+        return len(self.buckets) + 3
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        cells = self._cells(labels)
+        cells[bisect_left(self.buckets, value)] += 1
+        cells[-2] += value
+        cells[-1] += 1
+
+    def count(self, labels: Labels = ()) -> float:
+        cells = self.collect().get(labels)
+        return cells[-1] if cells else 0.0
+
+    def _render_cells(self, labels: Labels, cells: list[float]) -> list[str]:
+        lines = []
+        cumulative = 0.0
+        bounds = [*(_num(b) for b in self.buckets), "+Inf"]
+        for bound, count in zip(bounds, cells, strict=False):
+            cumulative += count
+            label_str = _format_labels((*self.labelnames, "le"), (*labels, bound))
+            lines.append(f"{self.name}_bucket{label_str} {_num(cumulative)}")
+        label_str = _format_labels(self.labelnames, labels)
+        lines.append(f"{self.name}_sum{label_str} {cells[-2]!r}")
+        lines.append(f"{self.name}_count{label_str} {_num(cells[-1])}")
+        return lines
+
+
+def _num(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class MetricsRegistry:
+    """Ensemble de métriques rendues ensemble sur ``/metrics``."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register[M: _Metric](self, metric: M) -> M:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Retourne toutes les métriques au format texte Prometheus 0.0.4."""
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "ager_http_request_duration_seconds",
+        "HTTP request latency by route template.",
+        ("method", "route"),
+    )
+)
+HTTP_REQUESTS = REGISTRY.register(
+    Counter(
+        "ager_http_requests_total",
+        "HTTP requests by route template and status code.",
+        ("method", "route", "status"),
+    )
+)
+ENGINE_CALL_DURATION = REGISTRY.register(
+    Histogram(
+        "ager_engine_call_duration_seconds",
+        "SimulationEngine method latency (the _count series is the call count).",
+        ("engine", "method"),
+    )
+)
+ENGINE_SQL_STATEMENTS = REGISTRY.register(
+    Counter(
+        "ager_engine_sql_statements_total",
+        "SQL statements executed by SimulationEngine methods.",
+        ("engine", "method"),
+    )
+)
+COMMAND_QUEUE_DEPTH = REGISTRY.register(
+    Gauge("ager_command_queue_depth", "Commands waiting in the command pipeline queue.")
+)
+COMMAND_BATCH_SIZE = REGISTRY.register(
+    Histogram(
+        "ager_command_batch_size",
+        "Commands applied per writer batch.",
+        buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+    )
+)
+COMMAND_WAIT_DURATION = REGISTRY.register(
+    Histogram(
+        "ager_command_wait_seconds",
+        "Time a command spends queued before the writer applies it.",
+    )
+)
+COMMANDS = REGISTRY.register(
+    Counter(
+        "ager_commands_total",
+        "Commands by outcome (accepted, rejected, failed, overloaded).",
+        ("status",),
+    )
+)
+WRITE_BEHIND_PENDING = REGISTRY.register(
+    Gauge("ager_write_behind_pending", "Mutations applied in memory but not yet in SQLite.")
+)
+WRITE_BEHIND_LAG = REGISTRY.register(
+    Histogram(
+        "ager_write_behind_lag_seconds",
+        "Delay between an in-memory mutation and its commit to SQLite.",
+    )
+)
+TIER_CACHE_EVENTS = REGISTRY.register(
+    Counter(
+        "ager_tier_cache_total",
+        "Tiered engine village cache events (hit, miss, eviction).",
+        ("event",),
+    )
+)
+TIER_RESIDENT = REGISTRY.register(
+    Gauge("ager_tier_resident_villages", "Villages held in the tiered engine's memory tier.")
+)
+ADMISSION_REJECTIONS = REGISTRY.register(
+    Counter(
+        "ager_admission_rejections_total",
+        "Build commands refused by admission control (client, village, concurrency).",
+        ("reason",),
+    )
+)
+BUILDS_IN_FLIGHT = REGISTRY.register(
+    Gauge("ager_builds_in_flight", "POST /cmd/build requests currently being handled.")
+)
+
+
+# --- Comptage des requêtes SQL ------------------------------------------------
+
+
+# Compteur par thread: les méthodes synchrones du moteur exécutent leurs requêtes
+# dans le thread appelant, la différence avant/après suffit à les attribuer.
+class _SQLCount(threading.local):
+    count = 0
+
+
+_sql_local = _SQLCount()
+
+
+def count_sql_statement(*_args: Any) -> None:
+    """Listener SQLAlchemy ``before_cursor_execute``: compte une requête."""
+    _sql_local.count += 1
+
+
+def add_sql_statements(count: int) -> None:
+    """Ajoute au thread courant des requêtes exécutées pour son compte ailleurs."""
+    _sql_local.count += count
+
+
+def sql_statement_count() -> int:
+    """Nombre de requêtes SQL exécutées jusqu'ici par le thread courant."""
+    return _sql_local.count
+
+
+# --- Instrumentation du moteur ------------------------------------------------
+
+
+def _timed[T](engine_name: str, method_name: str, func: Callable[..., T]) -> Callable[..., T]:
+    labels = (engine_name, method_name)
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        statements = sql_statement_count()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            ENGINE_CALL_DURATION.observe(time.perf_counter() - start, labels)
+            executed = sql_statement_count() - statements
+            if executed:
+                ENGINE_SQL_STATEMENTS.inc(labels, executed)
+
+    return wrapper
+
+
+def instrument_engine[E](engine: E, method_names: Iterable[str]) -> E:
+    """Enveloppe les méthodes du moteur pour mesurer appels, latence et requêtes SQL.
+
+    Les méthodes sont remplacées sur l'instance elle-même: le moteur garde son
+    type et son identité (``isinstance`` et comparaisons restent valides).
+
+    Args:
+        engine: Moteur à instrumenter
+        method_names: Méthodes du port à envelopper
+
+    Returns:
+        Le même moteur, instrumenté
+    """
+    engine_name = type(engine).__name__
+    for name in method_names:
+        method = getattr(engine, name, None)
+        if callable(method):
+            setattr(engine, name, _timed(engine_name, name, method))
+    return engine
+
+
+# --- Middleware ASGI ----------------------------------------------------------
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: latence et statut par gabarit de route (``/village/{vid}``).
+
+    Le gabarit (et non le chemin brut) est utilisé comme label pour borner la
+    cardinalité; les requêtes sans route correspondante sont regroupées.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, (method, route_path))
+            HTTP_REQUESTS.inc((method, route_path, str(status)))
@@ -1,23 +1,86 @@
 """Modèles DTO stables (façade API)."""
 
-from pydantic import BaseModel
+from typing import Literal, get_args
+
+from pydantic import BaseModel, ConfigDict
+
+# Métriques de classement: somme des ressources ou une ressource
+LeaderboardMetric = Literal["total", "wood", "clay", "iron", "crop"]
+LEADERBOARD_METRICS: tuple[str, ...] = get_args(LeaderboardMetric)
 
 
 class Resources(BaseModel):
+    # Partagées entre versions du monde: jamais modifiées en place
+    model_config = ConfigDict(frozen=True)
+
     wood: int = 800
     clay: int = 800
     iron: int = 800
     crop: int = 800
 
 
+# Variation de ressources (bois, argile, fer, céréales), positive ou négative
+ResourceDelta = tuple[int, int, int, int]
+
+# Transfert de ressources: (village source, village cible, quantités >= 0)
+Transfer = tuple[int, int, ResourceDelta]
+
+
 class Village(BaseModel):
+    """Enregistrement immuable: une mutation publie une copie (``model_copy``)."""
+
+    model_config = ConfigDict(frozen=True)
+
     id: int
     name: str
+    x: int = 0
+    y: int = 0
     resources: Resources = Resources()
-    queue: list[str] = []
+    queue: tuple[str, ...] = ()
+
+
+# Champs sélectionnables par projection (``fields=`` des routes de lecture)
+VILLAGE_FIELDS: frozenset[str] = frozenset(Village.model_fields)
 
 
 class BuildCmd(BaseModel):
     villageId: int
     building: str
     levelTarget: int
+
+
+class RankEntry(BaseModel):
+    rank: int
+    villageId: int
+    name: str
+    score: int
+
+
+class CacheStats(BaseModel):
+    resident: int
+    capacity: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+class SQLiteStats(BaseModel):
+    page_size: int
+    page_count: int
+    freelist_count: int
+    wal_bytes: int
+    wal_frames: int
+
+
+class EngineStats(BaseModel):
+    """Statistiques d'un moteur (``/debug/engine``); None: sans objet pour ce moteur."""
+
+    engine: str
+    villages: int
+    queue_items: int
+    memory_bytes: int | None = None
+    storage_bytes: int | None = None
+    last_persist_seconds: float | None = None
+    pending_writes: int | None = None
+    cache: CacheStats | None = None
+    sqlite: SQLiteStats | None = None
@@ -1,9 +1,40 @@
+from collections.abc import Mapping, Sequence
 from typing import Protocol
 
-from .models import BuildCmd, Village
+from .models import BuildCmd, EngineStats, RankEntry, ResourceDelta, Transfer, Village
 
 
 class SimulationEngine(Protocol):
-    def snapshot(self) -> list[Village]: ...
-    def get_village(self, vid: int) -> Village | None: ...
+    # ``fields``: champs de Village à charger (None = tous). Un champ non demandé
+    # peut garder sa valeur par défaut: l'appelant ne doit pas le lire.
+    def snapshot(self, fields: frozenset[str] | None = None) -> list[Village]: ...
+    def get_village(self, vid: int, fields: frozenset[str] | None = None) -> Village | None: ...
+
+    # Lecture groupée: villages connus parmi ``vids``, dans l'ordre de ``vids``
+    def get_villages(
+        self, vids: Sequence[int], fields: frozenset[str] | None = None
+    ) -> list[Village]: ...
     def queue_build(self, cmd: BuildCmd) -> bool: ...
+
+    # Constructions appliquées dans l'ordre, chacune comme ``queue_build`` sur
+    # le résultat des précédentes, en une seule écriture (transaction,
+    # sauvegarde ou journal); retourne l'acceptation de chacune, alignée sur ``cmds``
+    def queue_builds(self, cmds: Sequence[BuildCmd]) -> list[bool]: ...
+
+    # Écriture groupée: stocks bornés à 0, villages inconnus ignorés; retourne
+    # le nombre de villages modifiés
+    def adjust_resources(self, deltas: Mapping[int, ResourceDelta]) -> int: ...
+
+    # Transferts appliqués dans l'ordre, en une seule écriture: chaque quantité
+    # est bornée au stock de la source à ce moment (rien si la source ou la
+    # cible est inconnue), et la cible reçoit exactement ce qui a été prélevé.
+    # Retourne les quantités transférées, alignées sur ``transfers``
+    def transfer_resources(self, transfers: Sequence[Transfer]) -> list[ResourceDelta]: ...
+    def villages_within(self, x: int, y: int, r: float) -> list[Village]: ...
+    def nearest_villages(self, x: int, y: int, n: int) -> list[Village]: ...
+    def leaderboard(self, metric: str, limit: int, offset: int) -> list[RankEntry]: ...
+    def village_rank(self, vid: int, metric: str) -> RankEntry | None: ...
+
+    # Statistiques internes, tirées de compteurs tenus à jour (O(1)): sûres à
+    # relever toutes les quelques secondes en production
+    def stats(self) -> EngineStats: ...
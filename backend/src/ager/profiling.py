@@ -0,0 +1,391 @@
+"""Profilage à la demande de l'API AGER.
+
+Deux outils, installés uniquement si ``AGER_PROFILING=1`` (rien n'est importé ni
+enveloppé sinon):
+
+- profilage d'une requête: une requête portant l'en-tête ``X-Ager-Profile``
+  (ou le paramètre ``?_profile=``) égal au jeton ``AGER_PROFILING_TOKEN`` est
+  exécutée sous ``cProfile``. Les stats sont écrites dans ``AGER_PROFILE_DIR``
+  et leur identifiant est retourné dans l'en-tête ``X-Ager-Profile-Id``;
+- échantillonnage: ``POST /admin/profile/sampling`` démarre pour une durée
+  bornée un profileur qui relève périodiquement la pile de tous les threads
+  (``sys._current_frames``); ``GET`` retourne les piles repliées
+  (``frame;frame;frame count``), directement exploitables par flamegraph.pl
+  ou speedscope.
+
+L'endpoint de chaque route est enveloppé pour activer le profil de la requête
+pendant son exécution (dans le thread du threadpool pour un endpoint
+synchrone). Depuis Python 3.12, ``cProfile`` repose sur ``sys.monitoring``:
+un seul profileur peut être actif à la fois dans le processus, et il
+enregistre le code de tous les threads. Une seule requête est donc profilée
+à la fois (une requête profilée concurrente reçoit 409), et le profil
+contient aussi le travail des autres requêtes servies pendant celle-ci, ainsi
+que les tâches de la boucle qui s'exécutent pendant les ``await``.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import hmac
+import io
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from collections.abc import Callable
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+from pathlib import Path
+from types import FrameType
+from typing import Annotated, Any, Literal
+from urllib.parse import parse_qs
+
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILE_HEADER = "X-Ager-Profile"
+PROFILE_ID_HEADER = "X-Ager-Profile-Id"
+PROFILE_QUERY_PARAM = "_profile"
+ADMIN_PREFIX = "/admin/profile"
+
+# Bornes de l'échantillonneur
+MAX_SAMPLING_SECONDS = 300.0
+_PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{12}$")
+
+# Profil de la requête courante (propagé au threadpool avec le contexte)
+_current_profile: ContextVar[cProfile.Profile | None] = ContextVar(
+    "ager_current_profile", default=None
+)
+
+
+# Une seule requête profilée à la fois (un seul profileur actif par processus)
+_profiling_lock = threading.Lock()
+
+
+def _token_matches(candidate: str | None, token: str) -> bool:
+    return candidate is not None and hmac.compare_digest(candidate.encode(), token.encode())
+
+
+# --- Profilage d'une requête --------------------------------------------------
+
+
+def _enable(profile: cProfile.Profile) -> bool:
+    """Active le profil; False si un autre outil de ``sys.monitoring`` est déjà actif."""
+    try:
+        profile.enable()
+    except ValueError:
+        return False
+    return True
+
+
+def _profiled(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Enveloppe un endpoint pour activer le profil de la requête autour de l'appel."""
+    if iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            profile = _current_profile.get()
+            if profile is None or not _enable(profile):
+                return await func(*args, **kwargs)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                profile.disable()
+
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        profile = _current_profile.get()
+        if profile is None or not _enable(profile):
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+
+    return wrapper
+
+
+def wrap_routes(app: FastAPI) -> int:
+    """Enveloppe les endpoints des routes déjà déclarées de l'application.
+
+    Args:
+        app: Application FastAPI
+
+    Returns:
+        Nombre de routes enveloppées
+    """
+    wrapped = 0
+    for route in app.router.routes:
+        if isinstance(route, APIRoute) and route.dependant.call is not None:
+            route.dependant.call = _profiled(route.dependant.call)
+            wrapped += 1
+    return wrapped
+
+
+def _new_profile_id() -> str:
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:12]}"
+
+
+class RequestProfilerMiddleware:
+    """Middleware ASGI: profile les requêtes portant le jeton de profilage.
+
+    Sans jeton valide, la requête passe sans autre coût que la lecture d'un
+    en-tête. Si une autre requête est déjà profilée, la requête demandant un
+    profil reçoit 409 (``Retry-After``) au lieu d'être servie sans profil.
+    """
+
+    def __init__(self, app: ASGIApp, token: str, profile_dir: Path) -> None:
+        self.app = app
+        self.token = token
+        self.profile_dir = profile_dir
+
+    def _requested(self, scope: Scope) -> bool:
+        header = PROFILE_HEADER.lower().encode()
+        for name, value in scope["headers"]:
+            if name == header:
+                return _token_matches(value.decode("latin-1"), self.token)
+        query = scope.get("query_string", b"")
+        if PROFILE_QUERY_PARAM.encode() in query:
+            values = parse_qs(query.decode("latin-1")).get(PROFILE_QUERY_PARAM, [])
+            return any(_token_matches(v, self.token) for v in values)
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["path"].startswith(ADMIN_PREFIX)
+            or not self._requested(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        if not _profiling_lock.acquire(blocking=False):
+            busy = JSONResponse(
+                {"detail": "Another request is being profiled"},
+                status_code=409,
+                headers={"Retry-After": "1"},
+            )
+            await busy(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            _profiling_lock.release()
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profile_id = _new_profile_id()
+        profile = cProfile.Profile()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER.lower().encode(), profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            profile.create_stats()
+            if profile.stats:
+                self.profile_dir.mkdir(parents=True, exist_ok=True)
+                profile.dump_stats(self.profile_dir / f"{profile_id}.prof")
+
+
+def format_profile(path: Path, sort: str = "cumulative", limit: int = 40) -> str:
+    """Retourne le rapport texte ``pstats`` d'un profil enregistré.
+
+    Args:
+        path: Fichier ``.prof`` (format marshal de ``cProfile``)
+        sort: Clé de tri ``pstats``
+        limit: Nombre de fonctions affichées
+
+    Returns:
+        Rapport texte
+    """
+    out = io.StringIO()
+    pstats.Stats(str(path), stream=out).sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+# --- Échantillonnage ----------------------------------------------------------
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).name}:{code.co_qualname}"
+
+
+class SamplingProfiler:
+    """Profileur par échantillonnage des piles de tous les threads.
+
+    Un thread dédié relève ``sys._current_frames()`` à intervalle fixe pendant
+    une durée bornée et compte les piles repliées. Les threads inactifs
+    (boucle d'événements en attente, workers du threadpool) apparaissent avec
+    leur pile d'attente, comme dans tout profileur de type wall-clock.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.samples = 0
+
+    @property
+    def running(self) -> bool:
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def start(self, seconds: float, interval: float) -> bool:
+        """Démarre une session d'échantillonnage (efface la précédente).
+
+        Args:
+            seconds: Durée maximale de la session
+            interval: Intervalle entre deux relevés, en secondes
+
+        Returns:
+            False si une session est déjà en cours
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self._stacks = Counter()
+            self.samples = 0
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(time.monotonic() + seconds, interval),
+                name="ager-sampling-profiler",
+                daemon=True,
+            )
+            self._thread.start()
+            return True
+
+    def stop(self) -> None:
+        """Arrête la session en cours et attend la fin du thread."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _run(self, deadline: float, interval: float) -> None:
+        own_id = threading.get_ident()
+        names: dict[int | None, str] = {}
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            frames = sys._current_frames()
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            with self._lock:
+                for thread_id, leaf in frames.items():
+                    if thread_id == own_id:
+                        continue
+                    stack = []
+                    frame: FrameType | None = leaf
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                    self._stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+            del frames
+            self._stop.wait(interval)
+
+    def collapsed(self) -> str:
+        """Retourne les piles repliées (une ligne ``pile compte`` par pile)."""
+        with self._lock:
+            stacks = sorted(self._stacks.items())
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+
+# --- Installation -------------------------------------------------------------
+
+
+def build_admin_router(token: str, profile_dir: Path, sampler: SamplingProfiler) -> APIRouter:
+    """Construit les routes d'administration du profilage, protégées par le jeton.
+
+    Args:
+        token: Jeton attendu dans l'en-tête ``X-Ager-Profile``
+        profile_dir: Répertoire des profils de requêtes
+        sampler: Profileur par échantillonnage partagé
+
+    Returns:
+        Routeur à inclure dans l'application
+    """
+
+    def require_token(
+        x_ager_profile: Annotated[str | None, Header(alias=PROFILE_HEADER)] = None,
+    ) -> None:
+        if not _token_matches(x_ager_profile, token):
+            raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+    router = APIRouter(prefix=ADMIN_PREFIX, dependencies=[Depends(require_token)])
+
+    @router.post("/sampling", status_code=202)
+    def start_sampling(
+        seconds: Annotated[float, Query(gt=0, le=MAX_SAMPLING_SECONDS)] = 10.0,
+        interval_ms: Annotated[float, Query(ge=1, le=1000)] = 10.0,
+    ) -> dict[str, Any]:
+        if not sampler.start(seconds, interval_ms / 1000):
+            raise HTTPException(status_code=409, detail="Sampling already running")
+        return {"status": "started", "seconds": seconds, "intervalMs": interval_ms}
+
+    @router.get("/sampling", response_class=PlainTextResponse)
+    def get_sampling(response: Response) -> str:
+        response.headers["X-Ager-Profile-Running"] = "true" if sampler.running else "false"
+        response.headers["X-Ager-Profile-Samples"] = str(sampler.samples)
+        return sampler.collapsed()
+
+    @router.delete("/sampling")
+    def stop_sampling() -> dict[str, Any]:
+        sampler.stop()
+        return {"status": "stopped", "samples": sampler.samples}
+
+    @router.get("/requests/{profile_id}", response_class=PlainTextResponse)
+    def get_request_profile(
+        profile_id: str,
+        sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+        limit: Annotated[int, Query(ge=1, le=500)] = 40,
+    ) -> str:
+        path = profile_dir / f"{profile_id}.prof"
+        if not _PROFILE_ID.match(profile_id) or not path.is_file():
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return format_profile(path, sort, limit)
+
+    return router
+
+
+def install_profiling(app: FastAPI, token: str, profile_dir: Path) -> SamplingProfiler:
+    """Active le profilage à la demande sur une application.
+
+    À appeler après la déclaration des routes: seules les routes existantes sont
+    enveloppées (les routes d'administration ne le sont pas).
+
+    Args:
+        app: Application FastAPI
+        token: Jeton de garde (en-tête ``X-Ager-Profile``); ne doit pas être vide
+        profile_dir: Répertoire où écrire les profils de requêtes
+
+    Returns:
+        Le profileur par échantillonnage exposé sur ``/admin/profile/sampling``
+
+    Raises:
+        ValueError: Si le jeton est vide
+    """
+    if not token:
+        raise ValueError("AGER_PROFILING_TOKEN est requis quand AGER_PROFILING est actif")
+    wrap_routes(app)
+    sampler = SamplingProfiler()
+    app.include_router(build_admin_router(token, profile_dir, sampler))
+    app.add_middleware(RequestProfilerMiddleware, token=token, profile_dir=profile_dir)
+    return sampler
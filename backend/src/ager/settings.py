@@ -4,27 +4,55 @@ Gère les variables d'environnement et la configuration de l'application.
 """
 
 import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from importlib.resources import files
+from pathlib import Path
 from typing import Literal
 
-# Type pour les implémentations de moteur disponibles
-EngineType = Literal["memory", "file", "sql"]
+# Moteurs intégrés (d'autres peuvent être enregistrés dans le conteneur)
+EngineType = Literal["memory", "file", "sql", "hybrid", "tiered", "events", "shared"]
 
 
-def get_engine_type() -> EngineType:
+# Répertoire du monde dont le moteur est en cours de création (multi-mondes):
+# les chemins de stockage y sont alors résolus au lieu des variables globales
+_world_dir: ContextVar[Path | None] = ContextVar("ager_world_dir", default=None)
+
+
+@contextmanager
+def world_data_dir(path: Path) -> Iterator[None]:
+    """Résout les chemins de stockage dans le répertoire d'un monde.
+
+    Dans ce bloc, ``get_storage_path``, ``get_db_path`` et ``get_event_dir``
+    désignent ``world.json``, ``ager.db`` et ``events/`` sous ``path``: toute
+    fabrique de moteur qui lit ses chemins dans les settings crée ainsi le
+    moteur d'un monde sans changer de signature.
+
+    Args:
+        path: Répertoire de données du monde
+    """
+    token = _world_dir.set(path)
+    try:
+        yield
+    finally:
+        _world_dir.reset(token)
+
+
+def get_engine_type() -> str:
     """Retourne le type de moteur à utiliser depuis la variable d'environnement.
 
     Variable d'environnement:
-        AGER_ENGINE: Type de moteur ("memory" ou "file"). Défaut: "memory"
+        AGER_ENGINE: Nom du moteur ("memory", "file", "sql", "hybrid", "tiered",
+            "events", "shared" ou moteur enregistré).
+            Défaut: "memory"
+
+    La validation du nom est faite par le registre de moteurs du conteneur.
 
     Returns:
-        Type de moteur à instancier
+        Nom du moteur à instancier (en minuscules)
     """
-    engine = os.getenv("AGER_ENGINE", "memory").lower()
-    if engine not in ("memory", "file", "sql"):
-        raise ValueError(
-            f"AGER_ENGINE invalide: {engine}. Valeurs acceptées: 'memory', 'file', 'sql'"
-        )
-    return engine  # type: ignore[return-value]
+    return os.getenv("AGER_ENGINE", "memory").lower()
 
 
 def get_storage_path() -> str:
@@ -36,6 +64,9 @@ def get_storage_path() -> str:
     Returns:
         Chemin absolu ou relatif du fichier de stockage
     """
+    world_dir = _world_dir.get()
+    if world_dir is not None:
+        return str(world_dir / "world.json")
     return os.getenv("AGER_STORAGE_PATH", "./data/world.json")
 
 
@@ -48,4 +79,367 @@ def get_db_path() -> str:
     Returns:
         Chemin absolu ou relatif de la base de données
     """
+    world_dir = _world_dir.get()
+    if world_dir is not None:
+        return str(world_dir / "ager.db")
     return os.getenv("AGER_DB_PATH", "./data/ager.db")
+
+
+def get_db_template_enabled() -> bool:
+    """Indique si les nouvelles bases SQLite sont clonées depuis un template migré.
+
+    Variable d'environnement:
+        AGER_DB_TEMPLATE: "1" pour cloner (API backup sqlite3), "0" pour exécuter
+            les migrations sur chaque nouvelle base. Défaut: "1"
+
+    Returns:
+        True si le mode template est actif
+    """
+    return os.getenv("AGER_DB_TEMPLATE", "1").lower() not in ("0", "false", "no", "off")
+
+
+def get_metrics_enabled() -> bool:
+    """Indique si l'instrumentation (middleware HTTP, moteur, SQL) est active.
+
+    Variable d'environnement:
+        AGER_METRICS: "0" pour désactiver l'instrumentation. Défaut: "1"
+
+    Returns:
+        True si les métriques sont collectées et exposées sur /metrics
+    """
+    return os.getenv("AGER_METRICS", "1").lower() not in ("0", "false", "no", "off")
+
+
+def get_profiling_enabled() -> bool:
+    """Indique si le profilage à la demande est installé dans l'API.
+
+    Variable d'environnement:
+        AGER_PROFILING: "1" pour installer le profilage. Défaut: "0" (aucun coût)
+
+    Returns:
+        True si le middleware et les routes /admin/profile sont installés
+    """
+    return os.getenv("AGER_PROFILING", "0").lower() in ("1", "true", "yes", "on")
+
+
+def get_profiling_token() -> str:
+    """Retourne le jeton exigé pour déclencher le profilage.
+
+    Variable d'environnement:
+        AGER_PROFILING_TOKEN: Secret attendu dans l'en-tête X-Ager-Profile
+            (obligatoire si AGER_PROFILING est actif). Défaut: ""
+
+    Returns:
+        Jeton de profilage
+    """
+    return os.getenv("AGER_PROFILING_TOKEN", "")
+
+
+def get_debug_token() -> str:
+    """Retourne le jeton exigé par les routes de diagnostic (``/debug/engine``).
+
+    Variable d'environnement:
+        AGER_DEBUG_TOKEN: Secret attendu dans l'en-tête X-Ager-Debug-Token
+            (vide: routes désactivées, réponse 404). Défaut: ""
+
+    Returns:
+        Jeton de diagnostic
+    """
+    return os.getenv("AGER_DEBUG_TOKEN", "")
+
+
+def get_profile_dir() -> str:
+    """Retourne le répertoire des profils de requêtes.
+
+    Variable d'environnement:
+        AGER_PROFILE_DIR: Répertoire des fichiers .prof. Défaut: "./data/profiles"
+
+    Returns:
+        Chemin absolu ou relatif du répertoire
+    """
+    return os.getenv("AGER_PROFILE_DIR", "./data/profiles")
+
+
+def get_sql_tracing_enabled() -> bool:
+    """Indique si les requêtes SQL sont chronométrées (Server-Timing, log lent).
+
+    Variable d'environnement:
+        AGER_SQL_TRACING: "0" pour désactiver le traçage SQL. Défaut: "1"
+
+    Returns:
+        True si le traçage SQL est actif
+    """
+    return os.getenv("AGER_SQL_TRACING", "1").lower() not in ("0", "false", "no", "off")
+
+
+def get_slow_query_ms() -> float | None:
+    """Retourne le seuil du log des requêtes SQL lentes.
+
+    Variable d'environnement:
+        AGER_SLOW_QUERY_MS: Seuil en millisecondes ("off" pour désactiver le log).
+            Défaut: "100"
+
+    Returns:
+        Seuil en millisecondes, None si le log est désactivé
+    """
+    value = os.getenv("AGER_SLOW_QUERY_MS", "100").lower()
+    if value in ("", "off", "none"):
+        return None
+    return float(value)
+
+
+def get_cmd_queue_size() -> int:
+    """Retourne la capacité de la file du pipeline de commandes.
+
+    Variable d'environnement:
+        AGER_CMD_QUEUE_SIZE: Commandes en attente au-delà desquelles l'API
+            répond 503. Défaut: "1024"
+
+    Returns:
+        Capacité de la file
+    """
+    return int(os.getenv("AGER_CMD_QUEUE_SIZE", "1024"))
+
+
+def get_cmd_batch_size() -> int:
+    """Retourne la taille maximale d'un lot appliqué par l'écrivain de commandes.
+
+    Variable d'environnement:
+        AGER_CMD_BATCH: Commandes par lot. Défaut: "64"
+
+    Returns:
+        Taille maximale d'un lot
+    """
+    return int(os.getenv("AGER_CMD_BATCH", "64"))
+
+
+def get_event_dir() -> str:
+    """Retourne le répertoire du journal de commandes (moteur "events").
+
+    Variable d'environnement:
+        AGER_EVENT_DIR: Répertoire des segments de journal et checkpoints.
+            Défaut: "./data/events"
+
+    Returns:
+        Chemin absolu ou relatif du répertoire
+    """
+    world_dir = _world_dir.get()
+    if world_dir is not None:
+        return str(world_dir / "events")
+    return os.getenv("AGER_EVENT_DIR", "./data/events")
+
+
+def get_checkpoint_every() -> int:
+    """Retourne le nombre de commandes entre deux checkpoints du journal.
+
+    Variable d'environnement:
+        AGER_CHECKPOINT_EVERY: Commandes journalisées par checkpoint. Défaut: "10000"
+
+    Returns:
+        Intervalle entre deux checkpoints, en commandes
+    """
+    return int(os.getenv("AGER_CHECKPOINT_EVERY", "10000"))
+
+
+def get_event_fsync() -> bool:
+    """Indique si chaque commande journalisée est forcée sur disque (fsync).
+
+    Variable d'environnement:
+        AGER_EVENT_FSYNC: "1" pour un fsync par commande. Défaut: "0"
+
+    Returns:
+        True si le journal est synchronisé à chaque commande
+    """
+    return os.getenv("AGER_EVENT_FSYNC", "0").lower() in ("1", "true", "yes", "on")
+
+
+def get_write_behind_ms() -> float:
+    """Retourne le retard maximal de SQLite sur la mémoire (moteur "hybrid").
+
+    Variable d'environnement:
+        AGER_WRITE_BEHIND_MS: Délai maximal, en millisecondes, entre une
+            mutation en mémoire et son commit dans SQLite. Défaut: "200"
+
+    Returns:
+        Retard maximal en millisecondes
+    """
+    return float(os.getenv("AGER_WRITE_BEHIND_MS", "200"))
+
+
+def get_write_behind_max_pending() -> int:
+    """Retourne le nombre maximal de mutations en attente d'écriture (moteur "hybrid").
+
+    Variable d'environnement:
+        AGER_WRITE_BEHIND_MAX_PENDING: Mutations non persistées au-delà
+            desquelles les commandes attendent la persistance. Défaut: "10000"
+
+    Returns:
+        Nombre maximal de mutations en attente
+    """
+    return int(os.getenv("AGER_WRITE_BEHIND_MAX_PENDING", "10000"))
+
+
+def get_tier_capacity() -> int:
+    """Retourne le nombre de villages gardés en mémoire par le moteur "tiered".
+
+    Variable d'environnement:
+        AGER_TIER_CAPACITY: Villages chauds en mémoire (cache LRU). Défaut: "100000"
+
+    Returns:
+        Capacité du cache, en villages
+    """
+    return int(os.getenv("AGER_TIER_CAPACITY", "100000"))
+
+
+def get_tier_store() -> str:
+    """Retourne le moteur de stockage des villages froids du moteur "tiered".
+
+    Variable d'environnement:
+        AGER_TIER_STORE: Nom d'un moteur du registre ("sql", "file"...). Défaut: "sql"
+
+    Returns:
+        Nom du moteur de stockage (en minuscules)
+    """
+    return os.getenv("AGER_TIER_STORE", "sql").lower()
+
+
+def get_shm_queue_slots() -> int:
+    """Retourne le nombre d'éléments de queue par village du moteur "shared".
+
+    Variable d'environnement:
+        AGER_SHM_QUEUE_SLOTS: Taille fixe d'une queue dans le segment partagé
+            (identique pour tous les workers). Défaut: "64"
+
+    Returns:
+        Emplacements de queue par village
+    """
+    return int(os.getenv("AGER_SHM_QUEUE_SLOTS", "64"))
+
+
+def get_shm_flush_seconds() -> float | None:
+    """Retourne l'intervalle de persistance périodique du moteur "shared".
+
+    Variable d'environnement:
+        AGER_SHM_FLUSH_S: Secondes entre deux écritures du monde dans son
+            fichier par l'écrivain du segment (sans écriture si le monde n'a
+            pas changé); "0" pour n'écrire qu'à ``flush()`` et à la
+            fermeture. Défaut: "30"
+
+    Returns:
+        Intervalle en secondes, None si la persistance périodique est désactivée
+    """
+    seconds = float(os.getenv("AGER_SHM_FLUSH_S", "30"))
+    return seconds if seconds > 0 else None
+
+
+def get_client_rate() -> tuple[float, int]:
+    """Retourne le débit autorisé de commandes par client (seau à jetons).
+
+    Variables d'environnement:
+        AGER_CLIENT_RATE: Commandes par seconde et par client, 0 pour désactiver.
+            Défaut: "20"
+        AGER_CLIENT_BURST: Commandes acceptées d'affilée. Défaut: "40"
+
+    Returns:
+        (débit par seconde, rafale)
+    """
+    return float(os.getenv("AGER_CLIENT_RATE", "20")), int(os.getenv("AGER_CLIENT_BURST", "40"))
+
+
+def get_village_rate() -> tuple[float, int]:
+    """Retourne le débit autorisé de commandes par village (seau à jetons).
+
+    Variables d'environnement:
+        AGER_VILLAGE_RATE: Commandes par seconde et par village, 0 pour désactiver.
+            Défaut: "5"
+        AGER_VILLAGE_BURST: Commandes acceptées d'affilée. Défaut: "20"
+
+    Returns:
+        (débit par seconde, rafale)
+    """
+    return float(os.getenv("AGER_VILLAGE_RATE", "5")), int(os.getenv("AGER_VILLAGE_BURST", "20"))
+
+
+def get_max_inflight_builds() -> int:
+    """Retourne le nombre maximal de requêtes /cmd/build traitées simultanément.
+
+    Variable d'environnement:
+        AGER_MAX_INFLIGHT_BUILDS: Au-delà, l'API répond 503; 0 pour désactiver.
+            Défaut: "256"
+
+    Returns:
+        Limite de concurrence
+    """
+    return int(os.getenv("AGER_MAX_INFLIGHT_BUILDS", "256"))
+
+
+def get_worlds_dir() -> str:
+    """Retourne le répertoire des mondes hébergés (routes ``/worlds/{world_id}/...``).
+
+    Variable d'environnement:
+        AGER_WORLDS_DIR: Un sous-répertoire par monde; un monde n'existe que si
+            son répertoire existe. Défaut: "./data/worlds"
+
+    Returns:
+        Chemin absolu ou relatif du répertoire
+    """
+    return os.getenv("AGER_WORLDS_DIR", "./data/worlds")
+
+
+def get_max_worlds() -> int:
+    """Retourne le nombre maximal de mondes chargés en même temps.
+
+    Variable d'environnement:
+        AGER_MAX_WORLDS: Au-delà, le monde le moins récemment utilisé est
+            déchargé. Défaut: "16"
+
+    Returns:
+        Nombre maximal de mondes résidents
+    """
+    return int(os.getenv("AGER_MAX_WORLDS", "16"))
+
+
+def get_world_idle_seconds() -> float:
+    """Retourne la durée d'inactivité après laquelle un monde est déchargé.
+
+    Variable d'environnement:
+        AGER_WORLD_IDLE_S: Secondes sans requête avant déchargement. Défaut: "600"
+
+    Returns:
+        Durée en secondes
+    """
+    return float(os.getenv("AGER_WORLD_IDLE_S", "600"))
+
+
+# Données de jeu livrées avec le paquet (ager/data/buildings/*.json)
+_PACKAGE_GAME_DATA_DIR = files("ager") / "data"
+
+
+def get_game_data_dir() -> str | None:
+    """Retourne le répertoire des données de jeu (catalogue des bâtiments).
+
+    Variable d'environnement:
+        AGER_GAME_DATA_DIR: Répertoire contenant ``buildings/``; "off" pour
+            désactiver le catalogue (constructions acceptées sans coût).
+            Défaut: les définitions livrées avec le paquet (``ager/data``)
+
+    Returns:
+        Chemin du répertoire, None si le catalogue est désactivé
+    """
+    value = os.getenv("AGER_GAME_DATA_DIR", str(_PACKAGE_GAME_DATA_DIR))
+    if value.lower() in ("", "0", "off", "none"):
+        return None
+    return value
+
+
+def get_game_data_cache_dir() -> str:
+    """Retourne le répertoire du cache compilé du catalogue.
+
+    Variable d'environnement:
+        AGER_GAME_DATA_CACHE: Répertoire des tables compilées, nommées par
+            empreinte des définitions. Défaut: "./data/cache"
+
+    Returns:
+        Chemin absolu ou relatif du répertoire
+    """
+    return os.getenv("AGER_GAME_DATA_CACHE", "./data/cache")
@@ -0,0 +1,264 @@
+"""Hébergement de plusieurs mondes dans un même processus.
+
+Chaque monde a son propre moteur, créé au premier accès par la fabrique du
+conteneur avec les chemins de stockage de son répertoire
+(``AGER_WORLDS_DIR/<world_id>``). Le registre garde au plus ``max_resident``
+mondes chargés et décharge (``flush`` puis ``close``) le moins récemment
+utilisé au-delà, ainsi que tout monde inactif depuis ``idle_seconds``.
+
+Un moteur est obtenu par ``lease()``: tant qu'un bail est en cours (requête
+ou lot de commandes), le monde n'est jamais déchargé. Un monde en cours de
+déchargement n'est pas rechargé avant la fin de son ``close``: deux moteurs
+ne partagent jamais les fichiers d'un même monde. Une fois un monde
+déchargé, ``on_unload`` permet d'oublier l'état qui lui est associé ailleurs
+(pipeline de commandes).
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from .ports import SimulationEngine
+from .settings import get_max_worlds, get_world_idle_seconds, get_worlds_dir
+
+logger = logging.getLogger(__name__)
+
+# Identifiant de monde: nom de répertoire sûr (pas de séparateur ni de "..")
+WORLD_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+WorldFactory = Callable[[str], SimulationEngine]
+UnloadListener = Callable[[str], None]
+
+
+class UnknownWorldError(LookupError):
+    """Identifiant de monde invalide ou monde non provisionné."""
+
+
+class _World:
+    """Monde résident: moteur (créé au premier bail), baux en cours, dernier usage."""
+
+    __slots__ = ("engine", "leases", "last_used", "lock")
+
+    def __init__(self, now: float) -> None:
+        self.engine: SimulationEngine | None = None
+        self.leases = 0
+        self.last_used = now
+        # Sérialise la création du moteur (les autres baux l'attendent)
+        self.lock = threading.Lock()
+
+
+class WorldRegistry:
+    """Moteurs des mondes, créés à la demande et déchargés par LRU ou inactivité."""
+
+    def __init__(
+        self,
+        factory: WorldFactory,
+        max_resident: int = 16,
+        idle_seconds: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+        on_unload: UnloadListener | None = None,
+    ) -> None:
+        """Crée un registre vide.
+
+        Args:
+            factory: Crée le moteur d'un monde à partir de son identifiant
+            max_resident: Nombre maximal de mondes chargés (hors mondes en bail)
+            idle_seconds: Inactivité après laquelle un monde est déchargé
+            clock: Horloge monotone, en secondes
+            on_unload: Appelé avec l'identifiant de chaque monde déchargé,
+                après la fermeture de son moteur
+        """
+        if max_resident <= 0:
+            raise ValueError("max_resident doit être strictement positif")
+        self._factory = factory
+        self.max_resident = max_resident
+        self.idle_seconds = idle_seconds
+        self._clock = clock
+        self._on_unload = on_unload
+        self._lock = threading.Lock()
+        # Ordre d'utilisation: le moins récemment utilisé en tête
+        self._worlds: OrderedDict[str, _World] = OrderedDict()
+        # Mondes en cours de déchargement -> signalé une fois ``close`` terminé
+        self._unloading: dict[str, threading.Event] = {}
+        self.loads = 0
+        self.unloads = 0
+
+    @property
+    def resident(self) -> list[str]:
+        """Identifiants des mondes chargés, du moins au plus récemment utilisé."""
+        with self._lock:
+            return [wid for wid, world in self._worlds.items() if world.engine is not None]
+
+    @contextmanager
+    def lease(self, world_id: str) -> Iterator[SimulationEngine]:
+        """Fournit le moteur d'un monde, chargé au besoin, pour la durée du bloc.
+
+        Args:
+            world_id: Identifiant du monde
+
+        Raises:
+            Toute exception de la fabrique (le monde n'est alors pas gardé)
+        """
+        now = self._clock()
+        with self._lock:
+            world = self._worlds.get(world_id)
+            if world is None:
+                world = self._worlds[world_id] = _World(now)
+            self._worlds.move_to_end(world_id)
+            world.leases += 1
+            world.last_used = now
+            victims = self._pick_victims(now)
+        self._unload(victims)
+        try:
+            yield self._ensure_loaded(world_id, world)
+        finally:
+            with self._lock:
+                world.leases -= 1
+                world.last_used = self._clock()
+
+    def evict_idle(self) -> list[str]:
+        """Décharge les mondes inactifs depuis ``idle_seconds`` (sans bail en cours).
+
+        Returns:
+            Identifiants des mondes déchargés
+        """
+        with self._lock:
+            victims = self._pick_victims(self._clock())
+        self._unload(victims)
+        return [wid for wid, _ in victims]
+
+    def close_all(self) -> None:
+        """Décharge tous les mondes sans bail en cours (arrêt de l'application)."""
+        with self._lock:
+            victims = [(wid, w) for wid, w in self._worlds.items() if not w.leases]
+            for wid, _ in victims:
+                self._detach(wid)
+        self._unload(victims)
+
+    # --- Interne ----------------------------------------------------------
+
+    def _ensure_loaded(self, world_id: str, world: _World) -> SimulationEngine:
+        with world.lock:
+            if world.engine is None:
+                unloading = self._unloading.get(world_id)
+                if unloading is not None:
+                    unloading.wait()  # l'ancien moteur libère ses fichiers
+                try:
+                    world.engine = self._factory(world_id)
+                except BaseException:
+                    with self._lock:
+                        if self._worlds.get(world_id) is world and world.leases <= 1:
+                            del self._worlds[world_id]
+                    raise
+                self.loads += 1
+                logger.info("World %s loaded", world_id)
+            return world.engine
+
+    def _pick_victims(self, now: float) -> list[tuple[str, _World]]:
+        """Retire du registre les mondes à décharger (sous ``_lock``)."""
+        victims = []
+        excess = len(self._worlds) - self.max_resident
+        for wid, world in list(self._worlds.items()):
+            if world.leases:
+                continue
+            if excess > 0 or now - world.last_used >= self.idle_seconds:
+                victims.append((wid, world))
+                self._detach(wid)
+                excess -= 1
+            else:
+                break  # les suivants sont plus récents
+        return victims
+
+    def _detach(self, world_id: str) -> None:
+        del self._worlds[world_id]
+        # Un déchargement encore en cours garde son événement: les baux qui
+        # l'attendent sont libérés quand il se termine
+        self._unloading.setdefault(world_id, threading.Event())
+
+    def _unload(self, victims: list[tuple[str, _World]]) -> None:
+        """Persiste puis ferme les moteurs détachés (hors de ``_lock``)."""
+        for world_id, world in victims:
+            try:
+                with world.lock:
+                    engine = world.engine
+                    world.engine = None
+                if engine is not None:
+                    for name in ("flush", "close"):
+                        method = getattr(engine, name, None)
+                        if callable(method):
+                            method()
+                    self.unloads += 1
+                    logger.info("World %s unloaded", world_id)
+            except Exception:
+                logger.exception("Failed to unload world %s", world_id)
+            finally:
+                with self._lock:
+                    event = self._unloading.pop(world_id, None)
+                if event is not None:
+                    event.set()
+            if self._on_unload is not None:
+                try:
+                    self._on_unload(world_id)
+                except Exception:
+                    logger.exception("Unload listener failed for world %s", world_id)
+
+
+def world_dir(world_id: str) -> Path:
+    """Répertoire de données d'un monde provisionné.
+
+    Raises:
+        UnknownWorldError: Si l'identifiant est invalide ou si le répertoire
+            n'existe pas (les mondes sont créés par l'exploitant, pas par l'API)
+    """
+    if not WORLD_ID_PATTERN.fullmatch(world_id):
+        raise UnknownWorldError(world_id)
+    path = Path(get_worlds_dir()) / world_id
+    if not path.is_dir():
+        raise UnknownWorldError(world_id)
+    return path
+
+
+_registry: WorldRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_worlds() -> WorldRegistry:
+    """Retourne le registre des mondes (créé au premier appel depuis les settings)."""
+    global _registry
+    if _registry is None:
+        from .commands import forget_pipeline
+        from .container import create_world_engine
+
+        with _registry_lock:
+            if _registry is None:
+                _registry = WorldRegistry(
+                    create_world_engine,
+                    get_max_worlds(),
+                    get_world_idle_seconds(),
+                    on_unload=forget_pipeline,
+                )
+    return _registry
+
+
+def evict_idle_worlds() -> list[str]:
+    """Décharge les mondes inactifs du registre, s'il a été créé."""
+    return _registry.evict_idle() if _registry is not None else []
+
+
+def close_worlds() -> None:
+    """Décharge tous les mondes du registre, s'il a été créé."""
+    if _registry is not None:
+        _registry.close_all()
+
+
+def reset_worlds() -> None:
+    """Oublie le registre courant (utile pour les tests)."""
+    global _registry
+    _registry = None
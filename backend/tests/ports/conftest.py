@@ -1,44 +1,96 @@
 """Fixtures pour les tests de contrat du port SimulationEngine."""
 
+import json
 import os
+import shutil
 import tempfile
 from pathlib import Path
 
 import pytest
 
-from ager.adapters.file_engine import FileStorageEngine
+from ager.adapters.event_engine import CHECKPOINT_PREFIX, EventSourcedEngine
+from ager.adapters.file_engine import FileStorageEngine, load_world
+from ager.adapters.hybrid_engine import HybridEngine
 from ager.adapters.memory_engine import MemoryEngine
+from ager.adapters.shared_engine import SharedMemoryEngine
 from ager.adapters.sql_engine import SQLiteEngine
+from ager.adapters.tiered_engine import TieredEngine
 from ager.ports import SimulationEngine
+from tools.transfer_storage import import_file_to_sql
 
 
 @pytest.fixture()
-def engine() -> SimulationEngine:
+def engine(request: pytest.FixtureRequest) -> SimulationEngine:
     """Fournit une instance fraîche du moteur pour chaque test.
 
     Le type de moteur est déterminé par la variable d'environnement TEST_ENGINE_IMPL:
     - "memory" (défaut): MemoryEngine
     - "file": FileStorageEngine avec stockage temporaire
     - "sql": SQLiteEngine avec base de données temporaire
+    - "hybrid": HybridEngine avec base de données temporaire
+    - "tiered": TieredEngine devant une base de données temporaire
+    - "events": EventSourcedEngine avec journal temporaire
+    - "shared": SharedMemoryEngine (segment retiré en fin de test)
 
     Cette fixture crée une nouvelle instance pour éviter le partage d'état entre tests.
     Elle est agnostique de l'implémentation : seule l'interface SimulationEngine compte.
     """
+    return _create_engine(request, None)
+
+
+@pytest.fixture()
+def populated_engine(request: pytest.FixtureRequest) -> SimulationEngine:
+    """Comme ``engine``, avec un monde de 40 villages chargé au démarrage.
+
+    Les villages sont écrits dans le désordre (ID décroissants): ni l'ordre
+    du fichier ni celui d'une table de hachage ne coïncident avec les IDs.
+    """
+    path = Path(tempfile.mkdtemp()) / "seed_world.json"
+    villages = {str(vid): {"id": vid, "name": f"V{vid}"} for vid in range(40, 0, -1)}
+    path.write_text(json.dumps({"villages": villages}), encoding="utf-8")
+    return _create_engine(request, path)
+
+
+def _create_engine(request: pytest.FixtureRequest, seed: Path | None) -> SimulationEngine:
+    """Crée le moteur de TEST_ENGINE_IMPL, chargé depuis ``seed`` si fourni."""
     engine_type = os.getenv("TEST_ENGINE_IMPL", "memory").lower()
+    tmpdir = Path(tempfile.mkdtemp())
 
     if engine_type == "memory":
-        return MemoryEngine()
+        memory = MemoryEngine()
+        if seed is not None:
+            memory.world = load_world(seed)
+        return memory
     elif engine_type == "file":
         # Créer un fichier temporaire pour chaque test
-        tmpdir = tempfile.mkdtemp()
-        storage_path = Path(tmpdir) / "test_world.json"
+        storage_path = tmpdir / "test_world.json"
+        if seed is not None:
+            shutil.copy(seed, storage_path)
         return FileStorageEngine(str(storage_path))
-    elif engine_type == "sql":
+    elif engine_type in ("sql", "hybrid", "tiered"):
         # Créer une base de données temporaire pour chaque test
-        tmpdir = tempfile.mkdtemp()
-        db_path = Path(tmpdir) / "test_ager.db"
+        db_path = tmpdir / "test_ager.db"
+        if seed is not None:
+            import_file_to_sql(seed, db_path)
+        if engine_type == "hybrid":
+            return HybridEngine(db_path)
+        if engine_type == "tiered":
+            return TieredEngine(SQLiteEngine(db_path), capacity=2)
         return SQLiteEngine(db_path)
+    elif engine_type == "events":
+        if seed is not None:
+            # Le monde chargé devient la genèse du journal
+            shutil.copy(seed, tmpdir / f"{CHECKPOINT_PREFIX}{0:012d}.json")
+        return EventSourcedEngine(tmpdir)
+    elif engine_type == "shared":
+        storage_path = tmpdir / "test_world.json"
+        if seed is not None:
+            shutil.copy(seed, storage_path)
+        shared = SharedMemoryEngine(storage_path)
+        request.addfinalizer(shared.close)
+        return shared
     else:
         raise ValueError(
-            f"TEST_ENGINE_IMPL invalide: {engine_type}. " "Valeurs: 'memory', 'file', 'sql'"
+            f"TEST_ENGINE_IMPL invalide: {engine_type}. "
+            "Valeurs: 'memory', 'file', 'sql', 'hybrid', 'tiered', 'events', 'shared'"
         )
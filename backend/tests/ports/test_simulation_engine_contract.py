@@ -131,3 +131,115 @@ def test_snapshot_consistency(engine):
         ids1 = {v.id for v in snap1}
         ids2 = {v.id for v in snap2}
         assert ids1 == ids2
+
+
+def test_villages_within_contains_village_at_center(engine):
+    """villages_within() retourne au moins le village situé au centre de la requête."""
+    villages = engine.snapshot()
+    if len(villages) > 0:
+        v = villages[0]
+        result = engine.villages_within(v.x, v.y, 1)
+        assert isinstance(result, list)
+        assert v.id in {found.id for found in result}
+
+
+def test_nearest_villages_sorted_and_bounded(engine):
+    """nearest_villages() retourne au plus n villages, du plus proche au plus lointain."""
+    villages = engine.snapshot()
+    result = engine.nearest_villages(0, 0, 1)
+    assert len(result) == min(1, len(villages))
+    everything = engine.nearest_villages(0, 0, len(villages) + 5)
+    assert len(everything) == len(villages)
+    distances = [v.x**2 + v.y**2 for v in everything]
+    assert distances == sorted(distances)
+
+
+def test_leaderboard_ranks_every_village(engine):
+    """leaderboard() classe tous les villages par score décroissant, rangs à partir de 1."""
+    villages = engine.snapshot()
+    entries = engine.leaderboard("total", len(villages) + 5, 0)
+    assert [e.rank for e in entries] == list(range(1, len(villages) + 1))
+    assert {e.villageId for e in entries} == {v.id for v in villages}
+    scores = [e.score for e in entries]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_village_rank_matches_leaderboard(engine):
+    """village_rank() retourne la même entrée que le classement, None si le village est inconnu."""
+    entries = engine.leaderboard("total", 10, 0)
+    if entries:
+        assert engine.village_rank(entries[0].villageId, "total") == entries[0]
+    assert engine.village_rank(999_999, "total") is None
+
+
+def test_projection_keeps_requested_fields(engine):
+    """snapshot(fields) et get_village(vid, fields) gardent les valeurs des champs demandés."""
+    full = engine.snapshot()
+    projected = engine.snapshot(frozenset({"id", "name"}))
+    assert [(v.id, v.name) for v in projected] == [(v.id, v.name) for v in full]
+    if full:
+        village = engine.get_village(full[0].id, frozenset({"id", "resources"}))
+        assert village is not None
+        assert village.resources == full[0].resources
+
+
+def test_adjust_resources_clamps_at_zero(engine):
+    """adjust_resources() ajoute les deltas, borne à 0, ignore les villages inconnus."""
+    village = engine.snapshot()[0]
+    before = village.resources
+    changed = engine.adjust_resources(
+        {village.id: (5, -(before.clay + 1), 0, 0), 999_999: (1, 1, 1, 1)}
+    )
+    assert changed == 1
+    after = engine.get_village(village.id).resources
+    assert (after.wood, after.clay, after.iron, after.crop) == (
+        before.wood + 5,
+        0,
+        before.iron,
+        before.crop,
+    )
+    assert engine.adjust_resources({}) == 0
+
+
+def test_adjust_resources_updates_leaderboard(engine):
+    """Le classement suit les ressources modifiées par adjust_resources()."""
+    villages = engine.snapshot()
+    last = engine.leaderboard("total", len(villages), 0)[-1]
+    engine.adjust_resources({last.villageId: (10**9, 0, 0, 0)})
+    entry = engine.village_rank(last.villageId, "total")
+    assert entry is not None and entry.rank == 1 and entry.score == last.score + 10**9
+
+
+def test_stats_follow_world_size(engine):
+    """stats() compte les villages et les éléments de queue, à jour après une construction."""
+    villages = engine.snapshot()
+    before = engine.stats()
+    assert before.villages == len(villages)
+    assert before.queue_items == sum(len(v.queue) for v in villages)
+    assert engine.queue_build(BuildCmd(villageId=villages[0].id, building="Farm", levelTarget=1))
+    after = engine.stats()
+    assert (after.villages, after.queue_items) == (before.villages, before.queue_items + 1)
+
+
+def test_snapshot_ordered_by_id(populated_engine):
+    """snapshot() retourne les villages par ID croissant, quel que soit l'ordre de stockage."""
+    ids = [v.id for v in populated_engine.snapshot()]
+    assert ids == list(range(1, 41))
+    projected = populated_engine.snapshot(frozenset({"id", "name"}))
+    assert [v.id for v in projected] == ids
+
+
+def test_queue_builds_applies_in_order(engine):
+    """queue_builds() applique le lot dans l'ordre et répond pour chaque commande."""
+    vid = engine.snapshot()[0].id
+    before = engine.get_village(vid).queue
+    cmds = [
+        BuildCmd(villageId=vid, building="Farm", levelTarget=1),
+        BuildCmd(villageId=999_999, building="Farm", levelTarget=1),
+        BuildCmd(villageId=vid, building="", levelTarget=1),
+        BuildCmd(villageId=vid, building="Farm", levelTarget=2),
+    ]
+    assert engine.queue_builds(cmds) == [True, False, False, True]
+    assert engine.queue_builds([]) == []
+    assert engine.get_village(vid).queue == (*before, "Farm -> L1", "Farm -> L2")
+    assert engine.stats().queue_items == len(before) + 2
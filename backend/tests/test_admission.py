@@ -0,0 +1,104 @@
+"""Tests du contrôle d'admission de /cmd/build (seaux à jetons, concurrence)."""
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from ager import admission
+from ager.admission import AdmissionController, AdmissionError, TokenBucketLimiter
+from ager.app import app
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_bucket_allows_burst_then_refills():
+    """Un seau accepte ``burst`` requêtes d'affilée puis une par 1/rate secondes."""
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(rate=2, burst=3, clock=clock)
+    assert [limiter.acquire("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("a") == pytest.approx(0.5)
+    assert limiter.acquire("b") == 0.0  # seaux indépendants
+
+    clock.now = 0.5
+    assert limiter.acquire("a") == 0.0
+    assert limiter.acquire("a") > 0
+
+
+def test_idle_buckets_are_evicted():
+    """Un seau redevenu plein est oublié: la mémoire suit les clés actives."""
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(rate=10, burst=5, clock=clock)
+    for key in range(1000):
+        limiter.acquire(key)
+    assert len(limiter) == 1000
+
+    clock.now = 0.5  # temps de remplissage complet (5 / 10)
+    limiter.acquire("fresh")
+    assert len(limiter) == 1
+
+
+def test_disabled_limiter_keeps_no_state():
+    """Avec un débit nul, tout est accepté et aucun seau n'est créé."""
+    limiter = TokenBucketLimiter(rate=0, burst=1)
+    assert all(limiter.acquire("a") == 0.0 for _ in range(100))
+    assert len(limiter) == 0
+
+
+def test_controller_limits_and_refunds():
+    """Un refus pour le village ne débite pas le client; la concurrence est bornée."""
+    clock = FakeClock()
+    controller = AdmissionController(
+        TokenBucketLimiter(rate=1, burst=2, clock=clock),
+        TokenBucketLimiter(rate=1, burst=1, clock=clock),
+        max_in_flight=1,
+    )
+    controller.admit("c", 1)
+    assert controller.in_flight == 1
+    with pytest.raises(AdmissionError) as exc:
+        controller.admit("c", 2)
+    assert (exc.value.reason, exc.value.status_code) == ("concurrency", 503)
+    controller.release()
+    assert controller.in_flight == 0
+
+    with pytest.raises(AdmissionError) as exc:
+        controller.admit("c", 1)
+    assert (exc.value.reason, exc.value.status_code, exc.value.retry_after) == ("village", 429, 1)
+
+    # Le jeton client du refus précédent a été rendu: un autre village passe
+    controller.admit("c", 2)
+    controller.release()
+    with pytest.raises(AdmissionError) as exc:
+        controller.admit("c", 3)
+    assert exc.value.reason == "client"
+
+
+@pytest.fixture()
+def tight_admission(monkeypatch):
+    controller = AdmissionController(
+        TokenBucketLimiter(rate=0.1, burst=10), TokenBucketLimiter(rate=0.1, burst=2)
+    )
+    monkeypatch.setattr(admission, "_admission", controller)
+    return controller
+
+
+@pytest.mark.asyncio
+async def test_cmd_build_returns_429_with_retry_after(tight_admission):
+    """Au-delà de la rafale d'un village, /cmd/build répond 429 avec Retry-After."""
+    transport = ASGITransport(app=app)
+    payload = {"villageId": 1, "building": "farm", "levelTarget": 1}
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        statuses = [
+            (await ac.post("/cmd/build", params={"wait": "false"}, json=payload)).status_code
+            for _ in range(2)
+        ]
+        assert statuses == [202, 202]
+        r = await ac.post("/cmd/build", json=payload)
+        assert r.status_code == 429
+        assert r.headers["Retry-After"] == "10"
+        assert "village" in r.json()["detail"]
+    assert tight_admission.in_flight == 0
@@ -24,7 +24,7 @@ async def test_cmd_build():
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         r = await ac.post(
-            "/cmd/build", json={"villageId": 1, "building": "LumberCamp", "levelTarget": 2}
+            "/cmd/build", json={"villageId": 1, "building": "woodcutter", "levelTarget": 2}
         )
         assert r.status_code == 200
         assert r.json()["accepted"] is True
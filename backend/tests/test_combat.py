@@ -0,0 +1,157 @@
+"""Tests de la résolution des combats par lots (ager.combat)."""
+
+import random
+
+import pytest
+
+from ager import combat
+from ager.adapters.memory_engine import MemoryEngine
+from ager.combat import UNITS, Battle, CombatQueue, resolve_battles, resolve_tick
+from ager.models import Resources, Village
+
+STOCK = Resources(wood=100, clay=200, iron=300, crop=400)
+
+
+def _army(legionnaires=0, praetorians=0, imperians=0, equites=0):
+    return (legionnaires, praetorians, imperians, equites)
+
+
+@pytest.fixture(params=[False, True], ids=["python", "numpy"])
+def vectorized(request):
+    """Chaque test de règle tourne en Python pur et, si installé, avec NumPy."""
+    if request.param:
+        pytest.importorskip("numpy")
+    return request.param
+
+
+def test_attacker_wins_and_loots(vectorized):
+    """A > D: l'attaquant perd (D/A)^1.5 de ses unités et pille selon sa capacité."""
+    battle = Battle(1, 2, _army(legionnaires=10), _army(praetorians=2))
+    results = resolve_battles([battle], {2: STOCK}, vectorized)
+    # A = 400, D = 2 x 65 + 10 = 140: pertes 10 x 0.35^1.5 = 2.07 -> 2
+    assert results.attacker_won == [True]
+    assert results.attack_survivors == [[8, 0, 0, 0]]
+    assert results.defense_survivors == [[0, 0, 0, 0]]
+    # Capacité 8 x 50 = 400 sur un stock de 1000: 40 % de chaque ressource
+    assert results.loot == [[40, 80, 120, 160]]
+    assert results.deltas == {1: (40, 80, 120, 160), 2: (-40, -80, -120, -160)}
+
+
+def test_defender_wins_without_loot(vectorized):
+    """A <= D: l'attaquant perd tout, le défenseur (A/D)^1.5, rien n'est pillé."""
+    battle = Battle(1, 2, _army(legionnaires=1), _army(praetorians=10))
+    results = resolve_battles([battle], {2: STOCK}, vectorized)
+    # A = 40, D = 660: pertes 10 x (40/660)^1.5 = 0.15 -> 0
+    assert results.attacker_won == [False]
+    assert results.attack_survivors == [[0, 0, 0, 0]]
+    assert results.defense_survivors == [[0, 10, 0, 0]]
+    assert results.loot == [[0, 0, 0, 0]]
+    assert results.deltas == {}
+
+
+def test_attackers_share_defender_stock(vectorized):
+    """Plusieurs attaquants d'un village ne pillent jamais plus que son stock."""
+    battles = [Battle(vid, 9, _army(equites=50), _army()) for vid in (1, 2, 3)]
+    results = resolve_battles(battles, {9: STOCK}, vectorized)
+    assert results.loot == [[33, 66, 100, 133]] * 3
+    assert results.deltas[9] == (-99, -198, -300, -399)
+
+
+def test_numpy_matches_pure_python():
+    """Les deux implémentations donnent exactement les mêmes résultats."""
+    pytest.importorskip("numpy")
+    rng = random.Random(7)
+    battles = [
+        Battle(
+            rng.randint(1, 50),
+            rng.randint(1, 50),
+            tuple(rng.randint(0, 300) for _ in UNITS),
+            tuple(rng.randint(0, 300) for _ in UNITS),
+        )
+        for _ in range(2000)
+    ]
+    stocks = {
+        vid: Resources(**{r: rng.randint(0, 5000) for r in Resources.model_fields})
+        for vid in range(1, 51)
+    }
+    assert resolve_battles(battles, stocks, True) == resolve_battles(battles, stocks, False)
+
+
+def test_vectorized_requires_numpy(monkeypatch):
+    """``vectorized=True`` sans NumPy échoue; ``None`` se rabat sur Python pur."""
+    monkeypatch.setattr(combat, "_numpy", lambda: None)
+    battle = Battle(1, 2, _army(legionnaires=10), _army())
+    with pytest.raises(ModuleNotFoundError):
+        resolve_battles([battle], {}, vectorized=True)
+    assert resolve_battles([battle], {}).attacker_won == [True]
+
+
+def test_army_width_is_validated():
+    """Une armée doit avoir un effectif par type d'unité."""
+    with pytest.raises(ValueError):
+        resolve_battles([Battle(1, 2, (1, 2), _army())], {})
+
+
+def test_queue_returns_due_battles_in_order():
+    """Les combats dus sont rendus par tick, puis dans l'ordre de planification."""
+    queue = CombatQueue()
+    late, first, second = (Battle(i, 0, _army(), _army()) for i in range(3))
+    queue.schedule(late, tick=5)
+    queue.schedule(first, tick=2)
+    queue.schedule(second, tick=2)
+    assert queue.pop_due(1) == []
+    assert queue.pop_due(3) == [first, second]
+    assert len(queue) == 1
+
+
+def test_resolve_tick_applies_loot_in_one_write():
+    """Un tick lit les seuls défenseurs puis écrit tout le pillage en un seul transfert."""
+    engine = MemoryEngine()
+    engine.world = {
+        1: Village(id=1, name="A", resources=Resources(wood=0, clay=0, iron=0, crop=0)),
+        2: Village(id=2, name="B", resources=STOCK),
+        3: Village(id=3, name="C"),
+    }
+    reads, writes = [], []
+    get_villages, transfer = engine.get_villages, engine.transfer_resources
+    engine.get_villages = lambda vids, fields=None: reads.append(vids) or get_villages(vids, fields)
+    engine.transfer_resources = lambda transfers: writes.append(transfers) or transfer(transfers)
+    engine.snapshot = None  # le monde entier n'est jamais lu
+
+    queue = CombatQueue()
+    queue.schedule(Battle(1, 2, _army(legionnaires=10), _army(praetorians=2)), tick=1)
+    queue.schedule(Battle(2, 1, _army(legionnaires=1), _army(praetorians=10)), tick=1)
+    battles, results = resolve_tick(engine, queue, tick=1)
+
+    assert len(battles) == 2 and results.attacker_won == [True, False]
+    assert reads == [[1, 2]] and len(writes) == 1
+    assert engine.get_village(1).resources == Resources(wood=40, clay=80, iron=120, crop=160)
+    assert engine.get_village(2).resources == Resources(wood=60, clay=120, iron=180, crop=240)
+    assert resolve_tick(engine, queue, tick=2)[0] == []
+
+
+def test_resolve_tick_loot_bounded_by_current_stock():
+    """Un défenseur vidé entre lecture et écriture: l'attaquant ne gagne que ce qui reste."""
+    engine = MemoryEngine()
+    engine.world = {
+        1: Village(id=1, name="A", resources=Resources(wood=0, clay=0, iron=0, crop=0)),
+        2: Village(id=2, name="B", resources=STOCK),
+    }
+    get_villages = engine.get_villages
+
+    def read_then_drain(vids, fields=None):
+        villages = get_villages(vids, fields)
+        # Écriture concurrente entre la lecture des stocks et le pillage
+        engine.adjust_resources({2: (-95, -200, -300, -400)})
+        return villages
+
+    engine.get_villages = read_then_drain
+    queue = CombatQueue()
+    queue.schedule(Battle(1, 2, _army(legionnaires=10), _army(praetorians=2)), tick=1)
+    _, results = resolve_tick(engine, queue, tick=1)
+
+    # Butin calculé sur les stocks lus: (40, 80, 120, 160); restait (5, 0, 0, 0)
+    assert results.loot == [[5, 0, 0, 0]]
+    assert results.deltas == {1: (5, 0, 0, 0), 2: (-5, 0, 0, 0)}
+    assert engine.get_village(1).resources == Resources(wood=5, clay=0, iron=0, crop=0)
+    assert engine.get_village(2).resources == Resources(wood=0, clay=0, iron=0, crop=0)
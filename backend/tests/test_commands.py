@@ -0,0 +1,198 @@
+"""Tests du pipeline de commandes (file bornée, écrivain unique)."""
+
+import asyncio
+import threading
+from collections.abc import Sequence
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ager import commands
+from ager.adapters.file_engine import FileStorageEngine
+from ager.adapters.memory_engine import MemoryEngine
+from ager.adapters.sql_engine import SQLiteEngine
+from ager.app import app
+from ager.commands import CommandPipeline, PipelineFullError
+from ager.metrics import COMMAND_BATCH_SIZE
+from ager.models import BuildCmd
+
+
+def _client():
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def _cmd(level: int, vid: int = 1) -> BuildCmd:
+    return BuildCmd(villageId=vid, building="farm", levelTarget=level)
+
+
+class BlockingEngine(MemoryEngine):
+    """Moteur mémoire dont queue_builds attend l'événement ``release``."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.release = threading.Event()
+
+    def queue_builds(self, cmds: Sequence[BuildCmd]) -> list[bool]:
+        self.release.wait(5)
+        return super().queue_builds(cmds)
+
+
+@pytest.fixture
+def pipeline_engine():
+    """Installe un pipeline sur un moteur dédié pour la boucle du test."""
+    engine = BlockingEngine()
+    engine.release.set()
+
+    def install(**kwargs):
+        commands._pipeline = CommandPipeline(lambda: engine, **kwargs)
+        return commands._pipeline
+
+    yield engine, install
+    engine.release.set()
+    commands._pipeline = None
+
+
+async def test_cmd_build_waits_for_result():
+    """Par défaut, la réponse arrive une fois la commande appliquée."""
+    async with _client() as ac:
+        r = await ac.post("/cmd/build", json={"villageId": 1, "building": "farm", "levelTarget": 3})
+        assert r.status_code == 200
+        body = r.json()
+        assert body["accepted"] is True
+
+        status = await ac.get(f"/cmd/{body['commandId']}")
+    assert status.json()["status"] == "accepted"
+
+
+async def test_cmd_build_no_wait_returns_202(pipeline_engine):
+    """Avec wait=false, la réponse 202 donne l'identifiant à suivre."""
+    engine, install = pipeline_engine
+    pipeline = install()
+    engine.release.clear()
+    async with _client() as ac:
+        r = await ac.post(
+            "/cmd/build",
+            params={"wait": "false"},
+            json={"villageId": 1, "building": "farm", "levelTarget": 2},
+        )
+        assert r.status_code == 202
+        command_id = r.json()["commandId"]
+        assert r.headers["Location"] == f"/cmd/{command_id}"
+        assert (await ac.get(f"/cmd/{command_id}")).json()["status"] == "pending"
+
+        engine.release.set()
+        await pipeline.join()
+        assert (await ac.get(f"/cmd/{command_id}")).json()["status"] == "accepted"
+        assert (await ac.get("/cmd/unknown")).status_code == 404
+    assert engine.get_village(1).queue == ("farm -> L2",)
+
+
+async def test_full_queue_returns_503(pipeline_engine):
+    """File pleine: 503 avec Retry-After plutôt qu'une latence sans borne."""
+    engine, install = pipeline_engine
+    pipeline = install(maxsize=1)
+    engine.release.clear()
+    payload = {"villageId": 1, "building": "farm", "levelTarget": 1}
+    async with _client() as ac:
+        responses = [
+            await ac.post("/cmd/build", params={"wait": "false"}, json=payload) for _ in range(3)
+        ]
+        assert responses[0].status_code == 202
+        assert responses[-1].status_code == 503
+        assert int(responses[-1].headers["Retry-After"]) >= 1
+
+        engine.release.set()
+        await pipeline.join()
+    accepted = sum(r.status_code == 202 for r in responses)
+    assert len(engine.get_village(1).queue) == accepted
+
+
+async def test_writer_applies_batches_in_order(pipeline_engine):
+    """Les commandes déposées ensemble sont appliquées en un lot, dans l'ordre."""
+    engine, install = pipeline_engine
+    pipeline = install(max_batch=64)
+    before = COMMAND_BATCH_SIZE.count()
+
+    records = [pipeline.submit(_cmd(level)) for level in range(1, 11)]
+    statuses = await asyncio.gather(*(r.done for r in records))
+
+    assert statuses == ["accepted"] * 10
+    assert COMMAND_BATCH_SIZE.count() == before + 1
+    assert engine.get_village(1).queue == tuple(f"farm -> L{level}" for level in range(1, 11))
+
+
+async def test_failed_and_rejected_commands(pipeline_engine):
+    """Un refus n'empêche pas le reste du lot; une exception fait échouer tout le lot."""
+    engine, install = pipeline_engine
+    pipeline = install()
+    original = engine.queue_builds
+
+    def flaky(cmds: Sequence[BuildCmd]) -> list[bool]:
+        if any(cmd.levelTarget == 2 for cmd in cmds):
+            raise RuntimeError("boom")
+        return original(cmds)
+
+    engine.queue_builds = flaky
+    records = [pipeline.submit(_cmd(1)), pipeline.submit(_cmd(3, 99))]
+    await pipeline.join()
+    assert [r.status for r in records] == ["accepted", "rejected"]
+
+    records = [pipeline.submit(_cmd(2)), pipeline.submit(_cmd(4))]
+    await pipeline.join()
+    assert [r.status for r in records] == ["failed", "failed"]
+    assert "boom" in records[1].error
+    assert engine.get_village(1).queue == ("farm -> L1",)
+
+
+async def test_drained_batch_is_saved_once(tmp_path, monkeypatch):
+    """Un lot vidé de la file coûte une sauvegarde (fichier) ou un commit (SQLite)."""
+    file_engine = FileStorageEngine(str(tmp_path / "world.json"))
+    saves = []
+    save_world = file_engine._save_world
+    monkeypatch.setattr(file_engine, "_save_world", lambda v: (saves.append(1), save_world(v)))
+
+    sql_engine = SQLiteEngine(tmp_path / "ager.db")
+    commits = []
+
+    def count_commit(session: Session) -> None:
+        commits.append(1)
+
+    event.listen(Session, "after_commit", count_commit)
+    try:
+        for engine in (file_engine, sql_engine):
+            pipeline = CommandPipeline(lambda engine=engine: engine, max_batch=256)
+            records = [pipeline.submit(_cmd(level)) for level in range(1, 201)]
+            records.append(pipeline.submit(_cmd(1, vid=99)))
+            await pipeline.join()
+            assert [r.status for r in records] == ["accepted"] * 200 + ["rejected"]
+            assert len(engine.get_village(1).queue) == 200
+    finally:
+        event.remove(Session, "after_commit", count_commit)
+    assert len(saves) == 1
+    assert len(commits) == 1
+
+
+async def test_submit_raises_when_full(pipeline_engine):
+    """submit lève PipelineFullError au-delà de la capacité."""
+    engine, install = pipeline_engine
+    pipeline = install(maxsize=2)
+    engine.release.clear()
+    pipeline.submit(_cmd(1))
+    pipeline.submit(_cmd(2))
+    with pytest.raises(PipelineFullError):
+        pipeline.submit(_cmd(3))
+    engine.release.set()
+    await pipeline.join()
+
+
+async def test_pipeline_metrics_exposed():
+    """Profondeur de file, tailles de lot et attentes sont exposées sur /metrics."""
+    async with _client() as ac:
+        await ac.post("/cmd/build", json={"villageId": 1, "building": "farm", "levelTarget": 1})
+        text = (await ac.get("/metrics")).text
+    assert "ager_command_queue_depth " in text
+    assert "ager_command_batch_size_count " in text
+    assert "ager_command_wait_seconds_count " in text
+    assert 'ager_commands_total{status="accepted"}' in text
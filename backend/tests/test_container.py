@@ -0,0 +1,64 @@
+"""Tests du conteneur et du registre de moteurs."""
+
+from importlib.metadata import EntryPoint
+
+import pytest
+
+from ager import container
+from ager.adapters.memory_engine import MemoryEngine
+
+
+@pytest.fixture()
+def fresh_container(monkeypatch):
+    """Isole le singleton et le registre du conteneur."""
+    monkeypatch.setattr(container, "_factories", dict(container._factories))
+    container.reset_engine()
+    yield container
+    container.reset_engine()
+
+
+def test_builtin_engines_registered(fresh_container):
+    """Les moteurs intégrés sont sélectionnables."""
+    engines = {"memory", "file", "sql", "hybrid", "tiered", "events"}
+    assert engines <= set(fresh_container.available_engines())
+
+
+def test_get_engine_uses_selected_engine(fresh_container, monkeypatch):
+    """AGER_ENGINE sélectionne la fabrique enregistrée (insensible à la casse)."""
+    monkeypatch.setenv("AGER_ENGINE", "Memory")
+    engine = fresh_container.get_engine()
+    assert isinstance(engine, MemoryEngine)
+    assert fresh_container.get_engine() is engine
+
+
+def test_register_custom_engine(fresh_container, monkeypatch):
+    """Un moteur enregistré devient sélectionnable."""
+    custom = MemoryEngine()
+    fresh_container.register_engine("custom", lambda: custom)
+    monkeypatch.setenv("AGER_ENGINE", "custom")
+    assert fresh_container.get_engine() is custom
+
+
+def test_unknown_engine_raises(fresh_container, monkeypatch):
+    """Un nom inconnu du registre et des entry points est refusé."""
+    monkeypatch.setenv("AGER_ENGINE", "nope")
+    with pytest.raises(ValueError, match="nope"):
+        fresh_container.get_engine()
+
+
+def test_entry_point_discovery(fresh_container, monkeypatch):
+    """Les moteurs tiers sont découverts via le groupe d'entry points."""
+    ep = EntryPoint(
+        name="thirdparty",
+        value="ager.adapters.memory_engine:MemoryEngine",
+        group=container.ENTRY_POINT_GROUP,
+    )
+
+    def fake_entry_points(group):
+        return [ep] if group == container.ENTRY_POINT_GROUP else []
+
+    monkeypatch.setattr("importlib.metadata.entry_points", fake_entry_points)
+    monkeypatch.setenv("AGER_ENGINE", "thirdparty")
+
+    assert isinstance(fresh_container.get_engine(), MemoryEngine)
+    assert "thirdparty" in fresh_container.available_engines()
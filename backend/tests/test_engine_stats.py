@@ -0,0 +1,182 @@
+"""Tests des statistiques des moteurs (``stats()``) et de la route /debug/engine."""
+
+import threading
+import time
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from ager.adapters.event_engine import EventSourcedEngine
+from ager.adapters.file_engine import FileStorageEngine
+from ager.adapters.footprint import village_bytes, world_footprint
+from ager.adapters.hybrid_engine import HybridEngine
+from ager.adapters.memory_engine import MemoryEngine
+from ager.adapters.shared_engine import SharedMemoryEngine
+from ager.adapters.sql_engine import SQLiteEngine
+from ager.adapters.tiered_engine import TieredEngine
+from ager.app import app
+from ager.models import BuildCmd, Resources, Village
+
+BUILD = BuildCmd(villageId=1, building="farm", levelTarget=1)
+
+
+@pytest.fixture()
+def closing():
+    """Ferme en fin de test les moteurs qui ont une méthode ``close``."""
+    engines = []
+
+    def track(engine):
+        engines.append(engine)
+        return engine
+
+    yield track
+    for engine in reversed(engines):
+        close = getattr(engine, "close", None)
+        if callable(close):
+            close()
+
+
+def test_memory_footprint_follows_counters():
+    """L'empreinte mémoire est estimée à partir des compteurs du monde."""
+    engine = MemoryEngine()
+    engine.world = {
+        vid: Village(id=vid, name=f"V{vid}", resources=Resources(), queue=["farm -> L1"])
+        for vid in range(1, 101)
+    }
+    stats = engine.stats()
+    assert (stats.villages, stats.queue_items) == (100, 100)
+    assert stats.memory_bytes == world_footprint(100, 100) > 100 * village_bytes()
+    assert stats.storage_bytes is None and stats.sqlite is None
+
+
+def test_file_engine_reports_file_and_last_save(tmp_path):
+    """Le moteur fichier rapporte la taille du JSON et la durée de la dernière sauvegarde."""
+    engine = FileStorageEngine(str(tmp_path / "world.json"))
+    assert engine.stats().last_persist_seconds is None
+    assert engine.queue_build(BUILD)
+    stats = engine.stats()
+    assert stats.storage_bytes == (tmp_path / "world.json").stat().st_size
+    assert stats.last_persist_seconds is not None and stats.queue_items == 1
+
+
+def test_sqlite_page_and_wal_stats(tmp_path, closing):
+    """SQLiteEngine rapporte ses pages, son WAL et la durée du dernier commit."""
+    engine = closing(SQLiteEngine(tmp_path / "ager.db"))
+    assert engine.queue_build(BUILD)
+    stats = engine.stats()
+    sqlite = stats.sqlite
+    assert sqlite is not None and sqlite.page_size > 0 and sqlite.page_count > 0
+    assert sqlite.wal_bytes == (tmp_path / "ager.db-wal").stat().st_size
+    assert sqlite.wal_frames > 0
+    assert stats.storage_bytes >= sqlite.page_size * sqlite.page_count
+    assert stats.last_persist_seconds is not None
+    assert (stats.villages, stats.queue_items) == (1, 1)
+
+
+def test_sqlite_counters_are_maintained(tmp_path, closing):
+    """Après le comptage initial, chaque construction acceptée incrémente les compteurs."""
+    engine = closing(SQLiteEngine(tmp_path / "ager.db"))
+    assert engine.stats().queue_items == 0
+    for level in range(1, 4):
+        assert engine.queue_build(BuildCmd(villageId=1, building="farm", levelTarget=level))
+    assert engine._counts == [1, 3]
+    assert engine.stats().queue_items == 3
+
+
+def test_sqlite_counter_ignores_rolled_back_batches(tmp_path, closing):
+    """Une construction d'un lot annulé puis rejoué n'est comptée qu'à son commit."""
+    engine = closing(SQLiteEngine(tmp_path / "ager.db"))
+    assert engine.stats().queue_items == 0
+
+    def fail(session):
+        raise RuntimeError("boom")
+
+    # Retenir le writer pour que la construction et ``fail`` forment un seul lot
+    running, gate = threading.Event(), threading.Event()
+
+    def hold(session):
+        running.set()
+        return gate.wait(5)
+
+    engine._writer.submit(hold)
+    running.wait(5)
+    build = threading.Thread(target=engine.queue_build, args=(BUILD,))
+    build.start()
+    while engine._writer._queue.qsize() < 1:
+        time.sleep(0.001)
+    failed = engine._writer.submit(fail)
+    gate.set()
+    build.join(timeout=5)
+    assert isinstance(failed.exception(timeout=5), RuntimeError)
+    assert engine.stats().queue_items == 1
+
+
+def test_hybrid_reports_pending_and_sqlite(tmp_path, closing):
+    """Le moteur hybride ajoute les écritures en attente et les stats de sa base."""
+    engine = closing(HybridEngine(tmp_path / "ager.db", max_lag=60))
+    assert engine.queue_build(BUILD)
+    assert engine.stats().pending_writes == 1
+    engine.flush()
+    stats = engine.stats()
+    assert stats.pending_writes == 0 and stats.last_persist_seconds is not None
+    assert stats.sqlite is not None and stats.memory_bytes is not None
+
+
+def test_tiered_reports_cache(tmp_path, closing):
+    """Le moteur tiered complète les stats du stockage avec celles du cache."""
+    engine = closing(TieredEngine(SQLiteEngine(tmp_path / "ager.db"), capacity=2))
+    engine.get_village(1)
+    engine.get_village(1)
+    stats = engine.stats()
+    assert stats.engine == "TieredEngine(SQLiteEngine)"
+    assert stats.cache.model_dump() == {
+        "resident": 1,
+        "capacity": 2,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 0,
+    }
+    assert stats.sqlite is not None
+
+
+def test_event_engine_storage_counter(tmp_path, closing):
+    """La taille du journal est tenue à jour sans relister le répertoire."""
+    engine = closing(EventSourcedEngine(tmp_path, checkpoint_every=2))
+    for level in range(1, 4):
+        assert engine.queue_build(BuildCmd(villageId=1, building="farm", levelTarget=level))
+    engine.wait_checkpoint()
+    on_disk = sum(p.stat().st_size for p in tmp_path.iterdir())
+    stats = engine.stats()
+    assert stats.storage_bytes == on_disk
+    assert stats.last_persist_seconds is not None and stats.queue_items == 3
+
+
+def test_shared_engine_counters_in_header(tmp_path, closing):
+    """Les compteurs du moteur partagé sont lus dans l'en-tête du segment."""
+    writer = closing(SharedMemoryEngine(tmp_path / "world.json", timeout=5))
+    reader = closing(SharedMemoryEngine(tmp_path / "world.json", timeout=5))
+    assert reader.queue_build(BUILD)
+    stats = reader.stats()
+    assert (stats.villages, stats.queue_items) == (1, 1)
+    assert stats.memory_bytes > 0 and stats.last_persist_seconds is None
+    writer.flush()
+    assert writer.stats().last_persist_seconds is not None
+
+
+@pytest.mark.asyncio
+async def test_debug_engine_route(monkeypatch):
+    """Sans AGER_DEBUG_TOKEN la route est absente; avec, elle exige l'en-tête."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        monkeypatch.delenv("AGER_DEBUG_TOKEN", raising=False)
+        assert (await ac.get("/debug/engine")).status_code == 404
+        r = await ac.get("/debug/engine", headers={"X-Ager-Debug-Token": ""})
+        assert r.status_code == 404
+
+        monkeypatch.setenv("AGER_DEBUG_TOKEN", "secret")
+        assert (await ac.get("/debug/engine")).status_code == 403
+        r = await ac.get("/debug/engine", headers={"X-Ager-Debug-Token": "wrong"})
+        assert r.status_code == 403
+        r = await ac.get("/debug/engine", headers={"X-Ager-Debug-Token": "secret"})
+        assert r.status_code == 200
+        assert r.json()["villages"] >= 1 and "queue_items" in r.json()
@@ -0,0 +1,187 @@
+"""Tests du moteur à journal de commandes (EventSourcedEngine) et du rejeu."""
+
+import pytest
+
+from ager import container
+from ager.adapters.event_engine import EventSourcedEngine, list_checkpoints
+from ager.adapters.file_engine import FileStorageEngine
+from ager.models import BuildCmd
+from tools.replay_events import main, replay
+
+
+def _cmd(level: int, vid: int = 1) -> BuildCmd:
+    return BuildCmd(villageId=vid, building="farm", levelTarget=level)
+
+
+def _queue(engine) -> list[str]:
+    return list(engine.get_village(1).queue)
+
+
+def test_restart_replays_log(tmp_path):
+    """Les commandes journalisées sont retrouvées après redémarrage."""
+    eng = EventSourcedEngine(tmp_path)
+    for level in range(1, 6):
+        assert eng.queue_build(_cmd(level))
+    eng.close()
+
+    restarted = EventSourcedEngine(tmp_path)
+    assert _queue(restarted) == [f"farm -> L{level}" for level in range(1, 6)]
+    assert restarted.seq == 5
+    assert restarted.replayed == 5
+
+
+def test_resource_adjustments_are_replayed(tmp_path):
+    """Un ajustement de ressources est journalisé comme un événement et rejoué."""
+    eng = EventSourcedEngine(tmp_path)
+    before = eng.get_village(1).resources
+    assert eng.adjust_resources({1: (7, 0, 0, 0), 99: (1, 1, 1, 1)}) == 1
+    eng.close()
+
+    restarted = EventSourcedEngine(tmp_path)
+    assert restarted.get_village(1).resources.wood == before.wood + 7
+    assert restarted.seq == 1
+
+
+def test_public_mutators_are_journaled_or_refused(tmp_path):
+    """apply_build hérité est journalisé; remplacer le monde est refusé."""
+    eng = EventSourcedEngine(tmp_path)
+    assert eng.apply_build(_cmd(1), (100, 0, 0, 0))
+    assert not eng.apply_build(_cmd(2, vid=99), (0, 0, 0, 0))
+    with pytest.raises(AttributeError):
+        eng.world = {}
+    eng.close()
+
+    restarted = EventSourcedEngine(tmp_path)
+    assert _queue(restarted) == ["farm -> L1"]
+    assert restarted.get_village(1).resources.wood == 700
+    assert restarted.seq == 1
+
+
+def test_batch_is_journaled_per_command(tmp_path):
+    """queue_builds journalise chaque construction acceptée, rejouée au redémarrage."""
+    eng = EventSourcedEngine(tmp_path, checkpoint_every=3)
+    assert eng.queue_builds([_cmd(1), _cmd(2, vid=99), _cmd(3), _cmd(4)]) == [
+        True,
+        False,
+        True,
+        True,
+    ]
+    assert eng.seq == 3
+    eng.close()
+
+    restarted = EventSourcedEngine(tmp_path)
+    assert _queue(restarted) == ["farm -> L1", "farm -> L3", "farm -> L4"]
+    assert [c.seq for c in list_checkpoints(tmp_path)] == [0, 3]
+
+
+def test_checkpoint_limits_replay_to_tail(tmp_path):
+    """Au démarrage, seule la fin du journal postérieure au checkpoint est rejouée."""
+    eng = EventSourcedEngine(tmp_path, checkpoint_every=5)
+    for level in range(1, 8):
+        eng.queue_build(_cmd(level))
+    eng.close()
+
+    assert [c.seq for c in list_checkpoints(tmp_path)] == [0, 5]
+    restarted = EventSourcedEngine(tmp_path, checkpoint_every=5)
+    assert restarted.replayed == 2
+    assert len(_queue(restarted)) == 7
+
+
+def test_old_checkpoints_are_pruned(tmp_path):
+    """La genèse et les deux derniers checkpoints sont conservés."""
+    eng = EventSourcedEngine(tmp_path, checkpoint_every=2)
+    for level in range(1, 11):
+        eng.queue_build(_cmd(level))
+        eng.wait_checkpoint()
+    eng.close()
+    assert [c.seq for c in list_checkpoints(tmp_path)] == [0, 8, 10]
+
+
+def test_torn_tail_is_ignored_and_truncated(tmp_path):
+    """Une ligne à moitié écrite (arrêt brutal) est ignorée puis retirée."""
+    eng = EventSourcedEngine(tmp_path)
+    eng.queue_build(_cmd(1))
+    eng.close()
+    segment = next(tmp_path.glob("log-*.jsonl"))
+    with segment.open("a", encoding="utf-8") as fp:
+        fp.write('{"seq": 2, "type": "bui')
+
+    restarted = EventSourcedEngine(tmp_path)
+    assert restarted.seq == 1
+    restarted.queue_build(_cmd(3))
+    restarted.close()
+
+    assert _queue(EventSourcedEngine(tmp_path)) == ["farm -> L1", "farm -> L3"]
+
+
+def test_rejected_commands_are_not_logged(tmp_path):
+    """Une commande refusée n'est pas journalisée."""
+    eng = EventSourcedEngine(tmp_path)
+    assert eng.queue_build(_cmd(1, vid=99)) is False
+    assert eng.queue_build(_cmd(0)) is False
+    assert eng.seq == 0
+    eng.close()
+    assert not any(p.read_text() for p in tmp_path.glob("log-*.jsonl"))
+
+
+def test_manual_checkpoint(tmp_path):
+    """checkpoint() fige l'état courant; la reprise ne rejoue plus rien."""
+    eng = EventSourcedEngine(tmp_path)
+    eng.queue_build(_cmd(1))
+    assert eng.checkpoint() == 1
+    eng.close()
+    assert EventSourcedEngine(tmp_path).replayed == 0
+
+
+def test_replay_tool_rebuilds_world(tmp_path):
+    """Le rejeu depuis la genèse ou un checkpoint donne le même monde, jusqu'à --until."""
+    eng = EventSourcedEngine(tmp_path, checkpoint_every=4)
+    for level in range(1, 11):
+        eng.queue_build(_cmd(level))
+        eng.wait_checkpoint()
+    eng.close()
+
+    full, stats = replay(tmp_path)
+    assert stats.commands == 10
+    assert _queue(full) == _queue(eng)
+    from_checkpoint, stats = replay(tmp_path, from_checkpoint=True)
+    assert stats.commands == 2
+    assert _queue(from_checkpoint) == _queue(eng)
+
+    partial, stats = replay(tmp_path, until=6, from_checkpoint=True)
+    assert (stats.start_seq, stats.last_seq) == (4, 6)
+    assert _queue(partial) == [f"farm -> L{level}" for level in range(1, 7)]
+
+
+def test_replay_cli_writes_loadable_world(tmp_path, capsys):
+    """La sortie --out est un monde lisible par FileStorageEngine."""
+    events = tmp_path / "events"
+    eng = EventSourcedEngine(events)
+    eng.queue_build(_cmd(2))
+    eng.close()
+    out = tmp_path / "world.json"
+
+    main([str(events), "--out", str(out)])
+
+    assert "replayed 1 commands" in capsys.readouterr().out
+    assert FileStorageEngine(str(out)).get_village(1).queue == ("farm -> L2",)
+
+
+def test_replay_without_checkpoint_fails(tmp_path):
+    """Un répertoire sans checkpoint ne peut pas être rejoué."""
+    with pytest.raises(FileNotFoundError):
+        replay(tmp_path)
+
+
+def test_container_events_engine(tmp_path, monkeypatch):
+    """AGER_ENGINE=events sélectionne le moteur à journal."""
+    monkeypatch.setenv("AGER_ENGINE", "events")
+    monkeypatch.setenv("AGER_EVENT_DIR", str(tmp_path))
+    monkeypatch.setenv("AGER_METRICS", "0")
+    container.reset_engine()
+    try:
+        engine = container.get_engine()
+        assert isinstance(engine, EventSourcedEngine)
+        engine.close()
+    finally:
+        container.reset_engine()
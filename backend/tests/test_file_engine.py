@@ -2,12 +2,13 @@
 
 import json
 import tempfile
+import tracemalloc
 from pathlib import Path
 
 import pytest
 
 from ager.adapters.file_engine import FileStorageEngine
-from ager.models import BuildCmd, Village
+from ager.models import BuildCmd, Resources, Village
 
 
 @pytest.fixture()
@@ -131,3 +132,63 @@ def test_queue_build_invalid_command(temp_storage):
         # Level invalide
         cmd2 = BuildCmd(villageId=vid, building="Farm", levelTarget=0)
         assert engine.queue_build(cmd2) is False
+
+
+def test_engine_loads_sections_in_any_order(temp_storage):
+    """Les sections séparées sont appliquées même si elles précèdent les villages."""
+    text = (
+        '{"buildQueues": {"2": [{"building": "farm", "level": 3}]},'
+        ' "resources": {"1": {"wood": 5}, "2": {"wood": 6}},'
+        ' "villages": {'
+        '  "1": {"id": 1, "name": "A", "resources": {"wood": 1}, "queue": ["x -> L1"]},'
+        '  "2": {"id": 2, "name": "B", "queue": ["ignored -> L1"]},'
+        '  "3": {"id": 3, "name": "C"}'
+        " }}"
+    )
+    Path(temp_storage).write_text(text)
+
+    engine = FileStorageEngine(temp_storage)
+    v1, v2, v3 = (engine.get_village(i) for i in (1, 2, 3))
+    # Resources inline prioritaires, buildQueues prioritaires sur la queue inline
+    assert v1.resources.wood == 1
+    assert v1.queue == ("x -> L1",)
+    assert v2.resources.wood == 6
+    assert v2.queue == ("farm -> L3",)
+    assert v3.resources == Resources()
+    assert v3.queue == ()
+
+
+def test_saved_file_keeps_id_order(temp_storage):
+    """La sauvegarde range les villages par ID, pas dans l'ordre de la table interne."""
+    villages = {str(vid): {"id": vid, "name": f"V{vid}"} for vid in range(39, 0, -1)}
+    Path(temp_storage).write_text(json.dumps({"villages": villages}))
+    engine = FileStorageEngine(temp_storage)
+
+    assert engine.queue_build(BuildCmd(villageId=7, building="farm", levelTarget=1))
+
+    saved = json.loads(Path(temp_storage).read_text())["villages"]
+    assert list(saved) == [str(vid) for vid in range(1, 40)]
+    assert [v.id for v in engine.snapshot()] == list(range(1, 40))
+
+
+def test_engine_load_peak_memory_tracks_world_size(temp_storage):
+    """Le chargement en flux ne garde pas le texte brut ni l'arbre JSON complets."""
+    n = 3000
+    data = {
+        "villages": {str(i): {"id": i, "name": f"Village {i}"} for i in range(n)},
+        "resources": {str(i): {"wood": i, "clay": i, "iron": i, "crop": i} for i in range(n)},
+        "buildQueues": {str(i): [{"building": "farm", "level": 2}] for i in range(n)},
+    }
+    Path(temp_storage).write_text(json.dumps(data, indent=2))
+    del data
+
+    tracemalloc.start()
+    try:
+        engine = FileStorageEngine(temp_storage)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(engine.snapshot()) == n
+    assert engine.get_village(n - 1).resources.wood == n - 1
+    assert peak < 1.5 * current
@@ -0,0 +1,212 @@
+"""Tests du catalogue des données de jeu et du prélèvement des coûts par les moteurs."""
+
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+import ager
+from ager import container, gamedata
+from ager.adapters.event_engine import EventSourcedEngine
+from ager.adapters.file_engine import FileStorageEngine
+from ager.adapters.hybrid_engine import HybridEngine
+from ager.adapters.memory_engine import MemoryEngine
+from ager.adapters.sql_engine import SQLiteEngine
+from ager.adapters.tiered_engine import TieredEngine
+from ager.gamedata import GameDataError, load_catalog
+from ager.models import BuildCmd, Resources
+from ager.settings import get_game_data_dir
+
+FARM = {
+    "id": "farm",
+    "name": "Ferme",
+    "max_level": 3,
+    "cost": {"wood": 70, "clay": 90, "iron": 70, "crop": 20},
+    "cost_growth": 1.67,
+    "build_time_s": 150,
+    "time_growth": 1.6,
+}
+
+
+@pytest.fixture(autouse=True)
+def _fresh_catalogs(monkeypatch):
+    """Chaque test repart du cache disque, comme un nouveau processus."""
+    monkeypatch.setattr(gamedata, "_catalogs", {})
+
+
+def _data_dir(tmp_path, *definitions):
+    buildings = tmp_path / "game" / "buildings"
+    buildings.mkdir(parents=True)
+    for definition in definitions:
+        (buildings / f"{definition['id']}.json").write_text(json.dumps(definition))
+    return tmp_path / "game"
+
+
+def test_repository_catalog_tables(monkeypatch):
+    """Les définitions livrées avec le paquet se compilent; coûts et durées suivent les formules."""
+    monkeypatch.delenv("AGER_GAME_DATA_DIR", raising=False)
+    assert Path(get_game_data_dir()) == Path(ager.__file__).parent / "data"
+    catalog = load_catalog(get_game_data_dir())
+    assert "farm" in catalog.buildings and catalog.name("farm") == "Ferme"
+    assert catalog.cost("farm", 1) == (70, 90, 70, 20)
+    # 70 x 1.67 = 116.9 -> 115, 90 x 1.67 = 150.3 -> 150, 20 x 1.67 = 33.4 -> 35
+    assert catalog.cost("farm", 2) == (115, 150, 115, 35)
+    assert catalog.build_time("farm", 2) == 240
+    assert catalog.max_level("farm") == 20
+    assert catalog.cost("farm", 21) is None
+    assert catalog.cost("farm", 0) is None
+    assert catalog.cost("LumberCamp", 1) is None
+
+
+def test_compiled_form_is_cached_by_content(tmp_path, monkeypatch):
+    """Le cache compilé évite la recompilation; modifier une définition l'invalide."""
+    data_dir, cache_dir = _data_dir(tmp_path, FARM), tmp_path / "cache"
+    first = load_catalog(data_dir, cache_dir)
+    assert [p.name for p in cache_dir.iterdir()] == [f"buildings-{first.fingerprint[:16]}.json"]
+
+    def fail(*args):
+        raise AssertionError("recompilation")
+
+    monkeypatch.setattr(gamedata, "_catalogs", {})
+    monkeypatch.setattr(gamedata, "compile_catalog", fail)
+    cached = load_catalog(data_dir, cache_dir)
+    assert cached.cost("farm", 3) == first.cost("farm", 3)
+    assert load_catalog(data_dir, cache_dir) is cached  # même processus, fichiers inchangés
+
+    monkeypatch.undo()
+    (data_dir / "buildings" / "farm.json").write_text(json.dumps({**FARM, "max_level": 5}))
+    changed = load_catalog(data_dir, cache_dir)
+    assert changed.fingerprint != first.fingerprint
+    assert changed.max_level("farm") == 5
+    assert len(list(cache_dir.iterdir())) == 2
+
+
+def test_corrupt_cache_is_recompiled(tmp_path):
+    """Un fichier de cache illisible est ignoré puis réécrit."""
+    data_dir, cache_dir = _data_dir(tmp_path, FARM), tmp_path / "cache"
+    fingerprint = load_catalog(data_dir, cache_dir).fingerprint
+    cache_file = cache_dir / f"buildings-{fingerprint[:16]}.json"
+    cache_file.write_text("{not json")
+    gamedata._catalogs.clear()
+    assert load_catalog(data_dir, cache_dir).cost("farm", 1) == (70, 90, 70, 20)
+    assert json.loads(cache_file.read_text())["fingerprint"] == fingerprint
+
+
+@pytest.mark.parametrize(
+    "definition",
+    [
+        {**FARM, "cost": {**FARM["cost"], "wood": -1}},
+        {**FARM, "cost_growth": 0.5},
+        {**FARM, "speed": 2},
+        {**FARM, "id": "Farm"},
+    ],
+    ids=["negative-cost", "shrinking-cost", "unknown-field", "bad-id"],
+)
+def test_invalid_definitions_rejected(tmp_path, definition):
+    """Une définition invalide fait échouer le chargement en nommant son fichier."""
+    buildings = tmp_path / "buildings"
+    buildings.mkdir()
+    (buildings / "farm.json").write_text(json.dumps(definition))
+    with pytest.raises(GameDataError, match="farm.json"):
+        load_catalog(tmp_path)
+
+
+def test_missing_or_empty_buildings_dir(tmp_path):
+    """Sans répertoire buildings/ ou sans définition, le catalogue est refusé."""
+    with pytest.raises(GameDataError):
+        load_catalog(tmp_path)
+    (tmp_path / "buildings").mkdir()
+    with pytest.raises(GameDataError):
+        load_catalog(tmp_path)
+
+
+def _memory(tmp_path, catalog):
+    return MemoryEngine(catalog)
+
+
+def _file(tmp_path, catalog):
+    return FileStorageEngine(str(tmp_path / "world.json"), catalog=catalog)
+
+
+def _sql(tmp_path, catalog):
+    return SQLiteEngine(tmp_path / "ager.db", catalog=catalog)
+
+
+def _hybrid(tmp_path, catalog):
+    return HybridEngine(tmp_path / "ager.db", catalog=catalog)
+
+
+def _tiered(tmp_path, catalog):
+    return TieredEngine(SQLiteEngine(tmp_path / "ager.db", catalog=catalog), catalog=catalog)
+
+
+def _events(tmp_path, catalog):
+    return EventSourcedEngine(tmp_path / "events", catalog=catalog)
+
+
+@pytest.mark.parametrize("factory", [_memory, _file, _sql, _hybrid, _tiered, _events])
+def test_engines_charge_building_costs(tmp_path, factory):
+    """Chaque moteur refuse un bâtiment ou un niveau inconnu, prélève le coût et refuse
+    une construction que les stocks ne couvrent pas."""
+    eng = factory(tmp_path, load_catalog(get_game_data_dir()))
+    assert eng.get_village(1).resources == Resources()
+
+    assert not eng.queue_build(BuildCmd(villageId=1, building="LumberCamp", levelTarget=1))
+    assert not eng.queue_build(BuildCmd(villageId=1, building="farm", levelTarget=21))
+    assert eng.queue_build(BuildCmd(villageId=1, building="farm", levelTarget=1))
+    # Caserne niveau 8: 1185 bois, plus que les 800 du village
+    assert not eng.queue_build(BuildCmd(villageId=1, building="barracks", levelTarget=8))
+    assert not eng.queue_build(BuildCmd(villageId=99, building="farm", levelTarget=1))
+
+    village = eng.get_village(1)
+    assert village.queue == ("farm -> L1",)
+    assert village.resources == Resources(wood=730, clay=710, iron=730, crop=780)
+    assert eng.village_rank(1, "total").score == 730 + 710 + 730 + 780
+
+
+def test_hybrid_persists_charged_resources(tmp_path):
+    """Le moteur hybride écrit la construction et les stocks débités dans SQLite."""
+    eng = HybridEngine(tmp_path / "ager.db", max_lag=60, catalog=load_catalog(get_game_data_dir()))
+    assert eng.queue_build(BuildCmd(villageId=1, building="farm", levelTarget=1))
+    assert eng.adjust_resources({1: (0, 0, 0, 5)}) == 1
+    eng.close()
+
+    stored = SQLiteEngine(tmp_path / "ager.db").get_village(1)
+    assert stored.queue == ("farm -> L1",)
+    assert stored.resources == Resources(wood=730, clay=710, iron=730, crop=785)
+
+
+def test_event_replay_uses_logged_costs(tmp_path):
+    """Le rejeu applique le coût journalisé, même sans catalogue au redémarrage."""
+    eng = EventSourcedEngine(tmp_path, catalog=load_catalog(get_game_data_dir()))
+    assert eng.queue_build(BuildCmd(villageId=1, building="farm", levelTarget=2))
+    eng.close()
+
+    restarted = EventSourcedEngine(tmp_path)
+    assert restarted.get_village(1).resources == Resources(wood=685, clay=650, iron=685, crop=765)
+    assert restarted.replayed == 1
+
+
+def test_container_catalog_setting(tmp_path, monkeypatch):
+    """AGER_GAME_DATA_DIR choisit les définitions; "off" désactive le catalogue."""
+    shutil.copytree(get_game_data_dir(), tmp_path / "game")
+    monkeypatch.setenv("AGER_GAME_DATA_DIR", str(tmp_path / "game"))
+    monkeypatch.setenv("AGER_GAME_DATA_CACHE", str(tmp_path / "cache"))
+    monkeypatch.setenv("AGER_ENGINE", "memory")
+    monkeypatch.setenv("AGER_METRICS", "0")
+    container.reset_engine()
+    try:
+        engine = container.get_engine()
+        assert engine.catalog is container.get_catalog()
+        assert engine.catalog.cost("farm", 1) == (70, 90, 70, 20)
+        assert list((tmp_path / "cache").iterdir())
+
+        monkeypatch.setenv("AGER_GAME_DATA_DIR", "off")
+        container.reset_engine()
+        assert container.get_catalog() is None
+        assert container.get_engine().queue_build(
+            BuildCmd(villageId=1, building="LumberCamp", levelTarget=99)
+        )
+    finally:
+        container.reset_engine()
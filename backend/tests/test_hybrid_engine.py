@@ -0,0 +1,185 @@
+"""Tests du moteur hybride (mémoire + écriture différée dans SQLite)."""
+
+import sqlite3
+import threading
+import time
+
+from ager import container
+from ager.adapters.hybrid_engine import HybridEngine
+from ager.adapters.sql_engine import SQLiteEngine
+from ager.models import BuildCmd
+
+
+def _cmd(level: int, vid: int = 1) -> BuildCmd:
+    return BuildCmd(villageId=vid, building="farm", levelTarget=level)
+
+
+def _stored_queue(db) -> list[str]:
+    return list(SQLiteEngine(db).get_village(1).queue)
+
+
+def test_world_loaded_from_sqlite(tmp_path):
+    """Le monde initial est celui de la base SQLite."""
+    db = tmp_path / "ager.db"
+    SQLiteEngine(db).queue_build(_cmd(4))
+
+    eng = HybridEngine(db)
+    assert eng.snapshot() == SQLiteEngine(db).snapshot()
+    assert eng.get_village(1).queue == ("farm -> L4",)
+
+
+def test_reads_served_from_memory_before_persistence(tmp_path):
+    """La mutation est visible immédiatement; SQLite la reçoit après flush()."""
+    db = tmp_path / "ager.db"
+    eng = HybridEngine(db, max_lag=60)
+    assert eng.queue_build(_cmd(1))
+    assert eng.get_village(1).queue == ("farm -> L1",)
+    assert eng.pending == 1
+    assert _stored_queue(db) == []
+
+    eng.flush()
+    assert eng.pending == 0
+    assert _stored_queue(db) == ["farm -> L1"]
+    eng.close()
+
+
+def test_max_lag_bounds_persistence_delay(tmp_path):
+    """Sans flush, les mutations sont commitées après au plus max_lag."""
+    db = tmp_path / "ager.db"
+    eng = HybridEngine(db, max_lag=0.05)
+    for level in range(1, 4):
+        eng.queue_build(_cmd(level))
+
+    deadline = time.monotonic() + 5
+    while eng.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _stored_queue(db) == ["farm -> L1", "farm -> L2", "farm -> L3"]
+    eng.close()
+
+
+def test_max_pending_applies_backpressure(tmp_path):
+    """Le nombre de mutations non persistées ne dépasse jamais max_pending."""
+    db = tmp_path / "ager.db"
+    eng = HybridEngine(db, max_lag=60, max_pending=3)
+    for level in range(1, 11):
+        eng.queue_build(_cmd(level))
+        assert eng.pending <= 3
+    eng.close()
+    assert len(_stored_queue(db)) == 10
+
+
+def test_writer_blocked_on_its_village_does_not_block_others(tmp_path):
+    """_cond n'est pas tenu pendant l'application: seule la même strie fait attendre."""
+    db = tmp_path / "ager.db"
+    SQLiteEngine(db)
+    with sqlite3.connect(db) as conn:
+        conn.execute("INSERT INTO village(id, name) VALUES (2, 'V2')")
+    eng = HybridEngine(db, max_lag=60)
+
+    with eng._stripes.for_key(2):
+        blocked = threading.Thread(target=eng.queue_build, args=(_cmd(1, vid=2),))
+        blocked.start()
+        time.sleep(0.05)  # l'écrivain du village 2 attend sa strie
+        other = threading.Thread(target=eng.queue_build, args=(_cmd(1),))
+        other.start()
+        other.join(timeout=5)
+        assert not other.is_alive()
+    blocked.join(timeout=5)
+
+    eng.close()
+    assert _stored_queue(db) == ["farm -> L1"]
+    assert SQLiteEngine(db).get_village(2).queue == ("farm -> L1",)
+
+
+def test_batch_persisted_in_order(tmp_path):
+    """Un lot queue_builds compte une mutation en attente par construction acceptée."""
+    db = tmp_path / "ager.db"
+    eng = HybridEngine(db, max_lag=60)
+    assert eng.queue_builds([_cmd(1), _cmd(2, vid=99), _cmd(3)]) == [True, False, True]
+    assert eng.pending == 2
+    eng.flush()
+    assert _stored_queue(db) == ["farm -> L1", "farm -> L3"]
+    eng.close()
+
+
+def test_close_persists_and_restart_restores(tmp_path):
+    """close() persiste tout; un nouveau moteur retrouve l'état."""
+    db = tmp_path / "ager.db"
+    eng = HybridEngine(db, max_lag=60)
+    errors: list[BaseException] = []
+
+    def work(n: int) -> None:
+        try:
+            for level in range(1, 51):
+                assert eng.queue_build(BuildCmd(villageId=1, building=f"t{n}", levelTarget=level))
+        except BaseException as exc:  # remonté au thread principal
+            errors.append(exc)
+
+    workers = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    assert not errors
+    expected = eng.get_village(1).queue
+    eng.close()
+
+    assert HybridEngine(db).get_village(1).queue == expected
+
+
+def test_batch_failing_on_close_is_counted_as_dropped(tmp_path):
+    """Un lot en échec pendant l'arrêt est compté comme abandonné, pas comme persisté."""
+    db = tmp_path / "ager.db"
+    eng = HybridEngine(db, max_lag=60)
+
+    def fail(session, batch):
+        raise RuntimeError("disk full")
+
+    eng._write = fail
+    assert eng.queue_build(_cmd(1))
+    assert eng.queue_build(_cmd(2))
+    eng.close()
+    assert (eng._persisted, eng.dropped, eng.pending) == (0, 2, 0)
+    assert _stored_queue(db) == []
+
+
+def test_resource_adjustments_written_behind(tmp_path):
+    """adjust_resources() est visible en mémoire puis écrit dans SQLite au flush()."""
+    db = tmp_path / "ager.db"
+    eng = HybridEngine(db, max_lag=60)
+    wood = eng.get_village(1).resources.wood
+    assert eng.adjust_resources({1: (-(wood + 1), 3, 0, 0)}) == 1
+    assert eng.get_village(1).resources.wood == 0
+    eng.queue_build(_cmd(1))
+    eng.flush()
+
+    stored = SQLiteEngine(db).get_village(1)
+    assert stored.resources == eng.get_village(1).resources
+    assert stored.queue == ("farm -> L1",)
+
+
+def test_rejected_commands_not_persisted(tmp_path):
+    """Une commande refusée n'est ni appliquée ni mise en file."""
+    eng = HybridEngine(tmp_path / "ager.db")
+    assert eng.queue_build(_cmd(1, vid=999)) is False
+    assert eng.queue_build(_cmd(0)) is False
+    assert eng.pending == 0
+    eng.close()
+
+
+def test_container_hybrid_engine_and_flush(tmp_path, monkeypatch):
+    """AGER_ENGINE=hybrid sélectionne le moteur; flush_engine() persiste."""
+    db = tmp_path / "ager.db"
+    monkeypatch.setenv("AGER_ENGINE", "hybrid")
+    monkeypatch.setenv("AGER_DB_PATH", str(db))
+    monkeypatch.setenv("AGER_WRITE_BEHIND_MS", "60000")
+    container.reset_engine()
+    try:
+        engine = container.get_engine()
+        assert isinstance(engine, HybridEngine)
+        engine.queue_build(_cmd(2))
+        container.flush_engine()
+        assert _stored_queue(db) == ["farm -> L2"]
+        engine.close()
+    finally:
+        container.reset_engine()
@@ -0,0 +1,49 @@
+"""Budget de temps d'import: ``import ager`` + démarrage du moteur mémoire."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import ager
+
+# Seuil généreux pour absorber les machines de CI lentes; ajustable par variable d'env
+IMPORT_BUDGET_S = float(os.getenv("AGER_IMPORT_BUDGET_S", "1.5"))
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import ager
+from ager.container import get_engine
+get_engine().snapshot()
+elapsed = time.perf_counter() - t0
+heavy = [m for m in ("sqlalchemy", "sqlmodel", "fastapi", "starlette") if m in sys.modules]
+print(json.dumps({"elapsed": elapsed, "heavy": heavy}))
+"""
+
+
+def _probe() -> dict:
+    src_dir = str(Path(ager.__file__).resolve().parent.parent)
+    pythonpath = os.pathsep.join(filter(None, [src_dir, os.getenv("PYTHONPATH")]))
+    env = {**os.environ, "AGER_ENGINE": "memory", "PYTHONPATH": pythonpath}
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout)
+
+
+def test_memory_engine_does_not_import_heavy_dependencies():
+    """Le moteur mémoire ne charge ni SQLAlchemy/SQLModel ni FastAPI."""
+    assert _probe()["heavy"] == []
+
+
+def test_import_and_memory_startup_within_budget():
+    """``import ager`` + démarrage du moteur mémoire tient dans le budget."""
+    # Meilleur de 3 essais pour lisser le bruit de la machine
+    elapsed = min(_probe()["elapsed"] for _ in range(3))
+    assert elapsed < IMPORT_BUDGET_S, f"{elapsed:.3f}s > budget {IMPORT_BUDGET_S}s"
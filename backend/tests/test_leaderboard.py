@@ -0,0 +1,174 @@
+"""Tests des classements de villages (structure triée, moteurs et routes)."""
+
+import random
+import sqlite3
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from ager import container
+from ager.adapters.leaderboard import Leaderboard, build_boards, refresh_boards, resource_score
+from ager.adapters.memory_engine import MemoryEngine
+from ager.adapters.sql_engine import SQLiteEngine
+from ager.app import MAX_LEADERBOARD_OFFSET, app
+from ager.models import BuildCmd, Resources, Village
+
+# (id, wood, clay, iron, crop): totaux 40, 40, 100, 4, 70
+ROWS = [
+    (1, 10, 10, 10, 10),
+    (2, 40, 0, 0, 0),
+    (3, 25, 25, 25, 25),
+    (4, 1, 1, 1, 1),
+    (5, 0, 70, 0, 0),
+]
+
+
+def _village(vid: int, wood: int, clay: int, iron: int, crop: int) -> Village:
+    resources = Resources(wood=wood, clay=clay, iron=iron, crop=crop)
+    return Village(id=vid, name=f"V{vid}", resources=resources, queue=[])
+
+
+def _brute(scores: dict[int, int]) -> list[tuple[int, int, int]]:
+    ordered = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return [(rank, vid, score) for rank, (vid, score) in enumerate(ordered, start=1)]
+
+
+def test_leaderboard_matches_sorting_after_updates():
+    """Après des mises à jour aléatoires, top() et rank() égalent un tri complet."""
+    rng = random.Random(0)
+    scores = {vid: rng.randint(0, 50) for vid in range(200)}
+    board = Leaderboard.build(scores.items())
+    for _ in range(500):
+        vid = rng.randrange(250)
+        if rng.random() < 0.1:
+            board.remove(vid)
+            scores.pop(vid, None)
+        else:
+            scores[vid] = rng.randint(0, 50)
+            board.update(vid, scores[vid])
+
+    expected = _brute(scores)
+    assert len(board) == len(scores)
+    assert board.top(len(scores) + 10) == expected
+    assert board.top(5, offset=20) == expected[20:25]
+    for rank, vid, score in expected:
+        assert board.rank(vid) == (rank, score)
+    assert board.rank(10_000) is None
+
+
+def test_update_many_matches_single_updates():
+    """update_many() donne le même classement que des update(), petit lot ou re-tri complet."""
+    rng = random.Random(1)
+    scores = {vid: rng.randint(0, 50) for vid in range(500)}
+    for size in (3, 400):
+        batch = {rng.randrange(600): rng.randint(0, 50) for _ in range(size)}
+        board = Leaderboard.build(scores.items())
+        board.update_many(batch.items())
+        scores.update(batch)
+        assert board.top(len(scores)) == _brute(scores)
+
+
+def test_resource_score_metrics():
+    """Le score ``total`` somme les ressources; une métrique inconnue est refusée."""
+    resources = Resources(wood=1, clay=2, iron=3, crop=4)
+    assert resource_score(resources, "total") == 10
+    assert resource_score(resources, "iron") == 3
+    with pytest.raises(ValueError):
+        resource_score(resources, "gold")
+
+
+def test_refresh_boards_follows_resource_changes():
+    """Un village aux ressources modifiées est reclassé; une copie qui les partage ne l'est pas."""
+    villages = {vid: _village(vid, *res) for vid, *res in ROWS}
+    boards = build_boards(villages)
+    assert boards["total"].rank(4) == (5, 4)
+
+    richer = villages[4].model_copy(update={"resources": Resources(wood=500)})
+    refresh_boards(boards, villages[4], richer)
+    assert boards["total"].rank(4) == (1, 2_900)
+    assert boards["wood"].rank(4) == (1, 500)
+
+    # Même objet Resources: rien à reclasser, même si le classement est désynchronisé
+    boards["wood"].update(1, 0)
+    refresh_boards(boards, villages[1], villages[1].model_copy(update={"queue": ["x"]}))
+    assert boards["wood"].rank(1) == (4, 0)
+
+
+def _memory_engine(tmp_path):
+    eng = MemoryEngine()
+    eng.world = {vid: _village(vid, *res) for vid, *res in ROWS}
+    return eng
+
+
+def _sql_engine(tmp_path):
+    db = tmp_path / "ranks.db"
+    SQLiteEngine(db, use_template=False).close()
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("DELETE FROM resources")
+        conn.execute("DELETE FROM village")
+        conn.executemany(
+            "INSERT INTO village(id, name) VALUES (?, ?)", [(r[0], f"V{r[0]}") for r in ROWS]
+        )
+        conn.executemany(
+            "INSERT INTO resources(village_id, wood, clay, iron, crop) VALUES (?, ?, ?, ?, ?)", ROWS
+        )
+    conn.close()
+    return SQLiteEngine(db)
+
+
+@pytest.mark.parametrize("factory", [_memory_engine, _sql_engine])
+def test_engine_leaderboards(tmp_path, factory):
+    """Chaque moteur classe par score décroissant puis par ID, et donne le rang d'un village."""
+    eng = factory(tmp_path)
+    top = eng.leaderboard("total", 10, 0)
+    assert [(e.rank, e.villageId, e.score) for e in top] == [
+        (1, 3, 100),
+        (2, 5, 70),
+        (3, 1, 40),
+        (4, 2, 40),
+        (5, 4, 4),
+    ]
+    assert top[0].name == "V3"
+    assert [e.villageId for e in eng.leaderboard("wood", 2, 1)] == [3, 1]
+    assert eng.leaderboard("total", 10, 5) == []
+
+    assert eng.village_rank(2, "total").rank == 4
+    assert eng.village_rank(5, "clay").rank == 1
+    assert eng.village_rank(99, "total") is None
+    with pytest.raises(ValueError):
+        eng.leaderboard("gold", 10, 0)
+
+    # Une mise en queue ne change pas les ressources, donc pas le classement
+    assert eng.queue_build(BuildCmd(villageId=4, building="farm", levelTarget=1))
+    assert eng.village_rank(4, "total").rank == 5
+
+
+@pytest.fixture()
+def ranked_engine(tmp_path):
+    previous = container._engine
+    container._engine = _memory_engine(tmp_path)
+    yield
+    container._engine = previous
+
+
+@pytest.mark.asyncio
+async def test_leaderboard_routes(ranked_engine):
+    """GET /leaderboard pagine le classement; le rang d'un village inconnu donne 404."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.get("/leaderboard", params={"metric": "clay", "limit": 2})
+        assert r.status_code == 200
+        assert r.json()["metric"] == "clay"
+        assert [e["villageId"] for e in r.json()["entries"]] == [5, 3]
+
+        r = await ac.get("/leaderboard", params={"limit": 1, "offset": 1})
+        assert r.json()["entries"] == [{"rank": 2, "villageId": 5, "name": "V5", "score": 70}]
+
+        r = await ac.get("/leaderboard/village/1")
+        assert r.json() == {"rank": 3, "villageId": 1, "name": "V1", "score": 40}
+        assert (await ac.get("/leaderboard/village/99")).status_code == 404
+        assert (await ac.get("/leaderboard", params={"metric": "gold"})).status_code == 422
+        assert (await ac.get("/leaderboard", params={"limit": 1_000})).status_code == 422
+        too_deep = {"offset": MAX_LEADERBOARD_OFFSET + 1}
+        assert (await ac.get("/leaderboard", params=too_deep)).status_code == 422
@@ -0,0 +1,74 @@
+"""Tests du générateur de charge (tools.loadgen)."""
+
+import os
+import random
+
+import pytest
+
+from tools.loadgen import (
+    RouteStats,
+    arrivals,
+    engine_environment,
+    format_report,
+    latency_summary,
+    parse_mix,
+    percentile,
+    run_asgi,
+)
+
+
+def test_percentile_nearest_rank():
+    """Percentiles par rang le plus proche, max en queue de distribution."""
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.050
+    assert percentile(values, 99) == 0.099
+    assert percentile([], 50) == 0.0
+    assert latency_summary([0.3, 0.1, 0.2])["max"] == 0.3
+
+
+def test_parse_mix_validates_routes():
+    """Le mélange n'accepte que les routes connues, avec au moins un poids non nul."""
+    assert parse_mix("snapshot=1,village=8,build") == {
+        "snapshot": 1.0,
+        "village": 8.0,
+        "build": 1.0,
+    }
+    for bad in ("map=1", "village=-1", "village=0"):
+        with pytest.raises(ValueError):
+            parse_mix(bad)
+
+
+def test_arrivals_follow_target_rate():
+    """Intervalle fixe: rate x duration arrivées; Poisson: le même nombre en moyenne."""
+    assert len(list(arrivals(100, 1.0, random.Random(0), steady=True))) == 99
+    poisson = len(list(arrivals(1000, 10.0, random.Random(0), steady=False)))
+    assert 9500 < poisson < 10500
+
+
+def test_engine_environment_is_restored(tmp_path, monkeypatch):
+    """Les variables d'une passe sont retirées ou restaurées à la sortie."""
+    monkeypatch.setenv("AGER_ENGINE", "file")
+    monkeypatch.delenv("AGER_CLIENT_RATE", raising=False)
+    with engine_environment("sql", tmp_path, admission=False) as env:
+        assert os.environ["AGER_ENGINE"] == "sql"
+        assert env["AGER_DB_PATH"] == str(tmp_path / "ager.db")
+        assert os.environ["AGER_CLIENT_RATE"] == "0"
+    assert os.environ["AGER_ENGINE"] == "file"
+    assert "AGER_CLIENT_RATE" not in os.environ
+
+
+async def test_asgi_run_reports_every_route(tmp_path):
+    """Une passe en processus mesure chaque route du mélange, sans erreur."""
+    with engine_environment("memory", tmp_path, admission=False):
+        report = await run_asgi(
+            "memory", mix=parse_mix("snapshot,village,build"), rate=300, duration=0.3, steady=True
+        )
+    assert report.requests == 89
+    assert set(report.routes) == {"snapshot", "village", "build"}
+    assert all(
+        isinstance(stats, RouteStats) and not stats.errors for stats in report.routes.values()
+    )
+    assert report.summary()["routes"]["build"]["statuses"] == {
+        "200": len(report.routes["build"].latencies)
+    }
+    assert format_report(report).startswith("[OK] memory:")
@@ -0,0 +1,106 @@
+"""Tests de l'instrumentation (métriques Prometheus)."""
+
+import threading
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from ager.adapters.memory_engine import MemoryEngine
+from ager.adapters.sql_engine import SQLiteEngine
+from ager.app import app
+from ager.container import PORT_METHODS
+from ager.metrics import (
+    ENGINE_CALL_DURATION,
+    ENGINE_SQL_STATEMENTS,
+    Counter,
+    Histogram,
+    MetricsRegistry,
+    instrument_engine,
+)
+from ager.models import BuildCmd
+
+
+def test_histogram_render_is_cumulative():
+    """Les buckets rendus sont cumulatifs, avec +Inf, somme et total."""
+    registry = MetricsRegistry()
+    hist = registry.register(Histogram("h_seconds", "help", ("route",), buckets=(0.1, 1.0)))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        hist.observe(value, ("/x",))
+
+    text = registry.render()
+    assert "# TYPE h_seconds histogram" in text
+    assert 'h_seconds_bucket{route="/x",le="0.1"} 2' in text
+    assert 'h_seconds_bucket{route="/x",le="1"} 3' in text
+    assert 'h_seconds_bucket{route="/x",le="+Inf"} 4' in text
+    assert 'h_seconds_count{route="/x"} 4' in text
+    assert 'h_seconds_sum{route="/x"} 3.65' in text
+
+
+def test_counter_aggregates_thread_shards():
+    """Les cellules par thread sont sommées à la lecture."""
+    counter = Counter("c_total", "help", ("k",))
+
+    def work():
+        for _ in range(1000):
+            counter.inc(("a",))
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter.value(("a",)) == 8000
+
+
+def test_label_values_are_escaped():
+    """Les valeurs de labels sont échappées selon le format texte."""
+    registry = MetricsRegistry()
+    registry.register(Counter("c_total", "help", ("k",))).inc(('a"b\\',))
+    assert 'c_total{k="a\\"b\\\\"} 1' in registry.render()
+
+
+def test_instrument_engine_keeps_identity():
+    """L'instrumentation mesure les appels sans changer le type du moteur."""
+    eng = instrument_engine(MemoryEngine(), PORT_METHODS)
+    assert isinstance(eng, MemoryEngine)
+
+    labels = ("MemoryEngine", "get_village")
+    before = ENGINE_CALL_DURATION.count(labels)
+    eng.get_village(1)
+    eng.get_village(2)
+    assert ENGINE_CALL_DURATION.count(labels) == before + 2
+
+
+def test_instrument_sql_engine_counts_statements(tmp_path):
+    """Les requêtes SQL sont attribuées à la méthode du moteur qui les émet."""
+    eng = instrument_engine(SQLiteEngine(tmp_path / "m.db"), PORT_METHODS)
+    labels = ("SQLiteEngine", "get_village")
+    before = ENGINE_SQL_STATEMENTS.value(labels)
+    eng.get_village(1)
+    assert ENGINE_SQL_STATEMENTS.value(labels) - before >= 3  # village, resources, queue
+
+    eng.queue_build(BuildCmd(villageId=1, building="farm", levelTarget=1))
+    assert ENGINE_SQL_STATEMENTS.value(("SQLiteEngine", "queue_build")) >= 2
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_routes():
+    """/metrics expose latence et statuts par gabarit de route."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.get("/village/1")
+        await ac.get("/village/424242")
+        await ac.get("/does-not-exist")
+        r = await ac.get("/metrics")
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    text = r.text
+    assert 'ager_http_requests_total{method="GET",route="/village/{vid}",status="200"}' in text
+    assert 'ager_http_requests_total{method="GET",route="/village/{vid}",status="404"}' in text
+    assert 'route="<unmatched>",status="404"' in text
+    assert 'ager_http_request_duration_seconds_bucket{method="GET",route="/village/{vid}"' in text
+    assert (
+        'ager_engine_call_duration_seconds_count{engine="MemoryEngine",method="get_village"}'
+        in text
+    )
@@ -1,8 +1,15 @@
 """Tests for the migrations runner."""
 
 import sqlite3
+from pathlib import Path
 
-from ager.db.migrations.runner import apply_migrations
+from ager.adapters.sql_engine import SQLiteEngine
+from ager.db.migrations.runner import (
+    MIGRATIONS_DIR,
+    apply_migrations,
+    clone_from_template,
+    load_migrations,
+)
 
 
 def test_runner_applies_only_new_migrations(tmp_path):
@@ -112,3 +119,66 @@ def test_migrations_applied_in_order(tmp_path):
     steps = [row[0] for row in cursor.fetchall()]
     assert steps == [2, 3]  # 2 puis 3 (car 1 crée juste la table)
     conn.close()
+
+
+def test_up_to_date_database_skips_file_reads(tmp_path, monkeypatch):
+    """Une base à jour (fingerprint identique) ne relit aucun fichier de migration."""
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    (migrations_dir / "0001_first.sql").write_text(
+        "CREATE TABLE fp_test (id INTEGER PRIMARY KEY);", encoding="utf-8"
+    )
+    apply_migrations(tmp_path / "a.db", migrations_dir)
+
+    def fail_read(*args, **kwargs):
+        raise AssertionError("migration file read on the fast path")
+
+    monkeypatch.setattr(Path, "read_text", fail_read)
+    apply_migrations(tmp_path / "a.db", migrations_dir)
+
+    conn = sqlite3.connect(tmp_path / "a.db")
+    (fingerprint,) = conn.execute("SELECT fingerprint FROM schema_fingerprint").fetchone()
+    conn.close()
+    assert fingerprint == load_migrations(migrations_dir).fingerprint
+
+
+def test_fingerprint_changes_with_migrations(tmp_path):
+    """Le fingerprint dépend des versions et du contenu des migrations."""
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    (migrations_dir / "0001_first.sql").write_text("SELECT 1;", encoding="utf-8")
+    fp1 = load_migrations(migrations_dir).fingerprint
+
+    (migrations_dir / "0001_first.sql").write_text("SELECT 22;", encoding="utf-8")
+    fp2 = load_migrations(migrations_dir).fingerprint
+
+    (migrations_dir / "0002_second.sql").write_text("SELECT 3;", encoding="utf-8")
+    fp3 = load_migrations(migrations_dir).fingerprint
+
+    assert len({fp1, fp2, fp3}) == 3
+
+
+def test_clone_from_template(tmp_path):
+    """Une base clonée depuis le template est identique à une base migrée."""
+    migrated = tmp_path / "migrated.db"
+    cloned = tmp_path / "nested" / "cloned.db"
+    apply_migrations(migrated, MIGRATIONS_DIR)
+    clone_from_template(cloned, MIGRATIONS_DIR)
+    clone_from_template(tmp_path / "cloned2.db", MIGRATIONS_DIR)
+
+    def dump(path):
+        conn = sqlite3.connect(path)
+        try:
+            return list(conn.iterdump())
+        finally:
+            conn.close()
+
+    assert dump(cloned) == dump(migrated)
+    assert dump(tmp_path / "cloned2.db") == dump(migrated)
+
+
+def test_sql_engine_with_and_without_template(tmp_path):
+    """SQLiteEngine donne le même monde initial avec ou sans template."""
+    with_template = SQLiteEngine(tmp_path / "t.db", use_template=True)
+    without_template = SQLiteEngine(tmp_path / "m.db", use_template=False)
+    assert with_template.snapshot() == without_template.snapshot()
@@ -0,0 +1,142 @@
+"""Tests de la table persistante (HAMT) et des versions immuables du monde."""
+
+import random
+import threading
+
+import pytest
+from pydantic import ValidationError
+
+from ager.adapters.file_engine import FileStorageEngine
+from ager.adapters.memory_engine import MemoryEngine
+from ager.adapters.persistent_map import PersistentMap
+from ager.models import BuildCmd, Resources, Village
+
+
+class _Colliding:
+    """Clé dont toutes les instances ont le même hachage."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __hash__(self) -> int:
+        return 42
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Colliding) and other.name == self.name
+
+
+def test_matches_dict_under_random_updates():
+    """Suite aléatoire de set: même contenu qu'un dict, versions précédentes intactes."""
+    rng = random.Random(7)
+    expected: dict[int, int] = {}
+    current: PersistentMap[int, int] = PersistentMap()
+    versions = []
+    for i in range(5000):
+        key = rng.choice((rng.randrange(200), rng.randrange(-(2**70), 2**70)))
+        expected[key] = i
+        current = current.set(key, i)
+        if i % 500 == 0:
+            versions.append((current, dict(expected)))
+
+    assert len(current) == len(expected)
+    assert dict(current.items()) == expected
+    assert all(current[k] == v for k, v in expected.items())
+    for version, content in versions:
+        assert dict(version.items()) == content
+
+
+def test_bulk_construction_equals_incremental():
+    """Le constructeur en une passe donne la même table que des set successifs."""
+    items = {i * 37: str(i) for i in range(3000)}
+    built = PersistentMap(items)
+    incremental: PersistentMap[int, str] = PersistentMap()
+    for key, value in items.items():
+        incremental = incremental.set(key, value)
+    assert built == incremental == items
+    assert sorted(built.values()) == sorted(items.values())
+
+
+def test_update_small_and_bulk_batches():
+    """update() égale des set successifs, qu'il recopie des chemins ou reconstruise la table."""
+    base = PersistentMap((i, i) for i in range(1000))
+    for batch in ({5: -5, 2000: 1}, {i: -i for i in range(0, 1500, 2)}):
+        expected = dict(base.items()) | batch
+        updated = base.update(batch)
+        assert updated == expected and len(updated) == len(expected)
+        assert base[5] == 5
+
+
+def test_hash_collisions():
+    """Des clés distinctes de même hachage coexistent et se remplacent correctement."""
+    a, b, c = _Colliding("a"), _Colliding("b"), _Colliding("c")
+    m = PersistentMap([(a, 1), (b, 2)]).set(c, 3).set(b, 20).set(42, "int")
+    assert (m[a], m[b], m[c], m[42]) == (1, 20, 3, "int")
+    assert len(m) == 4
+    assert _Colliding("d") not in m
+
+
+def test_set_shares_structure():
+    """set recopie le chemin modifié seulement; la même valeur ne crée pas de version."""
+    m = PersistentMap({i: i for i in range(10_000)})
+    assert m.set(5, 5) is m
+    updated = m.set(5, -5)
+    assert (m[5], updated[5]) == (5, -5)
+    shared = set(map(id, m._root.array)) & set(map(id, updated._root.array))
+    assert len(shared) == len(m._root.array) - 1
+
+
+def test_memory_snapshot_is_stable_under_writes():
+    """Un snapshot déjà pris n'est pas modifié par les commandes suivantes."""
+    eng = MemoryEngine()
+    eng.queue_build(BuildCmd(villageId=1, building="farm", levelTarget=1))
+    view = eng.view()
+    snapshot = eng.snapshot()
+
+    eng.queue_build(BuildCmd(villageId=1, building="farm", levelTarget=2))
+
+    assert snapshot[0].queue == ("farm -> L1",)
+    assert view.villages[1].queue == ("farm -> L1",)
+    assert eng.view().version == view.version + 1
+    assert eng.get_village(1).queue == ("farm -> L1", "farm -> L2")
+
+
+def test_published_villages_are_frozen():
+    """Un village publié ne peut pas être modifié en place, ni ses ressources."""
+    village = MemoryEngine().get_village(1)
+    with pytest.raises(ValidationError):
+        village.queue = ("farm -> L1",)
+    with pytest.raises(ValidationError):
+        village.resources.wood = 0
+    assert village.queue == () and village.resources.wood == 800
+
+
+def _read_while_writing(eng, commands: int = 300) -> None:
+    """Lit des versions en boucle pendant qu'un thread envoie ``commands`` commandes."""
+    vids = list(eng.world)
+    done = threading.Event()
+
+    def write() -> None:
+        for level in range(1, commands + 1):
+            vid = vids[level % len(vids)]
+            eng.queue_build(BuildCmd(villageId=vid, building="b", levelTarget=level))
+        done.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    while not done.is_set():
+        view = eng.view()
+        before = {vid: list(v.queue) for vid, v in view.villages.items()}
+        assert sum(len(q) for q in before.values()) <= view.version
+        assert {vid: list(v.queue) for vid, v in view.villages.items()} == before
+    writer.join()
+    assert sum(len(v.queue) for v in eng.snapshot()) == commands
+
+
+def test_concurrent_readers_see_consistent_versions(tmp_path):
+    """Pendant des écritures, chaque version lue est figée (moteurs mémoire et fichier)."""
+    mem = MemoryEngine()
+    mem.world = {
+        vid: Village(id=vid, name=f"V{vid}", resources=Resources(), queue=[]) for vid in range(50)
+    }
+    _read_while_writing(mem)
+    _read_while_writing(FileStorageEngine(str(tmp_path / "world.json")))
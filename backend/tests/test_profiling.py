@@ -0,0 +1,151 @@
+"""Tests du profilage à la demande."""
+
+import cProfile
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from ager import profiling
+from ager.app import app as default_app
+from ager.profiling import PROFILE_HEADER, PROFILE_ID_HEADER, install_profiling
+
+TOKEN = "s3cret"
+
+
+def _busy_work() -> int:
+    return sum(i * i for i in range(200_000))
+
+
+@pytest.fixture
+def profiled_app(tmp_path):
+    app = FastAPI()
+
+    @app.get("/sync")
+    def sync_route() -> dict[str, int]:
+        return {"value": _busy_work()}
+
+    @app.get("/async")
+    async def async_route() -> dict[str, int]:
+        return {"value": _busy_work()}
+
+    sampler = install_profiling(app, TOKEN, tmp_path)
+    yield app, sampler
+    sampler.stop()
+
+
+def _client(app):
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def test_disabled_by_default():
+    """Sans AGER_PROFILING, aucune route ni middleware de profilage n'est installé."""
+    paths = {getattr(route, "path", "") for route in default_app.routes}
+    assert not any(path.startswith("/admin/profile") for path in paths)
+    assert all(m.cls.__name__ != "RequestProfilerMiddleware" for m in default_app.user_middleware)
+
+
+def test_install_requires_token(tmp_path):
+    """Un jeton vide est refusé à l'installation."""
+    with pytest.raises(ValueError):
+        install_profiling(FastAPI(), "", tmp_path)
+
+
+@pytest.mark.parametrize("path", ["/sync", "/async"])
+async def test_profile_single_request(profiled_app, tmp_path, path):
+    """Une requête avec le jeton est profilée et ses stats sont consultables."""
+    app, _ = profiled_app
+    async with _client(app) as ac:
+        plain = await ac.get(path)
+        assert plain.status_code == 200
+        assert PROFILE_ID_HEADER not in plain.headers
+
+        r = await ac.get(path, headers={PROFILE_HEADER: TOKEN})
+        assert r.status_code == 200
+        profile_id = r.headers[PROFILE_ID_HEADER]
+        assert (tmp_path / f"{profile_id}.prof").is_file()
+
+        report = await ac.get(
+            f"/admin/profile/requests/{profile_id}",
+            params={"sort": "tottime"},
+            headers={PROFILE_HEADER: TOKEN},
+        )
+    assert report.status_code == 200
+    assert "_busy_work" in report.text
+
+
+async def test_query_flag_and_wrong_token(profiled_app, tmp_path):
+    """Le paramètre ?_profile= déclenche le profil; un mauvais jeton est ignoré."""
+    app, _ = profiled_app
+    async with _client(app) as ac:
+        r = await ac.get("/sync", params={"_profile": TOKEN})
+        assert PROFILE_ID_HEADER in r.headers
+        r = await ac.get("/sync", headers={PROFILE_HEADER: "wrong"})
+        assert r.status_code == 200
+        assert PROFILE_ID_HEADER not in r.headers
+    assert len(list(tmp_path.glob("*.prof"))) == 1
+
+
+async def test_concurrent_profiled_request_is_409(profiled_app, tmp_path):
+    """Pendant qu'une requête est profilée, une autre requête profilée reçoit 409."""
+    app, _ = profiled_app
+    async with _client(app) as ac:
+        with profiling._profiling_lock:
+            busy = await ac.get("/sync", headers={PROFILE_HEADER: TOKEN})
+            plain = await ac.get("/sync")
+        assert busy.status_code == 409 and busy.headers["Retry-After"] == "1"
+        assert plain.status_code == 200
+        r = await ac.get("/sync", headers={PROFILE_HEADER: TOKEN})
+        assert PROFILE_ID_HEADER in r.headers
+    assert len(list(tmp_path.glob("*.prof"))) == 1
+
+
+def test_wrapped_endpoint_survives_active_profiler():
+    """Un endpoint enveloppé s'exécute sans profil si un autre profileur est actif."""
+    wrapped = profiling._profiled(_busy_work)
+    active, ours = cProfile.Profile(), cProfile.Profile()
+    token = profiling._current_profile.set(ours)
+    active.enable()
+    try:
+        assert wrapped() == _busy_work()
+    finally:
+        active.disable()
+        profiling._current_profile.reset(token)
+
+
+async def test_admin_routes_require_token(profiled_app):
+    """Les routes d'administration exigent le jeton et valident l'identifiant."""
+    app, _ = profiled_app
+    async with _client(app) as ac:
+        assert (await ac.get("/admin/profile/sampling")).status_code == 403
+        r = await ac.get("/admin/profile/requests/..%2Fsecret", headers={PROFILE_HEADER: TOKEN})
+        assert r.status_code == 404
+
+
+async def test_sampling_profiler_collapsed_stacks(profiled_app):
+    """L'échantillonneur borné produit des piles repliées pour flamegraph."""
+    app, sampler = profiled_app
+    headers = {PROFILE_HEADER: TOKEN}
+    async with _client(app) as ac:
+        r = await ac.post(
+            "/admin/profile/sampling", params={"seconds": 0.5, "interval_ms": 2}, headers=headers
+        )
+        assert r.status_code == 202
+        again = await ac.post("/admin/profile/sampling", headers=headers)
+        assert again.status_code == 409
+
+        deadline = time.monotonic() + 0.3
+        while time.monotonic() < deadline:
+            await ac.get("/sync")
+        sampler.stop()
+
+        r = await ac.get("/admin/profile/sampling", headers=headers)
+    assert r.headers["X-Ager-Profile-Running"] == "false"
+    assert int(r.headers["X-Ager-Profile-Samples"]) > 0
+    lines = r.text.splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) >= 1
+    assert ";" in stack
+    assert any("_busy_work" in line for line in lines)
@@ -0,0 +1,283 @@
+"""Tests du moteur en mémoire partagée (SharedMemoryEngine)."""
+
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+from ager import container
+from ager.adapters import shared_engine
+from ager.adapters.file_engine import load_world
+from ager.adapters.leaderboard import build_boards
+from ager.adapters.shared_engine import SharedMemoryEngine, _attach_segment, segment_name
+from ager.gamedata import load_catalog
+from ager.models import BuildCmd, Resources
+from ager.settings import get_game_data_dir
+
+
+@pytest.fixture()
+def engines():
+    """Moteurs créés par un test, fermés (lecteurs d'abord) à la fin."""
+    created = []
+
+    def make(path, **kwargs):
+        created.append(SharedMemoryEngine(path, timeout=5, **kwargs))
+        return created[-1]
+
+    yield make
+    for engine in reversed(created):
+        engine.close()
+
+
+def _build(building="farm", level=1, vid=1):
+    return BuildCmd(villageId=vid, building=building, levelTarget=level)
+
+
+def _crash(engine):
+    """Simule la mort de l'écrivain: verrou et socket libérés, segment laissé en place."""
+    engine._stop.set()
+    engine._listener.close()
+    os.close(engine._lock_fd)
+
+
+def _open_seqlock(engine, vid=1):
+    """Laisse le seqlock d'un village ouvert, comme un écrivain interrompu."""
+    engine._begin(engine._offset(engine._slots[vid]))
+
+
+def _run(code, *args):
+    """Lance un autre processus Python (un autre worker)."""
+    return subprocess.Popen(
+        [sys.executable, "-c", textwrap.dedent(code), *map(str, args)],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+
+
+def test_single_writer_and_forwarded_writes(tmp_path, engines):
+    """Le premier moteur écrit; le second lit le segment et lui transmet ses écritures."""
+    writer = engines(tmp_path / "world.json")
+    reader = engines(tmp_path / "world.json")
+    assert writer.is_writer and not reader.is_writer
+
+    assert reader.queue_build(_build())
+    assert reader.adjust_resources({1: (-10, 0, 0, 5), 99: (1, 1, 1, 1)}) == 1
+    for engine in (writer, reader):
+        village = engine.get_village(1)
+        assert village.queue == ("farm -> L1",)
+        assert village.resources == Resources(wood=790, clay=800, iron=800, crop=805)
+    assert reader.world_version == 2
+    assert reader.get_village(99) is None
+
+
+def test_reader_leaderboard_follows_writes(tmp_path, engines):
+    """Les classements d'un lecteur sont recalculés après une écriture de l'écrivain."""
+    writer = engines(tmp_path / "world.json")
+    reader = engines(tmp_path / "world.json")
+    assert reader.village_rank(1, "wood").score == 800
+    writer.adjust_resources({1: (100, 0, 0, 0)})
+    assert reader.village_rank(1, "wood").score == 900
+    assert reader.leaderboard("total", 10, 0)[0].score == 3300
+
+
+def test_queue_slots_and_layout_limits(tmp_path, engines):
+    """Une queue pleine ou un élément trop long est refusé, sans écriture partielle."""
+    engine = engines(tmp_path / "world.json", queue_slots=2)
+    assert engine.queue_build(_build(level=1))
+    assert not engine.queue_build(_build("x" * 40))
+    assert engine.queue_build(_build(level=2))
+    assert not engine.queue_build(_build(level=3))
+    assert engine.get_village(1).queue == ("farm -> L1", "farm -> L2")
+    with pytest.raises(ValueError, match="emplacements de queue"):
+        SharedMemoryEngine(tmp_path / "world.json", queue_slots=4, timeout=1)
+
+
+def test_catalog_costs_charged_by_writer(tmp_path, engines):
+    """Le coût d'une construction transmise est prélevé par l'écrivain."""
+    catalog = load_catalog(get_game_data_dir())
+    engines(tmp_path / "world.json", catalog=catalog)
+    reader = engines(tmp_path / "world.json", catalog=catalog)
+    assert not reader.queue_build(_build("LumberCamp"))
+    assert reader.queue_build(_build())
+    assert not reader.queue_build(_build("barracks", 8))
+    assert reader.get_village(1).resources == Resources(wood=730, clay=710, iron=730, crop=780)
+
+
+def test_close_persists_and_hands_over(tmp_path, engines):
+    """Fermer l'écrivain persiste le monde; un lecteur reprend ensuite le rôle."""
+    path = tmp_path / "world.json"
+    writer = SharedMemoryEngine(path, timeout=5)
+    reader = engines(path)
+    reader.queue_build(_build())
+    writer.close()
+    assert writer.last_persist_seconds is not None
+    assert load_world(path)[1].queue == ("farm -> L1",)
+
+    assert reader.get_village(1).queue == ("farm -> L1",)
+    assert reader.is_writer
+    assert reader.queue_build(_build(level=2))
+    assert reader.get_village(1).queue == ("farm -> L1", "farm -> L2")
+
+
+def test_workers_share_one_world(tmp_path, engines):
+    """Un autre processus écrit via l'écrivain et lit directement le segment."""
+    writer = engines(tmp_path / "world.json")
+    worker = _run(
+        """
+        import sys
+        from ager.adapters.shared_engine import SharedMemoryEngine
+        from ager.models import BuildCmd
+        engine = SharedMemoryEngine(sys.argv[1], timeout=5)
+        assert not engine.is_writer
+        for level in range(1, 11):
+            assert engine.queue_build(BuildCmd(villageId=1, building="farm", levelTarget=level))
+        engine.adjust_resources({1: (-800, 0, 0, 0)})
+        print(engine.get_village(1).resources.wood, len(engine.get_village(1).queue))
+        engine.close()
+        """,
+        tmp_path / "world.json",
+    )
+    out, _ = worker.communicate(timeout=60)
+    assert worker.returncode == 0
+    assert out.split() == ["0", "10"]
+    assert len(writer.get_village(1).queue) == 10
+    assert writer.get_village(1).resources.wood == 0
+
+
+def test_takeover_after_writer_crash(tmp_path, engines):
+    """Si le processus écrivain meurt, un lecteur reprend le segment sans perte."""
+    path = tmp_path / "world.json"
+    crashed = _run(
+        """
+        import sys
+        from ager.adapters.shared_engine import SharedMemoryEngine
+        from ager.models import BuildCmd
+        engine = SharedMemoryEngine(sys.argv[1])
+        engine.queue_build(BuildCmd(villageId=1, building="farm", levelTarget=1))
+        print("ready", flush=True)
+        sys.stdin.read()
+        """,
+        path,
+    )
+    try:
+        assert crashed.stdout.readline().strip() == "ready"
+        reader = engines(path)
+        assert not reader.is_writer
+        crashed.kill()
+        crashed.wait(timeout=10)
+
+        assert reader.queue_build(_build(level=2))
+        assert reader.is_writer
+        assert reader.get_village(1).queue == ("farm -> L1", "farm -> L2")
+    finally:
+        crashed.kill()
+        crashed.wait(timeout=10)
+
+
+def test_container_close_engine_retires_segment(tmp_path, monkeypatch):
+    """close_engine() (arrêt de l'application) persiste le monde et retire le segment."""
+    path = tmp_path / "world.json"
+    monkeypatch.setenv("AGER_ENGINE", "shared")
+    monkeypatch.setenv("AGER_STORAGE_PATH", str(path))
+    monkeypatch.setenv("AGER_SHM_FLUSH_S", "0")
+    container.reset_engine()
+    try:
+        engine = container.get_engine()
+        assert engine.flush_interval is None
+        assert engine.queue_build(_build())
+        container.close_engine()
+        assert _attach_segment(engine.name) is None
+        assert load_world(path)[1].queue == ("farm -> L1",)
+        assert container.get_engine() is not engine
+    finally:
+        container.close_engine()
+
+
+def test_segment_removed_on_close(tmp_path):
+    """Après la fermeture de l'écrivain, le segment n'existe plus."""
+    engine = SharedMemoryEngine(tmp_path / "world.json")
+    assert _attach_segment(engine.name) is not None
+    engine.close()
+    assert engine.name == segment_name(tmp_path / "world.json")
+    assert _attach_segment(engine.name) is None
+
+
+def test_stuck_seqlock_with_live_writer_times_out(tmp_path, engines, monkeypatch):
+    """Un seqlock qui reste fermé ne fait pas boucler le lecteur indéfiniment."""
+    monkeypatch.setattr(shared_engine, "SEQLOCK_TIMEOUT", 0.05)
+    writer = engines(tmp_path / "world.json")
+    reader = engines(tmp_path / "world.json")
+    _open_seqlock(writer)
+    with pytest.raises(TimeoutError, match="ne répond plus"):
+        reader.get_village(1)
+    writer._repair()
+    assert reader.get_village(1).id == 1
+
+
+def test_seqlock_left_by_dead_writer_is_repaired(tmp_path, engines, monkeypatch):
+    """Un lecteur bloqué par le seqlock d'un écrivain mort reprend et répare le segment."""
+    monkeypatch.setattr(shared_engine, "SEQLOCK_TIMEOUT", 0.05)
+    crashed = SharedMemoryEngine(tmp_path / "world.json", timeout=5)
+    reader = engines(tmp_path / "world.json")
+    crashed.queue_build(_build())
+    _open_seqlock(crashed)
+    _crash(crashed)
+
+    assert reader.get_village(1).queue == ("farm -> L1",)
+    assert reader.is_writer
+
+
+def test_periodic_flush_persists_changes(tmp_path, engines):
+    """L'écrivain persiste le monde modifié sans attendre ``flush()`` ni ``close()``."""
+    path = tmp_path / "world.json"
+    engine = engines(path, flush_interval=0.05)
+    assert engine.queue_build(_build())
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert load_world(path)[1].queue == ("farm -> L1",)
+
+
+def test_leftover_segment_reused_unless_file_changed(tmp_path, engines):
+    """Un segment laissé en place est repris, sauf si le fichier a changé depuis."""
+    path = tmp_path / "world.json"
+    first = SharedMemoryEngine(path, timeout=5)
+    first.queue_build(_build(level=1))
+    first.flush()
+    first.queue_build(_build(level=2))
+    _crash(first)
+
+    second = SharedMemoryEngine(path, timeout=5)
+    assert second.get_village(1).queue == ("farm -> L1", "farm -> L2")
+    _crash(second)
+
+    # Fichier restauré ou modifié hors du moteur: il fait foi
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    third = engines(path)
+    assert third.get_village(1).queue == ("farm -> L1",)
+
+
+def test_reader_rankings_follow_change_log(tmp_path, engines, monkeypatch):
+    """Un lecteur relit seulement les villages journalisés; anneau recouvert: reconstruction."""
+    builds = []
+    monkeypatch.setattr(
+        shared_engine, "build_boards", lambda villages: builds.append(1) or build_boards(villages)
+    )
+    writer = engines(tmp_path / "world.json")
+    reader = engines(tmp_path / "world.json")
+    assert reader.village_rank(1, "wood").score == 800
+    writer.adjust_resources({1: (100, 0, 0, 0)})
+    assert writer.queue_build(_build())
+    assert reader.village_rank(1, "wood").score == 900
+    assert reader.leaderboard("total", 10, 0)[0].score == 3300
+    assert len(builds) == 1
+
+    for _ in range(shared_engine.CHANGE_LOG_SLOTS):
+        writer.adjust_resources({1: (1, 0, 0, 0)})
+    assert reader.village_rank(1, "wood").score == 900 + shared_engine.CHANGE_LOG_SLOTS
+    assert len(builds) == 2
@@ -0,0 +1,104 @@
+"""Tests des projections ``fields=`` sur les routes de lecture et dans les moteurs."""
+
+import sqlite3
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from ager import container
+from ager.adapters.memory_engine import MemoryEngine
+from ager.adapters.sql_engine import SQLiteEngine
+from ager.app import app
+from ager.metrics import sql_statement_count
+from ager.models import BuildCmd
+
+
+@pytest.fixture()
+def sql_engine(tmp_path):
+    """Moteur SQL de 50 villages, dont le premier a une queue."""
+    db = tmp_path / "fields.db"
+    eng = SQLiteEngine(db)
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.executemany(
+            "INSERT INTO village(id, name) VALUES (?, ?)", [(i, f"V{i}") for i in range(2, 51)]
+        )
+        conn.executemany(
+            "INSERT INTO resources(village_id, wood) VALUES (?, ?)", [(i, i) for i in range(2, 51)]
+        )
+    conn.close()
+    assert eng.queue_build(BuildCmd(villageId=1, building="farm", levelTarget=2))
+    return eng
+
+
+def _statements(call):
+    before = sql_statement_count()
+    result = call()
+    return result, sql_statement_count() - before
+
+
+def test_sql_snapshot_skips_unrequested_queries(sql_engine):
+    """Une requête par table lue; sans resources ni queue, seule la table village est lue."""
+    full, full_count = _statements(sql_engine.snapshot)
+    light, light_count = _statements(lambda: sql_engine.snapshot(frozenset({"id", "name"})))
+    assert light_count == 1
+    assert full_count == 3
+    assert full == [sql_engine.get_village(v.id) for v in full]
+    assert [(v.id, v.name) for v in light] == [(v.id, v.name) for v in full]
+
+    resources, count = _statements(lambda: sql_engine.snapshot(frozenset({"id", "resources"})))
+    assert count == 2
+    assert resources[5].resources == full[5].resources
+
+
+def test_sql_get_village_loads_requested_fields(sql_engine):
+    """get_village n'émet la requête de queue ou de ressources que si le champ est demandé."""
+    village, count = _statements(lambda: sql_engine.get_village(1, frozenset({"id", "queue"})))
+    assert count == 2
+    assert village.queue == ("farm -> L2",)
+    village, count = _statements(lambda: sql_engine.get_village(7, frozenset({"id", "resources"})))
+    assert count == 2
+    assert village.resources.wood == 7
+    assert sql_engine.get_village(999, frozenset({"id"})) is None
+
+
+@pytest.fixture()
+def memory_app():
+    previous = container._engine
+    eng = MemoryEngine()
+    eng.queue_build(BuildCmd(villageId=1, building="farm", levelTarget=3))
+    container._engine = eng
+    yield
+    container._engine = previous
+
+
+@pytest.mark.asyncio
+async def test_routes_return_only_requested_fields(memory_app):
+    """La réponse ne contient que les champs demandés (et l'id); sans fields, le village complet."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.get("/snapshot", params={"fields": "name"})
+        assert r.status_code == 200
+        assert r.json() == {"villages": [{"id": 1, "name": "Capitale"}]}
+
+        r = await ac.get("/village/1", params={"fields": "resources, queue"})
+        assert r.json() == {
+            "id": 1,
+            "resources": {"wood": 800, "clay": 800, "iron": 800, "crop": 800},
+            "queue": ["farm -> L3"],
+        }
+
+        r = await ac.get("/village/1")
+        assert set(r.json()) == {"id", "name", "x", "y", "resources", "queue"}
+
+
+@pytest.mark.asyncio
+async def test_routes_reject_unknown_fields(memory_app):
+    """Un champ inconnu donne 422; un village inconnu reste 404."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.get("/snapshot", params={"fields": "name,gold"})
+        assert r.status_code == 422
+        assert "gold" in r.json()["detail"]
+        r = await ac.get("/village/99", params={"fields": "name"})
+        assert r.status_code == 404
@@ -0,0 +1,147 @@
+"""Tests de l'index spatial en grille et des requêtes de carte des moteurs."""
+
+import json
+import random
+import sqlite3
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from ager import container
+from ager.adapters.file_engine import FileStorageEngine
+from ager.adapters.memory_engine import MemoryEngine
+from ager.adapters.spatial import GridIndex
+from ager.adapters.sql_engine import SQLiteEngine
+from ager.app import app
+from ager.models import Resources, Village
+
+
+def _points(count: int, spread: int, seed: int = 0) -> list[tuple[int, int, int]]:
+    rng = random.Random(seed)
+    return [
+        (vid, rng.randint(-spread, spread), rng.randint(-spread, spread)) for vid in range(count)
+    ]
+
+
+def _brute_within(points, x, y, r):
+    found = sorted(((px - x) ** 2 + (py - y) ** 2, vid) for vid, px, py in points)
+    return [vid for d2, vid in found if d2 <= r * r]
+
+
+def _brute_nearest(points, x, y, n):
+    found = sorted(((px - x) ** 2 + (py - y) ** 2, vid) for vid, px, py in points)
+    return [vid for _, vid in found[:n]]
+
+
+@pytest.mark.parametrize("spread", [20, 500])
+def test_grid_matches_brute_force(spread):
+    """Les requêtes de rayon et de voisinage donnent le même résultat qu'un parcours complet."""
+    points = _points(400, spread)
+    index = GridIndex.build(points, cell_size=8)
+    rng = random.Random(1)
+    for _ in range(50):
+        x, y = rng.randint(-spread, spread), rng.randint(-spread, spread)
+        r = rng.uniform(0, spread)
+        n = rng.randint(1, 30)
+        assert index.within(x, y, r) == _brute_within(points, x, y, r)
+        assert index.nearest(x, y, n) == _brute_nearest(points, x, y, n)
+
+
+def test_grid_far_query_uses_sparse_fallback():
+    """Un point loin de tout village trouve quand même ses plus proches voisins."""
+    points = [(1, 0, 0), (2, 3, 4), (3, -50, 10)]
+    index = GridIndex.build(points, cell_size=4)
+    assert index.nearest(10_000, 10_000, 2) == _brute_nearest(points, 10_000, 10_000, 2)
+    assert index.within(10_000, 10_000, 1_000_000) == _brute_within(
+        points, 10_000, 10_000, 1_000_000
+    )
+
+
+def test_grid_add_move_remove():
+    """Un village déplacé change de case; un village retiré disparaît des requêtes."""
+    index = GridIndex(cell_size=4)
+    index.add(1, 0, 0)
+    index.add(2, 100, 100)
+    index.add(1, 99, 99)
+    assert index.nearest(100, 100, 2) == [2, 1]
+    index.remove(2)
+    index.remove(42)
+    assert len(index) == 1
+    assert index.within(0, 0, 5) == []
+    assert index.nearest(0, 0, 5) == [1]
+    with pytest.raises(ValueError):
+        GridIndex(cell_size=0)
+
+
+def _world() -> dict[int, Village]:
+    return {
+        vid: Village(id=vid, name=f"V{vid}", resources=Resources(), queue=[], x=x, y=y)
+        for vid, x, y in [(1, 0, 0), (2, 3, 4), (3, -6, 8), (4, 30, 0), (5, 0, -2)]
+    }
+
+
+def _sql_engine(tmp_path):
+    db = tmp_path / "map.db"
+    SQLiteEngine(db, use_template=False).close()
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("DELETE FROM resources")
+        conn.execute("DELETE FROM village")
+        for v in _world().values():
+            conn.execute(
+                "INSERT INTO village(id, name, x, y) VALUES (?, ?, ?, ?)", (v.id, v.name, v.x, v.y)
+            )
+            conn.execute("INSERT INTO resources(village_id) VALUES (?)", (v.id,))
+    conn.close()
+    return SQLiteEngine(db)
+
+
+def _file_engine(tmp_path):
+    path = tmp_path / "world.json"
+    villages = {str(vid): v.model_dump() for vid, v in _world().items()}
+    path.write_text(json.dumps({"villages": villages}))
+    return FileStorageEngine(str(path))
+
+
+def _memory_engine(tmp_path):
+    eng = MemoryEngine()
+    eng.world = _world()
+    return eng
+
+
+@pytest.mark.parametrize("factory", [_memory_engine, _file_engine, _sql_engine])
+def test_engine_map_queries(tmp_path, factory):
+    """Chaque moteur répond aux requêtes de carte, triées par distance puis par ID."""
+    eng = factory(tmp_path)
+    assert [v.id for v in eng.villages_within(0, 0, 5)] == [1, 5, 2]
+    assert [v.id for v in eng.villages_within(0, 0, 10)] == [1, 5, 2, 3]
+    assert eng.villages_within(100, 100, 5) == []
+    assert [v.id for v in eng.nearest_villages(0, 0, 2)] == [1, 5]
+    assert [v.id for v in eng.nearest_villages(29, 0, 1)] == [4]
+    assert [v.id for v in eng.nearest_villages(0, 0, 10)] == [1, 5, 2, 3, 4]
+    assert eng.villages_within(3, 4, 0)[0].x == 3
+
+
+@pytest.fixture()
+def map_engine(tmp_path):
+    previous = container._engine
+    container._engine = _memory_engine(tmp_path)
+    yield
+    container._engine = previous
+
+
+@pytest.mark.asyncio
+async def test_map_routes(map_engine):
+    """GET /map et /map/nearest retournent les villages; les bornes invalides donnent 422."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.get("/map", params={"x": 0, "y": 0, "r": 5})
+        assert r.status_code == 200
+        assert [v["id"] for v in r.json()["villages"]] == [1, 5, 2]
+        assert r.json()["villages"][2]["x"] == 3
+
+        r = await ac.get("/map/nearest", params={"x": 30, "y": 1, "n": 1})
+        assert [v["id"] for v in r.json()["villages"]] == [4]
+
+        assert (await ac.get("/map", params={"x": 0, "y": 0, "r": 10_000})).status_code == 422
+        assert (await ac.get("/map/nearest", params={"x": 0, "y": 0, "n": 0})).status_code == 422
@@ -0,0 +1,127 @@
+"""Non-régression des plans de requête de SQLiteEngine (EXPLAIN QUERY PLAN).
+
+Chaque requête émise par le moteur est capturée puis expliquée: un ``SCAN`` d'une
+grande table ou un tri temporaire fait échouer le test, sauf pour les lectures
+complètes voulues (requête sans ``WHERE``, comme la liste des villages de snapshot)
+et pour le tri par distance des requêtes de carte, borné au carré lu par l'index.
+"""
+
+import sqlite3
+
+import pytest
+from sqlalchemy import event
+
+from ager.adapters.sql_engine import SQLiteEngine
+from ager.db.session import get_engine, get_read_engine
+from ager.models import BuildCmd
+
+LARGE_TABLES = ("village", "resources", "build_queue")
+
+
+@pytest.fixture()
+def engine_and_statements(tmp_path):
+    """Moteur SQL peuplé et liste des requêtes qu'il émet."""
+    db = tmp_path / "plans.db"
+    eng = SQLiteEngine(db)
+    conn = sqlite3.connect(db)
+    conn.executemany(
+        "INSERT INTO village(id, name, x, y) VALUES (?, ?, ?, ?)",
+        [(i, f"V{i}", i % 25 * 8, i // 25 * 8) for i in range(2, 500)],
+    )
+    conn.executemany(
+        "INSERT INTO resources(village_id, wood, clay, iron, crop) VALUES (?, 1, 1, 1, 1)",
+        [(i,) for i in range(2, 500)],
+    )
+    conn.executemany(
+        "INSERT INTO build_queue(village_id, building, level, queued_at) VALUES (?, 'farm', 1, ?)",
+        [(i % 500, f"2025-01-01T00:00:{i:06d}") for i in range(5000)],
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+    statements: list[tuple[str, object]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        # executemany: un jeu de paramètres suffit à expliquer la requête
+        statements.append((statement, parameters[0] if executemany else parameters))
+
+    # Lectures (pool en lecture seule) et écritures (writer) passent par deux moteurs
+    sa_engines = (get_engine(db), get_read_engine(db))
+    for sa_engine in sa_engines:
+        event.listen(sa_engine, "before_cursor_execute", capture)
+    yield eng, db, statements
+    for sa_engine in sa_engines:
+        event.remove(sa_engine, "before_cursor_execute", capture)
+
+
+def _explain(db, statement, parameters):
+    conn = sqlite3.connect(db)
+    try:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+    finally:
+        conn.close()
+    return [row[-1] for row in rows]
+
+
+def _violations(db, statements):
+    found = []
+    for statement, parameters in statements:
+        full_read = " WHERE " not in statement.upper()
+        details = _explain(db, statement, parameters)
+        # Aucun index ne peut trier par distance: le tri est toléré seulement quand
+        # les lignes triées viennent du carré englobant lu par idx_village_xy
+        bounded = any("INDEX idx_village_xy" in d for d in details)
+        for detail in details:
+            scanned = detail.startswith("SCAN ") and detail.split()[1] in LARGE_TABLES
+            sorted_box = bounded and detail == "USE TEMP B-TREE FOR ORDER BY"
+            if (scanned and not full_read) or ("USE TEMP B-TREE" in detail and not sorted_box):
+                found.append(f"{detail!r} <- {statement}")
+    return found
+
+
+WORKLOADS = {
+    "snapshot": lambda eng: eng.snapshot(),
+    "get_village": lambda eng: eng.get_village(42),
+    "get_village_missing": lambda eng: eng.get_village(999_999),
+    "queue_build": lambda eng: eng.queue_build(
+        BuildCmd(villageId=7, building="farm", levelTarget=2)
+    ),
+    "leaderboard": lambda eng: eng.leaderboard("total", 10, 0),
+    "leaderboard_wood": lambda eng: eng.leaderboard("wood", 10, 0),
+    "village_rank": lambda eng: eng.village_rank(42, "total"),
+    "villages_within": lambda eng: eng.villages_within(80, 80, 20),
+    "nearest_villages": lambda eng: eng.nearest_villages(80, 80, 5),
+    "get_villages": lambda eng: eng.get_villages([42, 7, 999_999]),
+    "adjust_resources": lambda eng: eng.adjust_resources({42: (5, 0, 0, -1), 7: (1, 1, 1, 1)}),
+    "transfer_resources": lambda eng: eng.transfer_resources([(42, 7, (1, 0, 0, 0))]),
+    "stats": lambda eng: eng.stats(),
+}
+
+
+@pytest.mark.parametrize("workload", sorted(WORKLOADS))
+def test_no_scan_on_large_tables(engine_and_statements, workload):
+    """Aucune requête filtrée du moteur ne parcourt une grande table ni ne trie en mémoire."""
+    eng, db, statements = engine_and_statements
+    WORKLOADS[workload](eng)
+    assert statements, "aucune requête capturée"
+    assert _violations(db, statements) == []
+
+
+def test_build_queue_index_is_covering(engine_and_statements):
+    """La lecture de queue d'un village passe par l'index couvrant."""
+    eng, db, statements = engine_and_statements
+    eng.get_village(42)
+    details = [d for s, p in statements if "build_queue" in s for d in _explain(db, s, p)]
+    assert any("COVERING INDEX idx_build_queue_village_queued" in d for d in details)
+
+
+def test_suite_detects_missing_index(engine_and_statements):
+    """Sans l'index, la requête de queue est signalée (le garde-fou fonctionne)."""
+    eng, db, statements = engine_and_statements
+    conn = sqlite3.connect(db)
+    conn.execute("DROP INDEX idx_build_queue_village_queued")
+    conn.commit()
+    conn.close()
+    eng.get_village(42)
+    assert _violations(db, statements)
@@ -0,0 +1,81 @@
+"""Tests du traçage SQL (Server-Timing, log des requêtes lentes)."""
+
+import logging
+import re
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, text
+
+from ager.app import app
+from ager.container import reset_engine
+from ager.db.tracing import SERVER_TIMING_HEADER, current_request_stats, install_tracing
+
+
+def _sql_timing(response) -> tuple[int, float]:
+    match = re.search(
+        r'sql;dur=([0-9.]+);desc="(\d+) statements"', response.headers[SERVER_TIMING_HEADER]
+    )
+    assert match, response.headers[SERVER_TIMING_HEADER]
+    return int(match.group(2)), float(match.group(1))
+
+
+@pytest.fixture
+def sql_app(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGER_ENGINE", "sql")
+    monkeypatch.setenv("AGER_DB_PATH", str(tmp_path / "ager.db"))
+    reset_engine()
+    yield app
+    reset_engine()
+
+
+async def test_server_timing_counts_request_statements(sql_app):
+    """Server-Timing expose le nombre de requêtes SQL et leur durée par requête HTTP."""
+    async with AsyncClient(transport=ASGITransport(app=sql_app), base_url="http://test") as ac:
+        village = await ac.get("/village/1")
+        health = await ac.get("/health")
+
+    count, duration = _sql_timing(village)
+    assert count == 3  # village, ressources, queue
+    assert duration > 0
+    assert SERVER_TIMING_HEADER not in health.headers
+
+
+async def test_no_server_timing_without_sql(tmp_path, monkeypatch):
+    """Un moteur sans SQL n'ajoute pas d'en-tête Server-Timing vide."""
+    monkeypatch.setenv("AGER_ENGINE", "memory")
+    reset_engine()
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.get("/village/1")
+    finally:
+        reset_engine()
+    assert response.status_code == 200
+    assert SERVER_TIMING_HEADER not in response.headers
+
+
+def test_slow_query_log_includes_params_and_plan(tmp_path, caplog):
+    """Une requête au-dessus du seuil est journalisée avec paramètres et plan."""
+    engine = create_engine(f"sqlite:///{tmp_path / 't.db'}")
+    install_tracing(engine, slow_query_ms=0)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)"))
+        conn.execute(text("INSERT INTO t(id, v) VALUES (1, 'a')"))
+        with caplog.at_level(logging.WARNING, logger="ager.sql.slow"):
+            conn.execute(text("SELECT v FROM t WHERE id = :id"), {"id": 1})
+
+    assert current_request_stats() is None
+    record = caplog.records[-1]
+    assert "SELECT v FROM t WHERE id = ?" in record.getMessage()
+    assert "params=(1,)" in record.getMessage()
+    assert "SEARCH t USING INTEGER PRIMARY KEY" in record.getMessage()
+    assert record.sql_duration_ms >= 0
+
+
+def test_slow_query_log_disabled(tmp_path, caplog):
+    """Sans seuil, aucune requête n'est journalisée."""
+    engine = create_engine(f"sqlite:///{tmp_path / 't.db'}")
+    install_tracing(engine, slow_query_ms=None)
+    with caplog.at_level(logging.WARNING, logger="ager.sql.slow"), engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert not caplog.records
@@ -0,0 +1,134 @@
+"""Tests du writer SQLite unique et du pool de lecture."""
+
+import threading
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from ager.adapters.sql_engine import SQLiteEngine
+from ager.db.models import BuildQueue
+from ager.db.session import get_read_session, get_writer
+from ager.models import BuildCmd
+
+
+@pytest.fixture
+def sql_engine(tmp_path):
+    eng = SQLiteEngine(tmp_path / "w.db")
+    yield eng
+    eng.close()
+
+
+def _block_writer(writer):
+    """Occupe le thread du writer jusqu'à ce que l'événement retourné soit levé."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def wait(session):
+        started.set()
+        release.wait(5)
+
+    future = writer.submit(wait)
+    assert started.wait(5)
+    return release, future
+
+
+def _queue_item(building):
+    def write(session):
+        session.add(BuildQueue(village_id=1, building=building, level=1, queued_at="t"))
+        return building
+
+    return write
+
+
+def test_queued_writes_are_committed_in_one_batch(sql_engine, tmp_path):
+    """Les écritures en attente derrière un lot sont commitées ensemble."""
+    writer = get_writer(tmp_path / "w.db")
+    release, first = _block_writer(writer)
+    futures = [writer.submit(_queue_item(f"b{i}")) for i in range(10)]
+    batches = writer.batches
+    release.set()
+
+    assert [f.result(5) for f in futures] == [f"b{i}" for i in range(10)]
+    first.result(5)
+    assert writer.batches == batches + 2
+    assert len(sql_engine.get_village(1).queue) == 10
+
+
+def test_failing_write_does_not_abort_batch(sql_engine, tmp_path):
+    """Une commande en échec est isolée: les autres commandes du lot sont commitées."""
+    writer = get_writer(tmp_path / "w.db")
+    release, _ = _block_writer(writer)
+
+    def boom(session):
+        session.add(BuildQueue(village_id=1, building="boom", level=1, queued_at="t"))
+        raise RuntimeError("boom")
+
+    ok_before = writer.submit(_queue_item("before"))
+    failing = writer.submit(boom)
+    ok_after = writer.submit(_queue_item("after"))
+    release.set()
+
+    assert ok_before.result(5) == "before"
+    assert ok_after.result(5) == "after"
+    with pytest.raises(RuntimeError):
+        failing.result(5)
+    assert sql_engine.get_village(1).queue == ("before -> L1", "after -> L1")
+
+
+def test_reads_do_not_wait_for_open_write(sql_engine, tmp_path):
+    """Un lecteur lit le dernier état commité pendant qu'une écriture est en cours."""
+    writer = get_writer(tmp_path / "w.db")
+    release = threading.Event()
+    flushed = threading.Event()
+
+    def slow_write(session):
+        _queue_item("pending")(session)
+        session.flush()  # verrou d'écriture pris, transaction ouverte
+        flushed.set()
+        release.wait(5)
+
+    future = writer.submit(slow_write)
+    assert flushed.wait(5)
+    try:
+        assert sql_engine.get_village(1).queue == ()
+    finally:
+        release.set()
+    future.result(5)
+    assert sql_engine.get_village(1).queue == ("pending -> L1",)
+
+
+def test_concurrent_queue_build(sql_engine):
+    """Des queue_build concurrents sont tous appliqués."""
+
+    def work(n):
+        for i in range(20):
+            assert sql_engine.queue_build(
+                BuildCmd(villageId=1, building=f"t{n}", levelTarget=i + 1)
+            )
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(sql_engine.get_village(1).queue) == 160
+    assert sql_engine.queue_build(BuildCmd(villageId=999, building="farm", levelTarget=1)) is False
+
+
+def test_close_applies_pending_writes_and_restarts(sql_engine, tmp_path):
+    """close() vide la file puis arrête le thread; une écriture suivante le relance."""
+    writer = get_writer(tmp_path / "w.db")
+    futures = [writer.submit(_queue_item(f"c{i}")) for i in range(5)]
+    sql_engine.close()
+    assert all(f.done() for f in futures)
+    assert writer._thread is None
+
+    assert sql_engine.queue_build(BuildCmd(villageId=1, building="farm", levelTarget=1))
+    assert len(sql_engine.get_village(1).queue) == 6
+
+
+def test_read_sessions_are_query_only(sql_engine, tmp_path):
+    """Les connexions du pool de lecture refusent toute écriture."""
+    with get_read_session(tmp_path / "w.db") as session, pytest.raises(OperationalError):
+        session.execute(text("DELETE FROM build_queue"))
@@ -0,0 +1,140 @@
+"""Tests du moteur tiered (cache LRU borné devant un moteur de stockage)."""
+
+from collections import Counter
+
+import pytest
+
+from ager import container
+from ager.adapters.memory_engine import MemoryEngine
+from ager.adapters.sql_engine import SQLiteEngine
+from ager.adapters.tiered_engine import TieredEngine
+from ager.metrics import REGISTRY
+from ager.models import BuildCmd, Resources, Village
+from tools.bench_tiered import main as bench_main
+from tools.bench_tiered import run, zipf_sampler
+
+
+def _store(villages: int = 10) -> MemoryEngine:
+    store = MemoryEngine()
+    store.world = {
+        vid: Village(id=vid, name=f"V{vid}", resources=Resources(), queue=[])
+        for vid in range(1, villages + 1)
+    }
+    return store
+
+
+def test_misses_fault_villages_in_and_evict_lru():
+    """Un village absent est chargé depuis le stockage; le moins récent est évincé."""
+    eng = TieredEngine(_store(), capacity=2)
+    assert eng.get_village(1).id == 1
+    assert eng.get_village(2).id == 2
+    assert eng.get_village(1).id == 1  # 1 redevient le plus récent
+    assert eng.get_village(3).id == 3  # évince 2
+
+    assert (eng.hits, eng.misses, eng.evictions) == (1, 3, 1)
+    assert eng.resident == 2
+    eng.get_village(2)
+    assert eng.misses == 4
+
+
+def test_unknown_village_not_cached():
+    """Un ID inconnu retourne None sans occuper le cache."""
+    eng = TieredEngine(_store(), capacity=2)
+    assert eng.get_village(999) is None
+    assert eng.resident == 0
+
+
+def test_writes_go_through_to_store():
+    """Une commande est écrite dans le stockage et visible en mémoire comme après éviction."""
+    store = _store()
+    eng = TieredEngine(store, capacity=1)
+    cached = eng.get_village(1)
+    assert eng.queue_build(BuildCmd(villageId=1, building="farm", levelTarget=2))
+    assert cached.queue == ()  # la version déjà lue n'est pas modifiée
+    assert eng.get_village(1).queue == ("farm -> L2",)
+
+    eng.get_village(2)  # évince 1
+    assert eng.queue_build(BuildCmd(villageId=1, building="farm", levelTarget=3))
+    assert eng.get_village(1).queue == ("farm -> L2", "farm -> L3")
+    assert store.get_village(1).queue == ("farm -> L2", "farm -> L3")
+    assert not eng.queue_build(BuildCmd(villageId=99, building="farm", levelTarget=1))
+
+
+def test_resource_adjustments_update_cache_and_store():
+    """adjust_resources() écrit dans le stockage et met à jour la copie en cache."""
+    store = _store()
+    eng = TieredEngine(store, capacity=4)
+    wood = eng.get_village(1).resources.wood
+    assert eng.adjust_resources({1: (5, 0, 0, 0), 2: (1, 0, 0, 0), 99: (1, 0, 0, 0)}) == 2
+    assert eng.get_village(1).resources.wood == wood + 5
+    assert store.get_village(1).resources == eng.get_village(1).resources
+    assert store.get_village(2).resources == eng.get_village(2).resources
+
+
+def test_snapshot_reads_store():
+    """snapshot() couvre tout le monde, y compris les villages jamais chargés."""
+    eng = TieredEngine(_store(5), capacity=1)
+    assert len(eng.snapshot()) == 5
+
+
+def test_invalid_capacity():
+    """La capacité doit être strictement positive."""
+    with pytest.raises(ValueError):
+        TieredEngine(_store(), capacity=0)
+
+
+def test_cache_events_exposed_as_metrics():
+    """Hits, misses et évictions sont exposés au format Prometheus."""
+    eng = TieredEngine(_store(), capacity=1)
+    eng.get_village(1)
+    eng.get_village(1)
+    eng.get_village(2)
+    text = REGISTRY.render()
+    for event in ("hit", "miss", "eviction"):
+        assert f'ager_tier_cache_total{{event="{event}"}}' in text
+    assert "ager_tier_resident_villages 1" in text
+
+
+def test_zipf_access_mostly_hits_hot_villages():
+    """Sous un accès Zipf, un cache de 5 % des villages sert la majorité des lectures."""
+    sample = zipf_sampler(2000, exponent=1.1, seed=1)
+    draws = Counter(sample() for _ in range(5000))
+    assert draws.most_common(1)[0][0] == 1
+    assert all(1 <= vid <= 2000 for vid in draws)
+
+    eng = TieredEngine(_store(2000), capacity=100)
+    result = run("tiered", eng, zipf_sampler(2000, seed=1), ops=5000, write_ratio=0.1)
+    assert result.hit_ratio > 0.5
+    assert eng.resident <= 100
+
+
+def test_bench_cli_against_sqlite(tmp_path, capsys):
+    """Le benchmark compare SQLite seul et le moteur tiered sur une base générée."""
+    db = tmp_path / "bench.db"
+    bench_main([str(db), "--villages", "200", "--capacity", "20", "--ops", "200"])
+    out = capsys.readouterr().out
+    assert "[OK] sql:" in out
+    assert "hit ratio" in out
+    assert len(SQLiteEngine(db).snapshot()) == 200
+
+
+def test_container_tiered_engine(tmp_path, monkeypatch):
+    """AGER_ENGINE=tiered place un cache devant le moteur AGER_TIER_STORE."""
+    monkeypatch.setenv("AGER_ENGINE", "tiered")
+    monkeypatch.setenv("AGER_TIER_STORE", "sql")
+    monkeypatch.setenv("AGER_TIER_CAPACITY", "5")
+    monkeypatch.setenv("AGER_DB_PATH", str(tmp_path / "ager.db"))
+    container.reset_engine()
+    try:
+        engine = container.get_engine()
+        assert isinstance(engine, TieredEngine)
+        assert isinstance(engine.store, SQLiteEngine)
+        assert engine.capacity == 5
+        engine.close()
+
+        monkeypatch.setenv("AGER_TIER_STORE", "tiered")
+        container.reset_engine()
+        with pytest.raises(ValueError):
+            container.get_engine()
+    finally:
+        container.reset_engine()
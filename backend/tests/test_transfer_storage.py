@@ -0,0 +1,178 @@
+"""Tests du transfert en masse fichier JSON <-> SQLite."""
+
+import io
+import json
+import sqlite3
+
+from ager.adapters.file_engine import FileStorageEngine
+from ager.adapters.json_stream import WorldJsonWriter, iter_world_records
+from ager.adapters.sql_engine import SQLiteEngine
+from ager.models import BuildCmd
+from tools.seed_file_storage import main as seed_main
+from tools.transfer_storage import export_sql_to_file, import_file_to_sql, main
+
+
+def _write_world(path, villages):
+    path.write_text(json.dumps({"villages": villages}), encoding="utf-8")
+
+
+def test_iter_world_records_streams_small_chunks():
+    """Le lecteur incrémental découpe les sections même avec un petit tampon."""
+    data = {
+        "meta": {"ignored": [1, 2, 3]},
+        "villages": {str(i): {"id": i, "name": f"V{i}"} for i in range(50)},
+        "resources": {"3": {"wood": 12345}},
+    }
+    buf = io.StringIO(json.dumps(data, indent=2))
+    records = list(iter_world_records(buf, chunk_size=16))
+    assert len(records) == 51
+    assert records[0] == ("villages", "0", {"id": 0, "name": "V0"})
+    assert records[-1] == ("resources", "3", {"wood": 12345})
+
+
+def test_writer_output_is_valid_json():
+    """Le writer incrémental produit un document JSON valide."""
+    buf = io.StringIO()
+    writer = WorldJsonWriter(buf)
+    writer.write_section("villages", ((str(i), {"id": i, "name": "é"}) for i in range(3)))
+    writer.write_section("buildQueues", iter(()))
+    writer.close()
+    data = json.loads(buf.getvalue())
+    assert data["villages"]["2"] == {"id": 2, "name": "é"}
+    assert data["buildQueues"] == {}
+
+
+def test_import_seed_file_to_sql(tmp_path):
+    """Un fichier seed est importé avec ressources et queues séparées."""
+    json_path = tmp_path / "state.json"
+    db_path = tmp_path / "ager.db"
+    seed_main(json_path)
+
+    stats = import_file_to_sql(json_path, db_path, chunk_size=1)
+    assert (stats.villages, stats.resources, stats.queue_items) == (2, 2, 1)
+
+    eng = SQLiteEngine(db_path)
+    v1 = eng.get_village(1)
+    assert v1 is not None
+    assert v1.name == "Capitale"  # le seed SQL est remplacé
+    assert v1.resources.wood == 100
+    assert v1.queue == ("farm -> L2",)
+    assert eng.get_village(2).queue == ()
+
+
+def test_import_legacy_file_to_sql(tmp_path):
+    """Le format legacy (ressources et queue inline) est supporté."""
+    json_path = tmp_path / "world.json"
+    db_path = tmp_path / "ager.db"
+    _write_world(
+        json_path,
+        {
+            "7": {
+                "id": 7,
+                "name": "Legacy",
+                "resources": {"wood": 1, "clay": 2, "iron": 3, "crop": 4},
+                "queue": ["Farm -> L2", "Barracks -> L10"],
+            }
+        },
+    )
+    import_file_to_sql(json_path, db_path)
+
+    eng = SQLiteEngine(db_path)
+    assert eng.get_village(1) is None
+    v = eng.get_village(7)
+    assert v.resources.crop == 4
+    assert v.queue == ("Farm -> L2", "Barracks -> L10")
+
+
+def test_import_recreates_indexes(tmp_path):
+    """Les index supprimés pendant le chargement sont recréés."""
+    json_path = tmp_path / "state.json"
+    db_path = tmp_path / "ager.db"
+    seed_main(json_path)
+    SQLiteEngine(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE INDEX idx_test_village_name ON village(name)")
+    conn.commit()
+    conn.close()
+
+    import_file_to_sql(json_path, db_path)
+
+    conn = sqlite3.connect(db_path)
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    conn.close()
+    assert "idx_test_village_name" in names
+
+
+def test_roundtrip_sql_file_sql(tmp_path):
+    """SQL -> fichier -> SQL conserve le monde, lisible par FileStorageEngine."""
+    db_path = tmp_path / "source.db"
+    json_path = tmp_path / "export.json"
+    eng = SQLiteEngine(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO village(id, name) VALUES (?, ?)", [(i, f"V{i}") for i in range(2, 200)]
+    )
+    conn.executemany(
+        "INSERT INTO resources(village_id, wood, clay, iron, crop) VALUES (?, ?, ?, ?, ?)",
+        [(i, i, i, i, i) for i in range(2, 200)],
+    )
+    conn.commit()
+    conn.close()
+    eng.queue_build(BuildCmd(villageId=5, building="farm", levelTarget=1))
+    eng.queue_build(BuildCmd(villageId=5, building="farm", levelTarget=2))
+
+    stats = export_sql_to_file(db_path, json_path, chunk_size=7)
+    assert (stats.villages, stats.resources, stats.queue_items) == (199, 199, 2)
+
+    file_eng = FileStorageEngine(str(json_path))
+    assert len(file_eng.snapshot()) == 199
+    assert file_eng.get_village(42).resources.iron == 42
+    assert file_eng.get_village(5).queue == ("farm -> L1", "farm -> L2")
+
+    target = tmp_path / "target.db"
+    import_file_to_sql(json_path, target, chunk_size=13)
+    assert SQLiteEngine(target).get_village(5).queue == ("farm -> L1", "farm -> L2")
+    assert len(SQLiteEngine(target).snapshot()) == 199
+
+
+def test_cli(tmp_path, capsys):
+    """La CLI enchaîne import et export."""
+    json_path = tmp_path / "state.json"
+    seed_main(json_path)
+    main(["to-sql", str(json_path), str(tmp_path / "ager.db")])
+    main(["--chunk-size", "10", "to-file", str(tmp_path / "ager.db"), str(tmp_path / "out.json")])
+    assert "[OK]" in capsys.readouterr().out
+    assert set(json.loads((tmp_path / "out.json").read_text())["villages"]) == {"1", "2"}
+
+
+def test_import_independent_of_section_order(tmp_path):
+    """Priorités et clés de village identiques quel que soit l'ordre des sections."""
+    villages = {
+        "3": {
+            "id": 3,
+            "name": "Inline",
+            "resources": {"wood": 1, "clay": 2, "iron": 3, "crop": 4},
+            "queue": ["farm -> L1", "farm -> L2"],
+        },
+        "4": {"id": 99, "name": "Clé", "queue": ["wall -> L1"]},
+    }
+    resources = {"3": {"wood": 50}, "4": {"wood": 7}, "8": {"wood": 1}}
+    queues = {"4": [{"building": "barracks", "level": 3}], "8": [{"building": "farm"}]}
+    orders = {
+        "forward": {"villages": villages, "resources": resources, "buildQueues": queues},
+        "reverse": {"buildQueues": queues, "resources": resources, "villages": villages},
+    }
+    for label, data in orders.items():
+        json_path = tmp_path / f"{label}.json"
+        db_path = tmp_path / f"{label}.db"
+        json_path.write_text(json.dumps(data), encoding="utf-8")
+        stats = import_file_to_sql(json_path, db_path, chunk_size=2)
+        assert (stats.villages, stats.resources, stats.queue_items) == (2, 2, 3), label
+
+        eng = SQLiteEngine(db_path)
+        inline, keyed = eng.get_village(3), eng.get_village(4)
+        assert inline.resources.wood == 1 and inline.queue == ("farm -> L1", "farm -> L2")
+        assert keyed.name == "Clé" and keyed.resources.wood == 7
+        assert keyed.queue == ("barracks -> L3",)
+        assert eng.get_village(8) is None and eng.get_village(99) is None
+        eng.close()
@@ -0,0 +1,143 @@
+"""Tests des lectures groupées (get_villages) et des transferts atomiques de ressources."""
+
+import json
+import shutil
+
+import pytest
+
+from ager.adapters.event_engine import EventSourcedEngine
+from ager.adapters.file_engine import FileStorageEngine, load_world
+from ager.adapters.hybrid_engine import HybridEngine
+from ager.adapters.memory_engine import MemoryEngine
+from ager.adapters.shared_engine import SharedMemoryEngine
+from ager.adapters.sql_engine import SQLiteEngine
+from ager.adapters.tiered_engine import TieredEngine
+from ager.models import Resources
+from tools.transfer_storage import import_file_to_sql
+
+WORLD = {
+    "villages": {
+        "1": {
+            "id": 1,
+            "name": "Source",
+            "resources": {"wood": 100, "clay": 200, "iron": 300, "crop": 400},
+            "queue": [],
+        },
+        "2": {
+            "id": 2,
+            "name": "Cible",
+            "x": 3,
+            "resources": {"wood": 0, "clay": 0, "iron": 0, "crop": 0},
+            "queue": ["farm -> L1"],
+        },
+    }
+}
+
+
+def _memory(path, tmp_path):
+    engine = MemoryEngine()
+    engine.world = load_world(path)
+    return engine
+
+
+def _file(path, tmp_path):
+    return FileStorageEngine(str(path))
+
+
+def _sqlite(path, tmp_path):
+    import_file_to_sql(path, tmp_path / "ager.db")
+    return tmp_path / "ager.db"
+
+
+def _sql(path, tmp_path):
+    return SQLiteEngine(_sqlite(path, tmp_path))
+
+
+def _hybrid(path, tmp_path):
+    return HybridEngine(_sqlite(path, tmp_path), max_lag=60)
+
+
+def _tiered(path, tmp_path):
+    return TieredEngine(SQLiteEngine(_sqlite(path, tmp_path)), capacity=1)
+
+
+def _events(path, tmp_path):
+    shutil.copy(path, tmp_path / "events" / "checkpoint-000000000000.json")
+    return EventSourcedEngine(tmp_path / "events")
+
+
+def _shared(path, tmp_path):
+    return SharedMemoryEngine(path, timeout=5)
+
+
+FACTORIES = [_memory, _file, _sql, _hybrid, _tiered, _events, _shared]
+
+
+@pytest.fixture(params=FACTORIES, ids=lambda f: f.__name__.strip("_"))
+def engine(request, tmp_path):
+    """Moteur chargé avec deux villages (fermé en fin de test s'il a ``close``)."""
+    path = tmp_path / "world.json"
+    path.write_text(json.dumps(WORLD))
+    (tmp_path / "events").mkdir()
+    engine = request.param(path, tmp_path)
+    yield engine
+    close = getattr(engine, "close", None)
+    if callable(close):
+        close()
+
+
+def test_get_villages_in_requested_order(engine):
+    """Les villages connus sont rendus dans l'ordre demandé, les IDs inconnus omis."""
+    villages = engine.get_villages([2, 99, 1])
+    assert [v.id for v in villages] == [2, 1]
+    assert villages[0].queue == ("farm -> L1",) and villages[0].x == 3
+    assert villages[1].resources == Resources(wood=100, clay=200, iron=300, crop=400)
+    projected = engine.get_villages([1], frozenset({"id", "resources"}))
+    assert projected[0].resources.wood == 100
+    assert engine.get_villages([]) == []
+
+
+def test_transfers_bounded_by_source_stock(engine):
+    """Chaque transfert est borné au stock restant; la cible reçoit exactement le prélevé."""
+    moved = engine.transfer_resources(
+        [
+            (1, 2, (60, 0, 0, 0)),
+            (1, 2, (60, 10, 0, 0)),
+            (1, 99, (1, 1, 1, 1)),
+            (2, 2, (5, 5, 5, 5)),
+        ]
+    )
+    assert moved == [(60, 0, 0, 0), (40, 10, 0, 0), (0, 0, 0, 0), (5, 5, 0, 0)]
+    assert engine.get_village(1).resources == Resources(wood=0, clay=190, iron=300, crop=400)
+    assert engine.get_village(2).resources == Resources(wood=100, clay=10, iron=0, crop=0)
+    assert engine.village_rank(2, "wood").rank == 1
+    assert engine.transfer_resources([]) == []
+
+
+def test_negative_transfer_rejected(engine):
+    """Une quantité négative est refusée sans rien modifier."""
+    with pytest.raises(ValueError):
+        engine.transfer_resources([(2, 1, (0, 0, 0, 0)), (1, 2, (-1, 0, 0, 0))])
+    assert engine.get_village(1).resources.wood == 100
+
+
+def test_transfers_are_persisted(tmp_path):
+    """Journal et write-behind persistent les stocks résultant d'un transfert."""
+    path = tmp_path / "world.json"
+    path.write_text(json.dumps(WORLD))
+    (tmp_path / "events").mkdir()
+
+    events = _events(path, tmp_path)
+    events.transfer_resources([(1, 2, (150, 0, 0, 0))])
+    events.close()
+    replayed = EventSourcedEngine(tmp_path / "events")
+    assert replayed.get_village(2).resources.wood == 100
+    replayed.close()
+
+    hybrid = _hybrid(path, tmp_path)
+    hybrid.transfer_resources([(1, 2, (0, 50, 0, 0))])
+    hybrid.close()
+    store = SQLiteEngine(tmp_path / "ager.db")
+    assert store.get_village(1).resources.clay == 150
+    assert store.get_village(2).resources.clay == 50
+    store.close()
@@ -0,0 +1,245 @@
+"""Tests de l'hébergement multi-mondes (registre, chemins, routes /worlds/{id})."""
+
+import asyncio
+import threading
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from ager import commands, worlds
+from ager.adapters.memory_engine import MemoryEngine
+from ager.app import app
+from ager.settings import get_db_path, get_event_dir, get_storage_path, world_data_dir
+from ager.worlds import UnknownWorldError, WorldRegistry, world_dir
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class RecordingEngine(MemoryEngine):
+    """Moteur mémoire qui note les appels à flush et close."""
+
+    def __init__(self, world_id: str, calls: list[str]) -> None:
+        super().__init__()
+        self.world_id = world_id
+        self.calls = calls
+
+    def flush(self) -> None:
+        self.calls.append(f"flush:{self.world_id}")
+
+    def close(self) -> None:
+        self.calls.append(f"close:{self.world_id}")
+
+
+def _registry(max_resident=2, idle_seconds=60.0):
+    calls: list[str] = []
+    clock = FakeClock()
+    registry = WorldRegistry(
+        lambda wid: RecordingEngine(wid, calls), max_resident, idle_seconds, clock
+    )
+    return registry, calls, clock
+
+
+def test_registry_unloads_least_recently_used():
+    """Au-delà de ``max_resident``, le monde le moins récemment utilisé est déchargé."""
+    registry, calls, _ = _registry(max_resident=2)
+    for wid in ("a", "b", "a", "c"):
+        with registry.lease(wid):
+            pass
+    assert registry.resident == ["a", "c"]
+    assert calls == ["flush:b", "close:b"]
+    assert (registry.loads, registry.unloads) == (3, 1)
+
+
+def test_registry_reuses_resident_engine():
+    """Un monde résident n'est pas recréé entre deux baux."""
+    registry, _, _ = _registry()
+    with registry.lease("a") as first:
+        pass
+    with registry.lease("a") as second:
+        pass
+    assert first is second
+    assert registry.loads == 1
+
+
+def test_registry_evicts_idle_worlds():
+    """Les mondes inactifs depuis ``idle_seconds`` sont déchargés par le balayage."""
+    registry, calls, clock = _registry(max_resident=4, idle_seconds=60)
+    with registry.lease("a"):
+        pass
+    clock.now = 30
+    with registry.lease("b"):
+        pass
+    clock.now = 70
+    assert registry.evict_idle() == ["a"]
+    assert registry.resident == ["b"]
+    assert calls == ["flush:a", "close:a"]
+
+
+def test_leased_world_is_never_unloaded():
+    """Un monde en bail survit au dépassement de capacité et à l'inactivité."""
+    registry, calls, clock = _registry(max_resident=1, idle_seconds=10)
+    with registry.lease("a"):
+        with registry.lease("b"):
+            pass
+        clock.now = 100
+        assert registry.evict_idle() == ["b"]
+        assert registry.resident == ["a"]
+    clock.now = 200
+    assert registry.evict_idle() == ["a"]
+    assert calls == ["flush:b", "close:b", "flush:a", "close:a"]
+
+
+def test_failed_factory_leaves_no_entry():
+    """Une fabrique en échec ne laisse aucun monde fantôme dans le registre."""
+
+    def factory(wid: str) -> MemoryEngine:
+        raise RuntimeError("boom")
+
+    registry = WorldRegistry(factory, max_resident=1)
+    with pytest.raises(RuntimeError):
+        with registry.lease("a"):
+            pass
+    assert registry.resident == []
+    assert registry.evict_idle() == []
+
+
+def test_close_all_unloads_every_world():
+    """``close_all`` persiste et ferme tous les mondes chargés."""
+    registry, calls, _ = _registry(max_resident=4)
+    for wid in ("a", "b"):
+        with registry.lease(wid):
+            pass
+    registry.close_all()
+    assert registry.resident == []
+    assert sorted(calls) == ["close:a", "close:b", "flush:a", "flush:b"]
+
+
+def test_concurrent_leases_share_one_engine():
+    """Des baux simultanés sur un monde non chargé ne créent qu'un moteur."""
+    created = []
+    gate = threading.Event()
+
+    def factory(wid: str) -> MemoryEngine:
+        gate.wait(1)
+        engine = MemoryEngine()
+        created.append(engine)
+        return engine
+
+    registry = WorldRegistry(factory, max_resident=2)
+    seen = []
+
+    def use() -> None:
+        with registry.lease("a") as engine:
+            seen.append(engine)
+
+    threads = [threading.Thread(target=use) for _ in range(4)]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(created) == 1
+    assert all(engine is created[0] for engine in seen)
+
+
+def test_world_data_dir_redirects_storage_paths(tmp_path):
+    """Dans ``world_data_dir``, les chemins de stockage pointent dans le monde."""
+    with world_data_dir(tmp_path):
+        assert get_storage_path() == str(tmp_path / "world.json")
+        assert get_db_path() == str(tmp_path / "ager.db")
+        assert get_event_dir() == str(tmp_path / "events")
+    assert get_db_path() != str(tmp_path / "ager.db")
+
+
+def test_world_dir_requires_provisioned_directory(tmp_path, monkeypatch):
+    """Seuls les mondes provisionnés, au nom sûr, sont reconnus."""
+    monkeypatch.setenv("AGER_WORLDS_DIR", str(tmp_path))
+    (tmp_path / "alpha").mkdir()
+    assert world_dir("alpha") == tmp_path / "alpha"
+    for bad in ("missing", "..", "a/b", ""):
+        with pytest.raises(UnknownWorldError):
+            world_dir(bad)
+
+
+@pytest.fixture()
+def hosted_worlds(tmp_path, monkeypatch):
+    """Deux mondes provisionnés (moteur fichier), registre neuf."""
+    monkeypatch.setenv("AGER_WORLDS_DIR", str(tmp_path))
+    monkeypatch.setenv("AGER_ENGINE", "file")
+    for wid in ("alpha", "beta"):
+        (tmp_path / wid).mkdir()
+    worlds.reset_worlds()
+    yield tmp_path
+    worlds.close_worlds()
+    worlds.reset_worlds()
+
+
+async def test_world_routes_are_isolated(hosted_worlds):
+    """Une commande dans un monde n'affecte que ce monde, persisté dans son répertoire."""
+    cmd = {"villageId": 1, "building": "farm", "levelTarget": 2}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        r = await client.post("/worlds/alpha/cmd/build", json=cmd)
+        assert r.status_code == 200
+        alpha = (await client.get("/worlds/alpha/village/1")).json()
+        beta = (await client.get("/worlds/beta/village/1")).json()
+
+        r = await client.post("/worlds/beta/cmd/build?wait=false", json=cmd)
+        assert r.status_code == 202
+        assert r.headers["location"] == f"/worlds/beta/cmd/{r.json()['commandId']}"
+
+    assert len(alpha["queue"]) == 1
+    assert beta["queue"] == []
+    assert (hosted_worlds / "alpha" / "world.json").exists()
+
+
+async def test_unknown_world_is_404(hosted_worlds):
+    """Un monde non provisionné répond 404 sans rien créer sur disque."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        r = await client.get("/worlds/gamma/snapshot")
+        assert r.status_code == 404
+        r = await client.post(
+            "/worlds/gamma/cmd/build", json={"villageId": 1, "building": "farm", "levelTarget": 2}
+        )
+        assert r.status_code == 404
+    assert not (hosted_worlds / "gamma").exists()
+    assert worlds.get_worlds().resident == []
+
+
+def test_unload_tolerates_overlapping_detach():
+    """Un monde détaché de nouveau pendant son déchargement partage son événement."""
+    registry, calls, _ = _registry()
+    unloaded = []
+    registry._on_unload = unloaded.append
+    for wid in ("a", "b"):
+        with registry.lease(wid):
+            pass
+    first = [("a", registry._worlds["a"])]
+    registry._detach("a")
+    event = registry._unloading["a"]
+    # Nouvelle entrée du même monde, détachée avant la fin du premier déchargement
+    registry._worlds["a"] = registry._worlds.pop("b")
+    second = [("a", registry._worlds["a"])]
+    registry._detach("a")
+    assert registry._unloading["a"] is event
+    registry._unload(first)
+    registry._unload(second)
+    assert event.is_set() and registry._unloading == {}
+    assert unloaded == ["a", "a"]
+    assert calls == ["flush:a", "close:a", "flush:b", "close:b"]
+
+
+async def test_unloaded_world_forgets_idle_pipeline(hosted_worlds):
+    """Le pipeline d'un monde déchargé est oublié une fois ses commandes appliquées."""
+    cmd = {"villageId": 1, "building": "farm", "levelTarget": 2}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.post("/worlds/alpha/cmd/build", json=cmd)).status_code == 200
+    assert "alpha" in commands._world_pipelines
+    worlds.close_worlds()
+    await asyncio.sleep(0)
+    assert "alpha" not in commands._world_pipelines
@@ -0,0 +1,91 @@
+"""Benchmark de la résolution des combats par lots.
+
+Génère ``--battles`` combats aléatoires entre ``--villages`` villages, dus au
+même tick, et mesure leur résolution avec NumPy et en Python pur (mêmes
+résultats, vérifiés), puis le tick complet sur un MemoryEngine: lecture des
+stocks, résolution et écriture groupée du pillage.
+
+Usage:
+    python -m tools.bench_combat --battles 100000 --villages 50000
+"""
+
+import argparse
+import random
+import time
+
+from ager.adapters.memory_engine import MemoryEngine
+from ager.combat import UNITS, Battle, CombatQueue, _numpy, resolve_battles, resolve_tick
+from ager.models import Resources, Village
+
+
+def random_battles(count: int, villages: int, max_units: int = 200, seed: int = 0) -> list[Battle]:
+    """Combats aléatoires entre villages distincts de 1..villages."""
+    rng = random.Random(seed)
+    battles = []
+    for _ in range(count):
+        attacker, defender = rng.sample(range(1, villages + 1), 2)
+        battles.append(
+            Battle(
+                attacker,
+                defender,
+                tuple(rng.randint(0, max_units) for _ in UNITS),
+                tuple(rng.randint(0, max_units) for _ in UNITS),
+            )
+        )
+    return battles
+
+
+def random_world(villages: int, seed: int = 0) -> dict[int, Village]:
+    """Villages 1..villages aux stocks aléatoires."""
+    rng = random.Random(seed)
+    return {
+        vid: Village(
+            id=vid,
+            name=f"Village {vid}",
+            resources=Resources(**{r: rng.randint(0, 5000) for r in Resources.model_fields}),
+        )
+        for vid in range(1, villages + 1)
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Point d'entrée CLI."""
+    parser = argparse.ArgumentParser(description="Batch combat resolution benchmark")
+    parser.add_argument("--battles", type=int, default=100_000, help="Battles due in the tick")
+    parser.add_argument("--villages", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    world = random_world(args.villages, args.seed)
+    battles = random_battles(args.battles, args.villages, seed=args.seed)
+    stocks = {vid: v.resources for vid, v in world.items()}
+
+    modes = [False] if _numpy() is None else [True, False]
+    if len(modes) == 1:
+        print("[INFO] NumPy not installed (pip install '.[combat]'): pure Python only")
+    results = []
+    for vectorized in modes:
+        started = time.perf_counter()
+        results.append(resolve_battles(battles, stocks, vectorized))
+        seconds = time.perf_counter() - started
+        name = "numpy" if vectorized else "python"
+        print(f"[OK] {name}: {args.battles} battles in {seconds * 1000:.0f} ms")
+    if len(results) == 2 and results[0] != results[1]:
+        raise SystemExit("[ERROR] NumPy and pure Python results differ")
+
+    engine = MemoryEngine()
+    engine.world = world
+    queue = CombatQueue()
+    for battle in battles:
+        queue.schedule(battle, tick=1)
+    started = time.perf_counter()
+    _, tick_results = resolve_tick(engine, queue, tick=1)
+    seconds = time.perf_counter() - started
+    print(
+        f"[OK] tick: {args.battles} battles, {len(tick_results.deltas)} villages updated "
+        f"in {seconds * 1000:.0f} ms ({args.battles / seconds:.0f} battles/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Benchmark du moteur tiered sous un accès de popularité Zipf.
+
+Dans un monde de ``--villages`` villages, la plupart sont inactifs: quelques
+villages concentrent les accès (loi de Zipf d'exposant ``--zipf``). Le
+benchmark compare TieredEngine (cache LRU de ``--capacity`` villages devant
+SQLite) à SQLiteEngine seul, sur la même suite d'accès (lectures et
+``--writes`` de commandes).
+
+Usage:
+    python -m tools.bench_tiered data/bench.db --villages 100000 --capacity 10000
+"""
+
+import argparse
+import random
+import sqlite3
+import time
+from bisect import bisect_left
+from collections.abc import Callable
+from dataclasses import dataclass
+from itertools import accumulate
+from pathlib import Path
+
+from ager.adapters.sql_engine import SQLiteEngine
+from ager.adapters.tiered_engine import TieredEngine
+from ager.models import BuildCmd
+from ager.ports import SimulationEngine
+
+
+@dataclass
+class BenchResult:
+    """Résultat d'une passe de benchmark."""
+
+    name: str
+    ops: int
+    seconds: float
+    hit_ratio: float | None = None
+    evictions: int = 0
+
+    @property
+    def ops_per_second(self) -> float:
+        return self.ops / self.seconds if self.seconds else 0.0
+
+
+def zipf_sampler(n: int, exponent: float = 1.1, seed: int = 0) -> Callable[[], int]:
+    """Tire des IDs 1..n selon une loi de Zipf (l'ID 1 est le plus populaire).
+
+    Args:
+        n: Nombre de villages
+        exponent: Exposant de la loi (plus il est grand, plus l'accès est concentré)
+        seed: Graine du générateur, pour des suites d'accès reproductibles
+
+    Returns:
+        Fonction sans argument retournant un ID de village
+    """
+    cumulative = list(accumulate(1 / rank**exponent for rank in range(1, n + 1)))
+    total = cumulative[-1]
+    rng = random.Random(seed)
+
+    def sample() -> int:
+        return bisect_left(cumulative, rng.random() * total) + 1
+
+    return sample
+
+
+def populate(db_path: Path, villages: int) -> None:
+    """Crée (ou complète) une base SQLite contenant les villages 1..villages."""
+    SQLiteEngine(db_path, use_template=False).close()
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO village(id, name) VALUES (?, ?)",
+            ((vid, f"Village {vid}") for vid in range(1, villages + 1)),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO resources(village_id, wood, clay, iron, crop) "
+            "VALUES (?, 800, 800, 800, 800)",
+            ((vid,) for vid in range(1, villages + 1)),
+        )
+    conn.close()
+
+
+def run(
+    name: str,
+    engine: SimulationEngine,
+    sampler: Callable[[], int],
+    ops: int,
+    write_ratio: float = 0.1,
+    seed: int = 0,
+) -> BenchResult:
+    """Exécute ``ops`` accès (lectures ou commandes) sur un moteur.
+
+    Args:
+        name: Nom affiché du moteur
+        engine: Moteur testé
+        sampler: Tirage des IDs de village
+        ops: Nombre d'accès
+        write_ratio: Part des accès qui sont des commandes de construction
+        seed: Graine du choix lecture/écriture
+
+    Returns:
+        Résultat de la passe
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    for i in range(ops):
+        vid = sampler()
+        if rng.random() < write_ratio:
+            engine.queue_build(BuildCmd(villageId=vid, building="farm", levelTarget=i % 20 + 1))
+        else:
+            engine.get_village(vid)
+    result = BenchResult(name, ops, time.perf_counter() - started)
+    if isinstance(engine, TieredEngine):
+        result.hit_ratio = engine.hits / max(1, engine.hits + engine.misses)
+        result.evictions = engine.evictions
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Point d'entrée CLI."""
+    parser = argparse.ArgumentParser(description="Tiered engine benchmark (Zipf access)")
+    parser.add_argument("db", type=Path, help="SQLite database (created if missing)")
+    parser.add_argument("--villages", type=int, default=100_000)
+    parser.add_argument("--capacity", type=int, default=10_000, help="Hot villages in memory")
+    parser.add_argument("--ops", type=int, default=20_000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent")
+    parser.add_argument("--writes", type=float, default=0.1, help="Share of build commands")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    populate(args.db, args.villages)
+    store = SQLiteEngine(args.db)
+    tiered = TieredEngine(SQLiteEngine(args.db), capacity=args.capacity)
+    for name, engine in (("sql", store), ("tiered", tiered)):
+        sampler = zipf_sampler(args.villages, args.zipf, args.seed)
+        result = run(name, engine, sampler, args.ops, args.writes, args.seed)
+        line = f"[OK] {result.name}: {result.ops_per_second:.0f} ops/s"
+        if result.hit_ratio is not None:
+            line += f", hit ratio {result.hit_ratio:.1%}, {result.evictions} evictions"
+        print(line)
+    print(f"[INFO] {tiered.resident} villages resident (capacity {args.capacity})")
+    tiered.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""Générateur de charge HTTP pour l'API AGER, moteur par moteur.
+
+Envoie un mélange de requêtes ``/snapshot``, ``/village/{vid}`` et
+``/cmd/build`` à débit cible, en boucle ouverte: les arrivées suivent un
+processus de Poisson (ou un intervalle fixe avec ``--steady``),
+indépendamment des réponses. La latence est mesurée depuis la date
+d'arrivée prévue: si le générateur ou le serveur prend du retard, ce retard
+est compté (pas d'omission coordonnée).
+
+Deux cibles:
+
+- ``asgi`` (défaut): l'application ``ager.app:app`` est appelée dans le
+  processus via ``httpx.ASGITransport``, sans réseau, avec son lifespan.
+  Générateur et serveur partagent alors la boucle d'événements: les chiffres
+  servent à comparer des moteurs ou des versions, pas à dimensionner seuls.
+- ``uvicorn``: un serveur uvicorn local est lancé par moteur (sous-processus,
+  ``--port``), puis arrêté à la fin de la passe.
+
+Chaque moteur de ``--engines`` tourne sur des fichiers neufs (répertoire
+temporaire). Le contrôle d'admission est désactivé sauf avec ``--admission``:
+toutes les requêtes viennent d'un même client. Le catalogue des bâtiments
+l'est aussi sauf avec ``--catalog``: sans coût prélevé, chaque construction
+est acceptée et mesure le chemin d'écriture du moteur (avec, les villages
+épuisent vite leurs stocks et les commandes suivantes sont refusées).
+
+Usage:
+    python -m tools.loadgen --engines memory,sql --rate 500 --duration 10
+    python -m tools.loadgen --mix snapshot=1,village=8,build=1 --target uvicorn
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+ROUTES = ("snapshot", "village", "build")
+BUILDINGS = ("farm", "woodcutter", "clay_pit", "iron_mine", "warehouse")
+
+# Variables fixées pour chaque passe (hors AGER_ENGINE et chemins de stockage)
+NO_ADMISSION = {"AGER_CLIENT_RATE": "0", "AGER_VILLAGE_RATE": "0", "AGER_MAX_INFLIGHT_BUILDS": "0"}
+
+
+@dataclass
+class RouteStats:
+    """Latences (en secondes) et statuts observés sur une route."""
+
+    latencies: list[float] = field(default_factory=list)
+    statuses: dict[int, int] = field(default_factory=dict)
+    failures: int = 0
+
+    def record(self, latency: float, status: int) -> None:
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    @property
+    def errors(self) -> int:
+        """Réponses hors 2xx et échecs de transport."""
+        return self.failures + sum(n for s, n in self.statuses.items() if not 200 <= s < 300)
+
+
+@dataclass
+class LoadReport:
+    """Résultat d'une passe sur un moteur."""
+
+    engine: str
+    seconds: float
+    routes: dict[str, RouteStats]
+    dropped: int = 0
+
+    @property
+    def requests(self) -> int:
+        return sum(len(stats.latencies) + stats.failures for stats in self.routes.values())
+
+    @property
+    def throughput(self) -> float:
+        """Requêtes terminées par seconde."""
+        return self.requests / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> dict[str, Any]:
+        """Résumé sérialisable (latences en millisecondes)."""
+        return {
+            "engine": self.engine,
+            "seconds": round(self.seconds, 3),
+            "requests": self.requests,
+            "throughput": round(self.throughput, 1),
+            "dropped": self.dropped,
+            "routes": {
+                name: {
+                    "count": len(stats.latencies),
+                    "errors": stats.errors,
+                    "statuses": {str(s): n for s, n in sorted(stats.statuses.items())},
+                    **{
+                        key: round(value * 1000, 3)
+                        for key, value in latency_summary(stats.latencies).items()
+                    },
+                }
+                for name, stats in self.routes.items()
+            },
+        }
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Percentile ``q`` (0-100) par rang le plus proche d'une liste triée.
+
+    Returns:
+        La valeur de rang ``ceil(q/100 * n)``, 0.0 pour une liste vide
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def latency_summary(latencies: list[float]) -> dict[str, float]:
+    """p50, p95, p99 et max d'une série de latences."""
+    ordered = sorted(latencies)
+    return {
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1] if ordered else 0.0,
+    }
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    """Lit un mélange ``snapshot=1,village=8,build=1`` (poids relatifs).
+
+    Raises:
+        ValueError: Route inconnue, poids négatif ou somme nulle
+    """
+    mix: dict[str, float] = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise ValueError(f"Route inconnue: {name!r} (attendu: {', '.join(ROUTES)})")
+        mix[name] = float(weight) if weight else 1.0
+        if mix[name] < 0:
+            raise ValueError(f"Poids négatif pour {name}")
+    if not sum(mix.values()):
+        raise ValueError("Le mélange ne contient aucune requête")
+    return mix
+
+
+def arrivals(rate: float, duration: float, rng: random.Random, steady: bool) -> Iterator[float]:
+    """Dates d'arrivée (secondes depuis le début) à ``rate`` requêtes par seconde."""
+    t = 0.0
+    while True:
+        t += 1 / rate if steady else rng.expovariate(rate)
+        if t >= duration:
+            return
+        yield t
+
+
+def build_request(route: str, rng: random.Random, villages: int) -> tuple[str, str, Any]:
+    """(méthode, chemin, corps JSON) d'une requête de la route donnée."""
+    vid = rng.randint(1, villages)
+    if route == "snapshot":
+        return "GET", "/snapshot", None
+    if route == "village":
+        return "GET", f"/village/{vid}", None
+    cmd = {"villageId": vid, "building": rng.choice(BUILDINGS), "levelTarget": rng.randint(1, 20)}
+    return "POST", "/cmd/build", cmd
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    engine: str,
+    mix: dict[str, float],
+    rate: float,
+    duration: float,
+    villages: int = 1,
+    seed: int = 0,
+    steady: bool = False,
+    max_outstanding: int = 10_000,
+) -> LoadReport:
+    """Exécute une passe en boucle ouverte contre un client déjà configuré.
+
+    Args:
+        client: Client HTTP (transport ASGI ou serveur local)
+        engine: Nom du moteur, pour le rapport
+        mix: Poids relatifs des routes
+        rate: Débit cible, en requêtes par seconde
+        duration: Durée de la passe, en secondes
+        villages: Les IDs de village sont tirés dans 1..villages
+        seed: Graine du tirage des arrivées et des requêtes
+        steady: Intervalle fixe au lieu d'arrivées de Poisson
+        max_outstanding: Requêtes en cours au-delà desquelles une arrivée est
+            abandonnée (comptée dans ``dropped``) plutôt que d'épuiser la mémoire
+
+    Returns:
+        Rapport de la passe
+    """
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    report = LoadReport(engine, 0.0, {name: RouteStats() for name in names})
+    pending: set[asyncio.Task[None]] = set()
+
+    async def fire(route: str, scheduled: float) -> None:
+        method, path, body = build_request(route, rng, villages)
+        stats = report.routes[route]
+        try:
+            response = await client.request(method, path, json=body)
+        except httpx.HTTPError:
+            stats.failures += 1
+            return
+        stats.record(time.perf_counter() - scheduled, response.status_code)
+
+    started = time.perf_counter()
+    for offset in arrivals(rate, duration, rng, steady):
+        scheduled = started + offset
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(pending) >= max_outstanding:
+            report.dropped += 1
+            continue
+        task = asyncio.create_task(fire(rng.choices(names, weights)[0], scheduled))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.wait(pending)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+@contextmanager
+def engine_environment(
+    engine: str, data_dir: Path, admission: bool, catalog: bool = False
+) -> Iterator[dict[str, str]]:
+    """Configure l'environnement d'une passe (moteur, fichiers neufs, admission, catalogue).
+
+    Yields:
+        Variables ajoutées à l'environnement (pour un sous-processus)
+    """
+    overrides = {
+        "AGER_ENGINE": engine,
+        "AGER_STORAGE_PATH": str(data_dir / "world.json"),
+        "AGER_DB_PATH": str(data_dir / "ager.db"),
+        "AGER_EVENT_DIR": str(data_dir / "events"),
+        **({} if admission else NO_ADMISSION),
+        **(
+            {"AGER_GAME_DATA_CACHE": str(data_dir / "cache")}
+            if catalog
+            else {"AGER_GAME_DATA_DIR": "off"}
+        ),
+    }
+    saved = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    try:
+        yield overrides
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+async def run_asgi(engine: str, **options: Any) -> LoadReport:
+    """Passe en processus: ``ager.app:app`` via ASGITransport, lifespan compris."""
+    from ager import admission, container
+    from ager.app import app
+
+    container.reset_engine()
+    admission.reset_admission()
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadgen") as client:
+                return await drive(client, engine, **options)
+    finally:
+        close = getattr(container.get_engine(), "close", None)
+        if callable(close):
+            close()
+        container.reset_engine()
+        admission.reset_admission()
+
+
+async def run_uvicorn(engine: str, port: int, env: dict[str, str], **options: Any) -> LoadReport:
+    """Passe contre un serveur uvicorn local lancé pour ce moteur."""
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "ager.app:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env={**os.environ, **env},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        limits = httpx.Limits(max_connections=64, max_keepalive_connections=64)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+            await _wait_ready(client, server)
+            return await drive(client, engine, **options)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+async def _wait_ready(client: httpx.AsyncClient, server: subprocess.Popen[bytes]) -> None:
+    """Attend que ``/health`` réponde (10 s au plus)."""
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn s'est arrêté (code {server.returncode})")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("uvicorn n'a pas démarré en 10 s")
+
+
+def format_report(report: LoadReport) -> str:
+    """Tableau texte d'une passe (latences en millisecondes)."""
+    lines = [
+        f"[OK] {report.engine}: {report.throughput:.0f} req/s, "
+        f"{report.requests} requests in {report.seconds:.1f} s"
+        + (f", {report.dropped} dropped" if report.dropped else ""),
+        f"  {'route':<10}{'count':>8}{'errors':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}",
+    ]
+    for name, stats in report.routes.items():
+        lat = latency_summary(stats.latencies)
+        lines.append(
+            f"  {name:<10}{len(stats.latencies):>8}{stats.errors:>8}"
+            + "".join(f"{lat[key] * 1000:>10.2f}" for key in ("p50", "p95", "p99", "max"))
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Point d'entrée CLI."""
+    parser = argparse.ArgumentParser(description="Open-loop load generator for the AGER API")
+    parser.add_argument("--engines", default="memory", help="Comma-separated AGER_ENGINE values")
+    parser.add_argument("--target", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--port", type=int, default=8765, help="uvicorn target port")
+    parser.add_argument("--mix", default="snapshot=1,village=8,build=1", help="Route weights")
+    parser.add_argument("--rate", type=float, default=200.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per engine")
+    parser.add_argument("--villages", type=int, default=1, help="Village ids drawn in 1..N")
+    parser.add_argument("--steady", action="store_true", help="Fixed interval, not Poisson")
+    parser.add_argument("--admission", action="store_true", help="Keep admission control on")
+    parser.add_argument("--catalog", action="store_true", help="Charge building costs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="Also write the reports as JSON")
+    args = parser.parse_args(argv)
+
+    options = {
+        "mix": parse_mix(args.mix),
+        "rate": args.rate,
+        "duration": args.duration,
+        "villages": args.villages,
+        "seed": args.seed,
+        "steady": args.steady,
+    }
+    reports = []
+    for engine in (name.strip().lower() for name in args.engines.split(",") if name.strip()):
+        with tempfile.TemporaryDirectory(prefix=f"loadgen-{engine}-") as tmp:
+            with engine_environment(engine, Path(tmp), args.admission, args.catalog) as env:
+                if args.target == "asgi":
+                    report = asyncio.run(run_asgi(engine, **options))
+                else:
+                    report = asyncio.run(run_uvicorn(engine, args.port, env, **options))
+        print(format_report(report))
+        reports.append(report.summary())
+    if args.json:
+        args.json.write_text(json.dumps(reports, indent=2))
+        print(f"[INFO] Reports written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
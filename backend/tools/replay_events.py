@@ -0,0 +1,105 @@
+"""Rejeu déterministe du journal de commandes du moteur "events".
+
+Reconstruit un monde à partir de la genèse (ou du dernier checkpoint) en
+rejouant les commandes journalisées, éventuellement jusqu'à un numéro donné.
+Le rejeu applique les commandes avec les méthodes de MemoryEngine, sans
+journaliser: le débit affiché mesure donc le coût de la simulation seule.
+
+Usage:
+    python -m tools.replay_events data/events
+    python -m tools.replay_events data/events --until 5000 --out data/world.json
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from ager.adapters.event_engine import (
+    apply_event,
+    iter_events,
+    list_checkpoints,
+    village_record,
+    write_world_file,
+)
+from ager.adapters.file_engine import load_world
+from ager.adapters.memory_engine import MemoryEngine
+
+
+@dataclass
+class ReplayStats:
+    """Compteurs d'un rejeu."""
+
+    start_seq: int = 0
+    last_seq: int = 0
+    commands: int = 0
+    seconds: float = 0.0
+
+    @property
+    def commands_per_second(self) -> float:
+        return self.commands / self.seconds if self.seconds else 0.0
+
+
+def replay(
+    event_dir: Path, until: int | None = None, from_checkpoint: bool = False
+) -> tuple[MemoryEngine, ReplayStats]:
+    """Reconstruit le monde décrit par un journal de commandes.
+
+    Args:
+        event_dir: Répertoire du journal
+        until: Dernier numéro de commande à appliquer (None: tout le journal)
+        from_checkpoint: Partir du dernier checkpoint antérieur à ``until``
+            plutôt que de la genèse
+
+    Returns:
+        (moteur mémoire contenant le monde reconstruit, statistiques)
+
+    Raises:
+        FileNotFoundError: Si le répertoire ne contient aucun checkpoint
+    """
+    checkpoints = [c for c in list_checkpoints(event_dir) if until is None or c.seq <= until]
+    if not checkpoints:
+        raise FileNotFoundError(f"Aucun checkpoint dans {event_dir}")
+    start = checkpoints[-1] if from_checkpoint else checkpoints[0]
+
+    engine = MemoryEngine()
+    engine.world = load_world(start.path)
+    stats = ReplayStats(start_seq=start.seq, last_seq=start.seq)
+
+    started = time.perf_counter()
+    for seq, event in iter_events(event_dir, after_seq=start.seq):
+        if until is not None and seq > until:
+            break
+        apply_event(engine, event)
+        stats.last_seq = seq
+        stats.commands += 1
+    stats.seconds = time.perf_counter() - started
+    return engine, stats
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Point d'entrée CLI."""
+    parser = argparse.ArgumentParser(description="Rebuild a world from an event log")
+    parser.add_argument("event_dir", type=Path)
+    parser.add_argument("--until", type=int, default=None, help="Last command to apply")
+    parser.add_argument(
+        "--from-checkpoint",
+        action="store_true",
+        help="Start from the latest checkpoint instead of the genesis world",
+    )
+    parser.add_argument("--out", type=Path, default=None, help="Write the world to a JSON file")
+    args = parser.parse_args(argv)
+
+    engine, stats = replay(args.event_dir, args.until, args.from_checkpoint)
+    print(
+        f"[OK] replayed {stats.commands} commands ({stats.start_seq + 1}..{stats.last_seq}) "
+        f"in {stats.seconds:.2f}s ({stats.commands_per_second:.0f} commands/s)"
+    )
+    if args.out is not None:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        count = write_world_file(args.out, (village_record(v) for v in engine.snapshot()))
+        print(f"[INFO] {count} villages written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
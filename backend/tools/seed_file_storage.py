@@ -24,8 +24,8 @@ def create_seed_state() -> dict:
     """
     return {
         "villages": {
-            "1": {"id": 1, "name": "Capitale"},
-            "2": {"id": 2, "name": "Avant-Poste"},
+            "1": {"id": 1, "name": "Capitale", "x": 0, "y": 0},
+            "2": {"id": 2, "name": "Avant-Poste", "x": 12, "y": -7},
         },
         "resources": {
             "1": {"wood": 100, "clay": 80, "iron": 90, "crop": 75},
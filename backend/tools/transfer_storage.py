@@ -0,0 +1,349 @@
+"""Transfert en masse d'un monde entre FileStorageEngine (JSON) et SQLiteEngine.
+
+Les villages, ressources et queues de construction sont streamés par blocs:
+- côté SQL: ``executemany`` dans une seule transaction (ressources et queues
+  via des tables temporaires, puis un ``INSERT ... SELECT`` par table), index
+  supprimés pendant le chargement puis recréés à la fin;
+- côté fichier: lecture et écriture JSON incrémentales (format seed).
+
+La mémoire reste bornée par la taille d'un bloc, quel que soit le nombre de villages.
+
+Usage:
+    python -m tools.transfer_storage to-sql data/world.json data/ager.db
+    python -m tools.transfer_storage to-file data/ager.db data/world.json
+"""
+
+import argparse
+import sqlite3
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from ager.adapters.json_stream import WorldJsonWriter, iter_world_records
+from ager.db.migrations.runner import MIGRATIONS_DIR, apply_migrations
+from ager.models import Resources
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Tables du monde, dans l'ordre des dépendances (FK)
+_WORLD_TABLES = ("village", "resources", "build_queue")
+_RESOURCE_KEYS = ("wood", "clay", "iron", "crop")
+_RESOURCE_DEFAULTS = Resources().model_dump()
+
+
+@dataclass
+class TransferStats:
+    """Compteurs d'un transfert."""
+
+    villages: int = 0
+    resources: int = 0
+    queue_items: int = 0
+    seconds: float = 0.0
+
+
+def _resource_row(vid: int, priority: int, data: dict[str, Any]) -> tuple[int, ...]:
+    return (vid, priority, *(int(data.get(k, _RESOURCE_DEFAULTS[k])) for k in _RESOURCE_KEYS))
+
+
+def _parse_queue_item(item: str) -> tuple[str, int]:
+    """Convertit une entrée de queue ``"farm -> L2"`` en (building, level)."""
+    building, sep, level = item.rpartition(" -> L")
+    if not sep or not level.isdigit():
+        return item, 1
+    return building, int(level)
+
+
+# --- Fichier JSON -> SQLite ---------------------------------------------------
+
+
+class _ChunkedInserter:
+    """Accumule des lignes et les envoie par ``executemany`` à chaque bloc plein."""
+
+    def __init__(self, conn: sqlite3.Connection, sql: str, chunk_size: int) -> None:
+        self._conn = conn
+        self._sql = sql
+        self._chunk_size = chunk_size
+        self._rows: list[tuple[Any, ...]] = []
+        self.count = 0
+
+    def add(self, row: tuple[Any, ...]) -> None:
+        self._rows.append(row)
+        if len(self._rows) >= self._chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._rows:
+            self._conn.executemany(self._sql, self._rows)
+            self.count += len(self._rows)
+            self._rows.clear()
+
+
+# Tables de chargement: chaque ligne porte la priorité de sa source (0 l'emporte)
+_STAGING_DDL = (
+    "CREATE TEMP TABLE import_resources("
+    "village_id INTEGER, priority INTEGER, wood INTEGER, clay INTEGER, iron INTEGER, "
+    "crop INTEGER)",
+    "CREATE TEMP TABLE import_queue("
+    "village_id INTEGER, priority INTEGER, building TEXT, level INTEGER, queued_at TEXT)",
+)
+# Ressources du village avant la section ``resources``
+_INLINE_RESOURCES, _SEPARATE_RESOURCES = 0, 1
+# Section ``buildQueues`` avant la queue du village
+_SEPARATE_QUEUE, _INLINE_QUEUE = 0, 1
+
+# Par village, seules les lignes de la source prioritaire sont gardées (une
+# colonne nue à côté de min() vient de la ligne du minimum, en SQLite); les
+# lignes sans village sont ignorées, comme dans FileStorageEngine
+_FINAL_RESOURCES = (
+    "INSERT INTO resources(village_id, wood, clay, iron, crop) "
+    "SELECT village_id, wood, clay, iron, crop FROM ("
+    "  SELECT village_id, min(priority), wood, clay, iron, crop"
+    "  FROM import_resources GROUP BY village_id"
+    ") WHERE village_id IN (SELECT id FROM village)"
+)
+_FINAL_QUEUE = (
+    "INSERT INTO build_queue(village_id, building, level, queued_at) "
+    "SELECT q.village_id, q.building, q.level, q.queued_at FROM import_queue q "
+    "JOIN (SELECT village_id, min(priority) AS priority FROM import_queue GROUP BY village_id) w "
+    "ON w.village_id = q.village_id AND w.priority = q.priority "
+    "WHERE q.village_id IN (SELECT id FROM village) "
+    "ORDER BY q.rowid"
+)
+
+
+def import_file_to_sql(
+    json_path: Path, db_path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> TransferStats:
+    """Remplace le monde de la base SQLite par celui du fichier JSON.
+
+    Supporte les deux formats lus par FileStorageEngine (legacy et seed), avec
+    les mêmes priorités: ressources du village avant ``resources`` séparées,
+    ``buildQueues`` avant la queue du village, quel que soit l'ordre des
+    sections dans le fichier. Les trois sections sont reliées par leur clé de
+    village, qui devient l'ID de chaque ligne.
+
+    Les ressources et les queues sont d'abord chargées, avec leur priorité,
+    dans des tables temporaires; chaque table du monde est ensuite remplie par
+    un seul ``INSERT ... SELECT`` qui garde la source prioritaire de chaque
+    village.
+
+    Args:
+        json_path: Fichier JSON source
+        db_path: Base SQLite cible (créée et migrée si nécessaire)
+        chunk_size: Nombre de lignes par ``executemany``
+
+    Returns:
+        Statistiques du transfert
+    """
+    started = time.perf_counter()
+    apply_migrations(db_path, MIGRATIONS_DIR)
+    imported_at = datetime.now(UTC).isoformat()
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-65536")
+    for ddl in _STAGING_DDL:
+        conn.execute(ddl)
+    villages = _ChunkedInserter(
+        conn, "INSERT INTO village(id, name, x, y) VALUES (?, ?, ?, ?)", chunk_size
+    )
+    resources = _ChunkedInserter(
+        conn,
+        "INSERT INTO import_resources(village_id, priority, wood, clay, iron, crop) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        chunk_size,
+    )
+    queue = _ChunkedInserter(
+        conn,
+        "INSERT INTO import_queue(village_id, priority, building, level, queued_at) "
+        "VALUES (?, ?, ?, ?, ?)",
+        chunk_size,
+    )
+
+    try:
+        conn.execute("BEGIN")
+        for table in reversed(_WORLD_TABLES):
+            conn.execute(f"DELETE FROM {table}")
+        indexes = _drop_indexes(conn)
+
+        with json_path.open(encoding="utf-8") as fp:
+            for section, key, value in iter_world_records(fp):
+                vid = int(key)
+                if section == "villages":
+                    villages.add(
+                        (vid, value["name"], int(value.get("x", 0)), int(value.get("y", 0)))
+                    )
+                    if "resources" in value:
+                        resources.add(_resource_row(vid, _INLINE_RESOURCES, value["resources"]))
+                    for item in value.get("queue", []):
+                        queue.add((vid, _INLINE_QUEUE, *_parse_queue_item(item), imported_at))
+                elif section == "resources":
+                    resources.add(_resource_row(vid, _SEPARATE_RESOURCES, value))
+                elif section == "buildQueues":
+                    for item in value:
+                        queue.add(
+                            (
+                                vid,
+                                _SEPARATE_QUEUE,
+                                item["building"],
+                                int(item.get("level", 1)),
+                                item.get("queuedAt", imported_at),
+                            )
+                        )
+
+        for inserter in (villages, resources, queue):
+            inserter.flush()
+        resource_rows = conn.execute(_FINAL_RESOURCES).rowcount
+        queue_rows = conn.execute(_FINAL_QUEUE).rowcount
+        for sql in indexes:
+            conn.execute(sql)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    return TransferStats(
+        villages=villages.count,
+        resources=resource_rows,
+        queue_items=queue_rows,
+        seconds=time.perf_counter() - started,
+    )
+
+
+def _drop_indexes(conn: sqlite3.Connection) -> list[str]:
+    """Supprime les index des tables du monde et retourne leur DDL pour recréation."""
+    placeholders = ", ".join("?" for _ in _WORLD_TABLES)
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master "
+        f"WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})",
+        _WORLD_TABLES,
+    ).fetchall()
+    for name, _ in rows:
+        conn.execute(f'DROP INDEX "{name}"')
+    return [sql for _, sql in rows]
+
+
+# --- SQLite -> Fichier JSON ---------------------------------------------------
+
+
+def _fetch_chunks(conn: sqlite3.Connection, sql: str, chunk_size: int) -> Iterator[tuple[Any, ...]]:
+    cursor = conn.execute(sql)
+    while rows := cursor.fetchmany(chunk_size):
+        yield from rows
+
+
+def _village_records(conn: sqlite3.Connection, chunk_size: int) -> Iterator[tuple[str, Any]]:
+    sql = "SELECT id, name, x, y FROM village ORDER BY id"
+    for vid, name, x, y in _fetch_chunks(conn, sql, chunk_size):
+        yield str(vid), {"id": vid, "name": name, "x": x, "y": y}
+
+
+def _resource_records(conn: sqlite3.Connection, chunk_size: int) -> Iterator[tuple[str, Any]]:
+    sql = "SELECT village_id, wood, clay, iron, crop FROM resources ORDER BY village_id"
+    for vid, *values in _fetch_chunks(conn, sql, chunk_size):
+        yield str(vid), dict(zip(_RESOURCE_KEYS, values, strict=True))
+
+
+def _queue_records(conn: sqlite3.Connection, chunk_size: int) -> Iterator[tuple[str, Any]]:
+    sql = (
+        "SELECT village_id, building, level, queued_at FROM build_queue "
+        "ORDER BY village_id, queued_at, id"
+    )
+    current: int | None = None
+    items: list[dict[str, Any]] = []
+    for vid, building, level, queued_at in _fetch_chunks(conn, sql, chunk_size):
+        if vid != current:
+            if current is not None:
+                yield str(current), items
+            current, items = vid, []
+        items.append({"building": building, "level": level, "queuedAt": queued_at})
+    if current is not None:
+        yield str(current), items
+
+
+def _count_queue_items(
+    records: Iterator[tuple[str, Any]], stats: TransferStats
+) -> Iterator[tuple[str, Any]]:
+    for key, items in records:
+        stats.queue_items += len(items)
+        yield key, items
+
+
+def export_sql_to_file(
+    db_path: Path, json_path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> TransferStats:
+    """Exporte le monde d'une base SQLite vers un fichier JSON (format seed).
+
+    Le fichier est écrit dans un fichier temporaire puis renommé, pour ne jamais
+    laisser un monde à moitié écrit à la place de l'ancien.
+
+    Args:
+        db_path: Base SQLite source
+        json_path: Fichier JSON cible
+        chunk_size: Nombre de lignes lues par ``fetchmany``
+
+    Returns:
+        Statistiques du transfert
+    """
+    started = time.perf_counter()
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = json_path.with_name(json_path.name + ".tmp")
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        # Une seule transaction de lecture: les trois sections sont cohérentes
+        conn.execute("BEGIN")
+        with tmp_path.open("w", encoding="utf-8") as fp:
+            writer = WorldJsonWriter(fp)
+            stats = TransferStats()
+            stats.villages = writer.write_section("villages", _village_records(conn, chunk_size))
+            stats.resources = writer.write_section("resources", _resource_records(conn, chunk_size))
+            writer.write_section(
+                "buildQueues", _count_queue_items(_queue_records(conn, chunk_size), stats)
+            )
+            writer.close()
+    finally:
+        conn.close()
+
+    tmp_path.replace(json_path)
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Point d'entrée CLI."""
+    parser = argparse.ArgumentParser(description="Bulk transfer between file and SQL storage")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Rows per batch (default: {DEFAULT_CHUNK_SIZE})",
+    )
+    sub = parser.add_subparsers(dest="direction", required=True)
+    to_sql = sub.add_parser("to-sql", help="Import a JSON world file into a SQLite database")
+    to_sql.add_argument("source", type=Path)
+    to_sql.add_argument("target", type=Path)
+    to_file = sub.add_parser("to-file", help="Export a SQLite database to a JSON world file")
+    to_file.add_argument("source", type=Path)
+    to_file.add_argument("target", type=Path)
+    args = parser.parse_args(argv)
+
+    if args.direction == "to-sql":
+        stats = import_file_to_sql(args.source, args.target, args.chunk_size)
+    else:
+        stats = export_sql_to_file(args.source, args.target, args.chunk_size)
+
+    print(f"[OK] {args.source} -> {args.target} in {stats.seconds:.2f}s")
+    print(
+        f"[INFO] {stats.villages} villages, {stats.resources} resources, "
+        f"{stats.queue_items} queue items"
+    )
+
+
+if __name__ == "__main__":
+    main()